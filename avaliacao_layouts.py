@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Avaliação Vetorizada de Layouts
+
+Para um lote de grupos de fotos candidatos a página, avalia todos os
+layouts registrados (layouts.py) com o número certo de slots, em todas as
+permutações das fotos nos slots, e devolve a melhor atribuição de cada
+grupo. Tudo em NumPy: o livro inteiro de candidatos sai numa chamada.
+
+Cada par (foto, slot de um layout) recebe um custo, calculado uma vez:
+- PESO_PERDA_RECORTE x fração da foto cortada para cobrir o slot
+- PESO_ROSTOS x fração da área das pessoas detectadas que fica fora do
+  recorte inteligente (recortes.recortes_inteligentes)
+- PESO_DPI x quanto o DPI efetivo fica abaixo de DPI_MINIMO
+- PESO_ORIENTACAO se o slot prefere a outra orientação
+- PESO_PESSOAS x fração da área útil perdida, para fotos com muitas
+  pessoas (mais que LIMITE_PESSOAS_SIMPLES) em slots pequenos
+- PESO_LADO se um 'fv-l'/'fv-r'/'fh-t'/'fh-b' fica do lado errado da página
+
+e os tipos de slot do usuário são restrições: 'full' só em layouts de um
+slot; 'fv-*'/'fh-*' só em layouts de até dois slots e, dividindo a
+página, num slot vertical/horizontal. O custo de um grupo num layout é a
+soma dos custos dos seus pares (foto, slot); o melhor layout e permutação
+saem de um mínimo sobre o array (grupos, permutações) de cada layout.
+
+Grupos maiores que o maior layout registrado são avaliados nas colagens em
+linhas justificadas (avaliar_justificados), com as fotos na ordem e
+PESO_COLAGEM a mais por foto.
+
+Usado pela paginação (paginacao.py), pelo gerador (fotolivro.py), pelo
+schema e pela troca de layout no preview. Ver a medição 'avaliacao' em
+benchmark.py (tempo) e tests/test_avaliacao_layouts.py (paridade com o
+laço escalar).
+"""
+
+from dataclasses import dataclass
+from itertools import permutations
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from constantes import RATIO_QUADRADO_MIN, RATIO_QUADRADO_MAX
+from layouts import (LAYOUTS, AREAS_UTEIS, ESPACO_FOTOS, boxes_justificado, boxes_layout,
+                     empacotar_linhas, id_justificado)
+from planejamento import DPI_MINIMO
+from recortes import recortes_inteligentes
+
+
+# Pesos do custo de cada foto num slot (ver docstring do módulo)
+PESO_PERDA_RECORTE = 1.0
+PESO_ROSTOS = 2.0
+PESO_DPI = 1.0
+PESO_ORIENTACAO = 0.25
+PESO_PESSOAS = 0.5
+PESO_LADO = 0.5
+
+# Custo extra de cada foto numa colagem em linhas justificadas (fotos
+# menores): sem orçamento de páginas, poucas páginas viram colagem
+PESO_COLAGEM = 0.5
+
+# Acima disso a foto não é "simples" (mesmo critério de FotoInfo.simples)
+LIMITE_PESSOAS_SIMPLES = 2
+
+# Tipos de slot que restringem o layout: orientação exigida do slot
+# (None = qualquer) e número máximo de slots do layout
+TIPOS_RESTRITOS = {
+    'full': (None, 1),
+    'fv-l': ('retrato', 2),
+    'fv-r': ('retrato', 2),
+    'fh-t': ('paisagem', 2),
+    'fh-b': ('paisagem', 2),
+}
+
+# Lado da página de cada tipo: (eixo do centro do slot, sinal em relação ao meio)
+LADOS_TIPOS = {'fv-l': (0, -1), 'fv-r': (0, 1), 'fh-t': (1, -1), 'fh-b': (1, 1)}
+
+_CODIGO_ORIENTACAO = {None: 0, 'paisagem': 1, 'retrato': 2}
+
+
+def _slots_registrados():
+    """
+    Todos os slots de todos os layouts, achatados: (layouts [(id, primeira
+    coluna, número de slots)], largura, altura, orientação, centro x e y
+    normalizados, fração da área útil, slots do layout) por coluna.
+    """
+    indices, colunas = [], []
+    area_util = np.prod(boxes_layout('L1', True)[0][2:])
+    for id_layout, layout in LAYOUTS.items():
+        indices.append((id_layout, len(colunas), len(layout['slots'])))
+        boxes = boxes_layout(id_layout, True)  # Slots iguais nas duas paridades
+        for ((x, y, w, h), orientacao), box in zip(layout['slots'], boxes):
+            colunas.append((box[2], box[3], _CODIGO_ORIENTACAO[orientacao],
+                            x + w / 2, y + h / 2, box[2] * box[3] / area_util, len(layout['slots'])))
+    return indices, np.array(colunas, dtype=np.float64).T
+
+
+_LAYOUTS_SLOTS, (_SLOT_W, _SLOT_H, _SLOT_ORIENTACAO, _SLOT_CX, _SLOT_CY,
+                 _SLOT_FRACAO, _SLOT_TOTAL) = _slots_registrados()
+
+
+@dataclass
+class AvaliacaoFotos:
+    """Métricas e custo de cada foto (linhas) em cada slot registrado (colunas)."""
+    custos: np.ndarray  # (N, S), inf onde um tipo de slot proíbe
+    perda: np.ndarray  # Fração da foto cortada
+    retencao: np.ndarray  # Fração da área das pessoas dentro do recorte (1 sem pessoas)
+    dpi: np.ndarray  # DPI efetivo
+
+
+def _custos_pares(
+    img_w: np.ndarray,
+    img_h: np.ndarray,
+    regioes: Sequence[Sequence[Tuple[int, int, int, int]]],
+    foto: np.ndarray,
+    slot_w: np.ndarray,
+    slot_h: np.ndarray,
+    slot_orientacao: np.ndarray,
+    slot_fracao: np.ndarray
+) -> AvaliacaoFotos:
+    """
+    Custo de cada par (foto[m], slot m) sem os tipos de slot do usuário:
+    arrays (M,) alinhados, foto[m] indexando img_w/img_h/regioes.
+    """
+    w, h = img_w[foto], img_h[foto]
+    contagem = np.array([len(r) for r in regioes], dtype=np.int64)
+
+    # Recorte inteligente de cada par
+    cx, cy, cw, ch = recortes_inteligentes(
+        w, h, slot_w, slot_h, [regioes[i] for i in foto.tolist()]
+    ).astype(np.float64).T
+
+    perda = 1.0 - (cw * ch) / (w * h)
+    dpi = cw * 72.0 / slot_w
+
+    # Área das pessoas dentro do recorte (todas as regiões de todos os pares de uma vez)
+    caixas = np.array([c for r in regioes for c in r], dtype=np.float64).reshape(-1, 4)
+    inicio = np.cumsum(contagem) - contagem
+    por_par = contagem[foto]
+    par = np.repeat(np.arange(len(foto)), por_par)
+    posicao = np.arange(len(par)) - np.repeat(np.cumsum(por_par) - por_par, por_par)
+    rx, ry, rw, rh = caixas[inicio[foto][par] + posicao].T
+    dentro_w = np.clip(np.minimum(rx + rw, cx[par] + cw[par]) - np.maximum(rx, cx[par]), 0, None)
+    dentro_h = np.clip(np.minimum(ry + rh, cy[par] + ch[par]) - np.maximum(ry, cy[par]), 0, None)
+    area_total = np.bincount(par, rw * rh, minlength=len(foto))
+    area_dentro = np.bincount(par, dentro_w * dentro_h, minlength=len(foto))
+    retencao = np.where(area_total > 0, area_dentro / np.where(area_total > 0, area_total, 1), 1.0)
+
+    # Orientação da foto x preferência do slot
+    proporcao = w / np.where(h > 0, h, 1)
+    orientacao = np.where(proporcao > RATIO_QUADRADO_MAX, 1, np.where(proporcao < RATIO_QUADRADO_MIN, 2, 0))
+    contraria = (slot_orientacao > 0) & (orientacao > 0) & (orientacao != slot_orientacao)
+    cheia = contagem[foto] > LIMITE_PESSOAS_SIMPLES
+
+    custos = (PESO_PERDA_RECORTE * perda
+              + PESO_ROSTOS * (1.0 - retencao)
+              + PESO_DPI * np.clip(1.0 - dpi / DPI_MINIMO, 0, None)
+              + PESO_ORIENTACAO * contraria
+              + PESO_PESSOAS * cheia * (1.0 - slot_fracao))
+    return AvaliacaoFotos(custos, perda, retencao, dpi)
+
+
+def avaliar_fotos(
+    largura: Sequence[int],
+    altura: Sequence[int],
+    regioes: Sequence[Sequence[Tuple[int, int, int, int]]],
+    tipos: Sequence[str]
+) -> AvaliacaoFotos:
+    """
+    Custo de cada foto em cada slot de cada layout registrado.
+
+    Args:
+        largura, altura: Tamanho de cada foto em pixels
+        regioes: Para cada foto, pessoas detectadas (x, y, largura, altura) em pixels
+        tipos: slot_tipo efetivo de cada foto ('auto', 'full', 'fv-l', ...)
+    """
+    img_w = np.asarray(largura, dtype=np.float64)
+    img_h = np.asarray(altura, dtype=np.float64)
+    n, s = len(img_w), len(_SLOT_W)
+    if n == 0:
+        vazio = np.zeros((0, s))
+        return AvaliacaoFotos(vazio, vazio, vazio, vazio)
+
+    # Todos os pares (foto, slot), foto-major
+    pares = _custos_pares(img_w, img_h, regioes, np.repeat(np.arange(n), s),
+                          np.tile(_SLOT_W, n), np.tile(_SLOT_H, n),
+                          np.tile(_SLOT_ORIENTACAO, n), np.tile(_SLOT_FRACAO, n))
+    custos, perda, retencao, dpi = (v.reshape(n, s) for v in
+                                    (pares.custos, pares.perda, pares.retencao, pares.dpi))
+
+    # Tipos de slot do usuário
+    dividida = _SLOT_TOTAL > 1
+    for i, tipo in enumerate(tipos):
+        if tipo not in TIPOS_RESTRITOS:
+            continue
+        exigida, maximo = TIPOS_RESTRITOS[tipo]
+        proibido = _SLOT_TOTAL > maximo
+        if exigida is not None:
+            proibido |= dividida & (_SLOT_ORIENTACAO > 0) & (_SLOT_ORIENTACAO != _CODIGO_ORIENTACAO[exigida])
+        custos[i, proibido] = np.inf
+        if tipo in LADOS_TIPOS:
+            eixo, sinal = LADOS_TIPOS[tipo]
+            centro = _SLOT_CX if eixo == 0 else _SLOT_CY
+            custos[i] += PESO_LADO * (dividida & (sinal * (centro - 0.5) <= 0))
+
+    return AvaliacaoFotos(custos, perda, retencao, dpi)
+
+
+def avaliar_justificados(
+    largura: Sequence[int],
+    altura: Sequence[int],
+    regioes: Sequence[Sequence[Tuple[int, int, int, int]]],
+    tipos: Sequence[str],
+    grupos: Sequence[Tuple[int, int]]
+) -> Tuple[np.ndarray, List[str]]:
+    """
+    Custo e id da colagem em linhas justificadas (layouts.py) de cada grupo
+    [(inicio, fim)] de fotos consecutivas, com as fotos na ordem do grupo.
+
+    Cada foto custa como num slot registrado, mais PESO_COLAGEM; fotos com
+    um tipo de slot restrito ('full', 'fv-*', 'fh-*') não entram em colagens.
+    """
+    img_w = np.asarray(largura, dtype=np.float64)
+    img_h = np.asarray(altura, dtype=np.float64)
+    proporcoes = (img_w / np.where(img_h > 0, img_h, 1)).tolist()
+    area = np.prod(boxes_layout('L1', True)[0][2:])
+
+    ids, foto, slot_w, slot_h, grupo = [], [], [], [], []
+    for g, (inicio, fim) in enumerate(grupos):
+        da_pagina = proporcoes[inicio:fim]
+        linhas = empacotar_linhas(da_pagina)
+        ids.append(id_justificado(linhas))
+        for i, box in enumerate(boxes_justificado(linhas, da_pagina, AREAS_UTEIS[True], ESPACO_FOTOS)):
+            foto.append(inicio + i)
+            slot_w.append(box[2])
+            slot_h.append(box[3])
+            grupo.append(g)
+    if not grupo:
+        return np.zeros(len(grupos)), ids
+
+    foto, slot_w, slot_h = np.array(foto), np.array(slot_w), np.array(slot_h)
+    pares = _custos_pares(img_w, img_h, regioes, foto, slot_w, slot_h,
+                          np.zeros(len(foto)), slot_w * slot_h / area)
+    restrita = np.array([tipos[i] in TIPOS_RESTRITOS for i in foto.tolist()])
+    custos = np.where(restrita, np.inf, pares.custos + PESO_COLAGEM)
+    return np.bincount(grupo, custos, minlength=len(grupos)), ids
+
+
+def melhores_layouts(
+    avaliacao: AvaliacaoFotos,
+    grupos: np.ndarray,
+    permitidos: Optional[Sequence[str]] = None
+) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    Melhor layout e atribuição de slots de cada grupo.
+
+    Args:
+        avaliacao: Resultado de avaliar_fotos
+        grupos: Array (G, k) com os índices (linhas da avaliação) das fotos de cada grupo
+        permitidos: Ids de layout aceitos (None = todos os de k slots)
+
+    Retorna:
+        (custos (G,), id do layout de cada grupo, ordem (G, k)): ordem[g, j]
+        é a foto do slot j. Grupos sem layout viável ficam com custo inf,
+        no primeiro layout permitido e na ordem dada.
+    """
+    grupos = np.asarray(grupos, dtype=np.int64).reshape(len(grupos), -1)
+    g, k = grupos.shape
+    melhor_custo = np.full(g, np.inf)
+    melhor_layout = np.full(g, -1)
+    melhor_ordem = grupos.copy()
+
+    candidatos = [(id_layout, coluna) for id_layout, coluna, total in _LAYOUTS_SLOTS
+                  if total == k and (permitidos is None or id_layout in permitidos)]
+    if not candidatos:
+        return melhor_custo, [None] * g, melhor_ordem
+    perms = np.array(list(permutations(range(k))), dtype=np.int64)
+    por_permutacao = grupos[:, perms]  # (G, P, k): foto de cada slot em cada permutação
+    for i, (_, coluna) in enumerate(candidatos):
+        custos = avaliacao.custos[por_permutacao, coluna + np.arange(k)].sum(axis=2)
+        p = custos.argmin(axis=1)
+        custo = custos[np.arange(g), p]
+        melhorou = (custo < melhor_custo) | (melhor_layout < 0)
+        melhor_custo = np.where(melhorou, custo, melhor_custo)
+        melhor_layout = np.where(melhorou, i, melhor_layout)
+        melhor_ordem[melhorou] = por_permutacao[np.arange(g), p][melhorou]
+
+    ids = [candidatos[i][0] if i >= 0 else None for i in melhor_layout.tolist()]
+    return melhor_custo, ids, melhor_ordem
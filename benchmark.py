@@ -0,0 +1,998 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Medições de Desempenho do Fotolivro
+
+Compara o caminho antigo e o novo de etapas caras do pipeline usando as
+fotos reais das pastas dos anos (infantil1..infantil5).
+
+EXECUÇÃO:
+    python benchmark.py <pasta_raiz> [nome_medicao ...]
+
+Sem nomes, roda todas as medições. Medições disponíveis:
+    miniaturas  - decodificação de miniaturas de mosaico (completa x draft)
+    custo       - calibração do modelo de custo do --plan (planejamento.py)
+    deteccao    - detecção de pessoas no original x na imagem reduzida,
+                  comparando os recortes resultantes
+    saliencia   - mapa de saliência x Haar Cascades: tempo e qualidade dos recortes
+    importacao  - tempo de importação (partida a frio) de cada módulo e se
+                  ele carrega o OpenCV; gerar_capas e pdf_renderer também
+                  na versão de base (primeiro commit do repositório)
+    recortes    - motor de recortes vetorizado x implementações escalares
+                  anteriores: paridade dos retângulos e tempo
+    layouts     - tabelas compiladas do registro de layouts x cálculo das
+                  boxes página a página: paridade e tempo
+    paginacao   - paginação por programação dinâmica: ótimo conferido por
+                  força bruta e tempo num livro sintético de 500 fotos, com e
+                  sem orçamento de páginas
+    avaliacao   - avaliação vetorizada de layouts x laço escalar por layout e
+                  permutação: paridade da melhor atribuição e tempo dos
+                  candidatos de um livro de 500 fotos
+    repaginacao - troca de layout incremental (índice dos capítulos) x
+                  repaginar o resto do capítulo e serializar o livro inteiro,
+                  num schema sintético de 1000 páginas, sem e com destaques:
+                  paridade e tempo
+    eventos     - separação dos capítulos em eventos: histogramas em lote x
+                  Image.histogram foto a foto, fronteiras vetorizadas x laço
+                  escalar num capítulo sintético de 5000 fotos (paridade e
+                  tempo) e páginas do livro das amostras com e sem eventos
+    preflight   - DPI efetivo de todos os slots (PDFRenderer.preflight) x
+                  recorte e DPI slot a slot, no schema sintético da
+                  'repaginacao' com pan/zoom aleatórios: paridade e tempo
+"""
+
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image, ImageOps
+
+from previas import abrir_reduzida
+from varredura_fotos import escanear_pastas
+
+
+# Tamanho da célula de mosaico usada nas medições (capa 3000x2000 em grid 10x10)
+LARGURA_MINIATURA = 300
+ALTURA_MINIATURA = 200
+
+# Fotos usadas na medição de detecção (no original ela leva segundos por foto)
+AMOSTRA_DETECCAO = 12
+
+# Proporções de slot (largura/altura) usadas para comparar os recortes
+PROPORCOES_SLOT = (1.5, 1.0, 0.7)
+
+# IoU mínimo para considerar dois recortes equivalentes
+IOU_RECORTE_EQUIVALENTE = 0.9
+
+# Módulos cuja importação é medida (cada um num interpretador novo)
+MODULOS_IMPORTACAO = ('constantes', 'schema_manager', 'pdf_renderer', 'gerar_capas', 'fotolivro')
+
+# Módulos comparados com a versão de base (árvore do primeiro commit)
+MODULOS_COMPARADOS = ('gerar_capas', 'pdf_renderer')
+
+# Repetições de cada importação (vale a mais rápida: cache de disco quente)
+REPETICOES_IMPORTACAO = 5
+
+# Casos sintéticos (foto, slot, pan/zoom, âncoras) da medição de recortes
+CASOS_RECORTES = 20000
+
+# Páginas simuladas na medição de layouts (busca das boxes por página)
+PAGINAS_LAYOUTS = 100000
+
+# Livro sintético da medição de paginação (capítulos x fotos) e capítulos
+# pequenos conferidos por força bruta
+CAPITULOS_PAGINACAO = (5, 100)
+CASOS_FORCA_BRUTA = 200
+
+# Fotos do livro sintético da medição 'avaliacao'
+FOTOS_AVALIACAO = 500
+
+# Schema sintético da medição 'repaginacao': (capítulos, fotos por capítulo)
+# e trocas de layout medidas
+CAPITULOS_REPAGINACAO = (5, 565)
+TROCAS_REPAGINACAO = 50
+
+# Fotos do capítulo sintético da medição 'eventos' e quantas páginas a mais
+# (fração das páginas sem eventos) os eventos podem custar no livro das amostras
+FOTOS_EVENTOS = 5000
+PAGINAS_A_MAIS_EVENTOS = 0.1
+
+
+def _cronometrar(funcao: Callable, itens: List) -> float:
+    """Executa funcao(item) para cada item e retorna o tempo médio em ms."""
+    inicio = time.perf_counter()
+    for item in itens:
+        funcao(item)
+    return (time.perf_counter() - inicio) * 1000 / max(1, len(itens))
+
+
+def _miniatura(img: Image.Image) -> Image.Image:
+    """Reduz para a célula do mosaico (modo cover), como em criar_mosaico."""
+    return ImageOps.fit(img, (LARGURA_MINIATURA, ALTURA_MINIATURA), Image.Resampling.LANCZOS)
+
+
+def medir_miniaturas(fotos: List[Path]):
+    """Decodificação completa + LANCZOS x draft JPEG + reduce + LANCZOS."""
+
+    def antigo(caminho):
+        with Image.open(caminho) as img_arquivo:
+            img = ImageOps.exif_transpose(img_arquivo)
+            _miniatura(img)
+
+    def novo(caminho):
+        _miniatura(abrir_reduzida(caminho, LARGURA_MINIATURA, ALTURA_MINIATURA))
+
+    # Aquecer o cache de disco para as duas rodadas partirem do mesmo estado
+    for caminho in fotos:
+        caminho.read_bytes()
+
+    ms_antigo = _cronometrar(antigo, fotos)
+    ms_novo = _cronometrar(novo, fotos)
+
+    print(f"Miniaturas {LARGURA_MINIATURA}x{ALTURA_MINIATURA} ({len(fotos)} fotos):")
+    print(f"  decodificação completa: {ms_antigo:8.1f} ms/foto")
+    print(f"  draft + reduce:         {ms_novo:8.1f} ms/foto")
+    print(f"  ganho:                  {ms_antigo / max(ms_novo, 1e-9):8.1f}x")
+
+
+def medir_custo(fotos: List[Path]):
+    """
+    Mede as constantes do modelo de custo do planejamento (--plan):
+    decodificação e codificação por megapixel, bytes por megapixel e o
+    custo do ReportLab para embutir cada MB de JPEG no PDF.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.utils import ImageReader
+    import planejamento
+
+    amostra = fotos[:30]
+    mp_total = 0.0
+    t_decodificar = t_codificar = 0.0
+    buffers = []
+    for caminho in amostra:
+        inicio = time.perf_counter()
+        with Image.open(caminho) as img_arquivo:
+            img = ImageOps.exif_transpose(img_arquivo)
+            img.load()
+        t_decodificar += time.perf_counter() - inicio
+        mp_total += img.width * img.height / 1e6
+
+        buffer = BytesIO()
+        inicio = time.perf_counter()
+        img.convert('RGB').save(buffer, format='JPEG', quality=95)
+        t_codificar += time.perf_counter() - inicio
+        buffers.append(buffer)
+
+    bytes_total = sum(b.tell() for b in buffers)
+
+    # Embutir os JPEGs num PDF (uma foto por página)
+    inicio = time.perf_counter()
+    pdf = canvas.Canvas(BytesIO())
+    for buffer in buffers:
+        buffer.seek(0)
+        pdf.drawImage(ImageReader(buffer), 0, 0, width=500, height=400)
+        pdf.showPage()
+    pdf.save()
+    t_embutir = time.perf_counter() - inicio
+
+    print(f"Modelo de custo ({len(amostra)} fotos, {mp_total:.1f} MP):")
+    print(f"  MS_POR_MP_DECODIFICACAO = {t_decodificar * 1000 / mp_total:.1f}"
+          f"  (atual {planejamento.MS_POR_MP_DECODIFICACAO})")
+    print(f"  MS_POR_MP_CODIFICACAO = {t_codificar * 1000 / mp_total:.1f}"
+          f"  (atual {planejamento.MS_POR_MP_CODIFICACAO})")
+    print(f"  BYTES_POR_MP_JPEG = {bytes_total / mp_total:,.0f}"
+          f"  (atual {planejamento.BYTES_POR_MP_JPEG:,})".replace(',', '_'))
+    print(f"  MS_POR_MB_EMBUTIDO = {t_embutir * 1000 / (bytes_total / 1024 / 1024):.1f}"
+          f"  (atual {planejamento.MS_POR_MB_EMBUTIDO})")
+
+
+def _iou(a, b) -> float:
+    """Interseção sobre união de dois retângulos (x, y, largura, altura)."""
+    largura = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    altura = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if largura <= 0 or altura <= 0:
+        return 0.0
+    intersecao = largura * altura
+    return intersecao / (a[2] * a[3] + b[2] * b[3] - intersecao)
+
+
+def medir_deteccao(fotos: List[Path]):
+    """
+    Detecção no original x limitada a LADO_MAXIMO_DETECCAO: tempo por foto
+    e concordância dos recortes inteligentes (IoU) em slots de várias
+    proporções.
+    """
+    import fotolivro
+
+    # Fotos espalhadas por todos os capítulos
+    amostra = fotos[::max(1, len(fotos) // AMOSTRA_DETECCAO)][:AMOSTRA_DETECCAO]
+    resultados = {}
+
+    def detectar(lado_maximo):
+        def funcao(caminho):
+            resultados[(lado_maximo, caminho)] = fotolivro.detectar_pessoas(
+                caminho, lado_maximo=lado_maximo, orcamento_ms=None
+            )
+        return funcao
+
+    ms_original = _cronometrar(detectar(None), amostra)
+    ms_reduzida = _cronometrar(detectar(fotolivro.LADO_MAXIMO_DETECCAO), amostra)
+
+    ious = []
+    rostos_iguais = 0
+    for caminho in amostra:
+        largura, altura = fotolivro.obter_dimensoes_imagem(caminho)
+        regioes_original, rostos_original, _ = resultados[(None, caminho)]
+        regioes_reduzida, rostos_reduzida, _ = resultados[(fotolivro.LADO_MAXIMO_DETECCAO, caminho)]
+        rostos_iguais += rostos_original == rostos_reduzida
+        for proporcao in PROPORCOES_SLOT:
+            ious.append(_iou(
+                fotolivro.calcular_crop_inteligente(largura, altura, proporcao, 1.0, regioes_original),
+                fotolivro.calcular_crop_inteligente(largura, altura, proporcao, 1.0, regioes_reduzida),
+            ))
+
+    equivalentes = sum(iou >= IOU_RECORTE_EQUIVALENTE for iou in ious)
+    print(f"Detecção de pessoas ({len(amostra)} fotos):")
+    print(f"  original:               {ms_original:8.1f} ms/foto")
+    print(f"  lado máximo {fotolivro.LADO_MAXIMO_DETECCAO}px:     {ms_reduzida:8.1f} ms/foto")
+    print(f"  ganho:                  {ms_original / max(ms_reduzida, 1e-9):8.1f}x")
+    print(f"  mesmo número de rostos: {rostos_iguais}/{len(amostra)} fotos")
+    print(f"  recortes equivalentes (IoU >= {IOU_RECORTE_EQUIVALENTE}): "
+          f"{equivalentes}/{len(ious)} (IoU mínimo {min(ious, default=1.0):.2f}, "
+          f"médio {sum(ious) / max(1, len(ious)):.2f})")
+
+
+def _contem(crop, regiao) -> bool:
+    """Diz se a região (x, y, largura, altura) cabe inteira no recorte."""
+    return (regiao[0] >= crop[0] and regiao[1] >= crop[1] and
+            regiao[0] + regiao[2] <= crop[0] + crop[2] and
+            regiao[1] + regiao[3] <= crop[1] + crop[3])
+
+
+def medir_saliencia(fotos: List[Path]):
+    """
+    Detecção por saliência x Haar Cascades (modo 'full'): tempo por foto e
+    qualidade dos recortes. A referência são as pessoas encontradas pelos
+    cascades: conta quantas ficam inteiras no recorte de cada método (e no
+    crop centralizado, como base) e a concordância (IoU) com o recorte dos
+    cascades.
+    """
+    import fotolivro
+
+    amostra = fotos[::max(1, len(fotos) // AMOSTRA_DETECCAO)][:AMOSTRA_DETECCAO]
+    resultados = {}
+
+    def detectar(modo):
+        def funcao(caminho):
+            resultados[(modo, caminho)] = fotolivro.detectar_pessoas(
+                caminho, modo=modo, orcamento_ms=None
+            )
+        return funcao
+
+    modos = ('full', 'saliency', 'faces+saliency')
+    tempos = {modo: _cronometrar(detectar(modo), amostra) for modo in modos}
+
+    # Só o mapa e a região (sem decodificar a foto)
+    from saliencia import LADO_SALIENCIA, mapa_saliencia, regiao_saliente
+    cinzas = [fotolivro._carregar_para_deteccao(c, None, LADO_SALIENCIA)[0] for c in amostra]
+    ms_mapa = _cronometrar(lambda cinza: regiao_saliente(mapa_saliencia(cinza)), cinzas)
+
+    inteiras = {modo: 0 for modo in modos + ('centralizado',)}
+    ious = {modo: [] for modo in modos[1:]}
+    total_pessoas = 0
+    for caminho in amostra:
+        largura, altura = fotolivro.obter_dimensoes_imagem(caminho)
+        pessoas = resultados[('full', caminho)][0]
+        for proporcao in PROPORCOES_SLOT:
+            crops = {modo: fotolivro.calcular_crop_inteligente(
+                largura, altura, proporcao, 1.0, resultados[(modo, caminho)][0]
+            ) for modo in modos}
+            crops['centralizado'] = fotolivro._crop_centralizado(largura, altura, proporcao)
+            total_pessoas += len(pessoas)
+            for modo, crop in crops.items():
+                inteiras[modo] += sum(_contem(crop, p) for p in pessoas)
+            for modo in ious:
+                ious[modo].append(_iou(crops['full'], crops[modo]))
+
+    print(f"Saliência x Haar Cascades ({len(amostra)} fotos, "
+          f"{len(PROPORCOES_SLOT)} proporções de slot):")
+    for modo in modos:
+        print(f"  {modo:15s} {tempos[modo]:8.1f} ms/foto")
+    print(f"  (mapa de saliência sem decodificar: {ms_mapa:.1f} ms/foto)")
+    print(f"  pessoas (dos cascades) inteiras no recorte, de {total_pessoas}:")
+    for modo, total in inteiras.items():
+        print(f"    {modo:15s} {total}")
+    for modo, valores in ious.items():
+        print(f"  IoU com o recorte dos cascades, {modo}: "
+              f"médio {sum(valores) / max(1, len(valores)):.2f}, mínimo {min(valores, default=1.0):.2f}")
+
+
+def _importar_a_frio(codigo: str, pasta: Optional[Path] = None) -> float:
+    """Roda `codigo` num interpretador novo (em `pasta`) e retorna o menor tempo em ms."""
+    pasta = pasta or Path(__file__).resolve().parent
+    tempos = []
+    for _ in range(REPETICOES_IMPORTACAO):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, '-c', codigo], cwd=pasta, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return min(tempos)
+
+
+def medir_importacao(fotos: List[Path]):
+    """
+    Partida a frio: tempo para importar cada módulo num interpretador novo
+    (descontada a partida do próprio Python) e se a importação carrega o
+    OpenCV. Os Haar Cascades só carregam na primeira detecção; o custo dessa
+    carga aparece à parte.
+    """
+    base = _importar_a_frio('pass')
+    print(f"Importação a frio (menor de {REPETICOES_IMPORTACAO}, "
+          f"sem a partida do Python de {base:.0f} ms):")
+    for modulo in MODULOS_IMPORTACAO:
+        try:
+            ms = _importar_a_frio(f'import {modulo}') - base
+        except subprocess.CalledProcessError:
+            print(f"  {modulo:15s} não importou (dependência ausente?)")
+            continue
+        verificacao = subprocess.run(
+            [sys.executable, '-c', f"import sys, {modulo}; print('cv2' in sys.modules)"],
+            cwd=Path(__file__).resolve().parent, capture_output=True, text=True
+        )
+        opencv = 'carrega OpenCV' if verificacao.stdout.strip() == 'True' else 'sem OpenCV'
+        print(f"  {modulo:15s} {ms:8.1f} ms  ({opencv})")
+
+    import fotolivro
+    inicio = time.perf_counter()
+    fotolivro.carregar_cascades()
+    print(f"  primeira detecção: +{(time.perf_counter() - inicio) * 1000:.1f} ms "
+          f"(OpenCV + {len(fotolivro.ARQUIVOS_CASCADES)} cascades)")
+
+    _comparar_importacao_base(base)
+
+
+def _comparar_importacao_base(base: float):
+    """
+    Importação a frio de MODULOS_COMPARADOS na versão de base (árvore do
+    primeiro commit, extraída com git archive) x na versão atual.
+    """
+    pasta = Path(__file__).resolve().parent
+    try:
+        commit = subprocess.run(['git', 'rev-list', '--max-parents=0', 'HEAD'], cwd=pasta,
+                                capture_output=True, text=True, check=True).stdout.split()[0]
+        arquivo = subprocess.run(['git', 'archive', '--format=tar', commit], cwd=pasta,
+                                 capture_output=True, check=True).stdout
+    except (OSError, IndexError, subprocess.CalledProcessError):
+        print("  versão de base indisponível (sem histórico git)")
+        return
+
+    print(f"Versão de base ({commit[:7]}) x atual:")
+    with tempfile.TemporaryDirectory() as temporaria:
+        with tarfile.open(fileobj=BytesIO(arquivo)) as tar:
+            tar.extractall(temporaria)
+        for modulo in MODULOS_COMPARADOS:
+            tempos = []
+            for pasta_modulo in (Path(temporaria), pasta):
+                try:
+                    tempos.append(_importar_a_frio(f'import {modulo}', pasta_modulo) - base)
+                except subprocess.CalledProcessError:
+                    tempos.append(None)
+            antes, depois = (f"{ms:7.1f} ms" if ms is not None else "não importou (dependência ausente?)"
+                             for ms in tempos)
+            variacao = ''
+            if None not in tempos:
+                variacao = f"  ({(tempos[1] - tempos[0]) / tempos[0] * 100:+.0f}%)"
+            print(f"  {modulo:15s} base {antes}  atual {depois}{variacao}")
+
+
+def _versao_base():
+    """
+    Funções escalares da versão de base (tests/base_7ae236d.py, copiadas sem
+    alteração), referência de paridade e de tempo das medições.
+    """
+    pasta_testes = str(Path(__file__).resolve().parent / 'tests')
+    if pasta_testes not in sys.path:
+        sys.path.insert(0, pasta_testes)
+    import base_7ae236d
+    return base_7ae236d
+
+
+def _casos_recortes(n: int):
+    """Casos sintéticos reprodutíveis: fotos, slots, pan/zoom e âncoras."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    img_w = rng.integers(200, 6000, n)
+    img_h = rng.integers(200, 6000, n)
+    slot_w = rng.uniform(50, 800, n)
+    slot_h = rng.uniform(50, 600, n)
+    pan_x, pan_y = rng.uniform(0, 1, n), rng.uniform(0, 1, n)
+    zoom = rng.choice([0.5, 0.8, 1.0, 1.0, 1.25, 2.0, 3.0], n)
+    ancoras = []
+    for w, h, k in zip(img_w.tolist(), img_h.tolist(), rng.integers(0, 6, n).tolist()):
+        caixas = []
+        for _ in range(k):
+            cw, ch = int(rng.integers(1, w // 2 + 2)), int(rng.integers(1, h // 2 + 2))
+            caixas.append((int(rng.integers(0, w - cw + 1)), int(rng.integers(0, h - ch + 1)), cw, ch))
+        ancoras.append(caixas)
+    return img_w.tolist(), img_h.tolist(), slot_w.tolist(), slot_h.tolist(), \
+        pan_x.tolist(), pan_y.tolist(), zoom.tolist(), ancoras
+
+
+def medir_recortes(fotos: List[Path]):
+    """
+    Paridade e tempo do motor de recortes (recortes.py) contra as funções
+    escalares da versão de base, em CASOS_RECORTES casos sintéticos:
+    recorte inteligente (com e sem âncoras), recorte por ajuste do usuário
+    e geometria de exibição do PDFRenderer/preview. Os casos de borda são
+    verificados em tests/test_recortes.py.
+    """
+    import numpy as np
+    import recortes
+
+    base = _versao_base()
+    renderer = base.PDFRenderer()
+    img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom, ancoras = _casos_recortes(CASOS_RECORTES)
+    casos = list(zip(img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom, ancoras))
+
+    comparacoes = [
+        ('inteligente',
+         lambda: recortes.recortes_inteligentes(img_w, img_h, slot_w, slot_h, ancoras),
+         lambda c: base.calcular_crop_inteligente(*c[:4], c[7])),
+        ('com ajuste',
+         lambda: recortes.recortes_com_ajuste(img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom),
+         lambda c: renderer._calcular_crop(*c[:7])),
+        ('exibição',
+         lambda: recortes.geometrias_exibicao(img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom)[:, :4],
+         lambda c: base.geometria_renderizar_foto(c[0], c[1], (0.0, 0.0, c[2], c[3]), *c[4:7])),
+    ]
+
+    print(f"Motor de recortes x funções escalares ({len(casos)} casos):")
+    for nome, vetorizado, escalar in comparacoes:
+        inicio = time.perf_counter()
+        esperado = np.array([escalar(c) for c in casos], dtype=np.float64)
+        ms_escalar = (time.perf_counter() - inicio) * 1000
+        inicio = time.perf_counter()
+        obtido = vetorizado().astype(np.float64)
+        ms_vetorizado = (time.perf_counter() - inicio) * 1000
+
+        diferencas = np.abs(obtido - esperado).max(axis=1)
+        iguais = int((diferencas == 0).sum())
+        print(f"  {nome:12s} {ms_escalar:8.1f} ms escalar, {ms_vetorizado:6.1f} ms vetorizado "
+              f"({ms_escalar / max(ms_vetorizado, 1e-9):.0f}x); idênticos {iguais}/{len(casos)}, "
+              f"maior diferença {diferencas.max():.3g}")
+
+
+def medir_layouts(fotos: List[Path]):
+    """
+    Tabelas compiladas do registro de layouts (layouts.py) contra o cálculo
+    das boxes a cada página do PDFRenderer da versão de base: as boxes têm
+    que ser idênticas nas duas paridades (verificado também em
+    tests/test_layouts.py), e a busca na tabela não pode custar mais que o
+    cálculo.
+    """
+    import layouts
+
+    renderer = _versao_base().PDFRenderer()
+    inicio = time.perf_counter()
+    layouts.compilar_tabelas()
+    ms_compilacao = (time.perf_counter() - inicio) * 1000
+
+    print(f"Registro de layouts ({len(layouts.LAYOUTS)} layouts, compilação {ms_compilacao:.2f} ms):")
+    for id_layout in list(layouts.LAYOUTS) + ['desconhecido']:
+        iguais = all(
+            layouts.boxes_layout(id_layout, impar) ==
+            renderer._calcular_boxes_layout(id_layout, renderer._calcular_area_util(impar))
+            for impar in (True, False)
+        )
+        print(f"  {id_layout:12s} {'idênticas' if iguais else 'DIFERENTES'}")
+
+    ids = list(layouts.LAYOUTS)
+    paginas = [(ids[i % len(ids)], i % 2 == 1) for i in range(PAGINAS_LAYOUTS)]
+    inicio = time.perf_counter()
+    for id_layout, impar in paginas:
+        renderer._calcular_boxes_layout(id_layout, renderer._calcular_area_util(impar))
+    ms_calculo = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    for id_layout, impar in paginas:
+        layouts.boxes_layout(id_layout, impar)
+    ms_tabela = (time.perf_counter() - inicio) * 1000
+    print(f"  {len(paginas)} páginas: {ms_calculo:.1f} ms calculando, {ms_tabela:.1f} ms na tabela "
+          f"({ms_calculo / max(ms_tabela, 1e-9):.1f}x)")
+
+
+def _fotos_paginacao_sinteticas(rng, n: int, fotos: List[Path]):
+    """Fotos com os tamanhos das fotos reais (ou 3:2/2:3), tipos e pessoas sorteados."""
+    from paginacao import FotoPaginacao
+    proporcoes = []
+    for caminho in fotos:
+        with Image.open(caminho) as img:
+            w, h = img.size
+            if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):  # EXIF girado 90°
+                w, h = h, w
+        proporcoes.append((w, h))
+    proporcoes = proporcoes or [(3000, 2000), (2000, 3000)]
+    tipos = ['auto'] * 12 + ['full', 'fv-l', 'fv-r', 'fh-t', 'fh-b', 'square']
+    sinteticas = []
+    for _ in range(n):
+        w, h = proporcoes[rng.integers(len(proporcoes))]
+        regioes = []
+        for _ in range(int(rng.integers(0, 6))):
+            rw, rh = int(rng.integers(w // 20, w // 4)), int(rng.integers(h // 20, h // 4))
+            regioes.append((int(rng.integers(0, w - rw)), int(rng.integers(0, h - rh)), rw, rh))
+        sinteticas.append(FotoPaginacao(w, h, tipos[rng.integers(len(tipos))], tuple(regioes)))
+    return sinteticas
+
+
+def _paginacao_forca_bruta(custos, preco_pagina: float) -> float:
+    """Menor custo total entre todas as divisões (exponencial; capítulos pequenos)."""
+    n = len(custos)
+    if n == 0:
+        return 0.0
+    return min(custos[n - k][k - 1] + preco_pagina + _paginacao_forca_bruta(custos[:n - k], preco_pagina)
+               for k in range(1, min(n, len(custos[0])) + 1))
+
+
+def medir_paginacao(fotos: List[Path]):
+    """
+    Paginação ótima (paginacao.py): o custo da divisão escolhida pela
+    programação dinâmica tem que ser o mínimo encontrado por força bruta em
+    CASOS_FORCA_BRUTA capítulos pequenos (com orçamento e eventos em
+    tests/test_paginacao.py), e paginar um livro sintético de
+    CAPITULOS_PAGINACAO fotos precisa caber numa edição interativa.
+    """
+    import numpy as np
+    import paginacao
+
+    rng = np.random.default_rng(0)
+    iguais = 0
+    for _ in range(CASOS_FORCA_BRUTA):
+        capitulo = _fotos_paginacao_sinteticas(rng, int(rng.integers(1, 13)), fotos)
+        custos = paginacao.tabela_custos(capitulo)
+        grupos = paginacao.paginar(capitulo)
+        custo_dp = sum(custos[i][f - i - 1] + paginacao.CUSTO_PAGINA for i, f in grupos)
+        otimo = _paginacao_forca_bruta(custos.tolist(), paginacao.CUSTO_PAGINA)
+        iguais += abs(custo_dp - otimo) < 1e-9
+    print("Paginação por programação dinâmica:")
+    print(f"  ótima em {iguais}/{CASOS_FORCA_BRUTA} capítulos conferidos por força bruta")
+
+    num_capitulos, por_capitulo = CAPITULOS_PAGINACAO
+    livro = [_fotos_paginacao_sinteticas(rng, por_capitulo, fotos) for _ in range(num_capitulos)]
+    inicio = time.perf_counter()
+    divisao = paginacao.paginar_capitulos(livro)
+    ms_livre = (time.perf_counter() - inicio) * 1000
+    paginas = sum(len(g) for g in divisao)
+
+    orcamento = int(paginas * 0.85)
+    inicio = time.perf_counter()
+    com_orcamento = paginacao.paginar_capitulos(livro, orcamento)
+    ms_orcamento = (time.perf_counter() - inicio) * 1000
+
+    print(f"  livro de {num_capitulos * por_capitulo} fotos: {paginas} páginas em {ms_livre:.1f} ms; "
+          f"orçamento de {orcamento}: {sum(len(g) for g in com_orcamento)} páginas em {ms_orcamento:.1f} ms")
+
+
+def _custo_slot_escalar(foto, id_layout: str, j: int) -> float:
+    """Custo de uma foto num slot, foto a foto (referência de avaliacao_layouts.py)."""
+    import avaliacao_layouts as av
+    from constantes import RATIO_QUADRADO_MIN, RATIO_QUADRADO_MAX
+    from layouts import LAYOUTS, boxes_layout
+    from planejamento import DPI_MINIMO
+
+    slots = LAYOUTS[id_layout]['slots']
+    (x, y, w, h), orientacao_slot = slots[j]
+    slot_w, slot_h = boxes_layout(id_layout, True)[j][2:]
+    util_w, util_h = boxes_layout('L1', True)[0][2:]
+    cx, cy, cw, ch = _versao_base().calcular_crop_inteligente(foto.largura, foto.altura, slot_w, slot_h,
+                                                              list(foto.regioes))
+
+    area_total = sum(rw * rh for _, _, rw, rh in foto.regioes)
+    area_dentro = sum(max(0, min(rx + rw, cx + cw) - max(rx, cx)) * max(0, min(ry + rh, cy + ch) - max(ry, cy))
+                      for rx, ry, rw, rh in foto.regioes)
+    retencao = area_dentro / area_total if area_total > 0 else 1.0
+    dpi = cw * 72.0 / slot_w
+
+    proporcao = foto.largura / foto.altura
+    orientacao = 'paisagem' if proporcao > RATIO_QUADRADO_MAX else 'retrato' if proporcao < RATIO_QUADRADO_MIN else None
+    contraria = orientacao_slot is not None and orientacao is not None and orientacao != orientacao_slot
+    cheia = len(foto.regioes) > av.LIMITE_PESSOAS_SIMPLES
+
+    custo = (av.PESO_PERDA_RECORTE * (1.0 - (cw * ch) / (foto.largura * foto.altura))
+             + av.PESO_ROSTOS * (1.0 - retencao)
+             + av.PESO_DPI * max(0.0, 1.0 - dpi / DPI_MINIMO)
+             + av.PESO_ORIENTACAO * contraria
+             + av.PESO_PESSOAS * cheia * (1.0 - slot_w * slot_h / (util_w * util_h)))
+
+    if foto.tipo in av.TIPOS_RESTRITOS:
+        exigida, maximo = av.TIPOS_RESTRITOS[foto.tipo]
+        dividida = len(slots) > 1
+        if len(slots) > maximo or (dividida and exigida and orientacao_slot and orientacao_slot != exigida):
+            return float('inf')
+        if foto.tipo in av.LADOS_TIPOS:
+            eixo, sinal = av.LADOS_TIPOS[foto.tipo]
+            centro = x + w / 2 if eixo == 0 else y + h / 2
+            custo += av.PESO_LADO * (dividida and sinal * (centro - 0.5) <= 0)
+    return custo
+
+
+def _melhor_layout_escalar(fotos, grupo):
+    """Menor custo do grupo entre todos os layouts e permutações (laço escalar)."""
+    from itertools import permutations
+    from layouts import LAYOUTS
+
+    melhor = float('inf')
+    for id_layout, layout in LAYOUTS.items():
+        if len(layout['slots']) != len(grupo):
+            continue
+        for ordem in permutations(grupo):
+            melhor = min(melhor, sum(_custo_slot_escalar(fotos[i], id_layout, j) for j, i in enumerate(ordem)))
+    return melhor
+
+
+def medir_avaliacao(fotos: List[Path]):
+    """
+    Avaliação vetorizada de layouts (avaliacao_layouts.py): para todos os
+    grupos candidatos (1 a 4 fotos consecutivas) de um livro sintético de
+    FOTOS_AVALIACAO fotos, o melhor custo tem que ser o do laço escalar sobre
+    todos os layouts registrados e permutações (custos por slot e colagens
+    em tests/test_avaliacao_layouts.py), e o vetorizado precisa caber na
+    geração do schema e na troca de layout do preview.
+    """
+    import numpy as np
+    import paginacao
+    from avaliacao_layouts import melhores_layouts
+
+    rng = np.random.default_rng(0)
+    livro = _fotos_paginacao_sinteticas(rng, FOTOS_AVALIACAO, fotos)
+    janelas = [np.lib.stride_tricks.sliding_window_view(np.arange(len(livro)), k)
+               for k in range(1, paginacao.MAX_FOTOS_REGISTRADO + 1)]
+
+    inicio = time.perf_counter()
+    avaliacao = paginacao.avaliar(livro)
+    obtido = np.concatenate([melhores_layouts(avaliacao, grupos)[0] for grupos in janelas])
+    ms_vetorizado = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    esperado = np.array([_melhor_layout_escalar(livro, grupo.tolist()) for grupos in janelas for grupo in grupos])
+    ms_escalar = (time.perf_counter() - inicio) * 1000
+
+    finitos = np.isfinite(esperado)
+    iguais = int(np.isclose(obtido, esperado, rtol=0, atol=1e-9).sum())
+    print(f"Avaliação de layouts ({len(esperado)} grupos candidatos de {len(livro)} fotos):")
+    print(f"  {ms_escalar:8.1f} ms escalar, {ms_vetorizado:6.1f} ms vetorizado "
+          f"({ms_escalar / max(ms_vetorizado, 1e-9):.0f}x); melhor custo igual em {iguais}/{len(esperado)}, "
+          f"{int((~finitos).sum())} grupos inviáveis")
+
+
+def _schema_sintetico(rng, pasta: Path, fotos: List[Path], destaques: bool = False):
+    """
+    SchemaManager com capítulos de fotos sintéticas paginados pela paginação
+    ótima; com destaques, as fotos têm nitidez e as mais nítidas de cada
+    capítulo ganham página inteira, como no --regenerar.
+    """
+    import paginacao
+    from schema_manager import SchemaManager, PaginaSchema, FotoSchema, _tipos_paginacao
+
+    schema = SchemaManager(pasta)
+    num_capitulos, por_capitulo = CAPITULOS_REPAGINACAO
+    schema.paginas = [PaginaSchema(tipo='capa', layout='L1', fotos=[])]
+    for c in range(num_capitulos):
+        sinteticas = _fotos_paginacao_sinteticas(rng, por_capitulo, fotos)
+        nitidezes = rng.uniform(0, 400, len(sinteticas)).tolist() if destaques else [None] * len(sinteticas)
+        tipos = _tipos_paginacao(['auto'] * len(sinteticas), nitidezes,
+                                 [(f.largura, f.altura) for f in sinteticas])
+        sinteticas = [paginacao.FotoPaginacao(f.largura, f.altura, tipo, f.regioes)
+                      for f, tipo in zip(sinteticas, tipos)]
+        grupos = paginacao.paginar(sinteticas)
+        schema.paginas.append(PaginaSchema(tipo='subcapa', layout='L1', fotos=[], titulo=f'Capítulo {c + 1}'))
+        for (inicio, fim), (layout, ordem) in zip(grupos, paginacao.layouts_grupos(sinteticas, grupos)):
+            schema.paginas.append(PaginaSchema(tipo='conteudo', layout=layout, fotos=[
+                FotoSchema(f'c{c}/{i:04d}.jpg', sinteticas[i].largura, sinteticas[i].altura, 'paisagem',
+                           ordem.index(i), regioes=[list(r) for r in sinteticas[i].regioes],
+                           qualidade={'nitidez': nitidezes[i]} if destaques else None)
+                for i in range(inicio, fim)
+            ]))
+    schema.paginas.append(PaginaSchema(tipo='contra_capa', layout='L1', fotos=[]))
+    return schema
+
+
+def _repaginacao_referencia(schema, indice_pagina: int, novo_layout: str, num_fotos: int):
+    """
+    (layout, slots) esperados das páginas do resto do capítulo, pelo caminho
+    anterior: juntar as fotos, paginá-las do zero (destaques escolhidos no
+    capítulo inteiro) e serializar o livro todo.
+    """
+    import paginacao
+    from schema_manager import _fotos_paginacao
+
+    inicio, fim = schema.encontrar_limites_capitulo(indice_pagina)
+    anteriores = sum(len(pagina.fotos) for pagina in schema.paginas[inicio:indice_pagina])
+    capitulo = [f for pagina in schema.paginas[inicio:fim] for f in pagina.fotos]
+    sinteticas = _fotos_paginacao(capitulo)[anteriores:]
+    fotos = capitulo[anteriores:]
+    atual, resto = fotos[:num_fotos], fotos[num_fotos:]
+    ordem = list(range(len(atual)))
+    if len(atual) == num_fotos:
+        (_, ordem), = paginacao.layouts_grupos(sinteticas[:num_fotos], [(0, len(atual))], [novo_layout])
+    esperadas = [(novo_layout, sorted((s, atual[i].caminho) for s, i in enumerate(ordem)))]
+    sinteticas = sinteticas[num_fotos:]
+    grupos = paginacao.paginar(sinteticas)
+    for layout, ordem in paginacao.layouts_grupos(sinteticas, grupos):
+        esperadas.append((layout, sorted((s, resto[i].caminho) for s, i in enumerate(ordem))))
+    schema.to_dict()
+    return esperadas
+
+
+def medir_repaginacao(fotos: List[Path]):
+    """
+    Troca de layout no preview (SchemaManager.redistribuir_fotos_capitulo)
+    com o índice dos capítulos, num schema sintético de
+    CAPITULOS_REPAGINACAO sem e com destaques: o resultado tem que ser o de
+    repaginar o resto do capítulo do zero, e a troca (com a serialização
+    das páginas alteradas) precisa ficar na casa dos 10 ms. A primeira troca
+    em cada capítulo calcula a tabela de paginação dele; as outras só rodam
+    a programação dinâmica.
+    """
+    import tempfile
+    import numpy as np
+    from layouts import LAYOUTS, fotos_por_layout
+
+    for destaques in (False, True):
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as pasta:
+            schema = _schema_sintetico(rng, Path(pasta), fotos, destaques)
+            print(f"Repaginação incremental ({len(schema.paginas)} páginas, "
+                  f"{sum(len(p.fotos) for p in schema.paginas)} fotos, "
+                  + (f"com destaques, {sum(1 for p in schema.paginas if p.tipo == 'conteudo' and p.layout == 'L1')} "
+                     f"páginas L1):" if destaques else "sem destaques):"))
+
+            iguais, ms_referencia, ms_incremental, ms_frios, alteradas = 0, [], [], [], []
+            for troca in range(TROCAS_REPAGINACAO):
+                conteudo = [i for i, p in enumerate(schema.paginas) if p.tipo == 'conteudo']
+                indice = int(conteudo[rng.integers(len(conteudo))])
+                novo_layout = list(LAYOUTS)[rng.integers(len(LAYOUTS))]
+                num_fotos = fotos_por_layout(novo_layout)
+
+                inicio = time.perf_counter()
+                esperadas = _repaginacao_referencia(schema, indice, novo_layout, num_fotos)
+                ms_referencia.append((time.perf_counter() - inicio) * 1000)
+
+                inicio = time.perf_counter()
+                capitulo = schema._capitulo_da_pagina(indice)
+                frio = capitulo.tabela is None
+                repaginacao = schema.redistribuir_fotos_capitulo(indice, novo_layout, num_fotos,
+                                                                 capitulo.inicio, capitulo.fim)
+                [schema.pagina_para_dict(schema.paginas[i]) for i in repaginacao.alteradas]
+                (ms_frios if frio else ms_incremental).append((time.perf_counter() - inicio) * 1000)
+                alteradas.append(len(repaginacao.alteradas))
+
+                obtidas = [(p.layout, sorted((f.slot_index, f.caminho) for f in p.fotos))
+                           for p in schema.paginas[indice:capitulo.fim]]
+                iguais += obtidas == esperadas
+
+            inicio = time.perf_counter()
+            schema.salvar()
+            ms_salvar = (time.perf_counter() - inicio) * 1000
+
+        print(f"  iguais ao caminho anterior em {iguais}/{TROCAS_REPAGINACAO} trocas; "
+              f"mediana de {np.median(alteradas):.0f} páginas alteradas por troca")
+        print(f"  caminho anterior: mediana {np.median(ms_referencia):.1f} ms; incremental: mediana "
+              f"{np.median(ms_incremental):.2f} ms, máximo {max(ms_incremental):.2f} ms "
+              f"(primeira troca do capítulo: mediana {np.median(ms_frios):.1f} ms)")
+        print(f"  salvar o schema (adiado no preview, fora da troca): {ms_salvar:.1f} ms")
+
+
+def _eventos_escalar(datas, histogramas) -> List[int]:
+    """Evento de cada foto, par a par (referência de eventos.separar_eventos)."""
+    import math
+    from datetime import datetime
+    import eventos as ev
+
+    n = len(datas)
+    candidatas = []  # (lacuna, corte)
+    for i in range(1, n):
+        lacuna = None
+        if datas[i - 1] and datas[i]:
+            lacuna = abs((datetime.fromisoformat(datas[i]) -
+                          datetime.fromisoformat(datas[i - 1])).total_seconds())
+        distancia = 0.5 * sum(abs(a - b) for a, b in zip(histogramas[i - 1], histogramas[i]))
+        cor = not math.isnan(distancia)
+        if lacuna is not None:
+            fronteira = (lacuna >= ev.LACUNA_EVENTO_S or
+                         (lacuna >= ev.LACUNA_MINIMA_S and cor and distancia >= ev.LIMIAR_COR))
+        else:
+            fronteira = cor and distancia >= ev.LIMIAR_COR_SEM_DATA
+        if fronteira:
+            candidatas.append((lacuna or 0.0, i))
+
+    # Da maior lacuna para a menor (empates na ordem do capítulo)
+    aceitos = []
+    for _, corte in sorted(candidatas, key=lambda c: -c[0]):
+        esquerda = max([a for a in aceitos if a < corte], default=0)
+        direita = min([a for a in aceitos if a > corte], default=n)
+        if corte - esquerda >= ev.MIN_FOTOS_EVENTO and direita - corte >= ev.MIN_FOTOS_EVENTO:
+            aceitos.append(corte)
+    return [sum(a <= i for a in aceitos) for i in range(n)]
+
+
+def _paginas_amostras(fotos: List[Path], eventos: bool) -> int:
+    """Páginas de conteúdo do livro das amostras, em ordem de captura."""
+    from catalogo_fotos import CatalogoFotos
+    from eventos import calcular_histogramas, eventos_fotos
+    from paginacao import FotoPaginacao, paginar_capitulos
+
+    catalogo = CatalogoFotos(fotos[0].parent.parent)
+    catalogo.preparar(fotos)
+    if eventos:
+        calcular_histogramas(fotos, catalogo)
+        catalogo.salvar()
+
+    capitulos: Dict[Path, List[Path]] = {}
+    for caminho in fotos:
+        capitulos.setdefault(caminho.parent, []).append(caminho)
+
+    livro = []
+    for caminhos in capitulos.values():
+        caminhos = catalogo.ordenar_por_captura(caminhos)
+        evento = eventos_fotos(caminhos, catalogo).tolist() if eventos else [0] * len(caminhos)
+        livro.append([FotoPaginacao(catalogo.registro(c)['largura'], catalogo.registro(c)['altura'],
+                                    regioes=tuple(tuple(r) for r in catalogo.registro(c)['rostos'] or []),
+                                    evento=e)
+                      for c, e in zip(caminhos, evento)])
+    return sum(len(grupos) for grupos in paginar_capitulos(livro))
+
+
+def medir_eventos(fotos: List[Path]):
+    """
+    Separação em eventos (eventos.py): o histograma em lote de cada foto
+    tem que ser o de Image.histogram na mesma imagem reduzida, as
+    fronteiras vetorizadas as do laço escalar num capítulo sintético de
+    FOTOS_EVENTOS fotos (com datas e histogramas faltando), rápido o
+    bastante para rodar a cada regeneração do schema, e os eventos não
+    podem custar mais que PAGINAS_A_MAIS_EVENTOS das páginas do livro das
+    amostras.
+    """
+    import math
+    from datetime import datetime, timedelta
+    import numpy as np
+    import eventos as ev
+
+    amostra = [img for img in (ev._carregar_rgb(c, None) for c in fotos[:50]) if img is not None]
+    iguais_hist = 0
+    if amostra:
+        inicio = time.perf_counter()
+        lote = ev.histogramas_lote(np.stack(amostra))
+        ms_lote = (time.perf_counter() - inicio) * 1000
+        inicio = time.perf_counter()
+        for img, histograma in zip(amostra, lote):
+            faixas = Image.fromarray(img).point(lambda v: v * ev.BINS_CANAL >> 8)
+            canais = [np.asarray(c, dtype=np.int64) for c in faixas.split()]
+            indices = (canais[0] * ev.BINS_CANAL + canais[1]) * ev.BINS_CANAL + canais[2]
+            contagem = Image.fromarray(indices.astype(np.uint8)).histogram()[:ev.BINS_CANAL ** 3]
+            iguais_hist += np.allclose(np.array(contagem) / indices.size, histograma)
+        ms_foto = (time.perf_counter() - inicio) * 1000
+        print(f"Histogramas de cor ({len(amostra)} fotos): iguais em {iguais_hist}/{len(amostra)}; "
+              f"lote {ms_lote:.1f} ms, foto a foto {ms_foto:.1f} ms")
+
+    rng = np.random.default_rng(0)
+    base = datetime(2024, 3, 1, 8)
+    passos = rng.choice([30, 600, 4 * 3600, 20 * 3600], size=FOTOS_EVENTOS, p=[0.7, 0.15, 0.1, 0.05])
+    datas = [(base + timedelta(seconds=int(s))).isoformat() for s in np.cumsum(passos)]
+    for i in rng.choice(FOTOS_EVENTOS, FOTOS_EVENTOS // 20, replace=False):
+        datas[i] = None
+    histogramas = rng.dirichlet(np.full(ev.BINS_CANAL ** 3, 0.3), FOTOS_EVENTOS)
+    histogramas[rng.choice(FOTOS_EVENTOS, FOTOS_EVENTOS // 20, replace=False)] = np.nan
+
+    inicio = time.perf_counter()
+    referencia = _eventos_escalar(datas, histogramas.tolist())
+    ms_escalar = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    vetorizado = ev.separar_eventos(datas, histogramas)
+    ms_vetorizado = (time.perf_counter() - inicio) * 1000
+
+    print(f"Eventos ({FOTOS_EVENTOS} fotos, {vetorizado[-1] + 1} eventos): "
+          f"{'iguais' if vetorizado.tolist() == referencia else 'DIFERENTES'} ao laço escalar")
+    print(f"  laço escalar: {ms_escalar:.1f} ms; vetorizado: {ms_vetorizado:.1f} ms")
+
+    sem_eventos = _paginas_amostras(fotos, eventos=False)
+    com_eventos = _paginas_amostras(fotos, eventos=True)
+    limite = sem_eventos + math.ceil(sem_eventos * PAGINAS_A_MAIS_EVENTOS)
+    print(f"  livro das amostras ({len(fotos)} fotos, ordem de captura): {sem_eventos} páginas de "
+          f"conteúdo sem eventos, {com_eventos} com eventos "
+          f"({'dentro' if com_eventos <= limite else 'ACIMA'} do limite de {limite})")
+
+
+def medir_preflight(fotos: List[Path]):
+    """
+    Preflight de DPI (PDFRenderer.preflight) no schema sintético da medição
+    'repaginacao', com zoom e pan aleatórios: o DPI de cada slot tem que ser
+    o do recorte calculado slot a slot (motor de recortes e
+    planejamento.dpi_efetivo, como o --plan fazia foto a foto; contra a
+    geometria da versão de base em tests/test_preflight.py), e o livro
+    inteiro precisa responder na hora.
+    """
+    import tempfile
+    import numpy as np
+    from pdf_renderer import PDFRenderer
+    from planejamento import dpi_efetivo
+    from recortes import recortes_visiveis
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as pasta:
+        schema = _schema_sintetico(rng, Path(pasta), fotos)
+        for pagina in schema.paginas:
+            for foto in pagina.fotos:
+                foto.zoom = float(rng.choice([1.0, 1.0, 1.5, 2.5]))
+                foto.pan_x, foto.pan_y = rng.random(2).tolist()
+        renderer = PDFRenderer(Path(pasta), Path(pasta) / 'preflight.pdf')
+
+        inicio = time.perf_counter()
+        referencia = []
+        for i, pagina in enumerate(schema.paginas):
+            if pagina.tipo != 'conteudo':
+                continue
+            boxes = renderer._calcular_boxes_layout(pagina, (i + 1) % 2 == 1)
+            for foto in pagina.fotos:
+                _, _, w_box, h_box = boxes[foto.slot_index]
+                fontes, destinos = recortes_visiveis([foto.largura], [foto.altura], [w_box], [h_box],
+                                                     [foto.pan_x], [foto.pan_y], [foto.zoom])
+                referencia.append(dpi_efetivo(fontes[0][2], destinos[0][2]))
+        ms_escalar = (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        slots = renderer.preflight(schema)
+        ms_vetorizado = (time.perf_counter() - inicio) * 1000
+
+    iguais = sum(abs(s['dpi'] - round(r, 1)) < 0.051 for s, r in zip(slots, referencia))
+    print(f"Preflight de DPI ({len(schema.paginas)} páginas, {len(slots)} slots, "
+          f"{sum(s['abaixo'] for s in slots)} abaixo do mínimo):")
+    print(f"  iguais ao cálculo slot a slot em {iguais}/{len(referencia)}")
+    print(f"  slot a slot: {ms_escalar:.1f} ms; vetorizado: {ms_vetorizado:.1f} ms")
+
+
+MEDICOES: Dict[str, Callable[[List[Path]], None]] = {
+    'miniaturas': medir_miniaturas,
+    'custo': medir_custo,
+    'deteccao': medir_deteccao,
+    'saliencia': medir_saliencia,
+    'importacao': medir_importacao,
+    'recortes': medir_recortes,
+    'layouts': medir_layouts,
+    'paginacao': medir_paginacao,
+    'avaliacao': medir_avaliacao,
+    'repaginacao': medir_repaginacao,
+    'eventos': medir_eventos,
+    'preflight': medir_preflight,
+}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python benchmark.py <pasta_raiz> [nome_medicao ...]")
+        print(f"Medições: {', '.join(MEDICOES)}")
+        sys.exit(1)
+
+    pasta_raiz = Path(sys.argv[1])
+    nomes = sys.argv[2:] or list(MEDICOES)
+
+    desconhecidas = [n for n in nomes if n not in MEDICOES]
+    if desconhecidas:
+        print(f"ERRO: Medição desconhecida: {', '.join(desconhecidas)}")
+        sys.exit(1)
+
+    fotos = escanear_pastas(pasta_raiz).todas_imagens()
+    if not fotos:
+        print(f"ERRO: Nenhuma foto encontrada em {pasta_raiz}")
+        sys.exit(1)
+
+    for nome in nomes:
+        MEDICOES[nome](fotos)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Catálogo Persistente de Fotos
+
+Este módulo mantém um catálogo SQLite (ao lado do schema_fotolivro.json)
+com os metadados de cada foto que hoje exigem abrir o arquivo:
+dimensões (já com a orientação EXIF aplicada), orientação, proporção,
+índice EXIF (data de captura, câmera, GPS), hashes perceptuais (para achar
+duplicatas), métricas de nitidez/exposição, histograma de cor (eventos) e
+regiões de pessoas detectadas.
+
+Cada registro é identificado pelo caminho relativo + tamanho + mtime do
+arquivo. Se qualquer um deles mudar, a foto é sondada novamente; caso
+contrário, os dados vêm direto do catálogo, sem tocar nos pixels.
+
+EXECUÇÃO (estatísticas do catálogo):
+    python catalogo_fotos.py <pasta_raiz>
+"""
+
+import os
+import json
+import sqlite3
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from constantes import classificar_imagem
+from sondagem_imagens import ler_metadados, sondar_imagens
+
+
+# Nome do arquivo do catálogo (fica na pasta raiz, junto do schema)
+ARQUIVO_CATALOGO = ".catalogo_fotos.sqlite"
+
+# Versão do formato do catálogo (incrementar invalida todos os registros)
+VERSAO_CATALOGO = 4
+
+# Colunas de dados de cada foto (além da chave e da assinatura do arquivo)
+COLUNAS_DADOS = [
+    ("largura", "INTEGER"),
+    ("altura", "INTEGER"),
+    ("orientacao", "TEXT"),
+    ("ratio", "REAL"),
+    ("orientacao_exif", "INTEGER"),
+    ("data_captura", "TEXT"),  # DateTimeOriginal em ISO 8601 (AAAA-MM-DDTHH:MM:SS)
+    ("camera", "TEXT"),
+    ("tem_gps", "INTEGER"),
+    ("hash_conteudo", "TEXT"),  # SHA-1 do arquivo (identifica as prévias); NULL = não calculado
+    ("dhash", "TEXT"),  # Hash perceptual de gradiente (64 bits em hexadecimal)
+    ("phash", "TEXT"),  # Hash perceptual da DCT (64 bits em hexadecimal)
+    ("nitidez", "REAL"),  # Variância do Laplaciano na prévia; NULL = não avaliado
+    ("luminancia", "REAL"),  # Brilho médio (0-1)
+    ("estouradas", "REAL"),  # Fração de pixels estourados
+    ("escuras", "REAL"),  # Fração de pixels sem detalhe na sombra
+    ("histograma", "TEXT"),  # Histograma de cor da prévia (ver eventos.py); NULL = não calculado
+    ("rostos", "TEXT"),  # JSON com lista de (x, y, largura, altura); NULL = não detectado
+    ("num_rostos", "INTEGER"),
+    ("nivel_deteccao", "TEXT"),  # Nível atingido pela detecção (ver fotolivro.NIVEIS_DETECCAO)
+]
+
+
+def sondar_foto(caminho: Path) -> dict:
+    """
+    Lê dimensões e metadados EXIF de uma imagem pelo cabeçalho.
+
+    Retorna o dict de sondagem_imagens.ler_metadados(); se o arquivo não
+    puder ser lido, largura e altura vêm zeradas.
+    """
+    metadados = ler_metadados(caminho)
+    if metadados is None:
+        print(f"AVISO: Não foi possível ler dimensões de {caminho}")
+        return _sondagem_vazia()
+    return metadados
+
+
+def _sondagem_vazia() -> dict:
+    """Resultado de sondagem para arquivos ilegíveis."""
+    return {'largura': 0, 'altura': 0, 'orientacao_exif': 1,
+            'data_captura': None, 'camera': None, 'tem_gps': False}
+
+
+class CatalogoFotos:
+    """Catálogo persistente de metadados das fotos do fotolivro."""
+
+    def __init__(self, pasta_raiz: Path):
+        self.pasta_raiz = Path(pasta_raiz)
+        self.caminho_db = self.pasta_raiz / ARQUIVO_CATALOGO
+
+        # Registros em memória: chave -> dict com assinatura e dados
+        self._registros: Dict[str, dict] = {}
+        # Chaves alteradas desde o último salvar()
+        self._alterados = set()
+        self._carregado = False
+
+        # Estatísticas da execução atual (chaves das fotos em cada situação)
+        self._acertos = set()
+        self._sondadas = set()
+        self._detectadas = set()
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre a conexão com o SQLite e garante a tabela de fotos."""
+        conexao = sqlite3.connect(str(self.caminho_db))
+        colunas = ", ".join(f"{nome} {tipo}" for nome, tipo in COLUNAS_DADOS)
+        conexao.execute(
+            "CREATE TABLE IF NOT EXISTS fotos ("
+            "caminho TEXT PRIMARY KEY, tamanho INTEGER, mtime_ns INTEGER, "
+            f"{colunas})"
+        )
+        conexao.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT)")
+
+        # Migrar catálogos antigos: adicionar colunas que não existiam
+        existentes = {linha[1] for linha in conexao.execute("PRAGMA table_info(fotos)")}
+        for nome, tipo in COLUNAS_DADOS:
+            if nome not in existentes:
+                conexao.execute(f"ALTER TABLE fotos ADD COLUMN {nome} {tipo}")
+
+        # Versão diferente: descartar registros antigos
+        linha = conexao.execute("SELECT valor FROM meta WHERE chave = 'versao'").fetchone()
+        if linha is None or linha[0] != str(VERSAO_CATALOGO):
+            conexao.execute("DELETE FROM fotos")
+            conexao.execute(
+                "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('versao', ?)",
+                (str(VERSAO_CATALOGO),)
+            )
+            conexao.commit()
+
+        return conexao
+
+    def carregar(self) -> bool:
+        """Carrega todos os registros do catálogo para a memória."""
+        self._carregado = True
+        self._registros = {}
+
+        if not self.caminho_db.exists():
+            return False
+
+        try:
+            conexao = self._conectar()
+            try:
+                nomes = ["caminho", "tamanho", "mtime_ns"] + [n for n, _ in COLUNAS_DADOS]
+                cursor = conexao.execute(f"SELECT {', '.join(nomes)} FROM fotos")
+                for linha in cursor:
+                    registro = dict(zip(nomes, linha))
+                    if registro['rostos'] is not None:
+                        registro['rostos'] = [tuple(r) for r in json.loads(registro['rostos'])]
+                    registro['tem_gps'] = bool(registro['tem_gps'])
+                    self._registros[registro['caminho']] = registro
+            finally:
+                conexao.close()
+            return True
+        except Exception as e:
+            print(f"AVISO: Não foi possível ler o catálogo {self.caminho_db}: {e}")
+            self._registros = {}
+            return False
+
+    def salvar(self):
+        """Grava no SQLite os registros alterados desde o último salvamento."""
+        if not self._alterados:
+            return
+
+        nomes = ["caminho", "tamanho", "mtime_ns"] + [n for n, _ in COLUNAS_DADOS]
+        # Cópia do conjunto: outras threads (servidor de preview) podem marcar alterações
+        alterados = list(self._alterados)
+        linhas = []
+        for chave in alterados:
+            registro = self._registros.get(chave)
+            if registro is None:
+                continue
+            valores = dict(registro)
+            if valores.get('rostos') is not None:
+                valores['rostos'] = json.dumps([list(r) for r in valores['rostos']])
+            linhas.append(tuple(valores.get(n) for n in nomes))
+
+        try:
+            conexao = self._conectar()
+            try:
+                marcadores = ", ".join("?" for _ in nomes)
+                conexao.executemany(
+                    f"INSERT OR REPLACE INTO fotos ({', '.join(nomes)}) VALUES ({marcadores})",
+                    linhas
+                )
+                conexao.commit()
+            finally:
+                conexao.close()
+            self._alterados.difference_update(alterados)
+        except Exception as e:
+            print(f"AVISO: Não foi possível salvar o catálogo {self.caminho_db}: {e}")
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def chave(self, caminho: Path) -> str:
+        """Retorna a chave do catálogo (caminho relativo à pasta raiz)."""
+        caminho = Path(caminho)
+        try:
+            return str(caminho.relative_to(self.pasta_raiz))
+        except ValueError:
+            return str(caminho)
+
+    def _assinatura(self, caminho: Path) -> Tuple[int, int]:
+        """Retorna (tamanho, mtime_ns) do arquivo, ou (-1, -1) se não existir."""
+        try:
+            stat = os.stat(caminho)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return -1, -1
+
+    def _registro_valido(self, chave: str, assinatura: Tuple[int, int]) -> Optional[dict]:
+        """Retorna o registro em cache se ainda corresponde ao arquivo."""
+        registro = self._registros.get(chave)
+        if registro is not None and (registro['tamanho'], registro['mtime_ns']) == assinatura:
+            return registro
+        return None
+
+    def _criar_registro(self, chave: str, assinatura: Tuple[int, int], sondagem: dict) -> dict:
+        """Cria (ou substitui) o registro de uma foto nova ou alterada."""
+        largura, altura = sondagem['largura'], sondagem['altura']
+        registro = {
+            'caminho': chave,
+            'tamanho': assinatura[0],
+            'mtime_ns': assinatura[1],
+            'largura': largura,
+            'altura': altura,
+            'orientacao': classificar_imagem(largura, altura),
+            'ratio': largura / altura if altura > 0 else 1.0,
+            'orientacao_exif': sondagem['orientacao_exif'],
+            'data_captura': sondagem['data_captura'],
+            'camera': sondagem['camera'],
+            'tem_gps': bool(sondagem['tem_gps']),
+            'hash_conteudo': None,
+            'dhash': None,
+            'phash': None,
+            'nitidez': None,
+            'luminancia': None,
+            'estouradas': None,
+            'escuras': None,
+            'histograma': None,
+            'rostos': None,
+            'num_rostos': None,
+            'nivel_deteccao': None,
+        }
+        self._registros[chave] = registro
+        self._alterados.add(chave)
+        self._sondadas.add(chave)
+        return registro
+
+    def registro(self, caminho: Path) -> dict:
+        """
+        Retorna o registro atualizado de uma foto.
+
+        Se o arquivo mudou (tamanho ou mtime) ou ainda não está no catálogo,
+        as dimensões são sondadas novamente e os dados derivados (detecção)
+        são descartados.
+        """
+        if not self._carregado:
+            self.carregar()
+
+        caminho = Path(caminho)
+        chave = self.chave(caminho)
+        assinatura = self._assinatura(caminho)
+
+        registro = self._registro_valido(chave, assinatura)
+        if registro is not None:
+            if chave not in self._sondadas:
+                self._acertos.add(chave)
+            return registro
+
+        # Foto nova ou alterada: sondar dimensões pelo cabeçalho
+        return self._criar_registro(chave, assinatura, sondar_foto(caminho))
+
+    def preparar(self, caminhos: Iterable[Path], max_workers: int = 8) -> int:
+        """
+        Garante registros atualizados para várias fotos de uma vez.
+
+        Só as fotos novas ou alteradas são sondadas, em paralelo.
+        Retorna quantas fotos precisaram ser sondadas.
+        """
+        if not self._carregado:
+            self.carregar()
+
+        pendentes = {}
+        for caminho in caminhos:
+            caminho = Path(caminho)
+            chave = self.chave(caminho)
+            assinatura = self._assinatura(caminho)
+            if self._registro_valido(chave, assinatura) is None:
+                pendentes[caminho] = (chave, assinatura)
+
+        for caminho, sondagem in sondar_imagens(pendentes, max_workers).items():
+            chave, assinatura = pendentes[caminho]
+            if sondagem is None:
+                print(f"AVISO: Não foi possível ler dimensões de {caminho}")
+                sondagem = _sondagem_vazia()
+            self._criar_registro(chave, assinatura, sondagem)
+
+        return len(pendentes)
+
+    def marcar_alterado(self, caminho: Path):
+        """Marca o registro de uma foto para ser gravado no próximo salvar()."""
+        self._alterados.add(self.chave(caminho))
+
+    def obter_dimensoes(self, caminho: Path) -> Tuple[int, int]:
+        """Retorna (largura, altura) da foto, usando o catálogo quando possível."""
+        registro = self.registro(caminho)
+        return registro['largura'], registro['altura']
+
+    def deteccao_em_cache(
+        self,
+        caminho: Path,
+        aceitar_nivel: Optional[Callable[[Optional[str]], bool]] = None
+    ) -> bool:
+        """
+        Diz se a foto tem detecção guardada (e, se informado, se o nível
+        dela é aceito por aceitar_nivel).
+        """
+        registro = self.registro(caminho)
+        if registro['rostos'] is None:
+            return False
+        return aceitar_nivel is None or aceitar_nivel(registro['nivel_deteccao'])
+
+    def obter_deteccao(
+        self,
+        caminho: Path,
+        detector: Callable[[Path], Tuple[List[Tuple[int, int, int, int]], int, str]],
+        aceitar_nivel: Optional[Callable[[Optional[str]], bool]] = None
+    ) -> Tuple[List[Tuple[int, int, int, int]], int, Optional[str]]:
+        """
+        Retorna (regiões de pessoas, número de rostos, nível da detecção) da foto.
+
+        Usa o resultado em cache se a foto não mudou (e o nível guardado é
+        aceito por aceitar_nivel); caso contrário executa o detector e guarda
+        o resultado no catálogo.
+        """
+        registro = self.registro(caminho)
+        if self.deteccao_em_cache(caminho, aceitar_nivel):
+            return list(registro['rostos']), registro['num_rostos'], registro['nivel_deteccao']
+
+        self._detectadas.add(registro['caminho'])
+        rostos, num_rostos, nivel = detector(caminho)
+        registro['rostos'] = [tuple(int(v) for v in r) for r in rostos]
+        registro['num_rostos'] = int(num_rostos)
+        registro['nivel_deteccao'] = nivel
+        self._alterados.add(registro['caminho'])
+        return list(registro['rostos']), registro['num_rostos'], nivel
+
+    def obter_hashes(
+        self,
+        caminho: Path,
+        calculador: Callable[[Path], Tuple[str, str]]
+    ) -> Tuple[str, str]:
+        """
+        Retorna (dhash, phash) da foto.
+
+        Usa os hashes em cache se a foto não mudou; caso contrário executa
+        o calculador e guarda o resultado no catálogo.
+        """
+        registro = self.registro(caminho)
+        if registro['dhash'] is None or registro['phash'] is None:
+            registro['dhash'], registro['phash'] = calculador(caminho)
+            self._alterados.add(registro['caminho'])
+        return registro['dhash'], registro['phash']
+
+    def ordenar_por_captura(self, caminhos: Iterable[Path]) -> List[Path]:
+        """
+        Ordena fotos pela data de captura EXIF (DateTimeOriginal).
+
+        Fotos sem data vão para o final, na ordem do nome. A ordenação usa
+        só o índice do catálogo (O(n log n)), sem reabrir os arquivos.
+        """
+        def chave_ordem(caminho: Path):
+            data = self.registro(caminho)['data_captura']
+            return (data is None, data or '', caminho.name)
+
+        return sorted((Path(c) for c in caminhos), key=chave_ordem)
+
+    def resumo(self) -> str:
+        """Resumo das operações feitas nesta execução."""
+        return (f"catálogo: {len(self._acertos)} em cache, {len(self._sondadas)} sondadas, "
+                f"{len(self._detectadas)} detecções")
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Uso: python catalogo_fotos.py <pasta_raiz>")
+        sys.exit(1)
+
+    catalogo = CatalogoFotos(Path(sys.argv[1]))
+    if not catalogo.carregar():
+        print(f"Catálogo não encontrado: {catalogo.caminho_db}")
+        sys.exit(1)
+
+    registros = list(catalogo._registros.values())
+    com_deteccao = sum(1 for r in registros if r['rostos'] is not None)
+    print(f"Catálogo: {catalogo.caminho_db}")
+    print(f"  Fotos registradas: {len(registros)}")
+    print(f"  Com detecção de pessoas: {com_deteccao}")
+    print(f"  Com data de captura (EXIF): {sum(1 for r in registros if r['data_captura'])}")
+    print(f"  Com GPS: {sum(1 for r in registros if r['tem_gps'])}")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Constantes e Funções Auxiliares Compartilhadas do Fotolivro
+
+Fonte única das pastas dos anos, títulos, dimensões da página e margens,
+usada pelo gerador (fotolivro.py), pelas capas (gerar_capas.py), pelo
+schema, pelo renderizador de PDF e pelo servidor de preview.
+
+Só depende da biblioteca padrão: importar este módulo não carrega OpenCV,
+ReportLab nem NumPy (ver a medição 'importacao' em benchmark.py).
+"""
+
+
+# Ordem fixa das pastas dos anos (sequência obrigatória)
+PASTAS_ANOS = ["Infantil1", "Infantil2", "Infantil3", "Infantil4", "Infantil5"]
+
+# Formatos de imagem aceitos
+EXTENSOES_IMAGEM = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp"}
+
+# Dimensões A4 em paisagem (297mm x 210mm)
+A4_LARGURA_MM = 297
+A4_ALTURA_MM = 210
+
+# Margens (em milímetros)
+MARGEM_EXTERNA_MM = 10  # Margem de 1 cm em todos os lados externos
+MARGEM_LOMBADA_MM = 15  # Margem de 1.5 cm no lado da lombada
+ESPACO_ENTRE_FOTOS_MM = 5  # Espaço de 0.5 cm entre fotos vizinhas
+
+# Limites para classificação de proporção
+RATIO_QUADRADO_MIN = 0.9
+RATIO_QUADRADO_MAX = 1.1
+
+# Informações do fotolivro
+TITULO_CAPA = "Bruno Sereia Broering"
+SUBTITULO_CAPA = "Momentos no Infantil 1 ao 5"
+PERIODO_CAPA = "2021 ~ 2025"
+SUBTITULO_CONTRA_CAPA = "Infantil 2021 ~ 2025"
+
+# Títulos das subcapas por ano
+TITULOS_ANOS = {
+    "Infantil1": ("Infantil 1", "2021"),
+    "Infantil2": ("Infantil 2", "2022"),
+    "Infantil3": ("Infantil 3", "2023"),
+    "Infantil4": ("Infantil 4", "2024"),
+    "Infantil5": ("Infantil 5", "2025"),
+}
+
+
+def mm_to_points(mm_value: float) -> float:
+    """Converte milímetros para points (72 points = 1 inch = 25.4mm)."""
+    return mm_value * 72.0 / 25.4
+
+
+def classificar_imagem(largura: int, altura: int) -> str:
+    """
+    Classifica uma imagem como paisagem, retrato ou quase quadrada.
+
+    Retorna:
+        'paisagem': largura > altura
+        'retrato': altura > largura
+        'quadrada': proporção próxima de 1:1 (entre 0.9 e 1.1)
+    """
+    if largura == 0 or altura == 0:
+        return 'paisagem'  # fallback
+
+    ratio = largura / altura
+
+    if RATIO_QUADRADO_MIN <= ratio <= RATIO_QUADRADO_MAX:
+        return 'quadrada'
+    elif ratio > 1:
+        return 'paisagem'
+    else:
+        return 'retrato'
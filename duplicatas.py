@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de Fotos Quase Duplicadas
+
+Os pais costumam mandar o mesmo momento várias vezes (rajadas, reenvios do
+WhatsApp), às vezes em pastas de anos diferentes. Este módulo calcula dois
+hashes perceptuais de 64 bits por foto a partir de uma versão bem pequena:
+- dHash: gradiente horizontal em 9x8 (robusto a recompressão e redimensionamento)
+- pHash: sinais dos coeficientes de baixa frequência da DCT 32x32
+
+Os hashes ficam no catálogo (só são recalculados se a foto mudar). As
+distâncias de Hamming entre todos os pares são calculadas de uma vez,
+como produto de matrizes de bits no NumPy. Duas fotos são quase duplicadas
+quando ambos os hashes ficam dentro do limiar.
+
+EXECUÇÃO (listar duplicatas):
+    python duplicatas.py <pasta_raiz>
+"""
+
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from catalogo_fotos import CatalogoFotos
+from previas import abrir_reduzida
+
+
+# Distância de Hamming máxima (em 64 bits) para considerar duas fotos iguais
+LIMIAR_DHASH = 10
+LIMIAR_PHASH = 12
+
+# Tamanhos de trabalho dos hashes
+TAMANHO_DHASH = 8
+TAMANHO_PHASH = 32
+TAMANHO_BLOCO_PHASH = 8
+
+
+def _matriz_dct(n: int) -> np.ndarray:
+    """Matriz da DCT-II ortonormal n x n."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matriz = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matriz[0] /= np.sqrt(2.0)
+    return matriz
+
+
+_DCT_PHASH = _matriz_dct(TAMANHO_PHASH)
+
+
+def _bits_para_hex(bits: np.ndarray) -> str:
+    """Converte 64 bits (bool) para hexadecimal de 16 dígitos."""
+    return np.packbits(bits.astype(np.uint8)).tobytes().hex()
+
+
+def calcular_hashes(img: Image.Image) -> Tuple[str, str]:
+    """
+    Calcula (dhash, phash) de uma imagem, como hexadecimal de 16 dígitos.
+
+    A imagem pode (e deve) ser uma versão reduzida da foto.
+    """
+    cinza = img.convert('L')
+
+    # dHash: cada pixel comparado com o vizinho da direita (8 linhas x 8 colunas)
+    pequena = cinza.resize((TAMANHO_DHASH + 1, TAMANHO_DHASH), Image.Resampling.BOX)
+    pixels = np.asarray(pequena, dtype=np.int16)
+    dhash = _bits_para_hex((pixels[:, 1:] > pixels[:, :-1]).ravel())
+
+    # pHash: DCT 2D da imagem 32x32, bloco 8x8 de baixa frequência vs. mediana
+    media = cinza.resize((TAMANHO_PHASH, TAMANHO_PHASH), Image.Resampling.BOX)
+    pixels = np.asarray(media, dtype=np.float64)
+    dct = _DCT_PHASH @ pixels @ _DCT_PHASH.T
+    bloco = dct[:TAMANHO_BLOCO_PHASH, :TAMANHO_BLOCO_PHASH].ravel()
+    mediana = np.median(bloco[1:])  # sem o termo DC (brilho médio)
+    phash = _bits_para_hex(bloco > mediana)
+
+    return dhash, phash
+
+
+def calcular_hashes_foto(caminho: Path) -> Tuple[str, str]:
+    """Calcula os hashes de uma foto decodificada em escala reduzida (draft)."""
+    return calcular_hashes(abrir_reduzida(caminho, TAMANHO_PHASH, TAMANHO_PHASH))
+
+
+def _matriz_bits(hashes_hex: Sequence[str]) -> np.ndarray:
+    """Matriz (n, 64) de bits 0/1 a partir dos hashes hexadecimais."""
+    dados = np.frombuffer(bytes.fromhex(''.join(hashes_hex)), dtype=np.uint8)
+    return np.unpackbits(dados.reshape(len(hashes_hex), 8), axis=1)
+
+
+def distancias_hamming(hashes_hex: Sequence[str]) -> np.ndarray:
+    """
+    Distâncias de Hamming entre todos os pares de hashes, numa única
+    operação de matrizes: d(a, b) = a·(1-b) + (1-a)·b.
+    """
+    if not hashes_hex:
+        return np.zeros((0, 0), dtype=np.int32)
+    bits = _matriz_bits(hashes_hex).astype(np.int32)
+    inversos = 1 - bits
+    return bits @ inversos.T + inversos @ bits.T
+
+
+def agrupar_duplicatas(
+    dhashes: Sequence[str],
+    phashes: Sequence[str],
+    limiar_dhash: int = LIMIAR_DHASH,
+    limiar_phash: int = LIMIAR_PHASH
+) -> List[List[int]]:
+    """
+    Agrupa índices de fotos quase duplicadas (componentes conexos dos pares
+    dentro dos dois limiares). Só retorna grupos com 2 ou mais fotos, cada
+    um em ordem crescente de índice.
+    """
+    n = len(dhashes)
+    if n < 2:
+        return []
+
+    proximas = ((distancias_hamming(dhashes) <= limiar_dhash) &
+                (distancias_hamming(phashes) <= limiar_phash))
+    pares_i, pares_j = np.nonzero(np.triu(proximas, k=1))
+
+    # União dos pares (union-find com compressão de caminho)
+    pais = list(range(n))
+
+    def raiz(i):
+        while pais[i] != i:
+            pais[i] = pais[pais[i]]
+            i = pais[i]
+        return i
+
+    for i, j in zip(pares_i.tolist(), pares_j.tolist()):
+        ri, rj = raiz(i), raiz(j)
+        if ri != rj:
+            pais[max(ri, rj)] = min(ri, rj)
+
+    grupos: Dict[int, List[int]] = {}
+    for i in range(n):
+        grupos.setdefault(raiz(i), []).append(i)
+    return [g for g in grupos.values() if len(g) > 1]
+
+
+def encontrar_duplicatas(
+    caminhos: Sequence[Path],
+    catalogo: CatalogoFotos,
+    limiar_dhash: int = LIMIAR_DHASH,
+    limiar_phash: int = LIMIAR_PHASH
+) -> List[List[Path]]:
+    """
+    Encontra grupos de fotos quase duplicadas entre todos os capítulos.
+
+    Em cada grupo, a primeira foto é a que deve ser mantida (maior
+    resolução; em empate, a que vem antes na ordem do livro).
+    """
+    caminhos = [Path(c) for c in caminhos]
+    validos = []
+    dhashes, phashes = [], []
+    for caminho in caminhos:
+        try:
+            dhash, phash = catalogo.obter_hashes(caminho, calcular_hashes_foto)
+        except Exception as e:
+            print(f"AVISO: Não foi possível calcular o hash de {caminho}: {e}")
+            continue
+        validos.append(caminho)
+        dhashes.append(dhash)
+        phashes.append(phash)
+
+    def pixels(caminho: Path) -> int:
+        registro = catalogo.registro(caminho)
+        return registro['largura'] * registro['altura']
+
+    grupos = []
+    for indices in agrupar_duplicatas(dhashes, phashes, limiar_dhash, limiar_phash):
+        membros = [validos[i] for i in indices]
+        manter = max(membros, key=pixels)  # max() mantém o primeiro em empates
+        grupos.append([manter] + [c for c in membros if c != manter])
+    return grupos
+
+
+def fotos_descartadas(grupos: List[List[Path]]) -> set:
+    """Conjunto das fotos a remover (todas menos a primeira de cada grupo)."""
+    return {caminho for grupo in grupos for caminho in grupo[1:]}
+
+
+if __name__ == '__main__':
+    import sys
+    from varredura_fotos import escanear_pastas
+
+    if len(sys.argv) < 2:
+        print("Uso: python duplicatas.py <pasta_raiz>")
+        sys.exit(1)
+
+    pasta_raiz = Path(sys.argv[1])
+    catalogo = CatalogoFotos(pasta_raiz)
+    fotos = escanear_pastas(pasta_raiz).todas_imagens()
+    catalogo.preparar(fotos)
+
+    grupos = encontrar_duplicatas(fotos, catalogo)
+    catalogo.salvar()
+
+    print(f"{len(grupos)} grupos de duplicatas em {len(fotos)} fotos")
+    for grupo in grupos:
+        print(f"  manter {catalogo.chave(grupo[0])}")
+        for caminho in grupo[1:]:
+            print(f"    duplicata {catalogo.chave(caminho)}")
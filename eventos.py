@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Separação dos Capítulos em Eventos (horário de captura + cor)
+
+Divide as fotos de cada capítulo, na ordem de captura, em eventos (um
+passeio, uma festa, um dia de aula) e a paginação (paginacao.py) nunca põe
+fotos de eventos diferentes na mesma página. Entre duas fotos consecutivas
+(na ordem de captura) pode haver uma fronteira de evento quando:
+- o intervalo entre as capturas (EXIF DateTimeOriginal) passa de
+  LACUNA_EVENTO_S (outro dia); ou
+- o intervalo passa de LACUNA_MINIMA_S e as cores mudam (distância entre
+  os histogramas de cor >= LIMIAR_COR); ou
+- falta a data de uma das duas e as cores mudam muito (>= LIMIAR_COR_SEM_DATA).
+
+Um evento menor que uma página (MIN_FOTOS_EVENTO) obrigaria páginas quase
+vazias, então as fronteiras entram da maior lacuna para a menor e só ficam
+as que deixam pelo menos MIN_FOTOS_EVENTO fotos de cada lado: fotos
+esparsas (uma por dia) se juntam às vizinhas mais próximas no tempo.
+
+O histograma de cor (BINS_CANAL³ faixas RGB) sai da menor prévia da foto
+(previas.py) ou, sem armazém de prévias, do modo draft do JPEG, e fica no
+catálogo: depois da primeira vez, separar os eventos usa só metadados e
+roda a cada regeneração do schema. As fronteiras candidatas saem de
+operações vetorizadas sobre o capítulo inteiro. Os eventos só fazem sentido
+com as fotos em ordem de captura (--ordem-captura); --sem-eventos desliga
+a separação (ex.: quando um orçamento de páginas não é alcançável).
+
+EXECUÇÃO (listar os eventos de cada capítulo):
+    python eventos.py <pasta_raiz>
+"""
+
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+from catalogo_fotos import CatalogoFotos
+from previas import ArmazemPrevias, abrir_reduzida
+
+
+# Lado das imagens de trabalho do histograma (reduzidas para LADO x LADO)
+LADO_HISTOGRAMA = 64
+
+# Faixas por canal RGB (BINS_CANAL³ faixas no histograma)
+BINS_CANAL = 4
+
+# Intervalo entre capturas que sozinho separa eventos (segundos): uma noite
+LACUNA_EVENTO_S = 10 * 3600
+
+# Intervalo mínimo para uma mudança de cor separar eventos (segundos); abaixo
+# disso fotos do mesmo passeio variam muito de cor (0,3-0,7 nas amostras)
+LACUNA_MINIMA_S = 3 * 3600
+
+# Distância entre histogramas (variação total, 0-1) que indica outra cena
+LIMIAR_COR = 0.6
+
+# Sem data de captura, só uma mudança de cor bem maior separa eventos
+LIMIAR_COR_SEM_DATA = 0.75
+
+# Menor evento (fotos): o maior layout registrado enche uma página
+MIN_FOTOS_EVENTO = 4
+
+
+def _carregar_rgb(caminho: Path, previas: Optional[ArmazemPrevias]) -> Optional[np.ndarray]:
+    """Lê a menor prévia (ou a foto em modo draft) em RGB, LADO x LADO."""
+    try:
+        if previas is not None:
+            img = previas.abrir(caminho, LADO_HISTOGRAMA, LADO_HISTOGRAMA)
+        else:
+            img = abrir_reduzida(caminho, LADO_HISTOGRAMA, LADO_HISTOGRAMA)
+        img = img.convert('RGB').resize((LADO_HISTOGRAMA, LADO_HISTOGRAMA), Image.Resampling.BILINEAR)
+        return np.asarray(img, dtype=np.uint8)
+    except Exception as e:
+        print(f"AVISO: Não foi possível calcular o histograma de {caminho}: {e}")
+        return None
+
+
+def histogramas_lote(lote: np.ndarray) -> np.ndarray:
+    """
+    Histogramas de cor normalizados de um lote (N, LADO, LADO, 3) de
+    imagens RGB 0-255: array (N, BINS_CANAL³) com soma 1 por foto.
+    """
+    n = len(lote)
+    faixas = (lote.astype(np.int64) * BINS_CANAL) >> 8
+    indices = (faixas[..., 0] * BINS_CANAL + faixas[..., 1]) * BINS_CANAL + faixas[..., 2]
+    indices = indices.reshape(n, -1) + np.arange(n)[:, None] * BINS_CANAL ** 3
+    contagens = np.bincount(indices.ravel(), minlength=n * BINS_CANAL ** 3)
+    contagens = contagens.reshape(n, BINS_CANAL ** 3).astype(np.float64)
+    return contagens / contagens.sum(axis=1, keepdims=True)
+
+
+def _histograma_para_hex(histograma: np.ndarray) -> str:
+    """Histograma quantizado em um byte por faixa (hexadecimal, como os hashes)."""
+    return np.round(histograma * 255).astype(np.uint8).tobytes().hex()
+
+
+def _histograma_de_hex(texto: str) -> np.ndarray:
+    valores = np.frombuffer(bytes.fromhex(texto), dtype=np.uint8).astype(np.float64)
+    return valores / max(valores.sum(), 1.0)
+
+
+def calcular_histogramas(
+    caminhos: Sequence[Path],
+    catalogo: CatalogoFotos,
+    previas: Optional[ArmazemPrevias] = None,
+    max_workers: int = 8
+) -> int:
+    """
+    Calcula o histograma de cor das fotos que ainda não têm um no catálogo.
+
+    Retorna quantas fotos foram avaliadas agora.
+    """
+    pendentes = [Path(c) for c in caminhos if catalogo.registro(c).get('histograma') is None]
+    if not pendentes:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        imagens = list(executor.map(lambda c: _carregar_rgb(c, previas), pendentes))
+
+    validos = [(c, img) for c, img in zip(pendentes, imagens) if img is not None]
+    if validos:
+        histogramas = histogramas_lote(np.stack([img for _, img in validos]))
+        for (caminho, _), histograma in zip(validos, histogramas):
+            catalogo.registro(caminho)['histograma'] = _histograma_para_hex(histograma)
+            catalogo.marcar_alterado(caminho)
+    return len(pendentes)
+
+
+def separar_eventos(datas: Sequence[Optional[str]], histogramas: np.ndarray,
+                    minimo: int = MIN_FOTOS_EVENTO) -> np.ndarray:
+    """
+    Evento de cada foto de um capítulo já em ordem de captura (0, 1, 2...).
+
+    datas são as datas de captura ISO 8601 (None = sem data) e histogramas
+    o array (N, BINS_CANAL³) das fotos (linha NaN = sem histograma, a cor
+    não separa essa foto das vizinhas). Só ficam as fronteiras que deixam
+    pelo menos `minimo` fotos em cada evento, da maior lacuna para a menor.
+    """
+    n = len(datas)
+    if n < 2:
+        return np.zeros(n, dtype=np.int64)
+
+    capturas = np.array([d or 'NaT' for d in datas], dtype='datetime64[s]')
+    segundos = capturas.astype(np.int64).astype(np.float64)
+    segundos[np.isnat(capturas)] = np.nan
+    lacunas = np.abs(np.diff(segundos))
+
+    distancias = 0.5 * np.abs(np.diff(histogramas, axis=0)).sum(axis=1)
+
+    # Comparações com NaN dão False: falta de dado nunca separa sozinha
+    with np.errstate(invalid='ignore'):
+        candidatas = ((lacunas >= LACUNA_EVENTO_S) |
+                      ((lacunas >= LACUNA_MINIMA_S) & (distancias >= LIMIAR_COR)) |
+                      (np.isnan(lacunas) & (distancias >= LIMIAR_COR_SEM_DATA)))
+
+    # Cortes (fronteira entre as fotos c - 1 e c), da maior lacuna para a menor
+    cortes = np.flatnonzero(candidatas) + 1
+    prioridade = np.nan_to_num(lacunas[cortes - 1], nan=0.0)
+    aceitos = [0, n]
+    for corte in cortes[np.argsort(-prioridade, kind='stable')].tolist():
+        posicao = bisect_left(aceitos, corte)
+        if corte - aceitos[posicao - 1] >= minimo and aceitos[posicao] - corte >= minimo:
+            aceitos.insert(posicao, corte)
+
+    fronteiras = np.zeros(n, dtype=np.int64)
+    fronteiras[aceitos[1:-1]] = 1
+    return np.cumsum(fronteiras)
+
+
+def eventos_fotos(caminhos: Sequence[Path], catalogo: CatalogoFotos) -> np.ndarray:
+    """
+    Evento de cada foto de um capítulo só com o catálogo (datas e
+    histogramas já calculados; sem histograma, vale só o horário).
+
+    Os eventos saem da ordem de captura (a de catalogo.ordenar_por_captura)
+    e voltam para a posição de cada foto em caminhos, que pode estar em
+    outra ordem (aí um evento não é necessariamente contíguo).
+    """
+    registros = [catalogo.registro(c) for c in caminhos]
+    ordem = sorted(range(len(registros)),
+                   key=lambda i: (registros[i]['data_captura'] is None,
+                                  registros[i]['data_captura'] or '', Path(caminhos[i]).name))
+    histogramas = np.full((len(registros), BINS_CANAL ** 3), np.nan)
+    for posicao, i in enumerate(ordem):
+        if registros[i].get('histograma'):
+            histogramas[posicao] = _histograma_de_hex(registros[i]['histograma'])
+
+    eventos = np.zeros(len(registros), dtype=np.int64)
+    eventos[ordem] = separar_eventos([registros[i]['data_captura'] for i in ordem], histogramas)
+    return eventos
+
+
+def eventos_capitulos(
+    capitulos: Sequence[Sequence[Path]],
+    catalogo: CatalogoFotos,
+    previas: Optional[ArmazemPrevias] = None,
+    calcular: bool = True
+) -> List[np.ndarray]:
+    """
+    Evento de cada foto de cada capítulo. Com calcular, os histogramas que
+    faltam no catálogo são calculados antes (das prévias, em paralelo).
+    """
+    if calcular:
+        calcular_histogramas([c for caminhos in capitulos for c in caminhos], catalogo, previas)
+    return [eventos_fotos(caminhos, catalogo) for caminhos in capitulos]
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    from varredura_fotos import escanear_pastas
+
+    if len(sys.argv) < 2:
+        print("Uso: python eventos.py <pasta_raiz>")
+        sys.exit(1)
+
+    pasta_raiz = Path(sys.argv[1])
+    varredura = escanear_pastas(pasta_raiz)
+    catalogo = CatalogoFotos(pasta_raiz)
+    catalogo.preparar(varredura.todas_imagens())
+
+    inicio = time.perf_counter()
+    calculados = calcular_histogramas(varredura.todas_imagens(), catalogo, ArmazemPrevias(pasta_raiz, catalogo))
+    catalogo.salvar()
+    print(f"{calculados} histogramas calculados em {time.perf_counter() - inicio:.2f}s")
+
+    inicio = time.perf_counter()
+    capitulos = [catalogo.ordenar_por_captura(c.imagens) for c in varredura.capitulos]
+    eventos = eventos_capitulos(capitulos, catalogo, calcular=False)
+    ms = (time.perf_counter() - inicio) * 1000
+
+    for capitulo, caminhos, evento in zip(varredura.capitulos, capitulos, eventos):
+        tamanhos = np.bincount(evento).tolist() if len(evento) else []
+        print(f"{capitulo.nome_pasta}: {len(tamanhos)} eventos {tamanhos}")
+    print(f"Eventos separados em {ms:.1f} ms")
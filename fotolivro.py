@@ -9,7 +9,9 @@ organizadas em 5 pastas, cada uma representando um ano do Infantil.
 RECURSOS:
 - Detecção automática de rostos para enquadramento inteligente
 - Crop otimizado que preserva rostos e evita cortar pessoas
-- Layouts automáticos para 1, 2 ou 3 fotos por página
+- Layouts automáticos para 1 a 4 fotos por página, com paginação ótima (paginacao.py)
+- Em ordem de captura, fotos de eventos diferentes (horário + cor, eventos.py) nunca dividem uma página
+- Catálogo de metadados (.catalogo_fotos.sqlite): recompilações não reabrem fotos inalteradas
 
 PREPARAÇÃO:
 - Organize as fotos em 5 pastas: Infantil1, Infantil2, Infantil3, Infantil4, Infantil5
@@ -17,7 +19,24 @@ PREPARAÇÃO:
 - Formatos aceitos: .jpg, .jpeg, .png, .tif, .tiff, .webp
 
 EXECUÇÃO:
-    python fotolivro.py <pasta_raiz> <arquivo_saida.pdf>
+    python fotolivro.py <pasta_raiz> <arquivo_saida.pdf> [--ordem-captura] [--sem-eventos] [--sem-duplicatas] [--jobs N] [--paginas=N]
+
+    --ordem-captura: ordena as fotos de cada ano pela data EXIF em vez do nome
+            e separa cada ano em eventos (eventos.py) que não dividem página
+    --sem-eventos: com --ordem-captura, não separa os eventos (ex.: quando
+            o orçamento de --paginas não é alcançável)
+    --sem-duplicatas: deixa de fora fotos quase duplicadas (mantém a melhor)
+    --plan: só simula (sem decodificar fotos) e mostra páginas por capítulo,
+            DPI de cada slot, tamanho estimado e tempo projetado
+    --jobs N: detecta pessoas em N processos (fotos de todos os anos de uma vez)
+    --detect=MODO: detecção de pessoas para o crop inteligente (padrão full):
+            off (nenhuma), faces (só rostos), full (rostos + corpo; as passadas
+            de corpo pulam fotos com rosto confiável), saliency (só o mapa de
+            saliência, poucos ms por foto) ou faces+saliency
+    --detect-budget=MS: tempo máximo de detecção por foto (padrão 5000, 0 = sem
+            limite); estourado, a foto usa crop centralizado
+    --paginas=N: no máximo N páginas no livro (capas incluídas); a paginação
+            junta mais fotos por página até caber
 
 Exemplo:
     python fotolivro.py ./fotos_bruno ./fotolivro_bruno.pdf
@@ -28,8 +47,10 @@ INSTALAÇÃO DAS DEPENDÊNCIAS:
 
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Sequence, Tuple, Optional
 from enum import Enum
 
 try:
@@ -37,8 +58,7 @@ try:
     from reportlab.lib.units import mm
     from reportlab.pdfgen import canvas
     from reportlab.lib.utils import ImageReader
-    from PIL import Image
-    import cv2
+    from PIL import Image, ImageOps
     import numpy as np
 except ImportError as e:
     print(f"ERRO: Biblioteca necessária não instalada: {e}")
@@ -46,179 +66,279 @@ except ImportError as e:
     print("  pip install reportlab pillow opencv-python")
     sys.exit(1)
 
-# Carregar detectores do OpenCV (Haar Cascades)
-# Estes modelos já vêm com o OpenCV e não precisam de download
-try:
-    FACE_CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    UPPERBODY_CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_upperbody.xml')
-    FULLBODY_CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_fullbody.xml')
-    DETECTION_ENABLED = True
-except Exception:
-    FACE_CASCADE = None
-    UPPERBODY_CASCADE = None
-    FULLBODY_CASCADE = None
-    DETECTION_ENABLED = False
-    print("AVISO: Detectores não disponíveis. Usando crop centralizado.")
+from catalogo_fotos import CatalogoFotos
+from varredura_fotos import VarreduraFotos, escanear_pastas
+from sondagem_imagens import ler_cabecalho
+from previas import ArmazemPrevias, abrir_reduzida
+from duplicatas import encontrar_duplicatas, fotos_descartadas
+from qualidade_fotos import avaliar_fotos, escolher_destaques
+from eventos import calcular_histogramas, eventos_fotos
+from saliencia import LADO_SALIENCIA, mapa_saliencia, regiao_saliente
+from recortes import recortes_inteligentes, recortes_com_ajuste
+from layouts import LAYOUTS, boxes_layout
+from paginacao import FotoPaginacao, paginar_capitulos, layouts_grupos
+from planejamento import (PlanoFotolivro, PaginaPlanejada, SlotPlanejado,
+                          planejar_capa, dpi_efetivo)
+from constantes import (PASTAS_ANOS, EXTENSOES_IMAGEM, A4_LARGURA_MM, A4_ALTURA_MM,
+                        TITULO_CAPA, SUBTITULO_CAPA, PERIODO_CAPA, SUBTITULO_CONTRA_CAPA,
+                        TITULOS_ANOS, mm_to_points, classificar_imagem)
 
 
 # ============================================================================
 # CONSTANTES E CONFIGURAÇÕES
 # ============================================================================
 
-# Ordem fixa das pastas dos anos (sequência obrigatória)
-PASTAS_ANOS = ["Infantil1", "Infantil2", "Infantil3", "Infantil4", "Infantil5"]
-
-# Formatos de imagem aceitos
-EXTENSOES_IMAGEM = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp"}
-
-# Dimensões A4 em paisagem (297mm x 210mm)
-A4_LARGURA_MM = 297
-A4_ALTURA_MM = 210
-
-# Margens (em milímetros)
-MARGEM_EXTERNA_MM = 10  # Margem de 1 cm em todos os lados externos
-MARGEM_LOMBADA_MM = 15  # Margem de 1.5 cm no lado da lombada
-ESPACO_ENTRE_FOTOS_MM = 5  # Espaço de 0.5 cm entre fotos vizinhas
-
-# Limites para classificação de proporção
-RATIO_QUADRADO_MIN = 0.9
-RATIO_QUADRADO_MAX = 1.1
-
-# Informações do fotolivro
-TITULO_CAPA = "Bruno Sereia Broering"
-SUBTITULO_CAPA = "Momentos no Infantil 1 ao 5"
-PERIODO_CAPA = "2021 ~ 2025"
-
-# Títulos das subcapas por ano
-TITULOS_ANOS = {
-    "Infantil1": ("Infantil 1", "2021"),
-    "Infantil2": ("Infantil 2", "2022"),
-    "Infantil3": ("Infantil 3", "2023"),
-    "Infantil4": ("Infantil 4", "2024"),
-    "Infantil5": ("Infantil 5", "2025"),
+# Lado maior (px) da imagem usada na detecção de pessoas: a detecção roda numa
+# versão reduzida da foto e as caixas voltam para a escala do original
+# (None = resolução original)
+LADO_MAXIMO_DETECCAO = 2048
+
+# Modos de detecção (--detect): nenhuma, só rostos, rostos + corpo, só o mapa
+# de saliência (saliencia.py) ou rostos + saliência
+MODOS_DETECCAO = ('off', 'faces', 'full', 'saliency', 'faces+saliency')
+
+# Tempo máximo (ms) de detecção por foto; estourado, a foto usa crop centralizado
+# (None = sem limite)
+ORCAMENTO_DETECCAO_MS = 5000
+
+# Rostos com pelo menos tantas detecções vizinhas são confiáveis: as passadas
+# de corpo superior e corpo inteiro não rodam
+VIZINHOS_ROSTO_CONFIAVEL = 10
+
+# Níveis guardados no catálogo que servem para cada modo (None = detecção antiga)
+NIVEIS_ACEITOS_POR_MODO = {
+    'full': {None, 'rostos', 'corpo'},
+    'faces': {None, 'rostos', 'corpo', 'so_rostos'},
+    'saliency': {'saliencia'},
+    'faces+saliency': {'rostos+saliencia'},
+}
+
+# Nível atingido pela detecção de cada foto (resumo da execução)
+NIVEIS_DETECCAO = {
+    'off': 'sem detecção (--detect=off)',
+    'rostos': 'só rostos (rosto confiável)',
+    'so_rostos': 'só rostos (--detect=faces)',
+    'corpo': 'rostos + corpo',
+    'orcamento': 'tempo esgotado (crop centralizado)',
+    'saliencia': 'só saliência',
+    'rostos+saliencia': 'rostos + saliência',
+    'falha': 'falha na detecção (crop centralizado)',
+    'catalogo': 'detecção antiga do catálogo (sem nível)',
+}
+
+# Detectores do OpenCV (Haar Cascades), carregados na primeira detecção
+# (ver carregar_cascades). Estes modelos já vêm com o OpenCV e não
+# precisam de download.
+ARQUIVOS_CASCADES = {
+    'rosto': 'haarcascade_frontalface_default.xml',
+    'corpo_superior': 'haarcascade_upperbody.xml',
+    'corpo_inteiro': 'haarcascade_fullbody.xml',
 }
 
 # ============================================================================
 # FUNÇÕES AUXILIARES
 # ============================================================================
 
-def mm_to_points(mm_value: float) -> float:
-    """Converte milímetros para points (72 points = 1 inch = 25.4mm)."""
-    return mm_value * 72.0 / 25.4
-
-
-def classificar_imagem(largura: int, altura: int) -> str:
-    """
-    Classifica uma imagem como paisagem, retrato ou quase quadrada.
-    
-    Retorna:
-        'paisagem': largura > altura
-        'retrato': altura > largura
-        'quadrada': proporção próxima de 1:1 (entre 0.9 e 1.1)
+def obter_dimensoes_imagem(caminho: Path) -> Tuple[int, int]:
     """
-    if largura == 0 or altura == 0:
-        return 'paisagem'  # fallback
+    Obtém largura e altura de uma imagem em pixels.
     
-    ratio = largura / altura
+    Lê apenas o cabeçalho do arquivo e já aplica a orientação EXIF
+    (fotos de celular giradas têm largura e altura trocadas).
     
-    if RATIO_QUADRADO_MIN <= ratio <= RATIO_QUADRADO_MAX:
-        return 'quadrada'
-    elif ratio > 1:
-        return 'paisagem'
-    else:
-        return 'retrato'
+    Retorna (largura, altura).
+    """
+    resultado = ler_cabecalho(caminho)
+    if resultado is None:
+        print(f"AVISO: Não foi possível ler dimensões de {caminho}")
+        return (1000, 1000)  # fallback
+    return resultado[0], resultado[1]
 
 
-def encontrar_pasta_ano(diretorio_raiz: Path, nome_pasta: str) -> Optional[Path]:
-    """
-    Encontra uma pasta de ano no diretório raiz (case-insensitive).
-    
-    Retorna o Path da pasta encontrada ou None se não existir.
+# ============================================================================
+# DETECÇÃO DE PESSOAS E CROP INTELIGENTE
+# ============================================================================
+
+_cascades: Optional[Dict[str, object]] = None
+
+
+def carregar_cascades() -> Dict[str, object]:
     """
-    diretorio_raiz = Path(diretorio_raiz)
-    if not diretorio_raiz.exists():
-        return None
+    Carrega os Haar Cascades de ARQUIVOS_CASCADES (uma vez por processo).
     
-    # Busca case-insensitive
-    for item in diretorio_raiz.iterdir():
-        if item.is_dir() and item.name.lower() == nome_pasta.lower():
-            return item
+    O OpenCV só é importado aqui e nas funções de detecção: quem importa
+    este módulo sem detectar (capas, schema, PDF) não paga a inicialização.
     
-    return None
+    Retorna {nome: CascadeClassifier}, vazio se o OpenCV não estiver disponível.
+    """
+    global _cascades
+    if _cascades is None:
+        try:
+            import cv2
+            _cascades = {
+                nome: cv2.CascadeClassifier(cv2.data.haarcascades + arquivo)
+                for nome, arquivo in ARQUIVOS_CASCADES.items()
+            }
+        except Exception:
+            _cascades = {}
+            print("AVISO: Detectores não disponíveis. Usando crop centralizado.")
+    return _cascades
 
 
-def listar_imagens(pasta: Path) -> List[Path]:
+def _carregar_para_deteccao(
+    caminho: Path,
+    previas: Optional[ArmazemPrevias],
+    lado_maximo: Optional[int]
+) -> Tuple[np.ndarray, float]:
     """
-    Lista todas as imagens válidas em uma pasta, ordenadas por nome.
-    
-    Retorna lista de Paths das imagens encontradas.
+    Carrega a foto em tons de cinza com o lado maior limitado a lado_maximo
+    (prévia da pirâmide ou decodificação draft; nunca o original inteiro
+    quando há limite).
+
+    Retorna (imagem em cinza, fator para voltar à escala do original).
     """
-    imagens = []
-    if not pasta.exists() or not pasta.is_dir():
-        return imagens
-    
-    for arquivo in sorted(pasta.iterdir()):
-        if arquivo.is_file() and arquivo.suffix.lower() in EXTENSOES_IMAGEM:
-            imagens.append(arquivo)
-    
-    return imagens
+    if previas is not None:
+        largura, altura = previas.catalogo.obter_dimensoes(caminho)
+    else:
+        largura, altura = obter_dimensoes_imagem(caminho)
 
+    escala = 1.0
+    if lado_maximo and max(largura, altura) > lado_maximo:
+        escala = lado_maximo / max(largura, altura)
+    alvo = (max(1, round(largura * escala)), max(1, round(altura * escala)))
 
-def obter_dimensoes_imagem(caminho: Path) -> Tuple[int, int]:
+    if previas is not None:
+        img = previas.abrir(caminho, *alvo)
+    else:
+        img = abrir_reduzida(caminho, *alvo)
+    img = img.convert('L')
+    if img.size != alvo:
+        img = img.resize(alvo, Image.Resampling.BOX)
+    gray = np.asarray(img)
+
+    return gray, largura / gray.shape[1]
+
+
+def _min_size_reduzido(cascade, escala: float, min_size: Tuple[int, int]) -> Tuple[int, int]:
     """
-    Obtém largura e altura de uma imagem em pixels.
-    
-    Retorna (largura, altura).
+    Ajusta o minSize (pensado para o original) a uma imagem reduzida por
+    `escala`, sem ficar menor que a janela nativa do cascade.
+
+    O scaleFactor não muda: o passo da pirâmide de escalas é relativo e vale
+    para qualquer resolução.
     """
-    try:
-        with Image.open(caminho) as img:
-            return img.size  # (largura, altura)
-    except Exception as e:
-        print(f"AVISO: Não foi possível ler dimensões de {caminho}: {e}")
-        return (1000, 1000)  # fallback
+    janela_w, janela_h = cascade.getOriginalWindowSize()
+    return (max(janela_w, round(min_size[0] * escala)),
+            max(janela_h, round(min_size[1] * escala)))
 
 
-# ============================================================================
-# DETECÇÃO DE PESSOAS E CROP INTELIGENTE
-# ============================================================================
+def _regiao_saliente(gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Região saliente (saliencia.py) de uma imagem em cinza, nas coordenadas
+    da própria imagem. A imagem é reduzida para LADO_SALIENCIA antes do mapa
+    (PIL, sem OpenCV: o modo 'saliency' roda sem os cascades).
+    """
+    img_h, img_w = gray.shape[:2]
+    escala = min(1.0, LADO_SALIENCIA / max(img_w, img_h))
+    pequena = gray
+    if escala < 1.0:
+        tamanho = (max(1, round(img_w * escala)), max(1, round(img_h * escala)))
+        pequena = np.asarray(Image.fromarray(gray).resize(tamanho, Image.Resampling.BOX))
+    
+    regiao = regiao_saliente(mapa_saliencia(pequena))
+    if regiao is None:
+        return None
+    fator_x = img_w / pequena.shape[1]
+    fator_y = img_h / pequena.shape[0]
+    x, y, w, h = regiao
+    return (int(x * fator_x), int(y * fator_y), int(round(w * fator_x)), int(round(h * fator_y)))
+
 
-def detectar_pessoas(caminho: Path) -> Tuple[List[Tuple[int, int, int, int]], int]:
+def detectar_pessoas(
+    caminho: Path,
+    previas: Optional[ArmazemPrevias] = None,
+    lado_maximo: Optional[int] = LADO_MAXIMO_DETECCAO,
+    modo: str = 'full',
+    orcamento_ms: Optional[float] = ORCAMENTO_DETECCAO_MS
+) -> Tuple[List[Tuple[int, int, int, int]], int, str]:
     """
     Detecta pessoas em uma imagem usando OpenCV Haar Cascades.
     Combina detecção de rostos, corpo superior e corpo inteiro.
     
+    As passadas de corpo só rodam no modo 'full' e quando os rostos não
+    bastam (menos de 2, nenhum confiável). Uma passada que não caberia no
+    orçamento de tempo não começa: a foto fica sem regiões (crop centralizado).
+    
+    Os modos com saliência acrescentam (ou usam só) a região saliente de
+    saliencia.py, calculada numa imagem de LADO_SALIENCIA px em poucos ms.
+    O modo 'saliency' não carrega os cascades e roda sem o OpenCV.
+    
     Args:
         caminho: Caminho da imagem
+        previas: Armazém de prévias; se informado, a imagem reduzida sai da
+            menor prévia que atende a lado_maximo
+        lado_maximo: Lado maior (px) da imagem em que a detecção roda
+            (None = original); as caixas voltam para a escala do original
+        modo: 'off', 'faces' (só rostos), 'full' (rostos + corpo),
+            'saliency' (só saliência) ou 'faces+saliency' (rostos + saliência)
+        orcamento_ms: Tempo máximo da detecção desta foto (None = sem limite)
     
     Retorna:
         Tupla com:
         - Lista de bounding boxes (x, y, largura, altura) das pessoas detectadas
+          (em pixels do original)
         - Número de rostos detectados (para decidir layout)
+        - Nível atingido (chave de NIVEIS_DETECCAO)
     """
-    if not DETECTION_ENABLED:
-        return [], 0
+    if modo == 'off':
+        return [], 0, 'off'
+    if modo == 'saliency':
+        # Sem cascades nem OpenCV: basta a menor prévia que cobre LADO_SALIENCIA
+        try:
+            gray, fator = _carregar_para_deteccao(Path(caminho), previas, LADO_SALIENCIA)
+            regiao = _regiao_saliente(gray)
+        except Exception:
+            return [], 0, 'falha'
+        if regiao is None:
+            return [], 0, 'saliencia'
+        return [tuple(int(round(v * fator)) for v in regiao)], 0, 'saliencia'
+    cascades = carregar_cascades()
+    if not cascades:
+        return [], 0, 'off'
+    import cv2
+    face_cascade = cascades['rosto']
+    upperbody_cascade = cascades['corpo_superior']
+    fullbody_cascade = cascades['corpo_inteiro']
+    
+    inicio = time.perf_counter()
+    
+    def cabe_no_orcamento(estimativa_ms: float = 0.0) -> bool:
+        if orcamento_ms is None:
+            return True
+        return (time.perf_counter() - inicio) * 1000 + estimativa_ms <= orcamento_ms
     
     try:
-        # Carregar imagem com OpenCV
-        img = cv2.imread(str(caminho))
-        if img is None:
-            return [], 0
-        
-        # Converter para escala de cinza (necessário para Haar Cascade)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # Imagem em cinza (necessário para Haar Cascade), já reduzida
+        gray, fator = _carregar_para_deteccao(Path(caminho), previas, lado_maximo)
+        escala = 1.0 / fator
+        img_h, img_w = gray.shape[:2]
         
         regioes = []
         num_rostos = 0
+        confiavel = False
         
         # 1. Detectar rostos (mais preciso)
-        if FACE_CASCADE is not None:
-            faces = FACE_CASCADE.detectMultiScale(
+        inicio_passada = time.perf_counter()
+        if not face_cascade.empty():
+            min_size = _min_size_reduzido(face_cascade, escala, (30, 30))
+            faces, vizinhos = face_cascade.detectMultiScale2(
                 gray,
                 scaleFactor=1.1,
                 minNeighbors=5,
-                minSize=(30, 30),
+                minSize=min_size,
                 flags=cv2.CASCADE_SCALE_IMAGE
             )
+            confiavel = any(v >= VIZINHOS_ROSTO_CONFIAVEL for v in vizinhos)
             for (x, y, w, h) in faces:
                 # Expandir a região do rosto para incluir corpo estimado
                 # Rosto normalmente é ~1/7 da altura da pessoa
@@ -230,88 +350,197 @@ def detectar_pessoas(caminho: Path) -> Tuple[List[Tuple[int, int, int, int]], in
                 # Garantir que está dentro da imagem
                 corpo_x = max(0, corpo_x)
                 corpo_y = max(0, corpo_y)
-                corpo_w = min(img.shape[1] - corpo_x, corpo_w)
-                corpo_h = min(img.shape[0] - corpo_y, corpo_h)
+                corpo_w = min(img_w - corpo_x, corpo_w)
+                corpo_h = min(img_h - corpo_y, corpo_h)
                 
-                regioes.append((corpo_x, corpo_y, corpo_w, corpo_h))
+                regioes.append((int(corpo_x), int(corpo_y), int(corpo_w), int(corpo_h)))
                 num_rostos += 1
+        # Estimativa de custo das próximas passadas (percorrem a mesma imagem)
+        ms_passada = (time.perf_counter() - inicio_passada) * 1000
+        
+        if not cabe_no_orcamento():
+            return [], 0, 'orcamento'
+        
+        if modo == 'faces+saliency':
+            nivel = 'rostos+saliencia'
+            regiao = _regiao_saliente(gray)
+            if regiao is not None:
+                regioes.append(regiao)
+        elif confiavel or len(regioes) >= 2:
+            nivel = 'rostos'
+        elif modo == 'faces':
+            nivel = 'so_rostos'
+        else:
+            nivel = 'corpo'
+            
+            # 2. Detectar corpo superior (se não encontrou rostos suficientes)
+            if not upperbody_cascade.empty():
+                if not cabe_no_orcamento(ms_passada):
+                    return [], 0, 'orcamento'
+                min_size = _min_size_reduzido(upperbody_cascade, escala, (50, 50))
+                upperbodies = upperbody_cascade.detectMultiScale(
+                    gray,
+                    scaleFactor=1.1,
+                    minNeighbors=3,
+                    minSize=min_size,
+                    flags=cv2.CASCADE_SCALE_IMAGE
+                )
+                for (x, y, w, h) in upperbodies:
+                    # Verificar se não sobrepõe muito com regiões existentes
+                    sobrepoe = False
+                    for (rx, ry, rw, rh) in regioes:
+                        # Calcular interseção
+                        ix = max(x, rx)
+                        iy = max(y, ry)
+                        ix2 = min(x + w, rx + rw)
+                        iy2 = min(y + h, ry + rh)
+                        if ix < ix2 and iy < iy2:
+                            sobrepoe = True
+                            break
+                    
+                    if not sobrepoe:
+                        # Expandir para baixo (incluir pernas)
+                        corpo_h = int(h * 2)
+                        corpo_h = min(img_h - y, corpo_h)
+                        regioes.append((int(x), int(y), int(w), corpo_h))
+            
+            # 3. Detectar corpo inteiro (fallback)
+            if len(regioes) < 1 and not fullbody_cascade.empty():
+                if not cabe_no_orcamento(ms_passada):
+                    return [], 0, 'orcamento'
+                min_size = _min_size_reduzido(fullbody_cascade, escala, (50, 100))
+                fullbodies = fullbody_cascade.detectMultiScale(
+                    gray,
+                    scaleFactor=1.1,
+                    minNeighbors=3,
+                    minSize=min_size,
+                    flags=cv2.CASCADE_SCALE_IMAGE
+                )
+                for (x, y, w, h) in fullbodies:
+                    regioes.append((int(x), int(y), int(w), int(h)))
+            
+            if not cabe_no_orcamento():
+                return [], 0, 'orcamento'
         
-        # 2. Detectar corpo superior (se não encontrou rostos suficientes)
-        if len(regioes) < 2 and UPPERBODY_CASCADE is not None:
-            upperbodies = UPPERBODY_CASCADE.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=3,
-                minSize=(50, 50),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
-            for (x, y, w, h) in upperbodies:
-                # Verificar se não sobrepõe muito com regiões existentes
-                sobrepoe = False
-                for (rx, ry, rw, rh) in regioes:
-                    # Calcular interseção
-                    ix = max(x, rx)
-                    iy = max(y, ry)
-                    ix2 = min(x + w, rx + rw)
-                    iy2 = min(y + h, ry + rh)
-                    if ix < ix2 and iy < iy2:
-                        sobrepoe = True
-                        break
-                
-                if not sobrepoe:
-                    # Expandir para baixo (incluir pernas)
-                    corpo_h = int(h * 2)
-                    corpo_h = min(img.shape[0] - y, corpo_h)
-                    regioes.append((int(x), int(y), int(w), corpo_h))
-        
-        # 3. Detectar corpo inteiro (fallback)
-        if len(regioes) < 1 and FULLBODY_CASCADE is not None:
-            fullbodies = FULLBODY_CASCADE.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=3,
-                minSize=(50, 100),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
-            for (x, y, w, h) in fullbodies:
-                regioes.append((int(x), int(y), int(w), int(h)))
+        # Regiões detectadas na imagem reduzida: voltar para a escala do original
+        if fator != 1.0:
+            regioes = [tuple(int(round(v * fator)) for v in r) for r in regioes]
         
-        return regioes, num_rostos
+        return regioes, num_rostos, nivel
     
     except Exception:
         # Falha silenciosa - usar fallback
-        return [], 0
+        return [], 0, 'falha'
+
+
+def deteccao_reaproveitavel(nivel: Optional[str], modo: str) -> bool:
+    """
+    Diz se uma detecção guardada no catálogo (com o nível `nivel`) serve
+    para o modo pedido (NIVEIS_ACEITOS_POR_MODO). Tempo esgotado e falhas
+    são sempre refeitos; só rostos (--detect=faces) não serve para o modo
+    'full'; saliência e cascades não se misturam.
+    """
+    return nivel in NIVEIS_ACEITOS_POR_MODO.get(modo, set())
 
 
 def detectar_rostos(caminho: Path) -> List[Tuple[int, int, int, int]]:
     """
     Wrapper para compatibilidade - retorna apenas as regiões de pessoas.
     """
-    regioes, _ = detectar_pessoas(caminho)
+    regioes, _, _ = detectar_pessoas(caminho)
     return regioes
 
 
-def calcular_regiao_rostos(rostos: List[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+def _iniciar_processo_deteccao():
+    """Inicializa um processo da análise paralela (uma thread OpenCV por processo)."""
+    try:
+        import cv2
+    except ImportError:
+        return  # --detect=saliency roda sem OpenCV
+    cv2.setNumThreads(1)
+
+
+def _detectar_pessoas_processo(
+    caminho: Path,
+    modo: str,
+    orcamento_ms: Optional[float]
+) -> Tuple[List[Tuple[int, int, int, int]], int, str]:
+    """
+    Detecção executada num processo da análise paralela (--jobs).
+
+    Sem catálogo nem prévias (que são do processo principal): lê uma versão
+    reduzida do original (draft) e devolve tuplas simples de int.
     """
-    Calcula a união (bounding box) de todos os rostos detectados.
+    regioes, num_rostos, nivel = detectar_pessoas(caminho, modo=modo, orcamento_ms=orcamento_ms)
+    return [tuple(int(v) for v in r) for r in regioes], int(num_rostos), nivel
+
+
+def detectar_em_paralelo(
+    caminhos: List[Path],
+    catalogo: CatalogoFotos,
+    jobs: int,
+    modo: str = 'full',
+    orcamento_ms: Optional[float] = ORCAMENTO_DETECCAO_MS,
+    previas: Optional[ArmazemPrevias] = None
+) -> set:
+    """
+    Detecta pessoas nas fotos ainda sem detecção no catálogo usando um
+    pool de `jobs` processos (fotos de todos os anos de uma vez).
     
-    Args:
-        rostos: Lista de bounding boxes dos rostos
+    Os resultados vão para o catálogo por caminho, então a ordem das fotos
+    não depende da ordem em que os processos terminam. Se um processo
+    morrer (ex.: falha nativa do OpenCV), as fotos perdidas são refeitas
+    uma a uma, cada uma num processo próprio, para isolar a culpada.
+    O pool só é criado se houver fotos pendentes, com no máximo uma por
+    processo; com jobs <= 1 (ou uma foto só) a detecção roda aqui mesmo,
+    usando as prévias (se houver).
     
-    Retorna:
-        Bounding box (x, y, largura, altura) que engloba todos os rostos,
-        ou None se a lista estiver vazia.
+    Retorna o conjunto das fotos cuja detecção falhou (ficam sem rostos).
     """
-    if not rostos:
-        return None
+    pendentes = [c for c in caminhos if not catalogo.deteccao_em_cache(
+        c, lambda nivel: deteccao_reaproveitavel(nivel, modo))]
+    if not pendentes:
+        return set()
+    jobs = min(jobs, len(pendentes))
+    
+    def guardar(caminho, resultado):
+        catalogo.obter_deteccao(caminho, lambda _: resultado, lambda _: False)
+    
+    if jobs <= 1:
+        print(f"  Detectando pessoas em {len(pendentes)} fotos...")
+        falhas = set()
+        for caminho in pendentes:
+            resultado = detectar_pessoas(caminho, previas, modo=modo, orcamento_ms=orcamento_ms)
+            if resultado[2] == 'falha':
+                falhas.add(caminho)
+            guardar(caminho, resultado)
+        return falhas
+    
+    print(f"  Detectando pessoas em {len(pendentes)} fotos ({jobs} processos)...")
+    
+    def detectar(executor, caminho):
+        return executor.submit(_detectar_pessoas_processo, caminho, modo, orcamento_ms)
     
-    # Encontrar os limites extremos
-    x_min = min(r[0] for r in rostos)
-    y_min = min(r[1] for r in rostos)
-    x_max = max(r[0] + r[2] for r in rostos)
-    y_max = max(r[1] + r[3] for r in rostos)
+    perdidas = []
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=_iniciar_processo_deteccao) as executor:
+        futuros = [detectar(executor, c) for c in pendentes]
+        for caminho, futuro in zip(pendentes, futuros):
+            try:
+                guardar(caminho, futuro.result())
+            except Exception:
+                perdidas.append(caminho)
     
-    return (x_min, y_min, x_max - x_min, y_max - y_min)
+    falhas = set()
+    for caminho in perdidas:
+        try:
+            with ProcessPoolExecutor(max_workers=1,
+                                     initializer=_iniciar_processo_deteccao) as executor:
+                guardar(caminho, detectar(executor, caminho).result())
+        except Exception as e:
+            print(f"AVISO: Falha na detecção de pessoas em {caminho}: {e}")
+            falhas.add(caminho)
+    return falhas
 
 
 def calcular_crop_inteligente(
@@ -324,10 +553,9 @@ def calcular_crop_inteligente(
     """
     Calcula o melhor crop da imagem que PRESERVA os rostos (não corta-os).
     
-    Estratégia:
-    1. Começar com o MAIOR crop possível que caiba no aspect ratio do slot
-    2. Se há rostos, ajustar a posição do crop para evitar cortá-los
-    3. Preferir cortar fundo (bordas sem rostos) em vez de rostos
+    Uma foto só; para várias de uma vez use recortes.recortes_inteligentes
+    (mesma estratégia: maior crop com o aspect ratio do slot, deslocado
+    para não cortar as pessoas, preferindo cortar o fundo).
     
     Args:
         img_largura: Largura da imagem em pixels
@@ -339,85 +567,8 @@ def calcular_crop_inteligente(
     Retorna:
         (x, y, largura, altura) do crop na imagem original em pixels.
     """
-    ratio_slot = slot_largura / slot_altura
-    ratio_img = img_largura / img_altura if img_altura > 0 else 1.0
-    
-    # Calcular o maior crop possível com o aspect ratio do slot
-    if ratio_img >= ratio_slot:
-        # Imagem mais larga que o slot: usar altura total, cortar largura
-        crop_h = img_altura
-        crop_w = int(img_altura * ratio_slot)
-    else:
-        # Imagem mais alta que o slot: usar largura total, cortar altura
-        crop_w = img_largura
-        crop_h = int(img_largura / ratio_slot)
-    
-    # Se não há rostos, usar crop centralizado
-    if not rostos:
-        crop_x = (img_largura - crop_w) // 2
-        crop_y = (img_altura - crop_h) // 2
-        return (crop_x, crop_y, crop_w, crop_h)
-    
-    # Calcular o centro dos rostos (ponderado)
-    total_area = 0
-    centro_x = 0
-    centro_y = 0
-    
-    for (rx, ry, rw, rh) in rostos:
-        area = rw * rh
-        total_area += area
-        centro_x += (rx + rw / 2) * area
-        centro_y += (ry + rh / 2) * area
-    
-    if total_area > 0:
-        centro_x = centro_x / total_area
-        centro_y = centro_y / total_area
-    else:
-        centro_x = img_largura / 2
-        centro_y = img_altura / 2
-    
-    # Calcular a região que contém todos os rostos (com margem)
-    regiao_rostos = calcular_regiao_rostos(rostos)
-    if regiao_rostos:
-        face_x, face_y, face_w, face_h = regiao_rostos
-        # Adicionar margem de 10% ao redor dos rostos
-        margem = 0.1
-        face_x = max(0, face_x - int(face_w * margem))
-        face_y = max(0, face_y - int(face_h * margem))
-        face_w = min(img_largura - face_x, int(face_w * (1 + 2 * margem)))
-        face_h = min(img_altura - face_y, int(face_h * (1 + 2 * margem)))
-    else:
-        face_x, face_y, face_w, face_h = 0, 0, img_largura, img_altura
-    
-    # Posicionar o crop tentando manter os rostos dentro
-    # Começar centralizando no centro dos rostos
-    crop_x = int(centro_x - crop_w / 2)
-    crop_y = int(centro_y - crop_h / 2)
-    
-    # Ajustar para garantir que os rostos fiquem dentro do crop
-    # Se os rostos estão mais à esquerda que o crop, mover crop para esquerda
-    if face_x < crop_x:
-        crop_x = max(0, face_x)
-    # Se os rostos estão mais à direita que o crop
-    if face_x + face_w > crop_x + crop_w:
-        crop_x = min(img_largura - crop_w, face_x + face_w - crop_w)
-    
-    # Se os rostos estão mais acima que o crop
-    if face_y < crop_y:
-        crop_y = max(0, face_y)
-    # Se os rostos estão mais abaixo que o crop
-    if face_y + face_h > crop_y + crop_h:
-        crop_y = min(img_altura - crop_h, face_y + face_h - crop_h)
-    
-    # Clamping final para garantir que está dentro da imagem
-    crop_x = max(0, min(crop_x, img_largura - crop_w))
-    crop_y = max(0, min(crop_y, img_altura - crop_h))
-    
-    # Garantir dimensões válidas
-    crop_w = max(1, min(crop_w, img_largura - crop_x))
-    crop_h = max(1, min(crop_h, img_altura - crop_y))
-    
-    return (crop_x, crop_y, crop_w, crop_h)
+    crop = recortes_inteligentes([img_largura], [img_altura], [slot_largura], [slot_altura], [rostos])[0]
+    return tuple(int(v) for v in crop)
 
 
 def _crop_centralizado(img_largura: int, img_altura: int, ratio_slot: float) -> Tuple[int, int, int, int]:
@@ -426,67 +577,138 @@ def _crop_centralizado(img_largura: int, img_altura: int, ratio_slot: float) ->
     
     Fallback quando não há rostos detectados.
     """
-    ratio_img = img_largura / img_altura if img_altura > 0 else 1.0
-    
-    if ratio_img >= ratio_slot:
-        # Imagem mais larga: cortar nas laterais
-        nova_largura = int(img_altura * ratio_slot)
-        x = (img_largura - nova_largura) // 2
-        return (x, 0, nova_largura, img_altura)
-    else:
-        # Imagem mais alta: cortar em cima/baixo
-        nova_altura = int(img_largura / ratio_slot)
-        y = (img_altura - nova_altura) // 2
-        return (0, y, img_largura, nova_altura)
+    return calcular_crop_inteligente(img_largura, img_altura, ratio_slot, 1.0, [])
 
 
 # ============================================================================
 # CLASSES E ESTRUTURAS DE DADOS
 # ============================================================================
 
-class Layout(Enum):
-    """Tipos de layout disponíveis para as páginas."""
-    L1 = "1 foto"           # 1 foto ocupando toda área útil
-    L2H = "2 fotos horizontal"  # 2 fotos lado a lado
-    L2V = "2 fotos vertical"     # 2 fotos empilhadas
-    L3A = "3 fotos (2+1)"    # 2 em cima, 1 embaixo
-    L3B = "3 fotos (1+2)"    # 1 em cima, 2 embaixo
-    L3C = "3 fotos (1v+2h)"  # 1 vertical à direita, 2 horizontais à esquerda
-    L3D = "3 fotos (1h+2h)"  # 1 horizontal grande em cima, 2 horizontais menores embaixo
-    L4 = "4 fotos (2x2)"     # Grid 2x2 para fotos com poucos elementos
+# Tipos de layout registrados: um membro por entrada do registro
+# declarativo (layouts.py), com a descrição como valor (as colagens
+# justificadas, 'J:3-2', não têm membro: o id depende das fotos)
+Layout = Enum('Layout', {id_layout: layout['descricao'] for id_layout, layout in LAYOUTS.items()})
 
 
 class FotoInfo:
-    """Informações sobre uma foto, incluindo pessoas detectadas."""
-    def __init__(self, caminho: Path):
+    """
+    Informações sobre uma foto, incluindo pessoas detectadas.
+    
+    A detecção de pessoas é feita só no primeiro acesso a rostos, num_rostos
+    ou simples: fotos com pan/zoom definido pelo usuário nunca abrem o OpenCV.
+    """
+    def __init__(self, caminho: Path, catalogo: Optional[CatalogoFotos] = None,
+                 previas: Optional[ArmazemPrevias] = None, detectar: bool = True,
+                 modo_deteccao: str = 'full',
+                 orcamento_ms: Optional[float] = ORCAMENTO_DETECCAO_MS):
         self.caminho = caminho
-        self.largura, self.altura = obter_dimensoes_imagem(caminho)
+        
+        if catalogo is not None:
+            # Dimensões e detecção vêm do catálogo (só sonda fotos alteradas)
+            self.largura, self.altura = catalogo.obter_dimensoes(caminho)
+            if self.largura <= 0 or self.altura <= 0:
+                self.largura, self.altura = (1000, 1000)  # fallback
+        else:
+            self.largura, self.altura = obter_dimensoes_imagem(caminho)
         self.orientacao = classificar_imagem(self.largura, self.altura)
         self.ratio = self.largura / self.altura if self.altura > 0 else 1.0
         
-        # Detectar pessoas na foto (para crop inteligente e decisão de layout)
-        self.rostos, self.num_rostos = detectar_pessoas(caminho)
+        # Detecção de pessoas (para crop inteligente e decisão de layout), sob demanda
+        self._catalogo = catalogo
+        self._previas = previas
+        self._detectar = detectar
+        self._modo_deteccao = modo_deteccao
+        self._orcamento_ms = orcamento_ms
+        self._deteccao: Optional[Tuple[List[Tuple[int, int, int, int]], int, Optional[str]]] = None
         
-        # Classificar como "simples" se tem poucos rostos (bom para layout 4x4)
-        self.simples = self.num_rostos <= 2
+        # Nitidez (variância do Laplaciano), se já avaliada no catálogo
+        self.nitidez = catalogo.registro(caminho)['nitidez'] if catalogo is not None else None
+    
+    def _obter_deteccao(self) -> Tuple[List[Tuple[int, int, int, int]], int, Optional[str]]:
+        """Detecta pessoas na primeira chamada (ou lê do catálogo)."""
+        if self._deteccao is None:
+            catalogo = self._catalogo
+            modo = self._modo_deteccao
+            if modo == 'off':
+                self._deteccao = ([], 0, 'off')
+            elif catalogo is not None and not self._detectar:
+                # Planejamento: só a detecção que já está no catálogo, sem abrir a foto
+                registro = catalogo.registro(self.caminho)
+                self._deteccao = (list(registro['rostos'] or []), registro['num_rostos'] or 0,
+                                  registro['nivel_deteccao'])
+            elif catalogo is not None:
+                self._deteccao = catalogo.obter_deteccao(
+                    self.caminho,
+                    lambda c: detectar_pessoas(c, self._previas, modo=modo,
+                                               orcamento_ms=self._orcamento_ms),
+                    lambda nivel: deteccao_reaproveitavel(nivel, modo)
+                )
+            else:
+                self._deteccao = detectar_pessoas(self.caminho, modo=modo,
+                                                  orcamento_ms=self._orcamento_ms)
+        return self._deteccao
+    
+    @property
+    def rostos(self) -> List[Tuple[int, int, int, int]]:
+        """Regiões (x, y, largura, altura) das pessoas detectadas, em pixels."""
+        return self._obter_deteccao()[0]
+    
+    @property
+    def num_rostos(self) -> int:
+        """Número de rostos detectados (para decidir layout)."""
+        return self._obter_deteccao()[1]
+    
+    @property
+    def simples(self) -> bool:
+        """Foto "simples" (poucos rostos), boa para o layout 4x4."""
+        return self.num_rostos <= 2
+    
+    @property
+    def nivel_deteccao(self) -> Optional[str]:
+        """
+        Nível atingido pela detecção (chave de NIVEIS_DETECCAO), ou None se
+        a detecção não foi necessária (ex.: foto com ajuste do usuário).
+        """
+        if self._deteccao is None:
+            return None
+        return self._deteccao[2] or 'catalogo'
 
 
 class GeradorFotolivro:
     """Classe principal para gerar o fotolivro em PDF."""
     
-    def __init__(self, pasta_raiz: Path, arquivo_saida: Path):
+    def __init__(self, pasta_raiz: Path, arquivo_saida: Path, ordem: str = 'nome',
+                 remover_duplicatas: bool = False, jobs: int = 1,
+                 modo_deteccao: str = 'full',
+                 orcamento_deteccao_ms: Optional[float] = ORCAMENTO_DETECCAO_MS,
+                 orcamento_paginas: Optional[int] = None,
+                 eventos: bool = True):
         self.pasta_raiz = Path(pasta_raiz)
         self.arquivo_saida = Path(arquivo_saida)
         
+        # Processos na análise das fotos (detecção de pessoas); 1 = sem paralelismo
+        self.jobs = max(1, jobs)
+        
+        # Detecção de pessoas: modo ('off', 'faces', 'full') e tempo máximo por foto
+        self.modo_deteccao = modo_deteccao
+        self.orcamento_deteccao_ms = orcamento_deteccao_ms
+        
+        # Ordem das fotos dentro de cada ano: 'nome' (arquivo) ou 'captura' (EXIF)
+        self.ordem = ordem
+        
+        # Páginas sem misturar eventos (eventos.py): só em ordem de captura
+        self.separar_eventos = eventos and ordem == 'captura'
+        
+        # Deixar de fora fotos quase duplicadas (ver duplicatas.py)
+        self.remover_duplicatas = remover_duplicatas
+        
+        # Máximo de páginas do livro inteiro (None = sem limite; ver paginacao.py)
+        self.orcamento_paginas = orcamento_paginas
+        
         # Dimensões da página em points
         self.largura_pagina = mm_to_points(A4_LARGURA_MM)
         self.altura_pagina = mm_to_points(A4_ALTURA_MM)
         
-        # Margens em points
-        self.margem_externa = mm_to_points(MARGEM_EXTERNA_MM)  # 1 cm
-        self.margem_lombada = mm_to_points(MARGEM_LOMBADA_MM)  # 2 cm
-        self.espaco_entre_fotos = mm_to_points(ESPACO_ENTRE_FOTOS_MM)  # 1 cm
-        
         # Canvas do PDF
         self.canvas = None
         self.numero_pagina = 0
@@ -494,6 +716,15 @@ class GeradorFotolivro:
         # Ajustes de pan/zoom definidos pelo usuário (carregado do JSON)
         self.ajustes_usuario = {}
         
+        # Catálogo persistente de metadados (dimensões e detecção por foto)
+        self.catalogo = CatalogoFotos(self.pasta_raiz)
+        
+        # Prévias multi-resolução (detecção e mosaicos não decodificam o original)
+        self.previas = ArmazemPrevias(self.pasta_raiz, self.catalogo)
+        
+        # Retrato das pastas/imagens (feito uma vez em validar_estrutura)
+        self.varredura: Optional[VarreduraFotos] = None
+        
     def validar_estrutura(self) -> bool:
         """
         Valida se a estrutura de pastas está correta.
@@ -508,12 +739,12 @@ class GeradorFotolivro:
             print(f"ERRO: O caminho não é um diretório: {self.pasta_raiz}")
             return False
         
+        # Varrer a raiz uma única vez (pastas dos anos + imagens de cada uma)
+        if self.varredura is None:
+            self.varredura = escanear_pastas(self.pasta_raiz, PASTAS_ANOS, EXTENSOES_IMAGEM)
+        
         # Verificar se todas as pastas dos anos existem
-        pastas_faltando = []
-        for nome_pasta in PASTAS_ANOS:
-            pasta_encontrada = encontrar_pasta_ano(self.pasta_raiz, nome_pasta)
-            if pasta_encontrada is None:
-                pastas_faltando.append(nome_pasta)
+        pastas_faltando = self.varredura.pastas_faltando()
         
         if pastas_faltando:
             print(f"ERRO: Pastas não encontradas dentro de {self.pasta_raiz}:")
@@ -522,291 +753,12 @@ class GeradorFotolivro:
             return False
         
         # Verificar se há imagens em cada pasta
-        for nome_pasta in PASTAS_ANOS:
-            pasta = encontrar_pasta_ano(self.pasta_raiz, nome_pasta)
-            imagens = listar_imagens(pasta)
-            if not imagens:
-                print(f"AVISO: Nenhuma imagem válida encontrada na pasta {nome_pasta}.")
+        for capitulo in self.varredura.capitulos:
+            if not capitulo.imagens:
+                print(f"AVISO: Nenhuma imagem válida encontrada na pasta {capitulo.nome_pasta}.")
         
         return True
     
-    def calcular_crop_com_ajuste(
-        self,
-        img_largura: int,
-        img_altura: int,
-        slot_largura: float,
-        slot_altura: float,
-        ajuste: dict
-    ) -> Tuple[int, int, int, int]:
-        """
-        Calcula o crop baseado nos ajustes do usuário (pan_x, pan_y, zoom).
-        
-        Args:
-            img_largura: Largura da imagem em pixels
-            img_altura: Altura da imagem em pixels
-            slot_largura: Largura do slot em points
-            slot_altura: Altura do slot em points
-            ajuste: Dicionário com pan_x, pan_y (0-1) e zoom (1+)
-        
-        Retorna:
-            Tupla (x, y, largura, altura) do crop em pixels
-        """
-        pan_x = ajuste.get('pan_x', 0.5)
-        pan_y = ajuste.get('pan_y', 0.5)
-        zoom = ajuste.get('zoom', 1.0)
-        
-        # Calcular aspect ratio do slot
-        ratio_slot = slot_largura / slot_altura
-        ratio_img = img_largura / img_altura
-        
-        # Calcular dimensões do crop base (modo cover)
-        if ratio_img > ratio_slot:
-            # Imagem mais larga que o slot: limitar pela altura
-            crop_h = img_altura
-            crop_w = int(crop_h * ratio_slot)
-        else:
-            # Imagem mais alta que o slot: limitar pela largura
-            crop_w = img_largura
-            crop_h = int(crop_w / ratio_slot)
-        
-        # Aplicar zoom (reduz o tamanho do crop)
-        crop_w = int(crop_w / zoom)
-        crop_h = int(crop_h / zoom)
-        
-        # Garantir que o crop não seja maior que a imagem
-        crop_w = min(crop_w, img_largura)
-        crop_h = min(crop_h, img_altura)
-        
-        # Calcular posição baseada no pan (0=esquerda/topo, 1=direita/baixo)
-        max_x = img_largura - crop_w
-        max_y = img_altura - crop_h
-        
-        crop_x = int(pan_x * max_x)
-        crop_y = int(pan_y * max_y)
-        
-        # Garantir bounds
-        crop_x = max(0, min(crop_x, max_x))
-        crop_y = max(0, min(crop_y, max_y))
-        
-        return (crop_x, crop_y, crop_w, crop_h)
-    
-    def calcular_area_util(self, pagina_impar: bool) -> Tuple[float, float, float, float]:
-        """
-        Calcula a área útil da página (sem margens).
-        
-        Grade de margens:
-        - 1 cm em todos os lados externos
-        - 2 cm no lado da lombada (esquerda em ímpares, direita em pares)
-        
-        Args:
-            pagina_impar: True se página ímpar (lombada à esquerda), False se par (lombada à direita)
-        
-        Retorna:
-            (x, y, largura, altura) da área útil em points
-        """
-        # Página ímpar: lombada à ESQUERDA (margem esquerda = 2cm, direita = 1cm)
-        # Página par: lombada à DIREITA (margem esquerda = 1cm, direita = 2cm)
-        if pagina_impar:
-            margem_esquerda = self.margem_lombada  # 2 cm (lombada)
-            margem_direita = self.margem_externa   # 1 cm
-        else:
-            margem_esquerda = self.margem_externa  # 1 cm
-            margem_direita = self.margem_lombada   # 2 cm (lombada)
-        
-        # Margens superior e inferior: 1 cm
-        margem_superior = self.margem_externa
-        margem_inferior = self.margem_externa
-        
-        # Área útil
-        x = margem_esquerda
-        y = margem_inferior
-        largura = self.largura_pagina - margem_esquerda - margem_direita
-        altura = self.altura_pagina - margem_superior - margem_inferior
-        
-        return (x, y, largura, altura)
-    
-    def calcular_layout_l1(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """
-        Calcula coordenadas para layout L1 (1 foto).
-        
-        Retorna lista com uma tupla (x, y, largura, altura) da área da foto.
-        """
-        x, y, largura, altura = area_util
-        return [(x, y, largura, altura)]
-    
-    def calcular_layout_l2h(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """
-        Calcula coordenadas para layout L2H (2 fotos lado a lado).
-        
-        Retorna lista com duas tuplas (x, y, largura, altura) das áreas das fotos.
-        """
-        x, y, largura, altura = area_util
-        
-        # Dividir largura em 2, com espaço entre
-        largura_foto = (largura - self.espaco_entre_fotos) / 2
-        
-        foto1 = (x, y, largura_foto, altura)
-        foto2 = (x + largura_foto + self.espaco_entre_fotos, y, largura_foto, altura)
-        
-        return [foto1, foto2]
-    
-    def calcular_layout_l2v(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """
-        Calcula coordenadas para layout L2V (2 fotos empilhadas).
-        
-        Retorna lista com duas tuplas (x, y, largura, altura) das áreas das fotos.
-        """
-        x, y, largura, altura = area_util
-        
-        # Dividir altura em 2, com espaço entre
-        altura_foto = (altura - self.espaco_entre_fotos) / 2
-        
-        foto1 = (x, y + altura_foto + self.espaco_entre_fotos, largura, altura_foto)
-        foto2 = (x, y, largura, altura_foto)
-        
-        return [foto1, foto2]
-    
-    def calcular_layout_l3a(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """
-        Calcula coordenadas para layout L3A (2 em cima, 1 embaixo).
-        
-        Grade: toda área útil é ocupada por 3 slots com 1 cm entre eles.
-        - Linha superior: 2 fotos lado a lado (50% altura cada, dividem largura)
-        - Linha inferior: 1 foto ocupando toda largura (50% altura)
-        
-        Retorna lista com três tuplas (x, y, largura, altura) das áreas das fotos.
-        """
-        x, y, largura, altura = area_util
-        
-        # Dividir altura em 2 linhas com espaço entre
-        altura_linha = (altura - self.espaco_entre_fotos) / 2
-        
-        # Fotos superiores: dividem a largura com espaço entre
-        largura_foto_superior = (largura - self.espaco_entre_fotos) / 2
-        
-        foto1 = (x, y + altura_linha + self.espaco_entre_fotos, largura_foto_superior, altura_linha)
-        foto2 = (x + largura_foto_superior + self.espaco_entre_fotos, y + altura_linha + self.espaco_entre_fotos, 
-                 largura_foto_superior, altura_linha)
-        
-        # Foto inferior: ocupa toda a largura
-        foto3 = (x, y, largura, altura_linha)
-        
-        return [foto1, foto2, foto3]
-    
-    def calcular_layout_l3b(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """
-        Calcula coordenadas para layout L3B (1 em cima, 2 embaixo).
-        
-        Grade: toda área útil é ocupada por 3 slots com 1 cm entre eles.
-        - Linha superior: 1 foto ocupando toda largura (50% altura)
-        - Linha inferior: 2 fotos lado a lado (50% altura cada, dividem largura)
-        
-        Retorna lista com três tuplas (x, y, largura, altura) das áreas das fotos.
-        """
-        x, y, largura, altura = area_util
-        
-        # Dividir altura em 2 linhas com espaço entre
-        altura_linha = (altura - self.espaco_entre_fotos) / 2
-        
-        # Foto superior: ocupa toda a largura
-        foto1 = (x, y + altura_linha + self.espaco_entre_fotos, largura, altura_linha)
-        
-        # Fotos inferiores: dividem a largura com espaço entre
-        largura_foto_inferior = (largura - self.espaco_entre_fotos) / 2
-        foto2 = (x, y, largura_foto_inferior, altura_linha)
-        foto3 = (x + largura_foto_inferior + self.espaco_entre_fotos, y, largura_foto_inferior, altura_linha)
-        
-        return [foto1, foto2, foto3]
-    
-    def calcular_layout_l3c(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """
-        Calcula coordenadas para layout L3C (1 vertical à direita, 2 horizontais à esquerda).
-        
-        Grade: toda área útil é ocupada por 3 slots com 1 cm entre eles.
-        - Coluna esquerda (60%): 2 fotos horizontais empilhadas (dividem altura)
-        - Coluna direita (40%): 1 foto vertical ocupando toda altura
-        
-        Retorna lista com três tuplas (x, y, largura, altura) das áreas das fotos.
-        Ordem: [vertical, horizontal_superior, horizontal_inferior]
-        """
-        x, y, largura, altura = area_util
-        
-        # Dividir largura em 2 colunas (60% esquerda, 40% direita) com espaço entre
-        largura_esquerda = (largura - self.espaco_entre_fotos) * 0.60
-        largura_direita = (largura - self.espaco_entre_fotos) * 0.40
-        
-        # Área esquerda: 2 fotos horizontais dividindo verticalmente
-        altura_horizontal = (altura - self.espaco_entre_fotos) / 2
-        
-        # Foto horizontal superior (esquerda)
-        foto_h1 = (x, y + altura_horizontal + self.espaco_entre_fotos, largura_esquerda, altura_horizontal)
-        
-        # Foto horizontal inferior (esquerda)
-        foto_h2 = (x, y, largura_esquerda, altura_horizontal)
-        
-        # Foto vertical (direita) - ocupa toda altura
-        x_vertical = x + largura_esquerda + self.espaco_entre_fotos
-        foto_v = (x_vertical, y, largura_direita, altura)
-        
-        # Retornar na ordem: [vertical, horizontal_superior, horizontal_inferior]
-        return [foto_v, foto_h1, foto_h2]
-    
-    def calcular_layout_l3d(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """
-        Calcula coordenadas para layout L3D (1 horizontal em cima, 2 horizontais embaixo).
-        
-        Grade: toda área útil é ocupada por 3 slots com 1 cm entre eles.
-        - Linha superior: 1 foto ocupando toda largura (50% altura)
-        - Linha inferior: 2 fotos lado a lado (50% altura cada, dividem largura)
-        
-        Este layout é idêntico ao L3B, usado para 3 fotos horizontais.
-        
-        Retorna lista com três tuplas (x, y, largura, altura) das áreas das fotos.
-        Ordem: [foto_cima, foto_esquerda, foto_direita]
-        """
-        x, y, largura, altura = area_util
-        
-        # Dividir altura em 2 linhas com espaço entre
-        altura_linha = (altura - self.espaco_entre_fotos) / 2
-        
-        # Foto superior: ocupa toda a largura
-        foto_cima = (x, y + altura_linha + self.espaco_entre_fotos, largura, altura_linha)
-        
-        # Fotos inferiores: dividem a largura com espaço entre
-        largura_foto_inferior = (largura - self.espaco_entre_fotos) / 2
-        foto_esquerda = (x, y, largura_foto_inferior, altura_linha)
-        foto_direita = (x + largura_foto_inferior + self.espaco_entre_fotos, y, largura_foto_inferior, altura_linha)
-        
-        # Retornar na ordem: [foto_cima, foto_esquerda, foto_direita]
-        return [foto_cima, foto_esquerda, foto_direita]
-    
-    def calcular_layout_l4(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """
-        Calcula coordenadas para layout L4 (grid 2x2 de fotos).
-        
-        Grade: 4 fotos em grid 2x2 com espaço entre elas.
-        Ideal para fotos com poucos elementos/pessoas.
-        
-        Retorna lista com quatro tuplas (x, y, largura, altura) das áreas das fotos.
-        Ordem: [topo_esquerda, topo_direita, baixo_esquerda, baixo_direita]
-        """
-        x, y, largura, altura = area_util
-        
-        # Dividir em grid 2x2
-        largura_foto = (largura - self.espaco_entre_fotos) / 2
-        altura_foto = (altura - self.espaco_entre_fotos) / 2
-        
-        # Linha superior
-        foto_topo_esq = (x, y + altura_foto + self.espaco_entre_fotos, largura_foto, altura_foto)
-        foto_topo_dir = (x + largura_foto + self.espaco_entre_fotos, y + altura_foto + self.espaco_entre_fotos, 
-                         largura_foto, altura_foto)
-        
-        # Linha inferior
-        foto_baixo_esq = (x, y, largura_foto, altura_foto)
-        foto_baixo_dir = (x + largura_foto + self.espaco_entre_fotos, y, largura_foto, altura_foto)
-        
-        return [foto_topo_esq, foto_topo_dir, foto_baixo_esq, foto_baixo_dir]
-    
     def redimensionar_foto_contain(self, foto: FotoInfo, box: Tuple[float, float, float, float]) -> Tuple[float, float, float, float]:
         """
         Calcula dimensões e posição para redimensionar uma foto em modo "cover" dentro de uma box.
@@ -842,101 +794,70 @@ class GeradorFotolivro:
         
         return (x_final, y_final, largura_final, altura_final)
     
-    def escolher_layout(self, fotos: List[FotoInfo]) -> Tuple[Layout, List[Tuple[float, float, float, float]], List[FotoInfo]]:
+    def escolher_layout(self, fotos: List[FotoInfo]) -> Tuple[str, List[Tuple[float, float, float, float]], List[FotoInfo]]:
         """
         Escolhe o layout apropriado para um grupo de fotos.
-        Considera tipos de slot definidos pelo usuário.
+        
+        Todos os layouts registrados com o número de fotos do grupo são
+        avaliados em todas as ordens das fotos nos slots (avaliacao_layouts.py:
+        recorte perdido, pessoas cortadas, DPI efetivo, orientação), e os
+        tipos de slot definidos pelo usuário são respeitados. Grupos maiores
+        que o maior layout registrado viram colagens em linhas justificadas
+        ('J:3-2', layouts.py), com as fotos na ordem.
         
         Args:
-            fotos: Lista de 1, 2, 3 ou 4 fotos
+            fotos: Lista de 1 a MAX_FOTOS_PAGINA fotos (paginacao.py)
         
         Retorna:
-            (Layout, lista de boxes para as fotos, fotos reorganizadas se necessário)
+            (id do layout, lista de boxes para as fotos, fotos na ordem dos slots)
         """
-        num_fotos = len(fotos)
-        area_util = self.calcular_area_util(self.numero_pagina % 2 == 1)  # True se ímpar
-        
-        # Obter tipos de slot das fotos
-        tipos = [self.obter_slot_tipo(f) for f in fotos]
-        
-        if num_fotos == 1:
-            boxes = self.calcular_layout_l1(area_util)
-            return (Layout.L1, boxes, fotos)
+        pagina_impar = (self.numero_pagina % 2 == 1)
+        (id_layout, ordem), = layouts_grupos(self.fotos_paginacao(fotos), [(0, len(fotos))])
+        if id_layout is None:
+            # Mais fotos que qualquer layout: não deveria acontecer
+            return (Layout.L1.name, boxes_layout(Layout.L1.name, pagina_impar), fotos[:1])
+        fotos_ordenadas = [fotos[i] for i in ordem]
+        proporcoes = [f.largura / f.altura for f in fotos_ordenadas]
+        return (id_layout, boxes_layout(id_layout, pagina_impar, proporcoes), fotos_ordenadas)
+    
+    def fotos_paginacao(self, fotos: List[FotoInfo], destaques: Optional[set] = None,
+                        eventos: Optional[Sequence[int]] = None) -> List[FotoPaginacao]:
+        """
+        O que a paginação e a avaliação de layouts precisam de cada foto:
+        tamanho, tipo de slot (destaques sem tipo viram 'full'), pessoas e
+        evento (eventos.py).
+        """
+        # IMPORTANTE: Quando há ajustes do usuário, usar a mesma lógica do preview
+        # No preview, todas as fotos são consideradas "simples" (sem detecção de rostos)
+        # Para manter consistência, quando há ajustes, tratamos todas como simples
+        usar_modo_preview = bool(self.ajustes_usuario and self.ajustes_usuario.get('ajustes'))
         
-        elif num_fotos == 2:
-            # Verificar tipos de slot definidos
-            tipo1, tipo2 = tipos[0], tipos[1]
-            
-            # Se uma é vertical esquerda e outra direita, usar L2H
-            if (tipo1 == 'fv-l' and tipo2 == 'fv-r') or (tipo1 == 'fv-r' and tipo2 == 'fv-l'):
-                # Ordenar: esquerda primeiro
-                if tipo1 == 'fv-r':
-                    fotos = [fotos[1], fotos[0]]
-                boxes = self.calcular_layout_l2h(area_util)
-                return (Layout.L2H, boxes, fotos)
-            
-            # Se uma é horizontal topo e outra baixo, usar L2V
-            if (tipo1 == 'fh-t' and tipo2 == 'fh-b') or (tipo1 == 'fh-b' and tipo2 == 'fh-t'):
-                # Ordenar: topo primeiro
-                if tipo1 == 'fh-b':
-                    fotos = [fotos[1], fotos[0]]
-                boxes = self.calcular_layout_l2v(area_util)
-                return (Layout.L2V, boxes, fotos)
-            
-            # Se qualquer uma é vertical (fv-l ou fv-r), usar L2H
-            if tipo1 in ['fv-l', 'fv-r'] or tipo2 in ['fv-l', 'fv-r']:
-                # Garantir ordem correta: fv-l à esquerda, fv-r à direita
-                if tipo1 == 'fv-r' or tipo2 == 'fv-l':
-                    fotos = [fotos[1], fotos[0]]
-                boxes = self.calcular_layout_l2h(area_util)
-                return (Layout.L2H, boxes, fotos)
-            
-            # Se qualquer uma é horizontal (fh-t ou fh-b), usar L2V
-            if tipo1 in ['fh-t', 'fh-b'] or tipo2 in ['fh-t', 'fh-b']:
-                boxes = self.calcular_layout_l2v(area_util)
-                return (Layout.L2V, boxes, fotos)
-            
-            # Padrão: L2H (lado a lado) para 2 fotos
-            boxes = self.calcular_layout_l2h(area_util)
-            return (Layout.L2H, boxes, fotos)
+        resultado = []
+        for i, foto in enumerate(fotos):
+            tipo = self.obter_slot_tipo(foto)
+            if tipo == 'auto' and destaques and i in destaques:
+                tipo = 'full'
+            regioes = () if usar_modo_preview else tuple(tuple(r) for r in foto.rostos)
+            evento = int(eventos[i]) if eventos is not None else 0
+            resultado.append(FotoPaginacao(foto.largura, foto.altura, tipo, regioes, evento))
+        return resultado
+    
+    def obter_ajuste(self, caminho: Path) -> Optional[dict]:
+        """
+        Ajuste de pan/zoom definido pelo usuário para a foto (None se não houver).
         
-        elif num_fotos == 3:
-            # Verificar orientações das fotos
-            orientacoes = [f.orientacao for f in fotos]
-            
-            # Contar verticais e horizontais
-            verticais = [i for i, o in enumerate(orientacoes) if o == 'retrato']
-            horizontais = [i for i, o in enumerate(orientacoes) if o in ['paisagem', 'quadrada']]
-            
-            # Se temos exatamente 1 vertical e 2 horizontais, usar L3C
-            if len(verticais) == 1 and len(horizontais) == 2:
-                foto_vertical = fotos[verticais[0]]
-                fotos_horizontais = [fotos[i] for i in horizontais]
-                fotos_reorganizadas = [foto_vertical] + fotos_horizontais
-                
-                boxes = self.calcular_layout_l3c(area_util)
-                return (Layout.L3C, boxes, fotos_reorganizadas)
-            
-            # Se temos 3 fotos horizontais, usar L3D
-            if len(horizontais) == 3:
-                boxes = self.calcular_layout_l3d(area_util)
-                return (Layout.L3D, boxes, fotos)
-            
-            # Caso contrário, usar layouts tradicionais
-            if orientacoes[0] in ['paisagem', 'quadrada'] and orientacoes[1] in ['paisagem', 'quadrada']:
-                boxes = self.calcular_layout_l3a(area_util)
-                return (Layout.L3A, boxes, fotos)
-            else:
-                boxes = self.calcular_layout_l3b(area_util)
-                return (Layout.L3B, boxes, fotos)
+        Com ajuste, o crop não depende da detecção de pessoas.
+        """
+        if not isinstance(self.ajustes_usuario, dict):
+            return None
         
-        elif num_fotos == 4:
-            boxes = self.calcular_layout_l4(area_util)
-            return (Layout.L4, boxes, fotos)
+        try:
+            foto_path = str(Path(caminho).relative_to(self.pasta_raiz))
+        except ValueError:
+            foto_path = str(caminho)
         
-        else:
-            boxes = self.calcular_layout_l1(area_util)
-            return (Layout.L1, boxes, fotos)
+        # Os ajustes estão dentro da chave 'ajustes' no JSON
+        return self.ajustes_usuario.get('ajustes', {}).get(foto_path) or None
     
     def obter_slot_tipo(self, foto) -> str:
         """
@@ -955,124 +876,75 @@ class GeradorFotolivro:
         ajuste = ajustes.get(foto_path, {})
         return ajuste.get('slot_tipo', 'auto')
     
-    def agrupar_fotos(self, fotos: List[FotoInfo]) -> List[List[FotoInfo]]:
+    def agrupar_capitulos(self, fotos_por_ano: Dict[str, List[FotoInfo]]) -> Dict[str, List[List[FotoInfo]]]:
         """
-        Agrupa fotos em páginas considerando tipos de slot definidos pelo usuário.
+        Divide as fotos de cada ano em páginas de 1-4 fotos com a paginação
+        ótima de paginacao.py, respeitando o orçamento de páginas do livro
+        (self.orcamento_paginas, contando capa, subcapas e contra capa).
         
-        Tipos de slot:
-        - 'full': página inteira (1 foto)
-        - 'fv-l', 'fv-r': vertical (metade esquerda/direita)
-        - 'fh-t', 'fh-b': horizontal (metade superior/inferior)
-        - 'square': slot menor (para layouts 3-4 fotos)
-        - 'auto': escolha automática
+        Tipos de slot definidos pelo usuário restringem os grupos ('full'
+        sozinha, 'fv-*'/'fh-*' sozinhas ou em dupla), e as fotos mais
+        nítidas do ano (destaques) sem tipo definido são tratadas como 'full'.
+        Com self.separar_eventos, fotos de eventos diferentes (eventos.py,
+        com as datas e histogramas do catálogo) nunca dividem uma página.
         
-        Retorna lista de grupos, onde cada grupo é uma lista de 1-4 fotos.
+        Retorna {pasta do ano: lista de grupos}.
         """
-        grupos = []
-        i = 0
-        
-        # IMPORTANTE: Quando há ajustes do usuário, usar a mesma lógica do preview
-        # No preview, todas as fotos são consideradas "simples" (sem detecção de rostos)
-        # Para manter consistência, quando há ajustes, tratamos todas como simples
-        usar_modo_preview = bool(self.ajustes_usuario and self.ajustes_usuario.get('ajustes'))
+        capitulos = [self.fotos_paginacao(
+                         fotos, escolher_destaques([f.nitidez for f in fotos],
+                                                   [(f.largura, f.altura) for f in fotos]),
+                         eventos_fotos([f.caminho for f in fotos], self.catalogo) if self.separar_eventos else None)
+                     for fotos in fotos_por_ano.values()]
+        
+        orcamento = None
+        if self.orcamento_paginas is not None:
+            # Capa, subcapas e contra capa não entram na paginação
+            orcamento = self.orcamento_paginas - len(fotos_por_ano) - 2
+        
+        divisao = paginar_capitulos(capitulos, orcamento)
+        return {
+            nome_pasta: [fotos[inicio:fim] for inicio, fim in grupos]
+            for (nome_pasta, fotos), grupos in zip(fotos_por_ano.items(), divisao)
+        }
+    
+    def calcular_crops_pagina(
+        self,
+        fotos: List[FotoInfo],
+        boxes: List[Tuple[float, float, float, float]]
+    ) -> List[Tuple[int, int, int, int]]:
+        """
+        Calcula o crop de cada foto na sua box: ajuste do usuário, se houver,
+        ou crop inteligente automático (preserva rostos). As fotos com ajuste
+        e as automáticas vão ao motor de recortes numa chamada cada.
         
-        while i < len(fotos):
-            foto_atual = fotos[i]
-            restantes = len(fotos) - i
-            slot_tipo = self.obter_slot_tipo(foto_atual)
-            
-            # Foto com tipo 'full' vai sozinha
-            if slot_tipo == 'full':
-                grupos.append([foto_atual])
-                i += 1
-                continue
-            
-            # Fotos verticais (fv-l ou fv-r) precisam de complemento
-            if slot_tipo in ['fv-l', 'fv-r']:
-                # Procurar outra foto vertical ou squares para completar
-                if restantes >= 2:
-                    proxima = fotos[i + 1]
-                    tipo_proxima = self.obter_slot_tipo(proxima)
-                    
-                    # Se a próxima é vertical do outro lado ou square, formar par
-                    if tipo_proxima in ['fv-l', 'fv-r', 'square', 'auto']:
-                        grupos.append([foto_atual, proxima])
-                        i += 2
-                        continue
-                
-                # Se não encontrou par, coloca sozinha como full
-                grupos.append([foto_atual])
-                i += 1
-                continue
-            
-            # Fotos horizontais (fh-t ou fh-b) precisam de complemento
-            if slot_tipo in ['fh-t', 'fh-b']:
-                if restantes >= 2:
-                    proxima = fotos[i + 1]
-                    tipo_proxima = self.obter_slot_tipo(proxima)
-                    
-                    if tipo_proxima in ['fh-t', 'fh-b', 'square', 'auto']:
-                        grupos.append([foto_atual, proxima])
-                        i += 2
-                        continue
-                
-                grupos.append([foto_atual])
-                i += 1
-                continue
-            
-            # Lógica padrão para fotos 'auto' e 'square'
-            # IMPORTANTE: Verificar se alguma das próximas fotos tem slot_tipo especial
-            def encontrar_limite_grupo(inicio, max_fotos):
-                """Encontra quantas fotos podem ser agrupadas antes de uma com slot_tipo especial."""
-                limite = 0
-                for j in range(inicio, min(inicio + max_fotos, len(fotos))):
-                    tipo_j = self.obter_slot_tipo(fotos[j])
-                    # Parar se a foto tem slot_tipo especial
-                    if tipo_j in ['full', 'fv-l', 'fv-r', 'fh-t', 'fh-b']:
-                        break
-                    limite += 1
-                return limite
-            
-            # Calcular quantas fotos podemos agrupar
-            max_grupo = encontrar_limite_grupo(i, 4)
-            
-            if max_grupo >= 4 and restantes >= 4:
-                proximas_4 = fotos[i:i+4]
-                # Contar quantas são square ou simples
-                # IMPORTANTE: Em modo preview, todas são consideradas simples
-                square_count = sum(1 for f in proximas_4 
-                                   if self.obter_slot_tipo(f) == 'square' or 
-                                      (usar_modo_preview or f.simples))
-                
-                if square_count >= 3:
-                    grupos.append(proximas_4)
-                    i += 4
-                    continue
-            
-            if max_grupo >= 3 and restantes >= 3:
-                proximas_3 = fotos[i:i+3]
-                orientacoes = [f.orientacao for f in proximas_3]
-                
-                paisagem_count = sum(1 for o in orientacoes if o in ['paisagem', 'quadrada'])
-                if paisagem_count >= 2:
-                    grupos.append(proximas_3)
-                    i += 3
-                    continue
-            
-            if max_grupo >= 2 and restantes >= 2:
-                grupos.append(fotos[i:i+2])
-                i += 2
-            
-            elif max_grupo >= 1:
-                grupos.append([fotos[i]])
-                i += 1
-            
-            else:
-                # Não deveria acontecer, mas por segurança
-                grupos.append([fotos[i]])
-                i += 1
+        Retorna (x, y, largura, altura) do crop de cada foto, em pixels.
+        """
+        ajustes = [self.obter_ajuste(foto.caminho) for foto in fotos]
+        crops: List[Optional[Tuple[int, int, int, int]]] = [None] * len(fotos)
+        
+        ajustadas = [i for i, ajuste in enumerate(ajustes) if ajuste]
+        if ajustadas:
+            resultado = recortes_com_ajuste(
+                [fotos[i].largura for i in ajustadas], [fotos[i].altura for i in ajustadas],
+                [boxes[i][2] for i in ajustadas], [boxes[i][3] for i in ajustadas],
+                [ajustes[i].get('pan_x', 0.5) for i in ajustadas],
+                [ajustes[i].get('pan_y', 0.5) for i in ajustadas],
+                [ajustes[i].get('zoom', 1.0) for i in ajustadas]
+            )
+            for i, crop in zip(ajustadas, resultado.tolist()):
+                crops[i] = tuple(crop)
+        
+        automaticas = [i for i, ajuste in enumerate(ajustes) if not ajuste]
+        if automaticas:
+            resultado = recortes_inteligentes(
+                [fotos[i].largura for i in automaticas], [fotos[i].altura for i in automaticas],
+                [boxes[i][2] for i in automaticas], [boxes[i][3] for i in automaticas],
+                [fotos[i].rostos for i in automaticas]
+            )
+            for i, crop in zip(automaticas, resultado.tolist()):
+                crops[i] = tuple(crop)
         
-        return grupos
+        return crops
     
     def adicionar_pagina(self, fotos: List[FotoInfo]):
         """
@@ -1090,34 +962,21 @@ class GeradorFotolivro:
         # Escolher layout (pode reorganizar as fotos se necessário)
         layout, boxes, fotos_ordenadas = self.escolher_layout(fotos)
         
+        # Crops de todas as fotos da página de uma vez
+        crops = self.calcular_crops_pagina(fotos_ordenadas, boxes)
+        
         # Adicionar cada foto na sua box
-        for foto, box in zip(fotos_ordenadas, boxes):
+        for foto, box, crop in zip(fotos_ordenadas, boxes, crops):
             x_box, y_box, w_box, h_box = box
             
             try:
-                # Verificar se há ajuste do usuário para esta foto
-                foto_path_rel = str(foto.caminho.relative_to(self.pasta_raiz))
-                # Os ajustes estão dentro da chave 'ajustes' no JSON
-                ajustes_dict = self.ajustes_usuario.get('ajustes', {}) if isinstance(self.ajustes_usuario, dict) else {}
-                ajuste_usuario = ajustes_dict.get(foto_path_rel)
-                
-                if ajuste_usuario:
-                    # Usar ajuste do usuário
-                    crop_x, crop_y, crop_w, crop_h = self.calcular_crop_com_ajuste(
-                        foto.largura, foto.altura,
-                        w_box, h_box,
-                        ajuste_usuario
-                    )
-                else:
-                    # Usar crop inteligente automático (preserva rostos)
-                    crop_x, crop_y, crop_w, crop_h = calcular_crop_inteligente(
-                        foto.largura, foto.altura,
-                        w_box, h_box,
-                        foto.rostos
-                    )
+                crop_x, crop_y, crop_w, crop_h = crop
                 
                 # Abrir imagem e aplicar o crop
-                with Image.open(foto.caminho) as img:
+                with Image.open(foto.caminho) as img_arquivo:
+                    # Aplicar orientação EXIF (as dimensões já consideram a rotação)
+                    img = ImageOps.exif_transpose(img_arquivo)
+                    
                     # Aplicar crop na imagem
                     img_cropped = img.crop((crop_x, crop_y, crop_x + crop_w, crop_y + crop_h))
                     
@@ -1125,26 +984,22 @@ class GeradorFotolivro:
                     from io import BytesIO
                     img_buffer = BytesIO()
                     
-                    # Manter formato original ou converter para JPEG
-                    if img.format in ['JPEG', 'JPG']:
-                        img_cropped.save(img_buffer, format='JPEG', quality=95)
-                    else:
-                        # Converter para RGB se necessário (para JPEG)
-                        if img_cropped.mode in ('RGBA', 'P'):
-                            img_cropped = img_cropped.convert('RGB')
-                        img_cropped.save(img_buffer, format='JPEG', quality=95)
+                    # Converter para RGB se necessário (para JPEG)
+                    if img_cropped.mode in ('RGBA', 'P'):
+                        img_cropped = img_cropped.convert('RGB')
+                    img_cropped.save(img_buffer, format='JPEG', quality=95)
                     
                     img_buffer.seek(0)
-                    
-                    # Desenhar a imagem recortada no slot
-                    self.canvas.drawImage(
-                        ImageReader(img_buffer),
-                        x_box, y_box,
-                        width=w_box,
-                        height=h_box,
-                        preserveAspectRatio=False,  # O crop já tem o aspect ratio correto
-                        mask='auto'
-                    )
+                
+                # Desenhar a imagem recortada no slot
+                self.canvas.drawImage(
+                    ImageReader(img_buffer),
+                    x_box, y_box,
+                    width=w_box,
+                    height=h_box,
+                    preserveAspectRatio=False,  # O crop já tem o aspect ratio correto
+                    mask='auto'
+                )
                 
             except Exception as e:
                 print(f"AVISO: Erro ao adicionar foto {foto.caminho.name}: {e}")
@@ -1188,7 +1043,8 @@ class GeradorFotolivro:
             col = i % cols
             
             try:
-                with Image.open(foto.caminho) as img:
+                # Menor prévia que cobre a célula (já orientada)
+                with self.previas.abrir(foto.caminho, thumb_w, thumb_h) as img:
                     # Redimensionar para caber na célula (modo cover)
                     img_ratio = img.width / img.height
                     cell_ratio = thumb_w / thumb_h
@@ -1432,7 +1288,7 @@ class GeradorFotolivro:
         
         # Nome
         self.canvas.setFont('Helvetica-Bold', 32)
-        texto1 = "Bruno Sereia Broering"
+        texto1 = TITULO_CAPA
         texto1_w = self.canvas.stringWidth(texto1, 'Helvetica-Bold', 32)
         self.canvas.drawString(
             (self.largura_pagina - texto1_w) / 2,
@@ -1442,7 +1298,7 @@ class GeradorFotolivro:
         
         # Período
         self.canvas.setFont('Helvetica', 24)
-        texto2 = "Infantil 2021 ~ 2025"
+        texto2 = SUBTITULO_CONTRA_CAPA
         texto2_w = self.canvas.stringWidth(texto2, 'Helvetica', 24)
         self.canvas.drawString(
             (self.largura_pagina - texto2_w) / 2,
@@ -1452,6 +1308,138 @@ class GeradorFotolivro:
         
         self.canvas.showPage()
     
+    def fotos_descartadas(self) -> set:
+        """Duplicatas (rajadas, reenvios) a deixar de fora, se pedido."""
+        if not self.remover_duplicatas:
+            return set()
+        descartadas = fotos_descartadas(
+            encontrar_duplicatas(self.varredura.todas_imagens(), self.catalogo)
+        )
+        print(f"  {len(descartadas)} fotos duplicadas removidas")
+        return descartadas
+    
+    def detectar_em_paralelo(self, caminhos: List[Path]) -> set:
+        """
+        Detecta pessoas nas fotos ainda sem detecção no catálogo usando um
+        pool de self.jobs processos (ver detectar_em_paralelo).
+        """
+        return detectar_em_paralelo(caminhos, self.catalogo, self.jobs,
+                                    self.modo_deteccao, self.orcamento_deteccao_ms)
+    
+    def carregar_fotos(self, descartadas: set, detectar: bool = True) -> Dict[str, List[FotoInfo]]:
+        """
+        Cria os FotoInfo de cada ano, na ordem configurada.
+        
+        Args:
+            descartadas: Fotos a deixar de fora (duplicatas)
+            detectar: Se False, usa só a detecção já guardada no catálogo
+        
+        Retorna {nome_pasta: [FotoInfo]} dos anos com fotos.
+        """
+        caminhos_por_ano = {}
+        for capitulo in self.varredura.capitulos:
+            nome_pasta = capitulo.nome_pasta
+            if capitulo.pasta is None:
+                continue
+            
+            caminhos_imagens = [c for c in capitulo.imagens if c not in descartadas]
+            if self.ordem == 'captura':
+                caminhos_imagens = self.catalogo.ordenar_por_captura(caminhos_imagens)
+            if not caminhos_imagens:
+                print(f"AVISO: Nenhuma imagem encontrada em {nome_pasta}, pulando...")
+                continue
+            caminhos_por_ano[nome_pasta] = caminhos_imagens
+        
+        # Com --jobs, a detecção de todos os anos roda antes, em paralelo
+        # (só das fotos sem ajuste do usuário: as outras não usam a detecção)
+        falhas = set()
+        if detectar and self.jobs > 1 and self.modo_deteccao != 'off':
+            falhas = self.detectar_em_paralelo(
+                [c for caminhos in caminhos_por_ano.values() for c in caminhos
+                 if self.obter_ajuste(c) is None]
+            )
+        
+        return {
+            nome_pasta: [
+                FotoInfo(caminho, self.catalogo, self.previas,
+                         detectar=detectar and caminho not in falhas,
+                         modo_deteccao=self.modo_deteccao,
+                         orcamento_ms=self.orcamento_deteccao_ms)
+                for caminho in caminhos
+            ]
+            for nome_pasta, caminhos in caminhos_por_ano.items()
+        }
+    
+    def planejar(self) -> Optional[PlanoFotolivro]:
+        """
+        Simula a geração (modo --plan) sem decodificar pixels.
+        
+        Usa o mesmo agrupamento, escolha de layout e recortes de gerar(),
+        só com metadados do catálogo: detecção de pessoas e nitidez entram
+        apenas se já estiverem no catálogo (de uma geração anterior).
+        
+        Retorna o PlanoFotolivro, ou None se a estrutura for inválida.
+        """
+        if not self.validar_estrutura():
+            return None
+        
+        self.catalogo.preparar(self.varredura.todas_imagens())
+        fotos_por_ano = self.carregar_fotos(self.fotos_descartadas(), detectar=False)
+        self.catalogo.salvar()
+        todas_fotos = [foto for fotos in fotos_por_ano.values() for foto in fotos]
+        
+        # Mosaicos gerados na hora (quando não há capas pré-geradas)
+        pasta_capas = self.pasta_raiz / "_capas"
+        mp_mosaico = int(self.largura_pagina * 4) * int(self.altura_pagina * 4) / 1e6
+        
+        plano = PlanoFotolivro()
+        plano.adicionar(planejar_capa('', 'capa', pasta_capas / "capa.jpg",
+                                      len(todas_fotos), mp_mosaico))
+        self.numero_pagina = 1
+        grupos_por_ano = self.agrupar_capitulos(fotos_por_ano)
+        
+        for nome_pasta in PASTAS_ANOS:
+            if nome_pasta not in fotos_por_ano:
+                continue
+            fotos = fotos_por_ano[nome_pasta]
+            
+            plano.adicionar(planejar_capa(
+                nome_pasta, 'subcapa', pasta_capas / f"subcapa_{nome_pasta.lower()}.jpg",
+                len(fotos), mp_mosaico
+            ))
+            self.numero_pagina += 1
+            
+            for grupo in grupos_por_ano[nome_pasta]:
+                # Mesma numeração de adicionar_pagina (define o lado da lombada)
+                self.numero_pagina += 1
+                layout, boxes, fotos_ordenadas = self.escolher_layout(grupo)
+                
+                pagina = PaginaPlanejada(nome_pasta, 'conteudo', layout)
+                crops = self.calcular_crops_pagina(fotos_ordenadas, boxes)
+                for foto, (_, _, w_box, h_box), (_, _, crop_w, crop_h) in zip(fotos_ordenadas, boxes, crops):
+                    pagina.slots.append(SlotPlanejado(
+                        caminho=self.catalogo.chave(foto.caminho),
+                        dpi=min(dpi_efetivo(crop_w, w_box), dpi_efetivo(crop_h, h_box)),
+                        mp_decodificados=foto.largura * foto.altura / 1e6,
+                        mp_embutidos=crop_w * crop_h / 1e6
+                    ))
+                plano.adicionar(pagina)
+        
+        plano.adicionar(planejar_capa('', 'contra_capa', pasta_capas / "contra_capa.jpg"))
+        return plano
+    
+    def resumo_deteccao(self, fotos: List[FotoInfo]) -> List[str]:
+        """Linhas com quantas fotos atingiram cada nível de detecção."""
+        contagem: Dict[Optional[str], int] = {}
+        for foto in fotos:
+            contagem[foto.nivel_deteccao] = contagem.get(foto.nivel_deteccao, 0) + 1
+        
+        linhas = [f"{descricao}: {contagem[nivel]}"
+                  for nivel, descricao in NIVEIS_DETECCAO.items() if nivel in contagem]
+        if None in contagem:
+            linhas.append(f"detecção não usada (ajuste do usuário): {contagem[None]}")
+        return linhas
+    
     def gerar(self) -> bool:
         """
         Gera o fotolivro completo com capa, subcapas, conteúdo e contra capa.
@@ -1477,27 +1465,31 @@ class GeradorFotolivro:
         
         # Primeiro, carregar todas as fotos para criar a capa
         print("Carregando fotos...")
-        todas_fotos = []
-        fotos_por_ano = {}
         
-        for nome_pasta in PASTAS_ANOS:
-            pasta = encontrar_pasta_ano(self.pasta_raiz, nome_pasta)
-            if pasta is None:
-                continue
-            
-            caminhos_imagens = listar_imagens(pasta)
-            if not caminhos_imagens:
-                print(f"AVISO: Nenhuma imagem encontrada em {nome_pasta}, pulando...")
-                continue
-            
-            fotos = [FotoInfo(caminho) for caminho in caminhos_imagens]
-            fotos_por_ano[nome_pasta] = fotos
-            todas_fotos.extend(fotos)
+        # Sondar (pelo cabeçalho, em paralelo) só as fotos novas ou alteradas
+        self.catalogo.preparar(self.varredura.todas_imagens())
+        
+        descartadas = self.fotos_descartadas()
+        
+        # Nitidez e exposição em lote (decide quais fotos ganham página inteira)
+        avaliar_fotos([c for c in self.varredura.todas_imagens() if c not in descartadas],
+                      self.catalogo)
+        
+        # Histogramas de cor (modo draft) para separar os eventos de cada ano
+        if self.separar_eventos:
+            calcular_histogramas([c for c in self.varredura.todas_imagens() if c not in descartadas],
+                                 self.catalogo)
+        
+        fotos_por_ano = self.carregar_fotos(descartadas)
+        todas_fotos = [foto for fotos in fotos_por_ano.values() for foto in fotos]
         
         if not todas_fotos:
             print("ERRO: Nenhuma foto encontrada!")
             return False
         
+        # Persistir metadados novos para as próximas execuções
+        self.catalogo.salvar()
+        
         print(f"Total de fotos carregadas: {len(todas_fotos)}")
         
         # Criar capa principal
@@ -1506,6 +1498,9 @@ class GeradorFotolivro:
         
         total_paginas = 1  # Capa
         
+        # Páginas de todos os anos de uma vez (o orçamento é do livro inteiro)
+        grupos_por_ano = self.agrupar_capitulos(fotos_por_ano)
+        
         # Processar cada pasta (ano) na ordem fixa
         for nome_pasta in PASTAS_ANOS:
             if nome_pasta not in fotos_por_ano:
@@ -1518,11 +1513,8 @@ class GeradorFotolivro:
             self.criar_subcapa(fotos, nome_pasta)
             total_paginas += 1
             
-            # Agrupar fotos em páginas
-            grupos = self.agrupar_fotos(fotos)
-            
             # Adicionar cada grupo como uma página
-            for grupo in grupos:
+            for grupo in grupos_por_ano[nome_pasta]:
                 self.adicionar_pagina(grupo)
                 total_paginas += 1
         
@@ -1538,10 +1530,17 @@ class GeradorFotolivro:
             print(f"ERRO: Não foi possível salvar o PDF: {e}")
             return False
         
+        # Detecções feitas sob demanda durante as páginas
+        self.catalogo.salvar()
+        
         print(f"\n✓ Fotolivro gerado com sucesso!")
         print(f"  Total de fotos: {len(todas_fotos)}")
         print(f"  Total de páginas: {total_paginas}")
         print(f"  Arquivo salvo em: {self.arquivo_saida.absolute()}")
+        print(f"  ({self.catalogo.resumo()})")
+        print("  Detecção de pessoas por nível:")
+        for linha in self.resumo_deteccao(todas_fotos):
+            print(f"    {linha}")
         
         return True
 
@@ -1552,21 +1551,86 @@ class GeradorFotolivro:
 
 def main():
     """Função principal do script."""
-    if len(sys.argv) != 3:
-        print("Uso: python fotolivro.py <pasta_raiz> <arquivo_saida.pdf>")
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    ordem = 'captura' if '--ordem-captura' in sys.argv else 'nome'
+    remover_duplicatas = '--sem-duplicatas' in sys.argv
+    eventos = '--sem-eventos' not in sys.argv
+    planejar = '--plan' in sys.argv
+    
+    # --jobs N (ou --jobs=N): processos na detecção de pessoas
+    jobs = 1
+    for i, opcao in enumerate(sys.argv):
+        valor = None
+        if opcao.startswith('--jobs='):
+            valor = opcao.split('=', 1)[1]
+        elif opcao == '--jobs' and i + 1 < len(sys.argv):
+            valor = sys.argv[i + 1]
+            if valor in argumentos:
+                argumentos.remove(valor)
+        if valor is not None:
+            if not valor.isdigit() or int(valor) < 1:
+                print(f"ERRO: --jobs precisa de um número inteiro positivo (recebido: {valor})")
+                sys.exit(1)
+            jobs = int(valor)
+    
+    # --detect=MODO (MODOS_DETECCAO) e --detect-budget=MS (0 = sem limite)
+    modo_deteccao = 'full'
+    orcamento_deteccao_ms = ORCAMENTO_DETECCAO_MS
+    for opcao in sys.argv[1:]:
+        if opcao.startswith('--detect='):
+            modo_deteccao = opcao.split('=', 1)[1]
+            if modo_deteccao not in MODOS_DETECCAO:
+                print(f"ERRO: --detect precisa ser {', '.join(MODOS_DETECCAO)} (recebido: {modo_deteccao})")
+                sys.exit(1)
+        elif opcao.startswith('--detect-budget='):
+            valor = opcao.split('=', 1)[1]
+            if not valor.isdigit():
+                print(f"ERRO: --detect-budget precisa de um tempo em ms (recebido: {valor})")
+                sys.exit(1)
+            orcamento_deteccao_ms = int(valor) or None
+    
+    # --paginas=N: orçamento de páginas do livro inteiro
+    orcamento_paginas = None
+    for opcao in sys.argv[1:]:
+        if opcao.startswith('--paginas='):
+            valor = opcao.split('=', 1)[1]
+            if not valor.isdigit() or int(valor) < 1:
+                print(f"ERRO: --paginas precisa de um número inteiro positivo (recebido: {valor})")
+                sys.exit(1)
+            orcamento_paginas = int(valor)
+    
+    if len(argumentos) != 2 and not (planejar and len(argumentos) == 1):
+        print("Uso: python fotolivro.py <pasta_raiz> <arquivo_saida.pdf> [--ordem-captura] [--sem-eventos] [--sem-duplicatas] [--plan] [--jobs N] [--detect=MODO] [--detect-budget=MS] [--paginas=N]")
         print("\nExemplo:")
         print("  python fotolivro.py ./fotos_bruno ./fotolivro_bruno.pdf")
+        print("  python fotolivro.py ./fotos_bruno --plan")
+        print("  python fotolivro.py ./fotos_bruno ./fotolivro_bruno.pdf --jobs 8")
+        print("  python fotolivro.py ./fotos_bruno ./fotolivro_bruno.pdf --detect=faces --detect-budget=2000")
+        print("  python fotolivro.py ./fotos_bruno ./fotolivro_bruno.pdf --paginas=40")
         sys.exit(1)
     
-    pasta_raiz = Path(sys.argv[1])
-    arquivo_saida = Path(sys.argv[2])
+    pasta_raiz = Path(argumentos[0])
+    arquivo_saida = Path(argumentos[1]) if len(argumentos) > 1 else pasta_raiz / "fotolivro.pdf"
     
     # Garantir que a extensão do arquivo de saída seja .pdf
     if arquivo_saida.suffix.lower() != '.pdf':
         arquivo_saida = arquivo_saida.with_suffix('.pdf')
     
     # Gerar fotolivro
-    gerador = GeradorFotolivro(pasta_raiz, arquivo_saida)
+    gerador = GeradorFotolivro(pasta_raiz, arquivo_saida, ordem=ordem,
+                               remover_duplicatas=remover_duplicatas, jobs=jobs,
+                               modo_deteccao=modo_deteccao,
+                               orcamento_deteccao_ms=orcamento_deteccao_ms,
+                               orcamento_paginas=orcamento_paginas, eventos=eventos)
+    
+    if planejar:
+        # Só simular: paginação, DPI, tamanho e tempo estimados
+        plano = gerador.planejar()
+        if plano is None:
+            sys.exit(1)
+        plano.imprimir()
+        return
+    
     sucesso = gerador.gerar()
     
     if not sucesso:
@@ -16,15 +16,17 @@ import tempfile
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageFilter
 import numpy as np
-from playwright.sync_api import sync_playwright
 
-# Importar funções do fotolivro.py
+# Constantes compartilhadas (sem carregar o OpenCV do fotolivro.py)
 sys.path.insert(0, str(Path(__file__).parent))
-from fotolivro import (
-    PASTAS_ANOS, encontrar_pasta_ano, listar_imagens,
+from constantes import (
+    PASTAS_ANOS, EXTENSOES_IMAGEM,
     TITULOS_ANOS, TITULO_CAPA, SUBTITULO_CAPA, PERIODO_CAPA,
     A4_LARGURA_MM, A4_ALTURA_MM
 )
+from catalogo_fotos import CatalogoFotos
+from previas import ArmazemPrevias, abrir_reduzida
+from varredura_fotos import escanear_pastas
 
 # Resolução das capas (300 DPI para impressão)
 DPI = 300
@@ -32,11 +34,18 @@ LARGURA_PX = int(A4_LARGURA_MM * DPI / 25.4)
 ALTURA_PX = int(A4_ALTURA_MM * DPI / 25.4)
 
 
-def criar_mosaico(fotos_paths, largura, altura):
+def criar_mosaico(fotos_paths, largura, altura, catalogo=None, previas=None):
     """
     Cria um mosaico de miniaturas de todas as fotos.
     As fotos são repetidas ciclicamente para preencher toda a imagem.
+    
+    Se um catálogo for informado, as proporções vêm dele e fotos ilegíveis
+    são descartadas sem abrir o arquivo. Com um armazém de prévias, cada
+    miniatura vem da menor prévia que cobre a célula.
     """
+    if catalogo is not None:
+        fotos_paths = [f for f in fotos_paths if catalogo.obter_dimensoes(f)[1] > 0]
+    
     if not fotos_paths:
         return Image.new('RGB', (largura, altura), 'white')
     
@@ -61,8 +70,15 @@ def criar_mosaico(fotos_paths, largura, altura):
         col = i % cols
         
         try:
-            with Image.open(foto_path) as img:
-                img_ratio = img.width / img.height
+            if previas is not None:
+                img_aberta = previas.abrir(foto_path, thumb_w, thumb_h)
+            else:
+                img_aberta = abrir_reduzida(foto_path, thumb_w, thumb_h)
+            with img_aberta as img:
+                if catalogo is not None:
+                    img_ratio = catalogo.registro(foto_path)['ratio']
+                else:
+                    img_ratio = img.width / img.height
                 cell_ratio = thumb_w / thumb_h
                 
                 if img_ratio > cell_ratio:
@@ -294,7 +310,9 @@ def criar_contra_capa():
         f.write(html_content)
         html_path = f.name
     
-    # Renderizar HTML para imagem usando Playwright
+    # Renderizar HTML para imagem usando Playwright (importado só aqui:
+    # abrir um navegador só é preciso para a contra capa)
+    from playwright.sync_api import sync_playwright
     with sync_playwright() as p:
         browser = p.chromium.launch()
         page = browser.new_page(viewport={'width': LARGURA_PX, 'height': ALTURA_PX})
@@ -319,9 +337,12 @@ def criar_contra_capa():
     return img
 
 
-def gerar_capas(pasta_raiz):
+def gerar_capas(pasta_raiz, varredura=None):
     """
     Gera todas as capas e salva na pasta raiz.
+    
+    Aceita uma varredura (VarreduraFotos) já feita para não varrer as
+    pastas de novo.
     """
     pasta_raiz = Path(pasta_raiz)
     pasta_capas = pasta_raiz / "_capas"
@@ -334,21 +355,25 @@ def gerar_capas(pasta_raiz):
     todas_fotos = []
     fotos_por_ano = {}
     
-    for nome_pasta in PASTAS_ANOS:
-        pasta = encontrar_pasta_ano(pasta_raiz, nome_pasta)
-        if pasta is None:
-            continue
-        
-        caminhos = listar_imagens(pasta)
+    if varredura is None:
+        varredura = escanear_pastas(pasta_raiz, PASTAS_ANOS, EXTENSOES_IMAGEM)
+    
+    for capitulo in varredura.capitulos:
+        caminhos = list(capitulo.imagens)
         if caminhos:
-            fotos_por_ano[nome_pasta] = caminhos
+            fotos_por_ano[capitulo.nome_pasta] = caminhos
             todas_fotos.extend(caminhos)
     
     print(f"Total de fotos: {len(todas_fotos)}")
     
+    # Catálogo de metadados compartilhado com fotolivro.py e o schema
+    catalogo = CatalogoFotos(pasta_raiz)
+    catalogo.preparar(todas_fotos)
+    previas = ArmazemPrevias(pasta_raiz, catalogo)
+    
     # 1. Capa principal
     print("\n1. Gerando capa principal...")
-    mosaico = criar_mosaico(todas_fotos, LARGURA_PX, ALTURA_PX)
+    mosaico = criar_mosaico(todas_fotos, LARGURA_PX, ALTURA_PX, catalogo, previas)
     mosaico = aplicar_filtro_capa(mosaico)
     capa = desenhar_texto_capa(mosaico, TITULO_CAPA, SUBTITULO_CAPA, PERIODO_CAPA)
     capa_path = pasta_capas / "capa.jpg"
@@ -361,7 +386,7 @@ def gerar_capas(pasta_raiz):
         titulo, ano = TITULOS_ANOS.get(nome_pasta, (nome_pasta, ""))
         print(f"   {titulo}...")
         
-        mosaico = criar_mosaico(fotos, LARGURA_PX, ALTURA_PX)
+        mosaico = criar_mosaico(fotos, LARGURA_PX, ALTURA_PX, catalogo, previas)
         mosaico = aplicar_filtro_capa(mosaico)
         subcapa = desenhar_texto_subcapa(mosaico, titulo, ano)
         
@@ -369,6 +394,8 @@ def gerar_capas(pasta_raiz):
         subcapa.save(subcapa_path, 'JPEG', quality=95)
         print(f"   ✓ Salvo: {subcapa_path}")
     
+    catalogo.salvar()
+    
     # 3. Contra capa
     print("\n3. Gerando contra capa...")
     contra_capa = criar_contra_capa()
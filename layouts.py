@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro Declarativo dos Layouts de Página
+
+Cada layout é só dado: nome, e para cada slot um retângulo normalizado
+(x, y, largura, altura) na área útil, com origem no topo esquerdo e sem
+contar os espaços entre fotos, mais a orientação de foto que o slot
+prefere ('paisagem', 'retrato' ou None).
+
+O registro é compilado uma única vez, na importação, em tabelas de boxes
+em points para as duas paridades de página (lombada à esquerda nas
+ímpares, à direita nas pares). O gerador (fotolivro.py), o renderizador
+de PDF, o schema e o servidor de preview (/api/layouts) consultam essas
+tabelas, então a box de um slot é uma busca em dicionário, e um layout
+novo é só uma entrada nova em LAYOUTS.
+
+Compilação (cortes de guilhotina): os slots são separados em faixas
+(colunas ou linhas) que não se sobrepõem; o comprimento da região menos
+os espaços entre as faixas é dividido na proporção das faixas, e cada
+faixa é dividida do mesmo jeito até sobrar um slot. Assim o espaço entre
+fotos vizinhas é sempre ESPACO_ENTRE_FOTOS_MM, qualquer que seja a divisão.
+
+Colagens em linhas justificadas (páginas com mais fotos que o maior
+layout registrado, para dias de evento com muitas fotos): o id
+'J:3-2' é uma página de duas linhas, com 3 e 2 fotos, de cima para baixo.
+As boxes dependem das proporções das fotos (boxes_layout(..., proporcoes)):
+cada linha ocupa a largura útil, com as fotos lado a lado na largura
+proporcional à sua proporção, e as alturas das linhas são escaladas juntas
+até preencher a altura útil, então todas as fotos da página perdem a mesma
+fração no recorte. empacotar_linhas escolhe as linhas em tempo linear.
+
+EXECUÇÃO (mostrar as tabelas compiladas):
+    python layouts.py
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from constantes import (A4_LARGURA_MM, A4_ALTURA_MM, MARGEM_EXTERNA_MM,
+                        MARGEM_LOMBADA_MM, ESPACO_ENTRE_FOTOS_MM, mm_to_points)
+
+
+Box = Tuple[float, float, float, float]
+
+# Layout usado para ids desconhecidos (uma foto na área útil inteira)
+LAYOUT_PADRAO = 'L1'
+
+# id -> nome curto (preview), descrição e slots [((x, y, largura, altura), orientação)]
+# na ordem de slot_index
+LAYOUTS: Dict[str, Dict] = {
+    'L1': {
+        'nome': '1 foto',
+        'descricao': '1 foto',
+        'slots': [
+            ((0.0, 0.0, 1.0, 1.0), None),
+        ],
+    },
+    'L2H': {
+        'nome': '2 lado a lado',
+        'descricao': '2 fotos horizontal',
+        'slots': [
+            ((0.0, 0.0, 0.5, 1.0), 'retrato'),
+            ((0.5, 0.0, 0.5, 1.0), 'retrato'),
+        ],
+    },
+    'L2V': {
+        'nome': '2 empilhadas',
+        'descricao': '2 fotos vertical',
+        'slots': [
+            ((0.0, 0.0, 1.0, 0.5), 'paisagem'),
+            ((0.0, 0.5, 1.0, 0.5), 'paisagem'),
+        ],
+    },
+    'L3A': {
+        'nome': '2 cima + 1',
+        'descricao': '3 fotos (2+1)',
+        'slots': [
+            ((0.0, 0.0, 0.5, 0.5), None),
+            ((0.5, 0.0, 0.5, 0.5), None),
+            ((0.0, 0.5, 1.0, 0.5), 'paisagem'),
+        ],
+    },
+    'L3B': {
+        'nome': '1 + 2 baixo',
+        'descricao': '3 fotos (1+2)',
+        'slots': [
+            ((0.0, 0.0, 1.0, 0.5), 'paisagem'),
+            ((0.0, 0.5, 0.5, 0.5), None),
+            ((0.5, 0.5, 0.5, 0.5), None),
+        ],
+    },
+    'L3C': {
+        'nome': '1v + 2h',
+        'descricao': '3 fotos (1v+2h)',
+        'slots': [
+            ((0.6, 0.0, 0.4, 1.0), 'retrato'),
+            ((0.0, 0.0, 0.6, 0.5), 'paisagem'),
+            ((0.0, 0.5, 0.6, 0.5), 'paisagem'),
+        ],
+    },
+    'L3D': {
+        'nome': '1h + 2h',
+        'descricao': '3 fotos (1h+2h)',
+        'slots': [
+            ((0.0, 0.0, 1.0, 0.5), 'paisagem'),
+            ((0.0, 0.5, 0.5, 0.5), 'paisagem'),
+            ((0.5, 0.5, 0.5, 0.5), 'paisagem'),
+        ],
+    },
+    'L4': {
+        'nome': '2x2',
+        'descricao': '4 fotos (2x2)',
+        'slots': [
+            ((0.0, 0.0, 0.5, 0.5), None),
+            ((0.5, 0.0, 0.5, 0.5), None),
+            ((0.0, 0.5, 0.5, 0.5), None),
+            ((0.5, 0.5, 0.5, 0.5), None),
+        ],
+    },
+}
+
+# Prefixo dos ids de colagem em linhas justificadas ('J:3-2') e máximo de
+# fotos por colagem
+PREFIXO_JUSTIFICADO = 'J:'
+MAX_FOTOS_JUSTIFICADO = 9
+
+# Tolerância para comparar bordas normalizadas
+_EPS = 1e-9
+
+
+def area_util(pagina_impar: bool) -> Box:
+    """
+    Área útil (x, y, largura, altura) da página em points, origem no canto
+    inferior esquerdo: lombada à esquerda nas ímpares, à direita nas pares.
+    """
+    margem_externa = mm_to_points(MARGEM_EXTERNA_MM)
+    margem_lombada = mm_to_points(MARGEM_LOMBADA_MM)
+    if pagina_impar:
+        margem_esquerda, margem_direita = margem_lombada, margem_externa
+    else:
+        margem_esquerda, margem_direita = margem_externa, margem_lombada
+
+    largura = mm_to_points(A4_LARGURA_MM) - margem_esquerda - margem_direita
+    altura = mm_to_points(A4_ALTURA_MM) - margem_externa * 2
+    return (margem_esquerda, margem_externa, largura, altura)
+
+
+def _faixas(retangulos: Dict[int, Tuple[float, float, float, float]], eixo: int) -> List[Tuple[float, float, List[int]]]:
+    """
+    Agrupa os slots em faixas que não se sobrepõem no eixo (0 = colunas,
+    1 = linhas). Retorna [(inicio, fim, slots)] em ordem crescente.
+    """
+    faixas = []
+    for i in sorted(retangulos, key=lambda i: retangulos[i][eixo]):
+        inicio = retangulos[i][eixo]
+        fim = inicio + retangulos[i][eixo + 2]
+        if faixas and inicio < faixas[-1][1] - _EPS:
+            faixas[-1][1] = max(faixas[-1][1], fim)
+            faixas[-1][2].append(i)
+        else:
+            faixas.append([inicio, fim, [i]])
+    return [tuple(f) for f in faixas]
+
+
+def _dividir(id_layout: str, retangulos: Dict[int, Tuple[float, float, float, float]],
+             regiao: Tuple[float, float, float, float], box: Box, espaco: float,
+             saida: Dict[int, Box]):
+    """Corta a box da região entre os slots (recursivo, ver docstring do módulo)."""
+    if len(retangulos) == 1:
+        (i, retangulo), = retangulos.items()
+        if any(abs(a - b) > _EPS for a, b in zip(retangulo, regiao)):
+            raise ValueError(f"Layout {id_layout}: slot {i} não preenche a sua região")
+        saida[i] = box
+        return
+
+    for eixo in (0, 1):
+        faixas = _faixas(retangulos, eixo)
+        if len(faixas) > 1:
+            break
+    else:
+        raise ValueError(f"Layout {id_layout}: slots sobrepostos ou fora de uma grade de cortes")
+
+    inicio_regiao, tamanho_regiao = regiao[eixo], regiao[eixo + 2]
+    esperado = inicio_regiao
+    for inicio, fim, _ in faixas:
+        if abs(inicio - esperado) > _EPS:
+            raise ValueError(f"Layout {id_layout}: buraco entre os slots")
+        esperado = fim
+    if abs(esperado - (inicio_regiao + tamanho_regiao)) > _EPS:
+        raise ValueError(f"Layout {id_layout}: slots não cobrem a área útil")
+
+    # Em points: colunas da esquerda para a direita, linhas de baixo para cima
+    # (a normalização tem origem no topo, o PDF na base)
+    x, y, largura, altura = box
+    disponivel = (largura if eixo == 0 else altura) - espaco * (len(faixas) - 1)
+    posicao = x if eixo == 0 else y
+    for inicio, fim, membros in (faixas if eixo == 0 else reversed(faixas)):
+        comprimento = disponivel * ((fim - inicio) / tamanho_regiao)
+        if eixo == 0:
+            sub_regiao = (inicio, regiao[1], fim - inicio, regiao[3])
+            sub_box = (posicao, y, comprimento, altura)
+        else:
+            sub_regiao = (regiao[0], inicio, regiao[2], fim - inicio)
+            sub_box = (x, posicao, largura, comprimento)
+        _dividir(id_layout, {i: retangulos[i] for i in membros}, sub_regiao, sub_box, espaco, saida)
+        posicao = posicao + comprimento + espaco
+
+
+def compilar_layout(id_layout: str, area: Box, espaco: float) -> List[Box]:
+    """Boxes (x, y, largura, altura) em points dos slots de um layout, na ordem de slot_index."""
+    slots = LAYOUTS[id_layout]['slots']
+    saida: Dict[int, Box] = {}
+    _dividir(id_layout, {i: retangulo for i, (retangulo, _) in enumerate(slots)},
+             (0.0, 0.0, 1.0, 1.0), area, espaco, saida)
+    return [saida[i] for i in range(len(slots))]
+
+
+def compilar_tabelas() -> Dict[bool, Dict[str, List[Box]]]:
+    """Tabelas {pagina_impar: {id: boxes}} de todos os layouts registrados."""
+    espaco = mm_to_points(ESPACO_ENTRE_FOTOS_MM)
+    return {
+        pagina_impar: {id_layout: compilar_layout(id_layout, area_util(pagina_impar), espaco)
+                       for id_layout in LAYOUTS}
+        for pagina_impar in (True, False)
+    }
+
+
+TABELAS_BOXES = compilar_tabelas()
+
+# Área útil de cada paridade e espaço entre fotos, para as colagens justificadas
+AREAS_UTEIS = {pagina_impar: area_util(pagina_impar) for pagina_impar in (True, False)}
+ESPACO_FOTOS = mm_to_points(ESPACO_ENTRE_FOTOS_MM)
+
+
+def justificado(id_layout: Optional[str]) -> bool:
+    """Se o id é de uma colagem em linhas justificadas ('J:3-2')."""
+    return bool(id_layout) and id_layout.startswith(PREFIXO_JUSTIFICADO)
+
+
+def linhas_justificado(id_layout: str) -> List[int]:
+    """Fotos de cada linha da colagem, de cima para baixo ('J:3-2' -> [3, 2])."""
+    try:
+        linhas = [int(n) for n in id_layout[len(PREFIXO_JUSTIFICADO):].split('-')]
+    except ValueError:
+        return []
+    return linhas if all(n > 0 for n in linhas) else []
+
+
+def id_justificado(linhas: Sequence[int]) -> str:
+    """Id da colagem com essas linhas ([3, 2] -> 'J:3-2')."""
+    return PREFIXO_JUSTIFICADO + '-'.join(str(n) for n in linhas)
+
+
+def _linhas_por_soma(proporcoes: Sequence[float], num_linhas: int) -> List[int]:
+    """Cada foto na linha onde cai o seu centro na soma acumulada das proporções."""
+    por_linha = sum(proporcoes) / num_linhas
+    linhas = [0] * num_linhas
+    acumulado = 0.0
+    for proporcao in proporcoes:
+        linhas[min(num_linhas - 1, int((acumulado + proporcao / 2) / por_linha))] += 1
+        acumulado += proporcao
+    return [n for n in linhas if n > 0]
+
+
+def _faixas_justificado(linhas: Sequence[int], proporcoes: Sequence[float], area: Box,
+                        espaco: float) -> Tuple[List[Tuple[Sequence[float], float, float]], float]:
+    """
+    Por linha (proporções, largura, altura sem corte) e a escala das alturas
+    que preenche a altura útil (1 = nenhuma foto cortada).
+    """
+    _, _, largura, altura = area
+    faixas = []
+    inicio = 0
+    for n in linhas:
+        da_linha = proporcoes[inicio:inicio + n]
+        largura_linha = largura - espaco * (n - 1)
+        faixas.append((da_linha, largura_linha, largura_linha / sum(da_linha)))
+        inicio += n
+    return faixas, (altura - espaco * (len(linhas) - 1)) / sum(h for _, _, h in faixas)
+
+
+def empacotar_linhas(proporcoes: Sequence[float], pagina_impar: bool = True) -> List[int]:
+    """
+    Divide as fotos, na ordem, em linhas justificadas (tempo linear).
+    
+    O número de linhas sem corte, se as proporções fossem todas a média, é
+    sqrt(altura x soma das proporções / largura); para os dois inteiros
+    vizinhos, cada foto vai para a linha onde cai o seu centro na soma
+    acumulada das proporções, dividida igualmente entre as linhas, e fica
+    a divisão cuja escala das alturas está mais perto de 1 (menos corte).
+    
+    Retorna o número de fotos de cada linha, de cima para baixo.
+    """
+    if not proporcoes:
+        return []
+    area = AREAS_UTEIS[pagina_impar]
+    estimativa = (area[3] * sum(proporcoes) / area[2]) ** 0.5
+    
+    melhor, melhor_desvio = [], float('inf')
+    for num_linhas in (int(estimativa), int(estimativa) + 1):
+        num_linhas = max(1, min(len(proporcoes), num_linhas))
+        linhas = _linhas_por_soma(proporcoes, num_linhas)
+        desvio = abs(math.log(_faixas_justificado(linhas, proporcoes, area, ESPACO_FOTOS)[1]))
+        if desvio < melhor_desvio:
+            melhor, melhor_desvio = linhas, desvio
+    return melhor
+
+
+def boxes_justificado(linhas: Sequence[int], proporcoes: Sequence[float], area: Box, espaco: float) -> List[Box]:
+    """
+    Boxes da colagem em linhas justificadas na área (ver docstring do
+    módulo), na ordem das fotos: linha a linha de cima para baixo, da
+    esquerda para a direita.
+    """
+    x, y, _, altura = area
+    faixas, escala = _faixas_justificado(linhas, proporcoes, area, espaco)
+    boxes = []
+    topo = y + altura
+    for da_linha, largura_linha, altura_natural in faixas:
+        altura_linha = altura_natural * escala
+        posicao = x
+        for proporcao in da_linha:
+            largura_foto = largura_linha * proporcao / sum(da_linha)
+            boxes.append((posicao, topo - altura_linha, largura_foto, altura_linha))
+            posicao = posicao + largura_foto + espaco
+        topo = topo - altura_linha - espaco
+    return boxes
+
+
+def boxes_layout(id_layout: Optional[str], pagina_impar: bool,
+                 proporcoes: Optional[Sequence[float]] = None) -> List[Box]:
+    """
+    Boxes do layout na paridade da página (LAYOUT_PADRAO se o id for
+    desconhecido). Colagens justificadas usam as proporções (largura/altura)
+    das fotos na ordem dos slots; sem elas, ou com outro número de fotos,
+    as fotos de cada linha dividem a largura igualmente.
+    """
+    if justificado(id_layout):
+        linhas = linhas_justificado(id_layout)
+        if linhas:
+            if proporcoes is None or len(proporcoes) != sum(linhas):
+                proporcoes = [1.0] * sum(linhas)
+            return boxes_justificado(linhas, [p if p > 0 else 1.0 for p in proporcoes],
+                                     AREAS_UTEIS[pagina_impar], ESPACO_FOTOS)
+    tabela = TABELAS_BOXES[pagina_impar]
+    return tabela.get(id_layout) or tabela[LAYOUT_PADRAO]
+
+
+def fotos_por_layout(id_layout: Optional[str]) -> int:
+    """Número de slots do layout (1 se o id for desconhecido)."""
+    if justificado(id_layout) and linhas_justificado(id_layout):
+        return sum(linhas_justificado(id_layout))
+    layout = LAYOUTS.get(id_layout)
+    return len(layout['slots']) if layout else 1
+
+
+def orientacoes_layout(id_layout: Optional[str]) -> List[Optional[str]]:
+    """Orientação preferida de cada slot do layout (nenhuma nas colagens)."""
+    if justificado(id_layout) and linhas_justificado(id_layout):
+        return [None] * fotos_por_layout(id_layout)
+    return [orientacao for _, orientacao in LAYOUTS.get(id_layout, LAYOUTS[LAYOUT_PADRAO])['slots']]
+
+
+def layouts_para_json() -> Dict:
+    """
+    Registro e tabelas compiladas para o preview: por layout, os slots
+    normalizados e as boxes de cada paridade como frações da página
+    (esquerda, topo, largura, altura), prontas para posicionar em CSS.
+    Para as colagens justificadas, a área útil de cada paridade e o espaço
+    entre fotos nas mesmas frações (o preview monta as boxes como
+    boxes_justificado).
+    """
+    largura_pagina = mm_to_points(A4_LARGURA_MM)
+    altura_pagina = mm_to_points(A4_ALTURA_MM)
+
+    def fracoes(box: Box) -> List[float]:
+        x, y, largura, altura = box
+        return [round(x / largura_pagina, 6), round((altura_pagina - y - altura) / altura_pagina, 6),
+                round(largura / largura_pagina, 6), round(altura / altura_pagina, 6)]
+
+    return {
+        'pagina': [round(largura_pagina, 3), round(altura_pagina, 3)],
+        'justificado': {
+            'prefixo': PREFIXO_JUSTIFICADO,
+            'areas': {'impar': fracoes(AREAS_UTEIS[True]), 'par': fracoes(AREAS_UTEIS[False])},
+            'espaco': [round(ESPACO_FOTOS / largura_pagina, 6), round(ESPACO_FOTOS / altura_pagina, 6)],
+        },
+        'layouts': [
+            {
+                'id': id_layout,
+                'nome': layout['nome'],
+                'descricao': layout['descricao'],
+                'fotos': len(layout['slots']),
+                'slots': [{'retangulo': list(retangulo), 'orientacao': orientacao}
+                          for retangulo, orientacao in layout['slots']],
+                'caixas': {
+                    'impar': [fracoes(b) for b in TABELAS_BOXES[True][id_layout]],
+                    'par': [fracoes(b) for b in TABELAS_BOXES[False][id_layout]],
+                },
+            }
+            for id_layout, layout in LAYOUTS.items()
+        ],
+    }
+
+
+if __name__ == '__main__':
+    for pagina_impar, tabela in TABELAS_BOXES.items():
+        print(f"Páginas {'ímpares (lombada à esquerda)' if pagina_impar else 'pares (lombada à direita)'}:")
+        for id_layout, boxes in tabela.items():
+            print(f"  {id_layout:4s} {LAYOUTS[id_layout]['nome']}")
+            for i, (x, y, largura, altura) in enumerate(boxes):
+                print(f"       slot {i}: x={x:7.2f} y={y:7.2f} {largura:7.2f} x {altura:7.2f} pt")
+    
+    proporcoes = [1.5, 1.5, 0.67, 1.5, 1.0, 0.67, 1.5]
+    id_layout = id_justificado(empacotar_linhas(proporcoes))
+    print(f"Colagem justificada de proporções {proporcoes}: {id_layout}")
+    for i, (x, y, largura, altura) in enumerate(boxes_layout(id_layout, True, proporcoes)):
+        print(f"       slot {i}: x={x:7.2f} y={y:7.2f} {largura:7.2f} x {altura:7.2f} pt")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Paginação Ótima dos Capítulos (programação dinâmica)
+
+Divide as fotos de cada capítulo, na ordem, em páginas de 1 a
+MAX_FOTOS_PAGINA fotos consecutivas. Cada grupo possível custa
+CUSTO_PAGINA (menos páginas = livro mais barato) mais o custo do grupo no
+seu melhor layout e atribuição de slots, dado pela avaliação vetorizada de
+avaliacao_layouts.py (recorte perdido, pessoas cortadas, DPI efetivo,
+orientação e tipos de slot do usuário; grupos que violam um tipo de slot,
+como uma foto 'full' acompanhada, custam inf). Grupos maiores que o maior
+layout registrado viram colagens em linhas justificadas (layouts.py), que
+custam mais por foto e por isso aparecem sobretudo com orçamento de páginas.
+Grupos com fotos de eventos diferentes (eventos.py) custam inf: uma página
+nunca mistura dois eventos.
+
+A melhor divisão sai por programação dinâmica em O(n·k) por capítulo:
+melhor[j] = min(melhor[j - k] + custo(grupo de k fotos terminando em j)).
+Com um orçamento total de páginas, um preço extra por página (multiplicador
+de Lagrange, o mesmo para todos os capítulos) é ajustado por bisseção até
+o livro caber no orçamento; a tabela de custos é calculada uma vez e só a
+programação dinâmica é refeita, então paginar o livro inteiro leva poucos
+milissegundos (ver a medição 'paginacao' em benchmark.py) e pode rodar a
+cada edição no preview. A otimalidade, com e sem orçamento, é conferida
+por força bruta em tests/test_paginacao.py.
+
+EXECUÇÃO (paginar as fotos das pastas dos anos):
+    python paginacao.py <pasta_raiz> [--paginas=N] [--ordem-captura] [--sem-eventos]
+
+    --ordem-captura: fotos na ordem EXIF, separadas em eventos (eventos.py,
+            com os histogramas já no catálogo) salvo com --sem-eventos
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from avaliacao_layouts import AvaliacaoFotos, avaliar_fotos, avaliar_justificados, melhores_layouts
+from layouts import LAYOUTS, MAX_FOTOS_JUSTIFICADO, justificado
+
+
+# Fotos por página nos layouts registrados e nas colagens justificadas
+MAX_FOTOS_REGISTRADO = max(len(layout['slots']) for layout in LAYOUTS.values())
+MAX_FOTOS_PAGINA = max(MAX_FOTOS_REGISTRADO, MAX_FOTOS_JUSTIFICADO)
+
+# Custo de cada página (o do grupo vem de avaliacao_layouts.py)
+CUSTO_PAGINA = 1.0
+
+# Preço extra máximo por página na busca do orçamento e passos da bisseção
+PRECO_PAGINA_MAXIMO = 1000.0
+PASSOS_BISSECAO = 40
+
+
+@dataclass(frozen=True)
+class FotoPaginacao:
+    """O que a paginação precisa saber de uma foto."""
+    largura: int
+    altura: int
+    tipo: str = 'auto'  # slot_tipo efetivo ('full' para os destaques)
+    regioes: Tuple[Tuple[int, int, int, int], ...] = ()  # Pessoas detectadas (pixels)
+    evento: int = 0  # Evento da foto no capítulo (eventos.py)
+
+
+def avaliar(fotos: Sequence[FotoPaginacao]) -> AvaliacaoFotos:
+    """Custo de cada foto em cada slot registrado (avaliacao_layouts.avaliar_fotos)."""
+    return avaliar_fotos([f.largura for f in fotos], [f.altura for f in fotos],
+                         [f.regioes for f in fotos], [f.tipo for f in fotos])
+
+
+@dataclass
+class TabelaPaginacao:
+    """
+    Custo e melhor layout de cada grupo de fotos consecutivas de um
+    capítulo: custos[i, k - 1] e layouts[(i, i + k)] = (id do layout,
+    índices das fotos na ordem dos slots) do grupo fotos[i:i + k].
+    """
+    custos: np.ndarray
+    layouts: Dict[Tuple[int, int], Tuple[Optional[str], List[int]]]
+
+
+def tabela_paginacao(fotos: Sequence[FotoPaginacao]) -> TabelaPaginacao:
+    """
+    Custo (sem CUSTO_PAGINA) e melhor layout de cada grupo de fotos
+    consecutivas, no melhor layout de k slots (colagem justificada acima de
+    MAX_FOTOS_REGISTRADO); custo inf se o grupo passa do fim, viola um
+    tipo de slot ou junta fotos de eventos diferentes.
+    """
+    n = len(fotos)
+    custos = np.full((n, MAX_FOTOS_PAGINA), np.inf)
+    layouts: Dict[Tuple[int, int], Tuple[Optional[str], List[int]]] = {}
+    if n == 0:
+        return TabelaPaginacao(custos, layouts)
+    eventos = np.array([f.evento for f in fotos])
+    mesmo_evento = {k: _mesmo_evento(eventos, k) for k in range(1, min(n, MAX_FOTOS_PAGINA) + 1)}
+
+    avaliacao = avaliar(fotos)
+    for k in range(1, min(n, MAX_FOTOS_REGISTRADO) + 1):
+        janelas = np.lib.stride_tricks.sliding_window_view(np.arange(n), k)
+        custos_k, ids, ordens = melhores_layouts(avaliacao, janelas)
+        custos[:len(janelas), k - 1] = custos_k
+        for i, (id_layout, ordem) in enumerate(zip(ids, ordens.tolist())):
+            layouts[(i, i + k)] = (id_layout, ordem)
+
+    # Colagens só dentro de um evento
+    colagens = [(int(i), int(i) + k) for k in range(MAX_FOTOS_REGISTRADO + 1, min(n, MAX_FOTOS_PAGINA) + 1)
+                for i in np.flatnonzero(mesmo_evento[k])]
+    if colagens:
+        custos_colagens, ids = _avaliar_colagens(fotos, colagens)
+        inicios, fins = np.array(colagens).T
+        custos[inicios, fins - inicios - 1] = custos_colagens
+        for (inicio, fim), id_layout in zip(colagens, ids):
+            layouts[(inicio, fim)] = (id_layout, list(range(inicio, fim)))
+
+    for k in range(2, min(n, MAX_FOTOS_REGISTRADO) + 1):
+        custos[:n - k + 1, k - 1][~mesmo_evento[k]] = np.inf
+    return TabelaPaginacao(custos, layouts)
+
+
+def _mesmo_evento(eventos: np.ndarray, k: int) -> np.ndarray:
+    """Se cada grupo de k fotos consecutivas é todo de um evento só."""
+    janelas = np.lib.stride_tricks.sliding_window_view(eventos, k)
+    return (janelas == janelas[:, :1]).all(axis=1)
+
+
+def tabela_custos(fotos: Sequence[FotoPaginacao]) -> np.ndarray:
+    """Só os custos de tabela_paginacao (custos[i, k - 1] do grupo fotos[i:i + k])."""
+    return tabela_paginacao(fotos).custos
+
+
+def _avaliar_colagens(fotos: Sequence[FotoPaginacao], grupos: Sequence[Tuple[int, int]]) -> Tuple[np.ndarray, List[str]]:
+    """Custo e id da colagem justificada de cada grupo (avaliacao_layouts.avaliar_justificados)."""
+    return avaliar_justificados([f.largura for f in fotos], [f.altura for f in fotos],
+                                [f.regioes for f in fotos], [f.tipo for f in fotos], grupos)
+
+
+def layouts_grupos(fotos: Sequence[FotoPaginacao], grupos: Sequence[Tuple[int, int]],
+                   permitidos: Optional[Sequence[str]] = None) -> List[Tuple[Optional[str], List[int]]]:
+    """
+    Melhor layout de cada grupo [(inicio, fim)] das fotos e a foto de cada
+    slot: [(id do layout, índices das fotos na ordem dos slots)].
+    """
+    avaliacao = avaliar(fotos)
+    resultado: List[Tuple[Optional[str], List[int]]] = [(None, [])] * len(grupos)
+
+    # Colagens: fotos na ordem do capítulo
+    colagens = [i for i, (inicio, fim) in enumerate(grupos) if fim - inicio > MAX_FOTOS_REGISTRADO]
+    if colagens and (permitidos is None or any(justificado(p) for p in permitidos)):
+        _, ids = _avaliar_colagens(fotos, [grupos[i] for i in colagens])
+        for i, id_layout in zip(colagens, ids):
+            resultado[i] = (id_layout, list(range(*grupos[i])))
+
+    for k in sorted({fim - inicio for inicio, fim in grupos if fim - inicio <= MAX_FOTOS_REGISTRADO}):
+        posicoes = [i for i, (inicio, fim) in enumerate(grupos) if fim - inicio == k]
+        indices = np.array([list(range(grupos[i][0], grupos[i][1])) for i in posicoes])
+        _, ids, ordem = melhores_layouts(avaliacao, indices, permitidos)
+        for i, id_layout, linha in zip(posicoes, ids, ordem.tolist()):
+            resultado[i] = (id_layout, linha)
+    return resultado
+
+
+def _programacao_dinamica(custos: np.ndarray, preco_pagina: float) -> List[Tuple[int, int]]:
+    """Melhor divisão em grupos [(inicio, fim)] para a tabela de custos."""
+    n = len(custos)
+    custos = custos.tolist()
+    melhor = [0.0] + [float('inf')] * n
+    escolha = [0] * (n + 1)
+    for j in range(1, n + 1):
+        # Do maior grupo para o menor: empates ficam com menos páginas
+        for k in range(min(j, MAX_FOTOS_PAGINA), 0, -1):
+            total = melhor[j - k] + custos[j - k][k - 1] + preco_pagina
+            if total < melhor[j]:
+                melhor[j] = total
+                escolha[j] = k
+
+    grupos = []
+    j = n
+    while j > 0:
+        grupos.append((j - escolha[j], j))
+        j -= escolha[j]
+    return grupos[::-1]
+
+
+def paginar(fotos: Sequence[FotoPaginacao]) -> List[Tuple[int, int]]:
+    """Melhor divisão de um capítulo em páginas: [(inicio, fim)] das fotos."""
+    return _programacao_dinamica(tabela_custos(fotos), CUSTO_PAGINA)
+
+
+def paginar_a_partir(tabela: TabelaPaginacao, inicio: int) -> List[Tuple[int, int]]:
+    """
+    Melhor divisão das fotos[inicio:] do capítulo da tabela, sem reavaliar
+    nada: os custos de grupos que começam em inicio ou depois não dependem
+    das fotos anteriores, então basta a programação dinâmica nessas linhas.
+    """
+    return [(inicio + a, inicio + b) for a, b in _programacao_dinamica(tabela.custos[inicio:], CUSTO_PAGINA)]
+
+
+def _paginas(divisao: List[List[Tuple[int, int]]]) -> int:
+    return sum(len(grupos) for grupos in divisao)
+
+
+def paginar_capitulos(capitulos: Sequence[Sequence[FotoPaginacao]],
+                      orcamento_paginas: Optional[int] = None) -> List[List[Tuple[int, int]]]:
+    """
+    Pagina todos os capítulos; com orcamento_paginas (páginas de conteúdo
+    do livro inteiro), encarece as páginas até o livro caber.
+
+    Se nem a divisão mais compacta couber, avisa e devolve essa divisão.
+    """
+    tabelas = [tabela_custos(fotos) for fotos in capitulos]
+
+    def dividir(preco_extra: float) -> List[List[Tuple[int, int]]]:
+        return [_programacao_dinamica(t, CUSTO_PAGINA + preco_extra) for t in tabelas]
+
+    divisao = dividir(0.0)
+    if orcamento_paginas is None or _paginas(divisao) <= orcamento_paginas:
+        return divisao
+
+    compacta = dividir(PRECO_PAGINA_MAXIMO)
+    if _paginas(compacta) > orcamento_paginas:
+        print(f"AVISO: Orçamento de {orcamento_paginas} páginas de conteúdo não é alcançável; "
+              f"usando a divisão mais compacta ({_paginas(compacta)} páginas)")
+        return compacta
+
+    baixo, alto = 0.0, PRECO_PAGINA_MAXIMO
+    for _ in range(PASSOS_BISSECAO):
+        meio = (baixo + alto) / 2
+        if _paginas(dividir(meio)) <= orcamento_paginas:
+            alto = meio
+        else:
+            baixo = meio
+    return dividir(alto)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    from pathlib import Path
+    from catalogo_fotos import CatalogoFotos
+    from eventos import eventos_fotos
+    from varredura_fotos import escanear_pastas
+
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not argumentos:
+        print("Uso: python paginacao.py <pasta_raiz> [--paginas=N] [--ordem-captura] [--sem-eventos]")
+        sys.exit(1)
+
+    orcamento = None
+    for opcao in sys.argv[1:]:
+        if opcao.startswith('--paginas='):
+            orcamento = int(opcao.split('=', 1)[1])
+
+    pasta_raiz = Path(argumentos[0])
+    varredura = escanear_pastas(pasta_raiz)
+    catalogo = CatalogoFotos(pasta_raiz)
+    catalogo.preparar(varredura.todas_imagens())
+
+    por_captura = '--ordem-captura' in sys.argv
+    separar = por_captura and '--sem-eventos' not in sys.argv
+
+    capitulos = []
+    for capitulo in varredura.capitulos:
+        caminhos = catalogo.ordenar_por_captura(capitulo.imagens) if por_captura else list(capitulo.imagens)
+        eventos = eventos_fotos(caminhos, catalogo).tolist() if separar else [0] * len(caminhos)
+        fotos = []
+        for caminho, evento in zip(caminhos, eventos):
+            registro = catalogo.registro(caminho)
+            fotos.append(FotoPaginacao(registro['largura'], registro['altura'],
+                                       regioes=tuple(tuple(r) for r in registro['rostos'] or []),
+                                       evento=evento))
+        capitulos.append(fotos)
+
+    inicio = time.perf_counter()
+    divisao = paginar_capitulos(capitulos, orcamento)
+    ms = (time.perf_counter() - inicio) * 1000
+
+    for capitulo, grupos in zip(varredura.capitulos, divisao):
+        print(f"{capitulo.nome_pasta}: {len(grupos)} páginas {[fim - ini for ini, fim in grupos]}")
+    print(f"{_paginas(divisao)} páginas de conteúdo em {ms:.1f} ms")
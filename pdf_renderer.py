@@ -7,38 +7,37 @@ Este módulo renderiza o fotolivro em PDF baseado no schema definido.
 O schema é a fonte única de verdade - o PDF é gerado exatamente como definido.
 
 EXECUÇÃO:
-    python pdf_renderer.py <pasta_raiz> [arquivo_saida.pdf]
+    python pdf_renderer.py <pasta_raiz> [arquivo_saida.pdf] [--plan] [--preflight]
+
+    --plan: só simula (sem decodificar fotos) e mostra páginas por capítulo,
+            DPI de cada slot, tamanho estimado e tempo projetado
+    --preflight: só confere o DPI efetivo de todos os slots do livro (só
+            metadados do schema) e lista os abaixo do mínimo; sai com
+            código 1 se houver algum
+    --dpi-minimo=N: DPI mínimo do --preflight (padrão planejamento.DPI_MINIMO)
 
 Exemplo:
     python pdf_renderer.py ./fotos_bruno ./meu_fotolivro.pdf
 """
 
+import math
 import sys
 from pathlib import Path
-from typing import Tuple, List
+from typing import Any, Dict, List, Optional, Tuple
 from io import BytesIO
 
-from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
 from PIL import Image
 
+from constantes import A4_LARGURA_MM, A4_ALTURA_MM, mm_to_points
 from schema_manager import SchemaManager, PaginaSchema, FotoSchema
+from planejamento import (PlanoFotolivro, PaginaPlanejada, SlotPlanejado,
+                          planejar_capa, dpi_efetivo, DPI_MINIMO)
+from layouts import boxes_layout
 
-
-# Dimensões A4 em paisagem (297mm x 210mm)
-A4_LARGURA_MM = 297
-A4_ALTURA_MM = 210
-
-# Margens (em milímetros)
-MARGEM_EXTERNA_MM = 10  # 1 cm
-MARGEM_LOMBADA_MM = 15  # 1.5 cm
-ESPACO_ENTRE_FOTOS_MM = 5  # 0.5 cm
-
-
-def mm_to_points(mm_value: float) -> float:
-    """Converte milímetros para points."""
-    return mm_value * 72.0 / 25.4
+# NumPy e o motor de recortes (recortes.py) só são importados ao recortar
+# (renderizar, --plan, --preflight) e o ReportLab e o PIL.ImageOps só ao
+# desenhar o PDF: a partida do renderizador, o --plan, o --preflight e o
+# preview não pagam essas importações
 
 
 class PDFRenderer:
@@ -52,16 +51,14 @@ class PDFRenderer:
         self.largura_pagina = mm_to_points(A4_LARGURA_MM)
         self.altura_pagina = mm_to_points(A4_ALTURA_MM)
         
-        # Margens em points
-        self.margem_externa = mm_to_points(MARGEM_EXTERNA_MM)
-        self.margem_lombada = mm_to_points(MARGEM_LOMBADA_MM)
-        self.espaco_entre_fotos = mm_to_points(ESPACO_ENTRE_FOTOS_MM)
-        
         self.canvas = None
         self.numero_pagina = 0
+        self.recortes: Dict[int, Tuple[Any, Any]] = {}  # id(foto) -> (fonte, destino), arrays NumPy
     
     def renderizar(self, schema: SchemaManager) -> bool:
         """Renderiza o PDF completo baseado no schema."""
+        from reportlab.pdfgen import canvas
+
         try:
             self.canvas = canvas.Canvas(
                 str(self.arquivo_saida),
@@ -73,6 +70,9 @@ class PDFRenderer:
         
         print(f"Renderizando {schema.total_paginas()} páginas...")
         
+        # Parte visível de todas as fotos do livro, numa chamada ao motor de recortes
+        self.recortes = self._recortes_por_foto(schema)
+        
         for i, pagina in enumerate(schema.paginas):
             self.numero_pagina = i + 1
             
@@ -97,6 +97,43 @@ class PDFRenderer:
         
         return True
     
+    def planejar(self, schema: SchemaManager) -> PlanoFotolivro:
+        """
+        Simula a renderização do schema (modo --plan) sem abrir as fotos:
+        a geometria de cada slot sai das dimensões guardadas no schema.
+        """
+        plano = PlanoFotolivro()
+        capitulo = ''
+        
+        recortes = self._recortes_por_foto(schema)
+        
+        for i, pagina in enumerate(schema.paginas):
+            self.numero_pagina = i + 1
+            
+            if pagina.tipo != 'conteudo':
+                if pagina.tipo == 'subcapa':
+                    capitulo = pagina.titulo
+                arquivo = self.pasta_raiz / pagina.imagem if pagina.imagem else None
+                plano.adicionar(planejar_capa(capitulo if pagina.tipo == 'subcapa' else '',
+                                              pagina.tipo, arquivo))
+                continue
+            
+            planejada = PaginaPlanejada(capitulo, pagina.tipo, pagina.layout)
+            for foto in pagina.fotos:
+                if id(foto) not in recortes:
+                    continue
+                fonte, destino = recortes[id(foto)]
+                # Só a parte visível da foto é embutida
+                planejada.slots.append(SlotPlanejado(
+                    caminho=foto.caminho,
+                    dpi=dpi_efetivo(fonte[2], destino[2]),
+                    mp_decodificados=foto.largura * foto.altura / 1e6,
+                    mp_embutidos=float(math.ceil(fonte[2]) * math.ceil(fonte[3])) / 1e6
+                ))
+            plano.adicionar(planejada)
+        
+        return plano
+    
     def _renderizar_capa(self, pagina: PaginaSchema):
         """Renderiza a página de capa."""
         if pagina.imagem:
@@ -165,178 +202,167 @@ class PDFRenderer:
     def _renderizar_conteudo(self, pagina: PaginaSchema):
         """Renderiza uma página de conteúdo com fotos."""
         pagina_impar = (self.numero_pagina % 2 == 1)
-        area_util = self._calcular_area_util(pagina_impar)
         
         # Obter boxes do layout
-        boxes = self._calcular_boxes_layout(pagina.layout, area_util)
+        boxes = self._calcular_boxes_layout(pagina, pagina_impar)
         
         # Renderizar cada foto
         for foto in pagina.fotos:
             if foto.slot_index < len(boxes):
                 box = boxes[foto.slot_index]
-                self._renderizar_foto(foto, box)
+                self._renderizar_foto(foto, box, self.recortes.get(id(foto)))
         
         self.canvas.showPage()
     
-    def _calcular_area_util(self, pagina_impar: bool) -> Tuple[float, float, float, float]:
-        """Calcula a área útil da página (sem margens)."""
-        if pagina_impar:
-            margem_esquerda = self.margem_lombada
-            margem_direita = self.margem_externa
-        else:
-            margem_esquerda = self.margem_externa
-            margem_direita = self.margem_lombada
-        
-        x = margem_esquerda
-        y = self.margem_externa
-        largura = self.largura_pagina - margem_esquerda - margem_direita
-        altura = self.altura_pagina - self.margem_externa * 2
-        
-        return (x, y, largura, altura)
+    def slots_conteudo(self, schema: SchemaManager) -> List[Tuple[int, FotoSchema, Tuple[float, float, float, float]]]:
+        """
+        (índice da página, foto, box) de todas as fotos posicionadas do livro,
+        com as boxes do lado da lombada de cada página.
+        """
+        slots = []
+        for i, pagina in enumerate(schema.paginas):
+            if pagina.tipo != 'conteudo':
+                continue
+            pagina_impar = ((i + 1) % 2 == 1)  # Mesma numeração de renderizar
+            boxes = self._calcular_boxes_layout(pagina, pagina_impar)
+            for foto in pagina.fotos:
+                if foto.slot_index < len(boxes):
+                    slots.append((i, foto, boxes[foto.slot_index]))
+        return slots
     
-    def _calcular_boxes_layout(self, layout: str, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
-        """Calcula as boxes (slots) para cada layout."""
-        x, y, largura, altura = area_util
-        esp = self.espaco_entre_fotos
-        
-        if layout == 'L1':
-            return [(x, y, largura, altura)]
-        
-        elif layout == 'L2H':
-            # 2 fotos lado a lado
-            w = (largura - esp) / 2
-            return [
-                (x, y, w, altura),
-                (x + w + esp, y, w, altura)
-            ]
-        
-        elif layout == 'L2V':
-            # 2 fotos empilhadas
-            h = (altura - esp) / 2
-            return [
-                (x, y + h + esp, largura, h),
-                (x, y, largura, h)
-            ]
-        
-        elif layout == 'L3A':
-            # 2 em cima, 1 embaixo
-            h = (altura - esp) / 2
-            w = (largura - esp) / 2
-            return [
-                (x, y + h + esp, w, h),
-                (x + w + esp, y + h + esp, w, h),
-                (x, y, largura, h)
-            ]
-        
-        elif layout == 'L3B':
-            # 1 em cima, 2 embaixo
-            h = (altura - esp) / 2
-            w = (largura - esp) / 2
-            return [
-                (x, y + h + esp, largura, h),
-                (x, y, w, h),
-                (x + w + esp, y, w, h)
-            ]
-        
-        elif layout == 'L3C':
-            # 1 vertical à direita, 2 horizontais à esquerda
-            w_esq = (largura - esp) * 0.60
-            w_dir = (largura - esp) * 0.40
-            h = (altura - esp) / 2
-            return [
-                (x + w_esq + esp, y, w_dir, altura),  # Vertical à direita
-                (x, y + h + esp, w_esq, h),  # Horizontal superior
-                (x, y, w_esq, h)  # Horizontal inferior
-            ]
-        
-        elif layout == 'L3D':
-            # 1 horizontal em cima, 2 horizontais embaixo
-            h = (altura - esp) / 2
-            w = (largura - esp) / 2
-            return [
-                (x, y + h + esp, largura, h),
-                (x, y, w, h),
-                (x + w + esp, y, w, h)
-            ]
-        
-        elif layout == 'L4':
-            # Grid 2x2
-            w = (largura - esp) / 2
-            h = (altura - esp) / 2
-            return [
-                (x, y + h + esp, w, h),
-                (x + w + esp, y + h + esp, w, h),
-                (x, y, w, h),
-                (x + w + esp, y, w, h)
-            ]
-        
-        return [(x, y, largura, altura)]
+    def calcular_recortes(self, slots: List[Tuple[int, FotoSchema, Tuple[float, float, float, float]]]) -> Tuple[Any, Any]:
+        """
+        Parte visível de cada foto no seu slot, para o pan/zoom do schema,
+        numa única chamada ao motor de recortes (recortes.recortes_visiveis).
+        
+        Retorna (fontes, destinos), arrays (N, 4): retângulo em pixels da foto
+        e retângulo no slot em points (origem no canto inferior esquerdo).
+        """
+        import numpy as np
+        from recortes import recortes_visiveis
+        
+        if not slots:
+            return np.zeros((0, 4)), np.zeros((0, 4))
+        fotos = [foto for _, foto, _ in slots]
+        return recortes_visiveis(
+            [f.largura for f in fotos], [f.altura for f in fotos],
+            [box[2] for _, _, box in slots], [box[3] for _, _, box in slots],
+            [f.pan_x for f in fotos], [f.pan_y for f in fotos], [f.zoom for f in fotos]
+        )
+    
+    def preflight(self, schema: SchemaManager, dpi_minimo: float = DPI_MINIMO) -> List[Dict[str, Any]]:
+        """
+        DPI efetivo de todos os slots do livro, sem abrir nenhuma foto: os
+        pixels da parte visível (pan/zoom do schema) sobre as polegadas em
+        que ela é impressa no slot de _calcular_boxes_layout. Os recortes e
+        os DPIs saem de operações vetorizadas sobre o livro inteiro.
+        
+        Retorna, na ordem do livro, um dict por slot com indice_pagina,
+        slot_index, caminho, dpi, pixels e polegadas (largura, altura) da
+        parte visível e 'abaixo' (dpi < dpi_minimo).
+        """
+        import numpy as np
+        
+        slots = self.slots_conteudo(schema)
+        fontes, destinos = self.calcular_recortes(slots)
+        if not slots:
+            return []
+        
+        polegadas = destinos[:, 2:] / 72.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dpis = np.where(polegadas[:, 0] > 0, fontes[:, 2] / polegadas[:, 0], 0.0)
+        abaixo = dpis < dpi_minimo
+        
+        return [
+            {
+                'indice_pagina': indice,
+                'slot_index': foto.slot_index,
+                'caminho': foto.caminho,
+                'dpi': round(dpi, 1),
+                'pixels': [round(v) for v in pixels],
+                'polegadas': [round(v, 2) for v in tamanho],
+                'abaixo': baixo
+            }
+            for (indice, foto, _), dpi, pixels, tamanho, baixo in zip(
+                slots, dpis.tolist(), fontes[:, 2:].tolist(), polegadas.tolist(), abaixo.tolist())
+        ]
+    
+    def _recortes_por_foto(self, schema: SchemaManager) -> Dict[int, Tuple[Any, Any]]:
+        """(fonte, destino) de cada foto posicionada do livro, por id(foto)."""
+        slots = self.slots_conteudo(schema)
+        fontes, destinos = self.calcular_recortes(slots)
+        return {id(foto): (fonte, destino)
+                for (_, foto, _), fonte, destino in zip(slots, fontes, destinos)}
+    
+    def _calcular_boxes_layout(self, pagina: PaginaSchema, pagina_impar: bool) -> List[Tuple[float, float, float, float]]:
+        """
+        Boxes (slots) do layout da página na sua paridade, das tabelas
+        compiladas de layouts.py (colagens justificadas: das proporções das fotos).
+        """
+        return boxes_layout(pagina.layout, pagina_impar, pagina.proporcoes())
     
-    def _renderizar_foto(self, foto: FotoSchema, box: Tuple[float, float, float, float]):
-        """Renderiza uma foto em seu slot com os ajustes definidos."""
+    def _renderizar_foto(self, foto: FotoSchema, box: Tuple[float, float, float, float],
+                         recorte: Optional[Tuple[Any, Any]] = None):
+        """
+        Renderiza uma foto em seu slot com os ajustes definidos.
+        
+        Só a parte visível (recorte = (fonte, destino) de calcular_recortes)
+        é codificada e embutida, desenhada na mesma escala e posição em que
+        a foto inteira seria desenhada.
+        """
+        from PIL import ImageOps
+        from reportlab.lib.utils import ImageReader
+
         x_box, y_box, w_box, h_box = box
         
         try:
             img_path = self.pasta_raiz / foto.caminho
             
-            with Image.open(img_path) as img:
+            with Image.open(img_path) as img_arquivo:
+                # Aplicar orientação EXIF (igual ao navegador no preview)
+                img = ImageOps.exif_transpose(img_arquivo)
                 img_w, img_h = img.size
                 
-                # Calcular escala base para "cover" (preencher slot)
-                scale_x = w_box / img_w
-                scale_y = h_box / img_h
-                base_cover_scale = max(scale_x, scale_y)
-                
-                # Escala mínima para "contain" (mostrar toda imagem)
-                base_contain_scale = min(scale_x, scale_y)
-                
-                # Aplicar zoom do usuário
-                # zoom 1.0 = cover, zoom < 1 = mostra mais (até contain)
-                min_zoom = base_contain_scale / base_cover_scale if base_cover_scale > 0 else 0.3
-                effective_zoom = max(min_zoom, foto.zoom)
-                final_scale = base_cover_scale * effective_zoom
+                # Dimensões do schema desatualizadas (ou sem recorte): refazer só esta foto
+                if recorte is None or (img_w, img_h) != (foto.largura, foto.altura):
+                    from recortes import recortes_visiveis
+                    fontes, destinos = recortes_visiveis(
+                        [img_w], [img_h], [w_box], [h_box], [foto.pan_x], [foto.pan_y], [foto.zoom]
+                    )
+                    recorte = (fontes[0], destinos[0])
+                (fonte_x, fonte_y, fonte_w, fonte_h), (destino_x, destino_y, destino_w, destino_h) = recorte
+                if fonte_w <= 0 or fonte_h <= 0:
+                    return
                 
-                # Tamanho final da imagem
-                display_w = img_w * final_scale
-                display_h = img_h * final_scale
+                # Pixels inteiros que cobrem a parte visível
+                esq = max(0, math.floor(fonte_x))
+                topo = max(0, math.floor(fonte_y))
+                direita = min(img_w, math.ceil(fonte_x + fonte_w))
+                base = min(img_h, math.ceil(fonte_y + fonte_h))
+                escala = destino_w / fonte_w
                 
-                # Quanto a imagem excede/falta no slot
-                excess_w = display_w - w_box
-                excess_h = display_h - h_box
-                
-                # Posição baseada no pan (0.5 = centralizado)
-                # Nota: eixo Y do PDF é invertido em relação ao HTML
-                # No HTML: pan_y=0 mostra topo, pan_y=1 mostra base
-                # No PDF: Y cresce para cima, então invertemos
-                offset_x = -excess_w * foto.pan_x
-                offset_y = -excess_h * (1 - foto.pan_y)
-                
-                # Posição final da imagem
-                img_x = x_box + offset_x
-                img_y = y_box + offset_y
-                
-                # Se a imagem não cobre todo o slot, precisamos de clipping
-                # Salvar estado do canvas para aplicar clip
+                # Salvar estado do canvas e recortar no slot
                 self.canvas.saveState()
-                
-                # Criar área de clipping (o slot)
                 clip_path = self.canvas.beginPath()
                 clip_path.rect(x_box, y_box, w_box, h_box)
                 self.canvas.clipPath(clip_path, stroke=0, fill=0)
                 
-                # Converter imagem para buffer
+                # Converter a parte visível para buffer
                 img_buffer = BytesIO()
+                img = img.crop((esq, topo, direita, base))
                 if img.mode in ('RGBA', 'P'):
                     img = img.convert('RGB')
                 img.save(img_buffer, format='JPEG', quality=95)
                 img_buffer.seek(0)
                 
-                # Desenhar imagem na posição calculada
+                # Desenhar onde esses pixels ficariam com a foto inteira
+                # (eixo Y do PDF cresce para cima: a base do recorte fica embaixo)
                 self.canvas.drawImage(
                     ImageReader(img_buffer),
-                    img_x, img_y,
-                    width=display_w,
-                    height=display_h,
+                    x_box + destino_x - (fonte_x - esq) * escala,
+                    y_box + destino_y - (base - fonte_y - fonte_h) * escala,
+                    width=(direita - esq) * escala,
+                    height=(base - topo) * escala,
                     preserveAspectRatio=False,
                     mask='auto'
                 )
@@ -346,57 +372,32 @@ class PDFRenderer:
         
         except Exception as e:
             print(f"AVISO: Erro ao renderizar {foto.caminho}: {e}")
-    
-    def _calcular_crop(self, img_largura: int, img_altura: int,
-                       slot_largura: float, slot_altura: float,
-                       pan_x: float, pan_y: float, zoom: float) -> Tuple[int, int, int, int]:
-        """Calcula o crop baseado nos ajustes de pan/zoom."""
-        ratio_slot = slot_largura / slot_altura
-        ratio_img = img_largura / img_altura
-        
-        # Calcular dimensões do crop base (modo cover)
-        if ratio_img > ratio_slot:
-            crop_h = img_altura
-            crop_w = int(crop_h * ratio_slot)
-        else:
-            crop_w = img_largura
-            crop_h = int(crop_w / ratio_slot)
-        
-        # Aplicar zoom (reduz o tamanho do crop)
-        crop_w = int(crop_w / zoom)
-        crop_h = int(crop_h / zoom)
-        
-        # Garantir que o crop não seja maior que a imagem
-        crop_w = min(crop_w, img_largura)
-        crop_h = min(crop_h, img_altura)
-        
-        # Calcular posição baseada no pan
-        max_x = img_largura - crop_w
-        max_y = img_altura - crop_h
-        
-        crop_x = int(pan_x * max_x)
-        crop_y = int(pan_y * max_y)
-        
-        # Garantir bounds
-        crop_x = max(0, min(crop_x, max_x))
-        crop_y = max(0, min(crop_y, max_y))
-        
-        return (crop_x, crop_y, crop_w, crop_h)
 
 
 def main():
     """Função principal para execução via linha de comando."""
-    if len(sys.argv) < 2:
-        print("Uso: python pdf_renderer.py <pasta_raiz> [arquivo_saida.pdf]")
+    argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+    planejar = '--plan' in sys.argv
+    conferir_dpi = '--preflight' in sys.argv
+    
+    dpi_minimo = DPI_MINIMO
+    for opcao in sys.argv[1:]:
+        if opcao.startswith('--dpi-minimo='):
+            dpi_minimo = float(opcao.split('=', 1)[1])
+    
+    if len(argumentos) < 1:
+        print("Uso: python pdf_renderer.py <pasta_raiz> [arquivo_saida.pdf] [--plan] [--preflight]")
         print("\nExemplo:")
         print("  python pdf_renderer.py ./fotos_bruno")
         print("  python pdf_renderer.py ./fotos_bruno ./meu_fotolivro.pdf")
+        print("  python pdf_renderer.py ./fotos_bruno --plan")
+        print("  python pdf_renderer.py ./fotos_bruno --preflight --dpi-minimo=300")
         sys.exit(1)
     
-    pasta_raiz = Path(sys.argv[1]).resolve()
+    pasta_raiz = Path(argumentos[0]).resolve()
     
-    if len(sys.argv) >= 3:
-        arquivo_saida = Path(sys.argv[2])
+    if len(argumentos) >= 2:
+        arquivo_saida = Path(argumentos[1])
     else:
         arquivo_saida = pasta_raiz / "fotolivro_final.pdf"
     
@@ -407,8 +408,33 @@ def main():
         print("  python preview_server.py", pasta_raiz)
         sys.exit(1)
     
-    # Renderizar PDF
     renderer = PDFRenderer(pasta_raiz, arquivo_saida)
+    
+    if planejar:
+        # Só simular: paginação, DPI, tamanho e tempo estimados
+        renderer.planejar(schema).imprimir()
+        return
+    
+    if conferir_dpi:
+        # Só conferir o DPI efetivo de cada slot (nenhuma foto é aberta)
+        slots = renderer.preflight(schema, dpi_minimo)
+        baixos = [s for s in slots if s['abaixo']]
+        if slots:
+            dpis = sorted(s['dpi'] for s in slots)
+            print(f"Preflight: {len(slots)} slots; DPI efetivo mínimo {dpis[0]:.0f}, "
+                  f"mediana {dpis[len(dpis) // 2]:.0f}, máximo {dpis[-1]:.0f}")
+        if baixos:
+            print(f"AVISO: {len(baixos)} fotos abaixo de {dpi_minimo:.0f} DPI:")
+            for slot in baixos:
+                largura, altura = slot['pixels']
+                print(f"  p.{slot['indice_pagina'] + 1:3d} slot {slot['slot_index']} {slot['caminho']} "
+                      f"({slot['dpi']:.0f} DPI: {largura}x{altura} px em "
+                      f"{slot['polegadas'][0]:.2f}x{slot['polegadas'][1]:.2f} pol)")
+            sys.exit(1)
+        print(f"✓ Todas as fotos com pelo menos {dpi_minimo:.0f} DPI")
+        return
+    
+    # Renderizar PDF
     sucesso = renderer.renderizar(schema)
     
     if not sucesso:
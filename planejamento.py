@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planejamento do Fotolivro (modo --plan)
+
+Simula uma renderização sem decodificar nenhum pixel: o agrupamento, a
+escolha de layout e a geometria dos recortes usam só os metadados do
+catálogo (cabeçalho dos arquivos). O plano informa:
+- páginas por capítulo
+- DPI efetivo de cada slot (pixels da foto / polegadas impressas)
+- bytes de imagem embutidos no PDF (estimativa)
+- tempo projetado da renderização
+
+O tempo e o tamanho vêm de um modelo de custo por megapixel calibrado com
+as fotos de exemplo (python benchmark.py <pasta_raiz> custo):
+decodificar o original, codificar o JPEG embutido, embutir os bytes no
+PDF (o ReportLab codifica em ASCII85) e um custo fixo por página e por
+miniatura de mosaico.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# Modelo de custo (calibrado em benchmark.py, medição 'custo')
+MS_POR_MP_DECODIFICACAO = 14.2  # Decodificar o original (JPEG)
+MS_POR_MP_CODIFICACAO = 6.2  # Codificar o JPEG embutido (qualidade 95)
+BYTES_POR_MP_JPEG = 255_000  # Tamanho do JPEG embutido (qualidade 95)
+MS_POR_MB_EMBUTIDO = 510.0  # ReportLab: ler e codificar (ASCII85) cada MB no PDF
+FATOR_ASCII85 = 1.25  # O ASCII85 gera 5 bytes para cada 4 embutidos
+MS_POR_PAGINA = 5.0  # Custo fixo do ReportLab por página
+MS_POR_MINIATURA = 6.0  # Uma célula de mosaico a partir das prévias
+
+# Abaixo deste DPI efetivo a impressão tende a ficar visivelmente suave
+DPI_MINIMO = 150
+
+
+def dpi_efetivo(pixels: float, pontos: float) -> float:
+    """DPI de `pixels` impressos em `pontos` (1/72 de polegada)."""
+    if pontos <= 0:
+        return 0.0
+    return pixels / (pontos / 72.0)
+
+
+@dataclass
+class SlotPlanejado:
+    """Uma foto posicionada em um slot, com o custo estimado."""
+    caminho: str
+    dpi: float  # DPI efetivo da parte visível da foto
+    mp_decodificados: float  # Megapixels decodificados do original
+    mp_embutidos: float  # Megapixels codificados no PDF
+
+    @property
+    def bytes_estimados(self) -> int:
+        return int(self.mp_embutidos * BYTES_POR_MP_JPEG)
+
+    @property
+    def ms_estimados(self) -> float:
+        return (self.mp_decodificados * MS_POR_MP_DECODIFICACAO +
+                self.mp_embutidos * MS_POR_MP_CODIFICACAO +
+                self.bytes_estimados / 1024 / 1024 * MS_POR_MB_EMBUTIDO)
+
+
+@dataclass
+class PaginaPlanejada:
+    """Uma página do plano."""
+    capitulo: str  # Nome da pasta do ano ('' para capa/contra capa)
+    tipo: str  # 'capa', 'subcapa', 'conteudo', 'contra_capa'
+    layout: str
+    slots: List[SlotPlanejado] = field(default_factory=list)
+    bytes_fixos: int = 0  # Imagens embutidas como estão (capas pré-geradas)
+    ms_fixos: float = 0.0  # Trabalho fora dos slots (ex.: mosaico de capa)
+
+    @property
+    def bytes_estimados(self) -> int:
+        return self.bytes_fixos + sum(s.bytes_estimados for s in self.slots)
+
+    @property
+    def ms_estimados(self) -> float:
+        return (MS_POR_PAGINA + self.ms_fixos +
+                self.bytes_fixos / 1024 / 1024 * MS_POR_MB_EMBUTIDO +
+                sum(s.ms_estimados for s in self.slots))
+
+
+def planejar_capa(capitulo: str, tipo: str, arquivo_pronto: Optional[Path],
+                  num_miniaturas: int = 0, mp_mosaico: float = 0.0) -> PaginaPlanejada:
+    """
+    Planeja uma capa/subcapa/contra capa: a imagem pré-gerada é embutida
+    como está; sem ela, o custo é o do mosaico gerado na hora.
+    """
+    if arquivo_pronto is not None and arquivo_pronto.exists():
+        return PaginaPlanejada(capitulo, tipo, 'L1', bytes_fixos=arquivo_pronto.stat().st_size)
+    return PaginaPlanejada(
+        capitulo, tipo, 'L1',
+        bytes_fixos=int(mp_mosaico * BYTES_POR_MP_JPEG),
+        ms_fixos=num_miniaturas * MS_POR_MINIATURA + mp_mosaico * MS_POR_MP_CODIFICACAO
+    )
+
+
+class PlanoFotolivro:
+    """Resultado de uma simulação de renderização."""
+
+    def __init__(self):
+        self.paginas: List[PaginaPlanejada] = []
+
+    def adicionar(self, pagina: PaginaPlanejada):
+        self.paginas.append(pagina)
+
+    def slots(self) -> List[SlotPlanejado]:
+        return [s for p in self.paginas for s in p.slots]
+
+    def paginas_por_capitulo(self) -> Dict[str, int]:
+        """Páginas de conteúdo (mais a subcapa) de cada capítulo, na ordem."""
+        contagem: Dict[str, int] = {}
+        for pagina in self.paginas:
+            if pagina.capitulo:
+                contagem[pagina.capitulo] = contagem.get(pagina.capitulo, 0) + 1
+        return contagem
+
+    def bytes_estimados(self) -> int:
+        return sum(p.bytes_estimados for p in self.paginas)
+
+    def ms_estimados(self) -> float:
+        return sum(p.ms_estimados for p in self.paginas)
+
+    def imprimir(self, detalhado: bool = True):
+        """Imprime o relatório do plano."""
+        print(f"\nPLANO DO FOTOLIVRO ({len(self.paginas)} páginas)")
+
+        print("\nPáginas por capítulo (incluindo a subcapa):")
+        for capitulo, total in self.paginas_por_capitulo().items():
+            print(f"  {capitulo}: {total}")
+
+        if detalhado:
+            print("\nDPI efetivo por slot:")
+            for numero, pagina in enumerate(self.paginas, start=1):
+                if not pagina.slots:
+                    continue
+                dpis = ", ".join(
+                    f"{s.dpi:.0f}{'!' if s.dpi < DPI_MINIMO else ''}" for s in pagina.slots
+                )
+                print(f"  p.{numero:3d} {pagina.layout:4s} {dpis}")
+
+        slots = self.slots()
+        baixos = [s for s in slots if s.dpi < DPI_MINIMO]
+        if slots:
+            dpis = sorted(s.dpi for s in slots)
+            print(f"\nDPI efetivo: mínimo {dpis[0]:.0f}, mediana {dpis[len(dpis) // 2]:.0f}, "
+                  f"máximo {dpis[-1]:.0f}")
+        if baixos:
+            print(f"AVISO: {len(baixos)} fotos abaixo de {DPI_MINIMO} DPI (marcadas com !):")
+            for slot in baixos:
+                print(f"  {slot.caminho} ({slot.dpi:.0f} DPI)")
+
+        mb = self.bytes_estimados() / 1024 / 1024
+        print(f"\nImagens embutidas (estimativa): {mb:.1f} MB "
+              f"(PDF com cerca de {mb * FATOR_ASCII85:.0f} MB)")
+        print(f"Tempo de renderização projetado: {self.ms_estimados() / 1000:.1f} s")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pirâmide de Prévias das Fotos
+
+Este módulo mantém versões reduzidas (prévias) de cada foto em 256, 1024 e
+2048 px no lado maior, geradas uma única vez por foto a partir de uma só
+decodificação do original. As prévias ficam em .previas/ na pasta raiz e
+são identificadas pelo hash do conteúdo do arquivo (guardado no catálogo),
+então editar uma foto gera prévias novas automaticamente.
+
+Toda leitura em resolução reduzida passa por abrir_reduzida(): em JPEG o
+decodificador já entrega a imagem em 1/2, 1/4 ou 1/8 da escala (modo draft,
+escala DCT) e o restante é reduzido por média de blocos (Image.reduce),
+sem nunca decodificar o original inteiro.
+
+Cada consumidor pede o menor nível que atende à sua necessidade:
+- Miniaturas dos mosaicos (capas): 256 ou 1024
+- Preview no navegador: 1024
+- Detecção de pessoas: 2048 (LADO_MAXIMO_DETECCAO)
+
+EXECUÇÃO (pré-gerar todas as prévias):
+    python previas.py <pasta_raiz>
+"""
+
+import os
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from PIL import Image, ImageOps
+
+from catalogo_fotos import CatalogoFotos
+from sondagem_imagens import TAG_ORIENTACAO, ORIENTACOES_GIRADAS
+
+
+# Níveis da pirâmide (lado maior em pixels), do menor para o maior
+NIVEIS_PREVIA = (256, 1024, 2048)
+
+# Pasta das prévias (dentro da pasta raiz)
+PASTA_PREVIAS = ".previas"
+
+# Qualidade JPEG das prévias
+QUALIDADE_PREVIA = 90
+
+
+def calcular_hash_conteudo(caminho: Path) -> str:
+    """Calcula o hash SHA-1 do conteúdo do arquivo (lido em blocos)."""
+    h = hashlib.sha1()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def abrir_reduzida(caminho: Path, largura_min: int, altura_min: int) -> Image.Image:
+    """
+    Abre uma imagem com pelo menos largura_min x altura_min pixels, do jeito
+    mais barato possível:
+    1. JPEG: modo draft (o decodificador reduz 1/2, 1/4 ou 1/8 na escala DCT)
+    2. Image.reduce pelo maior fator inteiro que ainda atende ao mínimo
+
+    As medidas pedidas são da imagem já orientada (EXIF). Retorna uma imagem
+    PIL orientada e carregada em memória, possivelmente maior que o pedido
+    (o consumidor faz o ajuste fino com LANCZOS).
+    """
+    largura_min = max(1, int(largura_min))
+    altura_min = max(1, int(altura_min))
+
+    with Image.open(caminho) as img_arquivo:
+        # Medidas pedidas no sentido gravado no arquivo (antes de girar)
+        if img_arquivo.getexif().get(TAG_ORIENTACAO, 1) in ORIENTACOES_GIRADAS:
+            largura_min, altura_min = altura_min, largura_min
+
+        if img_arquivo.format == 'JPEG':
+            img_arquivo.draft(img_arquivo.mode, (largura_min, altura_min))
+
+        fator = min(img_arquivo.width // largura_min, img_arquivo.height // altura_min)
+        if fator >= 2:
+            img = img_arquivo.reduce(fator)
+        else:
+            img_arquivo.load()
+            img = img_arquivo
+
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    return img
+
+
+def escolher_nivel(largura_min: int, altura_min: int, largura: int, altura: int) -> Optional[int]:
+    """
+    Escolhe o menor nível da pirâmide cuja prévia tenha pelo menos
+    largura_min x altura_min pixels.
+
+    Args:
+        largura_min, altura_min: Tamanho mínimo necessário
+        largura, altura: Tamanho do original (orientado)
+
+    Retorna o nível ou None se só o original atende.
+    """
+    lado_maior = max(largura, altura)
+    if lado_maior <= 0:
+        return None
+
+    for nivel in NIVEIS_PREVIA:
+        if nivel >= lado_maior:
+            return None  # a prévia seria o próprio original
+        escala = nivel / lado_maior
+        if largura * escala >= largura_min and altura * escala >= altura_min:
+            return nivel
+    return None
+
+
+class ArmazemPrevias:
+    """Armazena e fornece as prévias multi-resolução das fotos."""
+
+    def __init__(self, pasta_raiz: Path, catalogo: Optional[CatalogoFotos] = None):
+        self.pasta_raiz = Path(pasta_raiz)
+        self.pasta = self.pasta_raiz / PASTA_PREVIAS
+        self.catalogo = catalogo if catalogo is not None else CatalogoFotos(self.pasta_raiz)
+
+        # Estatísticas da execução atual
+        self.geradas = 0
+        self.reaproveitadas = 0
+
+    def hash_conteudo(self, caminho: Path) -> str:
+        """Hash do conteúdo da foto (calculado uma vez e guardado no catálogo)."""
+        registro = self.catalogo.registro(caminho)
+        if not registro.get('hash_conteudo'):
+            registro['hash_conteudo'] = calcular_hash_conteudo(caminho)
+            self.catalogo.marcar_alterado(caminho)
+        return registro['hash_conteudo']
+
+    def _arquivo_previa(self, hash_conteudo: str, nivel: int) -> Path:
+        """Caminho do arquivo de uma prévia."""
+        return self.pasta / hash_conteudo[:2] / f"{hash_conteudo}_{nivel}.jpg"
+
+    def gerar(self, caminho: Path) -> Dict[int, Path]:
+        """
+        Gera (se necessário) todos os níveis de uma foto com uma única
+        decodificação do original.
+
+        Retorna {nivel: arquivo} dos níveis existentes para a foto.
+        """
+        caminho = Path(caminho)
+        registro = self.catalogo.registro(caminho)
+        hash_conteudo = self.hash_conteudo(caminho)
+        lado_maior = max(registro['largura'], registro['altura'])
+
+        # Só faz sentido gerar níveis menores que o original
+        niveis = [n for n in NIVEIS_PREVIA if n < lado_maior]
+        arquivos = {n: self._arquivo_previa(hash_conteudo, n) for n in niveis}
+        faltando = [n for n in niveis if not arquivos[n].exists()]
+
+        if not faltando:
+            self.reaproveitadas += 1
+            return arquivos
+
+        # Decodificar só o necessário para o maior nível
+        escala = max(niveis) / lado_maior
+        img = abrir_reduzida(
+            caminho, registro['largura'] * escala, registro['altura'] * escala
+        )
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Do maior para o menor: cada nível é reduzido a partir do anterior
+        for nivel in sorted(niveis, reverse=True):
+            img.thumbnail((nivel, nivel), Image.Resampling.LANCZOS)
+            if nivel in faltando:
+                destino = arquivos[nivel]
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                # Gravar em arquivo temporário e renomear (seguro entre threads)
+                temporario = destino.with_suffix(f".{os.getpid()}.tmp")
+                img.save(temporario, 'JPEG', quality=QUALIDADE_PREVIA)
+                os.replace(temporario, destino)
+
+        self.geradas += 1
+        return arquivos
+
+    def caminho_previa(self, caminho: Path, nivel: int) -> Path:
+        """
+        Retorna o arquivo da prévia de um nível (gerando se necessário).
+
+        Se o original já é menor que o nível pedido, retorna o próprio original.
+        """
+        arquivos = self.gerar(caminho)
+        return arquivos.get(nivel, Path(caminho))
+
+    def abrir(self, caminho: Path, largura_min: int, altura_min: int) -> Image.Image:
+        """
+        Abre a menor versão da foto com pelo menos largura_min x altura_min.
+
+        Retorna uma imagem PIL já orientada (EXIF) e carregada em memória.
+        A imagem pode ser maior que o pedido; o consumidor reduz o restante.
+        """
+        registro = self.catalogo.registro(caminho)
+        nivel = escolher_nivel(largura_min, altura_min, registro['largura'], registro['altura'])
+
+        origem = self.caminho_previa(caminho, nivel) if nivel is not None else Path(caminho)
+        return abrir_reduzida(origem, largura_min, altura_min)
+
+    def gerar_todas(self, caminhos: Iterable[Path]):
+        """Pré-gera as prévias de várias fotos."""
+        for caminho in caminhos:
+            try:
+                self.gerar(caminho)
+            except Exception as e:
+                print(f"AVISO: Não foi possível gerar prévias de {caminho}: {e}")
+        self.catalogo.salvar()
+
+    def resumo(self) -> str:
+        """Resumo das operações feitas nesta execução."""
+        return f"prévias: {self.geradas} geradas, {self.reaproveitadas} reaproveitadas"
+
+
+if __name__ == '__main__':
+    import sys
+    from varredura_fotos import escanear_pastas
+
+    if len(sys.argv) < 2:
+        print("Uso: python previas.py <pasta_raiz>")
+        sys.exit(1)
+
+    pasta_raiz = Path(sys.argv[1])
+    varredura = escanear_pastas(pasta_raiz)
+    armazem = ArmazemPrevias(pasta_raiz)
+    armazem.catalogo.preparar(varredura.todas_imagens())
+    armazem.gerar_todas(varredura.todas_imagens())
+    print(armazem.resumo())
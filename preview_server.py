@@ -7,7 +7,10 @@ Este servidor permite visualizar e ajustar o enquadramento das fotos
 antes de gerar o PDF final.
 
 EXECUÇÃO:
-    python preview_server.py <pasta_raiz>
+    python preview_server.py <pasta_raiz> [--jobs=N]
+
+    --jobs=N: processos na detecção de pessoas ao gerar o schema (só para
+              as fotos ainda sem detecção no catálogo; padrão 1)
 
 Exemplo:
     python preview_server.py ./fotos_bruno
@@ -19,12 +22,16 @@ INSTALAÇÃO DAS DEPENDÊNCIAS:
 import os
 import sys
 import json
+import atexit
+import threading
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, render_template, jsonify, request, send_from_directory, send_file, abort
 
 # Importar gerenciador de schema
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from schema_manager import SchemaManager
+from previas import ArmazemPrevias, NIVEIS_PREVIA
+from layouts import fotos_por_layout, layouts_para_json
 
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
@@ -32,21 +39,65 @@ app = Flask(__name__, static_folder='static', template_folder='templates')
 # Variáveis globais
 pasta_raiz = None
 schema_manager = None
+armazem_previas = None
+jobs_deteccao = 1  # --jobs=N
+
+# As requisições que mudam ou percorrem as páginas (menos a geração do PDF,
+# longa demais para segurar o preview), o salvamento (SchemaManager.salvar)
+# e a preparação da repaginação (numa thread) tomam a trava do schema
+# (schema_manager.trava), então nenhuma delas vê páginas pela metade.
+#
+# Salvamento adiado do schema: a troca de layout responde sem esperar o
+# arquivo (que num livro grande leva mais que a troca inteira); trocas em
+# sequência viram um salvamento só
+ATRASO_SALVAR_S = 0.5
+_salvamento_pendente = None
+_trava_salvamento = threading.Lock()
+
+
+def salvar_schema_adiado():
+    """Salva o schema numa thread, ATRASO_SALVAR_S depois da última chamada."""
+    global _salvamento_pendente
+    with _trava_salvamento:
+        if _salvamento_pendente is not None:
+            _salvamento_pendente.cancel()
+        _salvamento_pendente = threading.Timer(ATRASO_SALVAR_S, salvar_schema_pendente)
+        _salvamento_pendente.daemon = True
+        _salvamento_pendente.start()
+
+
+@atexit.register
+def salvar_schema_pendente():
+    """Faz agora o salvamento adiado, se houver um (também ao encerrar o servidor)."""
+    global _salvamento_pendente
+    with _trava_salvamento:
+        if _salvamento_pendente is None:
+            return
+        _salvamento_pendente.cancel()
+        _salvamento_pendente = None
+    schema_manager.salvar()
 
 
 def inicializar_schema():
     """Inicializa ou carrega o schema do fotolivro."""
-    global schema_manager
+    global schema_manager, armazem_previas
     
     schema_manager = SchemaManager(pasta_raiz)
+    armazem_previas = ArmazemPrevias(pasta_raiz)
     
     if not schema_manager.carregar():
         print("Schema não encontrado. Gerando schema inicial...")
-        schema_manager.gerar_schema_inicial()
+        schema_manager.gerar_schema_inicial(jobs=jobs_deteccao)
         schema_manager.migrar_ajustes_antigos()
         print(f"Schema gerado com {schema_manager.total_paginas()} páginas")
     else:
         print(f"Schema carregado com {schema_manager.total_paginas()} páginas")
+    preparar_repaginacao()
+
+
+def preparar_repaginacao():
+    """Tabelas de paginação dos capítulos numa thread (trocas de layout sem espera)."""
+    threading.Thread(target=schema_manager.preparar_repaginacao, daemon=True).start()
 
 
 @app.route('/')
@@ -58,7 +109,18 @@ def index():
 @app.route('/api/fotolivro')
 def api_fotolivro():
     """Retorna a estrutura completa do fotolivro baseada no schema."""
-    return jsonify(schema_manager.to_dict())
+    with schema_manager.trava:
+        return jsonify(schema_manager.to_dict())
+
+
+@app.route('/api/layouts')
+def api_layouts():
+    """
+    Layouts registrados (layouts.py) com as boxes compiladas de cada
+    paridade, em frações da página, para o preview posicionar os slots
+    exatamente onde o PDF vai desenhá-los.
+    """
+    return jsonify(layouts_para_json())
 
 
 @app.route('/api/atualizar_foto', methods=['POST'])
@@ -67,15 +129,15 @@ def api_atualizar_foto():
     data = request.json
     caminho = data.get('caminho')
     
-    schema_manager.atualizar_foto(
-        caminho=caminho,
-        pan_x=data.get('pan_x'),
-        pan_y=data.get('pan_y'),
-        zoom=data.get('zoom'),
-        slot_tipo=data.get('slot_tipo')
-    )
-    
-    schema_manager.salvar()
+    with schema_manager.trava:
+        schema_manager.atualizar_foto(
+            caminho=caminho,
+            pan_x=data.get('pan_x'),
+            pan_y=data.get('pan_y'),
+            zoom=data.get('zoom'),
+            slot_tipo=data.get('slot_tipo')
+        )
+        schema_manager.salvar()
     return jsonify({'success': True})
 
 
@@ -86,8 +148,9 @@ def api_atualizar_layout():
     indice = data.get('indice_pagina')
     layout = data.get('layout')
     
-    schema_manager.atualizar_layout_pagina(indice, layout)
-    schema_manager.salvar()
+    with schema_manager.trava:
+        schema_manager.atualizar_layout_pagina(indice, layout)
+        schema_manager.salvar()
     
     return jsonify({'success': True})
 
@@ -98,7 +161,11 @@ def api_mudar_layout_pagina():
     Muda o layout de uma página redistribuindo fotos apenas no capítulo atual.
     - Não altera páginas anteriores
     - Não altera outros capítulos
-    - Fotos excedentes vão para o final do capítulo
+    - O resto do capítulo é repaginado
+    
+    Responde só com as páginas que mudaram: as páginas [inicio, inicio +
+    removidas) viram inseridas páginas, das quais as de índice em alteradas
+    vêm em paginas; as outras são as antigas na mesma posição.
     """
     data = request.json
     indice_pagina = data.get('indice_pagina')
@@ -108,34 +175,35 @@ def api_mudar_layout_pagina():
         return jsonify({'success': False, 'mensagem': 'Parâmetros inválidos'})
     
     # Calcular número de fotos do novo layout
-    fotos_por_layout = {
-        'L1': 1, 'L2H': 2, 'L2V': 2,
-        'L3A': 3, 'L3B': 3, 'L3C': 3, 'L3D': 3,
-        'L4': 4
-    }
-    num_fotos_necessarias = fotos_por_layout.get(novo_layout, 1)
-    
-    # Encontrar limites do capítulo atual
-    inicio_capitulo, fim_capitulo = schema_manager.encontrar_limites_capitulo(indice_pagina)
-    
-    if inicio_capitulo is None:
-        return jsonify({'success': False, 'mensagem': 'Página não encontrada'})
-    
-    # Redistribuir fotos no capítulo
-    sucesso = schema_manager.redistribuir_fotos_capitulo(
-        indice_pagina, novo_layout, num_fotos_necessarias,
-        inicio_capitulo, fim_capitulo
-    )
+    num_fotos_necessarias = fotos_por_layout(novo_layout)
     
-    if sucesso:
-        schema_manager.salvar()
-        return jsonify({
-            'success': True,
-            'paginas': schema_manager.to_dict()['paginas'],
-            'total_paginas': schema_manager.total_paginas()
-        })
-    else:
-        return jsonify({'success': False, 'mensagem': 'Não foi possível redistribuir fotos'})
+    with schema_manager.trava:
+        # Encontrar limites do capítulo atual
+        inicio_capitulo, fim_capitulo = schema_manager.encontrar_limites_capitulo(indice_pagina)
+        
+        if inicio_capitulo is None:
+            return jsonify({'success': False, 'mensagem': 'Página não encontrada'})
+        
+        # Redistribuir fotos no capítulo
+        repaginacao = schema_manager.redistribuir_fotos_capitulo(
+            indice_pagina, novo_layout, num_fotos_necessarias,
+            inicio_capitulo, fim_capitulo
+        )
+        
+        if repaginacao:
+            salvar_schema_adiado()
+            return jsonify({
+                'success': True,
+                'inicio': repaginacao.inicio,
+                'removidas': repaginacao.removidas,
+                'inseridas': repaginacao.inseridas,
+                'alteradas': repaginacao.alteradas,
+                'paginas': [schema_manager.pagina_para_dict(schema_manager.paginas[i])
+                            for i in repaginacao.alteradas],
+                'total_paginas': schema_manager.total_paginas()
+            })
+        else:
+            return jsonify({'success': False, 'mensagem': 'Não foi possível redistribuir fotos'})
 
 
 @app.route('/api/reorganizar_pagina', methods=['POST'])
@@ -146,21 +214,52 @@ def api_reorganizar_pagina():
     layout = data.get('layout')
     fotos = data.get('fotos', [])
     
-    schema_manager.reorganizar_pagina(indice, layout, fotos)
-    schema_manager.salvar()
+    with schema_manager.trava:
+        schema_manager.reorganizar_pagina(indice, layout, fotos)
+        schema_manager.salvar()
     
     return jsonify({'success': True})
 
 
 @app.route('/api/regenerar_schema', methods=['POST'])
 def api_regenerar_schema():
-    """Regenera o schema do zero (útil após adicionar/remover fotos)."""
-    schema_manager.gerar_schema_inicial()
-    schema_manager.migrar_ajustes_antigos()
+    """
+    Regenera o schema do zero (útil após adicionar/remover fotos).
+    
+    Aceita {"ordem": "captura"} para ordenar as fotos pela data EXIF,
+    {"remover_duplicatas": true} para deixar de fora as fotos quase duplicadas
+    e {"orcamento_paginas": N} para limitar o livro a N páginas. Em ordem de
+    captura, as páginas não misturam eventos (eventos.py), salvo com
+    {"eventos": false}.
+    """
+    data = request.get_json(silent=True) or {}
+    orcamento_paginas = data.get('orcamento_paginas')
+    with schema_manager.trava:
+        schema_manager.gerar_schema_inicial(
+            ordem=data.get('ordem', 'nome'),
+            remover_duplicatas=bool(data.get('remover_duplicatas', False)),
+            orcamento_paginas=int(orcamento_paginas) if orcamento_paginas else None,
+            eventos=bool(data.get('eventos', True)),
+            jobs=jobs_deteccao
+        )
+        schema_manager.migrar_ajustes_antigos()
+        total_paginas = schema_manager.total_paginas()
+    preparar_repaginacao()
     
     return jsonify({
         'success': True,
-        'total_paginas': schema_manager.total_paginas()
+        'total_paginas': total_paginas
+    })
+
+
+@app.route('/api/duplicados')
+def api_duplicados():
+    """Lista os grupos de fotos quase duplicadas (entre todos os anos)."""
+    grupos = schema_manager.encontrar_duplicatas()
+    return jsonify({
+        'total_grupos': len(grupos),
+        'total_duplicatas': sum(len(g['duplicatas']) for g in grupos),
+        'grupos': grupos
     })
 
 
@@ -170,14 +269,15 @@ def api_ajustes():
     if request.method == 'GET':
         # Extrair ajustes do schema
         ajustes = {}
-        for pagina in schema_manager.paginas:
-            for foto in pagina.fotos:
-                ajustes[foto.caminho] = {
-                    'pan_x': foto.pan_x,
-                    'pan_y': foto.pan_y,
-                    'zoom': foto.zoom,
-                    'slot_tipo': foto.slot_tipo
-                }
+        with schema_manager.trava:
+            for pagina in schema_manager.paginas:
+                for foto in pagina.fotos:
+                    ajustes[foto.caminho] = {
+                        'pan_x': foto.pan_x,
+                        'pan_y': foto.pan_y,
+                        'zoom': foto.zoom,
+                        'slot_tipo': foto.slot_tipo
+                    }
         return jsonify({'ajustes': ajustes, 'layouts': {}})
     else:
         # POST: salvar ajustes
@@ -185,25 +285,26 @@ def api_ajustes():
         ajustes = data.get('ajustes', {})
         layouts = data.get('layouts', {})
         
-        # Atualizar ajustes das fotos
-        for caminho, aj in ajustes.items():
-            schema_manager.atualizar_foto(
-                caminho=caminho,
-                pan_x=aj.get('pan_x'),
-                pan_y=aj.get('pan_y'),
-                zoom=aj.get('zoom'),
-                slot_tipo=aj.get('slot_tipo')
-            )
-        
-        # Atualizar layouts das páginas
-        for indice_str, layout in layouts.items():
-            try:
-                indice = int(indice_str)
-                schema_manager.atualizar_layout_pagina(indice, layout)
-            except (ValueError, TypeError):
-                pass
-        
-        schema_manager.salvar()
+        with schema_manager.trava:
+            # Atualizar ajustes das fotos
+            for caminho, aj in ajustes.items():
+                schema_manager.atualizar_foto(
+                    caminho=caminho,
+                    pan_x=aj.get('pan_x'),
+                    pan_y=aj.get('pan_y'),
+                    zoom=aj.get('zoom'),
+                    slot_tipo=aj.get('slot_tipo')
+                )
+            
+            # Atualizar layouts das páginas
+            for indice_str, layout in layouts.items():
+                try:
+                    indice = int(indice_str)
+                    schema_manager.atualizar_layout_pagina(indice, layout)
+                except (ValueError, TypeError):
+                    pass
+            
+            schema_manager.salvar()
         return jsonify({'success': True})
 
 
@@ -213,6 +314,87 @@ def servir_foto(foto_path):
     return send_from_directory(pasta_raiz, foto_path)
 
 
+@app.route('/previa/<int:nivel>/<path:foto_path>')
+def servir_previa(nivel, foto_path):
+    """
+    Serve a prévia reduzida de uma foto (nível 256, 1024 ou 2048 px).
+    A prévia é gerada na primeira requisição e reaproveitada depois.
+    """
+    if nivel not in NIVEIS_PREVIA:
+        abort(404)
+    
+    caminho = (pasta_raiz / foto_path).resolve()
+    if pasta_raiz not in caminho.parents or not caminho.is_file():
+        abort(404)
+    
+    arquivo = armazem_previas.caminho_previa(caminho, nivel)
+    armazem_previas.catalogo.salvar()
+    return send_file(arquivo)
+
+
+@app.route('/api/recortes')
+def api_recortes():
+    """
+    Parte visível de cada foto no seu slot, exatamente como o PDF vai
+    recortá-la (mesmo motor de recortes do PDFRenderer, o livro inteiro
+    numa chamada).
+
+    Para cada foto: 'fonte' em pixels da foto (origem no topo esquerdo),
+    'destino' no slot em points (origem no canto inferior esquerdo) e o
+    DPI efetivo da impressão.
+    """
+    from pdf_renderer import PDFRenderer
+    from planejamento import dpi_efetivo
+
+    renderer = PDFRenderer(pasta_raiz, pasta_raiz / "fotolivro_final.pdf")
+    with schema_manager.trava:
+        slots = renderer.slots_conteudo(schema_manager)
+        fontes, destinos = renderer.calcular_recortes(slots)
+
+        return jsonify({
+            'recortes': [
+                {
+                    'indice_pagina': indice,
+                    'slot_index': foto.slot_index,
+                    'caminho': foto.caminho,
+                    'fonte': [round(v, 2) for v in fonte],
+                    'destino': [round(v, 2) for v in destino],
+                    'dpi': round(dpi_efetivo(fonte[2], destino[2]))
+                }
+                for (indice, foto, _), fonte, destino in zip(slots, fontes.tolist(), destinos.tolist())
+            ]
+        })
+
+
+@app.route('/api/preflight')
+def api_preflight():
+    """
+    Confere o DPI efetivo de todos os slots do livro antes de gerar o PDF,
+    só com os metadados do schema (PDFRenderer.preflight; nenhuma foto é
+    aberta).
+
+    Aceita ?dpi_minimo=N (padrão planejamento.DPI_MINIMO). Retorna o resumo
+    e, para cada slot, o DPI, os pixels visíveis, as polegadas impressas e
+    se está abaixo do mínimo.
+    """
+    from pdf_renderer import PDFRenderer
+    from planejamento import DPI_MINIMO
+
+    dpi_minimo = request.args.get('dpi_minimo', DPI_MINIMO, type=float)
+    renderer = PDFRenderer(pasta_raiz, pasta_raiz / "fotolivro_final.pdf")
+    with schema_manager.trava:
+        slots = renderer.preflight(schema_manager, dpi_minimo)
+    dpis = [s['dpi'] for s in slots]
+
+    return jsonify({
+        'dpi_minimo': dpi_minimo,
+        'total_slots': len(slots),
+        'abaixo_minimo': sum(s['abaixo'] for s in slots),
+        'dpi_pior': min(dpis) if dpis else None,
+        'slots': slots
+    })
+
+
 @app.route('/api/gerar_pdf', methods=['POST'])
 def api_gerar_pdf():
     """Gera o PDF final baseado no schema."""
@@ -238,12 +420,15 @@ def api_gerar_pdf():
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Uso: python preview_server.py <pasta_raiz>")
+        print("Uso: python preview_server.py <pasta_raiz> [--jobs=N]")
         print("\nExemplo:")
         print("  python preview_server.py ./fotos_bruno")
         sys.exit(1)
     
     pasta_raiz = Path(sys.argv[1]).resolve()
+    for opcao in sys.argv[2:]:
+        if opcao.startswith('--jobs='):
+            jobs_deteccao = max(1, int(opcao.split('=', 1)[1]))
     
     if not pasta_raiz.exists():
         print(f"ERRO: Pasta não encontrada: {pasta_raiz}")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Avaliação de Qualidade das Fotos (nitidez e exposição)
+
+Calcula, para cada foto, a partir de uma versão reduzida em tons de cinza:
+- nitidez: variância do Laplaciano (valores baixos = foto tremida/desfocada)
+- luminancia: brilho médio (0-1)
+- estouradas: fração de pixels estourados (>= 250)
+- escuras: fração de pixels sem detalhe na sombra (<= 5)
+
+As fotos são processadas em lotes: todas são reduzidas mantendo a
+proporção (lado menor = LADO_AVALIACAO), recortadas no centro para o mesmo
+tamanho e empilhadas num único array NumPy, e as métricas saem de operações
+vetorizadas sobre o lote inteiro (sem filtros PIL foto a foto). A leitura
+usa o modo draft do JPEG em paralelo. Os resultados ficam no catálogo.
+
+Como a nitidez é medida na mesma escala relativa ao quadro, ela não depende
+da resolução do arquivo; quem escolhe os destaques (página inteira) pondera
+a nitidez pelo DPI que a foto teria na página inteira e descarta as que
+ficariam abaixo de planejamento.DPI_MINIMO.
+
+EXECUÇÃO (avaliar e listar as fotos borradas):
+    python qualidade_fotos.py <pasta_raiz>
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from catalogo_fotos import CatalogoFotos
+from layouts import boxes_layout
+from planejamento import DPI_MINIMO, dpi_efetivo
+from previas import abrir_reduzida
+
+
+# Lado das imagens de trabalho (lado menor reduzido para LADO, recorte LADO x LADO)
+LADO_AVALIACAO = 256
+
+# Fotos por lote (256x256 float32 = 256 KB por foto)
+TAMANHO_LOTE = 128
+
+# Abaixo desta variância do Laplaciano a foto é considerada borrada
+LIMIAR_NITIDEZ = 50.0
+
+# Limites de pixel estourado/escuro (0-255)
+LIMITE_ESTOURADO = 250
+LIMITE_ESCURO = 5
+
+# Fração das fotos mais nítidas de cada capítulo que ganham página inteira (L1)
+FRACAO_DESTAQUE = 0.1
+
+# DPI a partir do qual a resolução não limita mais a nitidez impressa: abaixo
+# dele a nitidez dos destaques é ponderada por dpi / DPI_REFERENCIA_DESTAQUE
+DPI_REFERENCIA_DESTAQUE = 300
+
+# Métricas gravadas no catálogo
+METRICAS_QUALIDADE = ('nitidez', 'luminancia', 'estouradas', 'escuras')
+
+
+def _carregar_cinza(caminho: Path) -> Optional[np.ndarray]:
+    """
+    Lê a foto reduzida (draft) em tons de cinza, com o lado menor em LADO
+    (sem distorcer a proporção) e recortada no centro para LADO x LADO.
+    """
+    try:
+        img = abrir_reduzida(caminho, LADO_AVALIACAO, LADO_AVALIACAO)
+        img = ImageOps.fit(img.convert('L'), (LADO_AVALIACAO, LADO_AVALIACAO), Image.Resampling.BILINEAR)
+        return np.asarray(img, dtype=np.float32)
+    except Exception as e:
+        print(f"AVISO: Não foi possível avaliar a qualidade de {caminho}: {e}")
+        return None
+
+
+def avaliar_lote(lote: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Calcula as métricas de um lote (N, LADO, LADO) de imagens em cinza 0-255.
+
+    Retorna {métrica: array (N,)}.
+    """
+    centro = lote[:, 1:-1, 1:-1]
+    laplaciano = (lote[:, :-2, 1:-1] + lote[:, 2:, 1:-1] +
+                  lote[:, 1:-1, :-2] + lote[:, 1:-1, 2:] - 4 * centro)
+    return {
+        'nitidez': laplaciano.var(axis=(1, 2)),
+        'luminancia': lote.mean(axis=(1, 2)) / 255.0,
+        'estouradas': (lote >= LIMITE_ESTOURADO).mean(axis=(1, 2)),
+        'escuras': (lote <= LIMITE_ESCURO).mean(axis=(1, 2)),
+    }
+
+
+def avaliar_fotos(
+    caminhos: Sequence[Path],
+    catalogo: CatalogoFotos,
+    max_workers: int = 8
+) -> int:
+    """
+    Avalia as fotos que ainda não têm métricas no catálogo (em lotes).
+
+    Retorna quantas fotos foram avaliadas agora.
+    """
+    pendentes = [Path(c) for c in caminhos
+                 if catalogo.registro(c).get('nitidez') is None]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for inicio in range(0, len(pendentes), TAMANHO_LOTE):
+            caminhos_lote = pendentes[inicio:inicio + TAMANHO_LOTE]
+            imagens = list(executor.map(_carregar_cinza, caminhos_lote))
+
+            validos = [(c, img) for c, img in zip(caminhos_lote, imagens) if img is not None]
+            if not validos:
+                continue
+
+            metricas = avaliar_lote(np.stack([img for _, img in validos]))
+            for k, (caminho, _) in enumerate(validos):
+                registro = catalogo.registro(caminho)
+                for nome in METRICAS_QUALIDADE:
+                    registro[nome] = float(metricas[nome][k])
+                catalogo.marcar_alterado(caminho)
+
+    return len(pendentes)
+
+
+def qualidade_registro(registro: dict) -> Optional[dict]:
+    """Métricas de qualidade de um registro do catálogo (None se não avaliado)."""
+    if registro.get('nitidez') is None:
+        return None
+    qualidade = {nome: round(registro[nome], 4) for nome in METRICAS_QUALIDADE}
+    qualidade['borrada'] = registro['nitidez'] < LIMIAR_NITIDEZ
+    return qualidade
+
+
+def dpi_pagina_inteira(largura: int, altura: int) -> float:
+    """
+    DPI efetivo da foto numa página inteira (L1, zoom 1 = cover): o lado
+    que limita o recorte, na paridade de página com o slot maior.
+    """
+    return min(min(dpi_efetivo(largura, w_box), dpi_efetivo(altura, h_box))
+               for pagina_impar in (True, False)
+               for _, _, w_box, h_box in boxes_layout('L1', pagina_impar))
+
+
+def escolher_destaques(nitidezes: Sequence[Optional[float]],
+                       dimensoes: Sequence[Tuple[int, int]],
+                       fracao: float = FRACAO_DESTAQUE) -> Set[int]:
+    """
+    Índices das fotos mais nítidas de um capítulo, que merecem página
+    inteira. Fotos borradas, sem avaliação ou que ficariam abaixo de
+    DPI_MINIMO na página inteira nunca são destaque.
+
+    dimensoes são os (largura, altura) das fotos. A nitidez (medida numa
+    escala relativa ao quadro) é ponderada pelo DPI na página inteira até
+    DPI_REFERENCIA_DESTAQUE: entre duas fotos igualmente nítidas, ganha a
+    de maior resolução.
+    """
+    quantidade = int(len(nitidezes) * fracao)
+    pontuacoes = {}
+    for i, (nitidez, (largura, altura)) in enumerate(zip(nitidezes, dimensoes)):
+        if nitidez is None or nitidez < LIMIAR_NITIDEZ:
+            continue
+        dpi = dpi_pagina_inteira(largura, altura)
+        if dpi < DPI_MINIMO:
+            continue
+        pontuacoes[i] = nitidez * min(1.0, dpi / DPI_REFERENCIA_DESTAQUE)
+    candidatas = sorted(pontuacoes, key=pontuacoes.get, reverse=True)
+    return set(candidatas[:quantidade])
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    from varredura_fotos import escanear_pastas
+
+    if len(sys.argv) < 2:
+        print("Uso: python qualidade_fotos.py <pasta_raiz>")
+        sys.exit(1)
+
+    pasta_raiz = Path(sys.argv[1])
+    catalogo = CatalogoFotos(pasta_raiz)
+    fotos = escanear_pastas(pasta_raiz).todas_imagens()
+    catalogo.preparar(fotos)
+
+    inicio = time.perf_counter()
+    avaliadas = avaliar_fotos(fotos, catalogo)
+    catalogo.salvar()
+    print(f"{avaliadas} fotos avaliadas em {time.perf_counter() - inicio:.2f}s")
+
+    borradas: List[str] = []
+    for caminho in fotos:
+        qualidade = qualidade_registro(catalogo.registro(caminho))
+        if qualidade and qualidade['borrada']:
+            borradas.append(f"{catalogo.chave(caminho)} (nitidez {qualidade['nitidez']:.1f})")
+    print(f"{len(borradas)} fotos borradas")
+    for linha in borradas:
+        print(f"  {linha}")
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de Recortes do Fotolivro (vetorizado)
+
+Toda a matemática de enquadramento num só lugar, sobre arrays NumPy: cada
+função recebe arrays (N,) de tamanhos de foto, tamanhos de slot, pan/zoom
+ou regiões-âncora e devolve os N retângulos de uma vez. Assim o livro
+inteiro é enquadrado numa única chamada, em vez de foto a foto em escalares.
+
+Dois modelos de enquadramento convivem:
+- Recorte (fotolivro.py): a parte da foto com o aspect ratio do slot que
+  é embutida no PDF. recortes_inteligentes posiciona o recorte pelas
+  regiões de pessoas; recortes_com_ajuste, pelo pan/zoom do usuário.
+- Exibição (PDFRenderer e preview): a foto inteira é escalada (zoom 1 =
+  cover, zoom < 1 até contain) e deslocada pelo pan; o slot recorta o que
+  sobra. geometrias_exibicao dá a posição da foto e recortes_visiveis, a
+  parte da foto que de fato aparece no slot.
+
+Só depende do NumPy (nada de OpenCV), então serve ao preview e ao PDF.
+A paridade com as implementações escalares antigas é verificada em
+tests/test_recortes.py (o tempo, em benchmark.py, medição 'recortes').
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+# Margem (fração) adicionada ao redor da união das regiões-âncora
+MARGEM_ANCORAS = 0.1
+
+
+def _arrays(*valores) -> Tuple[np.ndarray, ...]:
+    """Converte os argumentos para arrays float64 de mesmo formato (N,)."""
+    return tuple(np.asarray(v, dtype=np.float64) for v in np.broadcast_arrays(*valores))
+
+
+def _recorte_cover(img_w: np.ndarray, img_h: np.ndarray, ratio_slot: np.ndarray,
+                   empate_corta_largura: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Maior recorte (largura, altura) com o aspect ratio do slot.
+
+    Com a proporção da foto igual à do slot, int(altura * proporção) nem
+    sempre volta à largura; empate_corta_largura escolhe o lado calculado,
+    como nas versões escalares (recorte inteligente com '>=', recorte com
+    ajuste com '>').
+    """
+    ratio_img = np.divide(img_w, img_h, out=np.ones_like(img_w), where=img_h > 0)
+    if empate_corta_largura:
+        mais_larga = ratio_img >= ratio_slot
+    else:
+        mais_larga = ratio_img > ratio_slot
+    crop_w = np.where(mais_larga, np.trunc(img_h * ratio_slot), img_w)
+    crop_h = np.where(mais_larga, img_h, np.trunc(img_w / ratio_slot))
+    return crop_w, crop_h
+
+
+def recortes_inteligentes(
+    img_w: Sequence[int],
+    img_h: Sequence[int],
+    slot_w: Sequence[float],
+    slot_h: Sequence[float],
+    ancoras: Sequence[Sequence[Tuple[int, int, int, int]]]
+) -> np.ndarray:
+    """
+    Recorte cover de cada foto posicionado para não cortar as regiões-âncora
+    (pessoas detectadas ou região saliente). Sem âncoras, o recorte é
+    centralizado.
+
+    Estratégia (por foto): centralizar o recorte no centro das âncoras
+    ponderado pela área; se a união das âncoras (com MARGEM_ANCORAS) ficar
+    de fora, deslocar o recorte até ela caber; manter dentro da imagem.
+
+    Args:
+        img_w, img_h: Tamanho de cada foto em pixels
+        slot_w, slot_h: Tamanho de cada slot (qualquer unidade; só a proporção importa)
+        ancoras: Para cada foto, lista de (x, y, largura, altura) em pixels
+
+    Retorna:
+        Array int64 (N, 4) com (x, y, largura, altura) de cada recorte.
+    """
+    img_w, img_h, slot_w, slot_h = _arrays(img_w, img_h, slot_w, slot_h)
+    crop_w, crop_h = _recorte_cover(img_w, img_h, slot_w / slot_h)
+    n = len(img_w)
+
+    # Todas as âncoras do livro num só array, com o índice da foto de cada uma
+    contagem = np.array([len(a) for a in ancoras], dtype=np.int64)
+    dono = np.repeat(np.arange(n), contagem)
+    caixas = np.array([r for a in ancoras for r in a], dtype=np.float64).reshape(-1, 4)
+    rx, ry, rw, rh = caixas.T
+    tem_ancoras = contagem > 0
+
+    # Centro das âncoras ponderado pela área
+    area = rw * rh
+    total_area = np.bincount(dono, area, minlength=n)
+    soma_x = np.bincount(dono, (rx + rw / 2) * area, minlength=n)
+    soma_y = np.bincount(dono, (ry + rh / 2) * area, minlength=n)
+    com_area = total_area > 0
+    centro_x = np.where(com_area, soma_x / np.where(com_area, total_area, 1), img_w / 2)
+    centro_y = np.where(com_area, soma_y / np.where(com_area, total_area, 1), img_h / 2)
+
+    # União das âncoras de cada foto, com margem
+    x_min = np.full(n, np.inf)
+    y_min = np.full(n, np.inf)
+    x_max = np.full(n, -np.inf)
+    y_max = np.full(n, -np.inf)
+    np.minimum.at(x_min, dono, rx)
+    np.minimum.at(y_min, dono, ry)
+    np.maximum.at(x_max, dono, rx + rw)
+    np.maximum.at(y_max, dono, ry + rh)
+    x_min, y_min = np.where(tem_ancoras, x_min, 0), np.where(tem_ancoras, y_min, 0)
+    face_w = np.where(tem_ancoras, x_max, img_w) - x_min
+    face_h = np.where(tem_ancoras, y_max, img_h) - y_min
+
+    face_x = np.maximum(0, x_min - np.trunc(face_w * MARGEM_ANCORAS))
+    face_y = np.maximum(0, y_min - np.trunc(face_h * MARGEM_ANCORAS))
+    face_w = np.minimum(img_w - face_x, np.trunc(face_w * (1 + 2 * MARGEM_ANCORAS)))
+    face_h = np.minimum(img_h - face_y, np.trunc(face_h * (1 + 2 * MARGEM_ANCORAS)))
+
+    # Centralizar no centro das âncoras e deslocar até a união caber
+    crop_x = np.trunc(centro_x - crop_w / 2)
+    crop_y = np.trunc(centro_y - crop_h / 2)
+    crop_x = np.where(face_x < crop_x, np.maximum(0, face_x), crop_x)
+    crop_x = np.where(face_x + face_w > crop_x + crop_w,
+                      np.minimum(img_w - crop_w, face_x + face_w - crop_w), crop_x)
+    crop_y = np.where(face_y < crop_y, np.maximum(0, face_y), crop_y)
+    crop_y = np.where(face_y + face_h > crop_y + crop_h,
+                      np.minimum(img_h - crop_h, face_y + face_h - crop_h), crop_y)
+
+    # Manter dentro da imagem
+    crop_x = np.maximum(0, np.minimum(crop_x, img_w - crop_w))
+    crop_y = np.maximum(0, np.minimum(crop_y, img_h - crop_h))
+    ancorado_w = np.maximum(1, np.minimum(crop_w, img_w - crop_x))
+    ancorado_h = np.maximum(1, np.minimum(crop_h, img_h - crop_y))
+
+    # Sem âncoras: recorte centralizado
+    recortes = np.stack([
+        np.where(tem_ancoras, crop_x, np.floor((img_w - crop_w) / 2)),
+        np.where(tem_ancoras, crop_y, np.floor((img_h - crop_h) / 2)),
+        np.where(tem_ancoras, ancorado_w, crop_w),
+        np.where(tem_ancoras, ancorado_h, crop_h),
+    ], axis=1)
+    return recortes.astype(np.int64)
+
+
+def recortes_com_ajuste(
+    img_w: Sequence[int],
+    img_h: Sequence[int],
+    slot_w: Sequence[float],
+    slot_h: Sequence[float],
+    pan_x: Sequence[float],
+    pan_y: Sequence[float],
+    zoom: Sequence[float]
+) -> np.ndarray:
+    """
+    Recorte de cada foto pelo ajuste do usuário: o recorte cover é reduzido
+    pelo zoom (nunca maior que a foto) e posicionado pelo pan (0 = esquerda/
+    topo, 1 = direita/base).
+
+    Retorna:
+        Array int64 (N, 4) com (x, y, largura, altura) de cada recorte.
+    """
+    img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom = _arrays(
+        img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom
+    )
+    crop_w, crop_h = _recorte_cover(img_w, img_h, slot_w / slot_h, empate_corta_largura=False)
+    crop_w = np.minimum(np.trunc(crop_w / zoom), img_w)
+    crop_h = np.minimum(np.trunc(crop_h / zoom), img_h)
+
+    max_x = img_w - crop_w
+    max_y = img_h - crop_h
+    crop_x = np.clip(np.trunc(pan_x * max_x), 0, max_x)
+    crop_y = np.clip(np.trunc(pan_y * max_y), 0, max_y)
+    return np.stack([crop_x, crop_y, crop_w, crop_h], axis=1).astype(np.int64)
+
+
+def geometrias_exibicao(
+    img_w: Sequence[int],
+    img_h: Sequence[int],
+    slot_w: Sequence[float],
+    slot_h: Sequence[float],
+    pan_x: Sequence[float],
+    pan_y: Sequence[float],
+    zoom: Sequence[float]
+) -> np.ndarray:
+    """
+    Onde cada foto inteira é desenhada no seu slot (modelo do preview e do
+    PDFRenderer): zoom 1 = cover, zoom < 1 mostra mais (até contain); o pan
+    distribui a sobra (0.5 = centralizado; pan_y = 0 mostra o topo).
+
+    Retorna:
+        Array float64 (N, 5) com (x, y, largura, altura, escala): posição da
+        foto a partir do canto inferior esquerdo do slot (eixo Y do PDF, pode
+        exceder o slot), tamanho desenhado e unidades do slot por pixel.
+    """
+    img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom = _arrays(
+        img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom
+    )
+    scale_x = slot_w / img_w
+    scale_y = slot_h / img_h
+    base_cover_scale = np.maximum(scale_x, scale_y)
+    base_contain_scale = np.minimum(scale_x, scale_y)
+
+    com_escala = base_cover_scale > 0
+    min_zoom = np.where(com_escala,
+                        base_contain_scale / np.where(com_escala, base_cover_scale, 1), 0.3)
+    final_scale = base_cover_scale * np.maximum(min_zoom, zoom)
+
+    display_w = img_w * final_scale
+    display_h = img_h * final_scale
+    offset_x = -(display_w - slot_w) * pan_x
+    offset_y = -(display_h - slot_h) * (1 - pan_y)
+    return np.stack([offset_x, offset_y, display_w, display_h, final_scale], axis=1)
+
+
+def recortes_visiveis(
+    img_w: Sequence[int],
+    img_h: Sequence[int],
+    slot_w: Sequence[float],
+    slot_h: Sequence[float],
+    pan_x: Sequence[float],
+    pan_y: Sequence[float],
+    zoom: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parte de cada foto que aparece no slot, no modelo de exibição
+    (geometrias_exibicao).
+
+    Retorna (fontes, destinos), arrays float64 (N, 4):
+        fontes: (x, y, largura, altura) em pixels da foto (origem no topo esquerdo)
+        destinos: (x, y, largura, altura) no slot (origem no canto inferior
+            esquerdo); menor que o slot quando o zoom mostra a foto inteira,
+            largura/altura 0 quando o pan tira a foto do slot
+    """
+    _, _, slot_w, slot_h, _, _, _ = _arrays(img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom)
+    geometria = geometrias_exibicao(img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom)
+    x, y, largura, altura, escala = geometria.T
+
+    dest_x0 = np.maximum(0, x) + 0.0  # + 0.0: sem -0.0 no JSON do preview
+    dest_y0 = np.maximum(0, y) + 0.0
+    # Pan fora de 0..1 pode tirar a foto inteira do slot: nada visível (largura 0)
+    dest_x1 = np.maximum(dest_x0, np.minimum(slot_w, x + largura))
+    dest_y1 = np.maximum(dest_y0, np.minimum(slot_h, y + altura))
+
+    fontes = np.stack([
+        (dest_x0 - x) / escala,
+        (y + altura - dest_y1) / escala,
+        (dest_x1 - dest_x0) / escala,
+        (dest_y1 - dest_y0) / escala,
+    ], axis=1)
+    destinos = np.stack([dest_x0, dest_y0, dest_x1 - dest_x0, dest_y1 - dest_y0], axis=1)
+    return fontes, destinos
+
+
+def enquadramentos_iniciais(
+    img_w: Sequence[int],
+    img_h: Sequence[int],
+    slot_w: Sequence[float],
+    slot_h: Sequence[float],
+    ancoras: Sequence[Sequence[Tuple[int, int, int, int]]]
+) -> np.ndarray:
+    """
+    Converte o recorte inteligente (recortes_inteligentes) de cada foto no
+    pan/zoom do modelo de exibição: pan de 0 a 1 sobre a sobra do cover,
+    zoom 1 = cover. Fotos sem âncoras ficam centralizadas (0.5, 0.5, 1.0).
+
+    Retorna:
+        Array float64 (N, 3) com (pan_x, pan_y, zoom), arredondados a 4 casas.
+    """
+    img_w, img_h, slot_w, slot_h = _arrays(img_w, img_h, slot_w, slot_h)
+    crop_x, crop_y, crop_w, crop_h = recortes_inteligentes(
+        img_w, img_h, slot_w, slot_h, ancoras
+    ).T.astype(np.float64)
+    cover_w, _ = _recorte_cover(img_w, img_h, slot_w / slot_h)
+
+    sobra_x = img_w - crop_w
+    sobra_y = img_h - crop_h
+    pan_x = np.where(sobra_x > 0, crop_x / np.where(sobra_x > 0, sobra_x, 1), 0.5)
+    pan_y = np.where(sobra_y > 0, crop_y / np.where(sobra_y > 0, sobra_y, 1), 0.5)
+    zoom = np.maximum(1.0, cover_w / np.maximum(crop_w, 1))
+
+    sem_ancoras = np.array([len(a) == 0 for a in ancoras], dtype=bool)
+    enquadramentos = np.stack([pan_x, pan_y, zoom], axis=1)
+    enquadramentos[sem_ancoras] = (0.5, 0.5, 1.0)
+    return np.round(enquadramentos, 4)
@@ -13,67 +13,16 @@ O schema define:
 """
 
 import json
+import os
+import threading
+from bisect import bisect_right
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
-from PIL import Image
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
 
-# Constantes
-PASTAS_ANOS = ["Infantil1", "Infantil2", "Infantil3", "Infantil4", "Infantil5"]
-EXTENSOES_IMAGEM = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp"}
-
-TITULOS_ANOS = {
-    "Infantil1": ("Infantil 1", "2021"),
-    "Infantil2": ("Infantil 2", "2022"),
-    "Infantil3": ("Infantil 3", "2023"),
-    "Infantil4": ("Infantil 4", "2024"),
-    "Infantil5": ("Infantil 5", "2025"),
-}
-
-TITULO_CAPA = "Bruno Sereia Broering"
-SUBTITULO_CAPA = "Momentos no Infantil 1 ao 5"
-PERIODO_CAPA = "2021 ~ 2025"
-
-
-def classificar_imagem(largura: int, altura: int) -> str:
-    """Classifica uma imagem como paisagem, retrato ou quadrada."""
-    if largura == 0 or altura == 0:
-        return 'paisagem'
-    
-    ratio = largura / altura
-    
-    if 0.9 <= ratio <= 1.1:
-        return 'quadrada'
-    elif ratio > 1:
-        return 'paisagem'
-    else:
-        return 'retrato'
-
-
-def encontrar_pasta_ano(diretorio_raiz: Path, nome_pasta: str) -> Optional[Path]:
-    """Encontra uma pasta de ano no diretório raiz (case-insensitive)."""
-    diretorio_raiz = Path(diretorio_raiz)
-    if not diretorio_raiz.exists():
-        return None
-    
-    for item in diretorio_raiz.iterdir():
-        if item.is_dir() and item.name.lower() == nome_pasta.lower():
-            return item
-    
-    return None
-
-
-def listar_imagens(pasta: Path) -> List[Path]:
-    """Lista todas as imagens válidas em uma pasta, ordenadas por nome."""
-    imagens = []
-    if not pasta.exists() or not pasta.is_dir():
-        return imagens
-    
-    for arquivo in sorted(pasta.iterdir()):
-        if arquivo.is_file() and arquivo.suffix.lower() in EXTENSOES_IMAGEM:
-            imagens.append(arquivo)
-    
-    return imagens
+from constantes import (PASTAS_ANOS, EXTENSOES_IMAGEM, TITULOS_ANOS, TITULO_CAPA,
+                        SUBTITULO_CAPA, PERIODO_CAPA, SUBTITULO_CONTRA_CAPA,
+                        classificar_imagem)
 
 
 @dataclass
@@ -88,19 +37,77 @@ class FotoSchema:
     pan_y: float = 0.5  # Posição vertical do pan (0-1)
     zoom: float = 1.0  # Nível de zoom
     slot_tipo: str = 'auto'  # Tipo de slot definido pelo usuário
+    qualidade: Optional[Dict[str, Any]] = None  # Nitidez/exposição (ver qualidade_fotos.py)
+    regioes: Optional[List[List[int]]] = None  # Pessoas detectadas [x, y, largura, altura] (pixels)
+    evento: int = 0  # Evento da foto no capítulo (eventos.py); páginas não misturam eventos
 
 
 @dataclass
 class PaginaSchema:
     """Schema de uma página do fotolivro."""
     tipo: str  # 'capa', 'subcapa', 'conteudo', 'contra_capa'
-    layout: str  # 'L1', 'L2H', 'L2V', 'L3A', 'L3B', 'L3C', 'L3D', 'L4'
+    layout: str  # 'L1', 'L2H', 'L2V', 'L3A', 'L3B', 'L3C', 'L3D', 'L4' ou colagem 'J:3-2' (layouts.py)
     fotos: List[FotoSchema]  # Lista de fotos na página
     # Campos opcionais para capas
     titulo: str = ""
     subtitulo: str = ""
     ano: str = ""
     imagem: str = ""  # Caminho da imagem pré-gerada (para capas)
+    
+    def proporcoes(self) -> List[float]:
+        """Proporção (largura/altura) das fotos na ordem dos slots (boxes das colagens)."""
+        fotos = sorted(self.fotos, key=lambda f: f.slot_index)
+        return [f.largura / f.altura if f.altura else 1.0 for f in fotos]
+
+
+@dataclass(eq=False)
+class IndiceCapitulo:
+    """Trecho de páginas de conteúdo de um capítulo e a ordem das suas fotos."""
+    inicio: int  # Índice da primeira página de conteúdo
+    fim: int  # Índice depois da última página de conteúdo (exclusivo)
+    fotos: List[FotoSchema]  # Fotos do capítulo, na ordem das páginas
+    primeira_foto: List[int]  # Posição em fotos da primeira foto de cada página (e o total no fim)
+    tabela: Any = None  # TabelaPaginacao das fotos (paginacao.py), calculada sob demanda
+    tipos_tabela: Optional[Tuple[str, ...]] = None  # slot_tipos efetivos (com destaques) da tabela
+
+
+@dataclass
+class Repaginacao:
+    """
+    Páginas trocadas por uma repaginação incremental: as páginas
+    [inicio, inicio + removidas) viraram [inicio, inicio + inseridas), e as
+    seguintes andaram inseridas - removidas posições.
+    """
+    inicio: int
+    removidas: int
+    inseridas: int
+    alteradas: List[int]  # Índices (já na numeração nova) das páginas cujo conteúdo mudou
+
+
+def _tipos_paginacao(tipos: List[str], nitidezes: List[Optional[float]],
+                     dimensoes: List[Tuple[int, int]]) -> List[str]:
+    """
+    slot_tipo efetivo de cada foto de um capítulo na paginação: os
+    destaques do capítulo (qualidade_fotos.escolher_destaques) sem slot_tipo
+    definido ganham página inteira, como se fossem 'full'.
+    """
+    from qualidade_fotos import escolher_destaques
+    destaques = escolher_destaques(nitidezes, dimensoes)
+    return ['full' if tipo == 'auto' and i in destaques else tipo for i, tipo in enumerate(tipos)]
+
+
+def _fotos_paginacao(fotos: List[FotoSchema]) -> List:
+    """
+    O que a paginação e a avaliação de layouts (paginacao.py) precisam de
+    cada foto. fotos é um capítulo inteiro: os destaques são escolhidos
+    entre elas, como em _agrupar_capitulos.
+    """
+    from paginacao import FotoPaginacao
+    tipos = _tipos_paginacao([f.slot_tipo for f in fotos],
+                             [(f.qualidade or {}).get('nitidez') for f in fotos],
+                             [(f.largura, f.altura) for f in fotos])
+    return [FotoPaginacao(f.largura, f.altura, tipo, tuple(tuple(r) for r in f.regioes or []), f.evento)
+            for f, tipo in zip(fotos, tipos)]
 
 
 class SchemaManager:
@@ -110,6 +117,13 @@ class SchemaManager:
         self.pasta_raiz = Path(pasta_raiz)
         self.schema_path = self.pasta_raiz / "schema_fotolivro.json"
         self.paginas: List[PaginaSchema] = []
+        # Índice dos capítulos (trechos de páginas de conteúdo), mantido
+        # incrementalmente pela repaginação; refeito se self.paginas mudar por fora
+        self._capitulos: List[IndiceCapitulo] = []
+        self._paginas_indexadas = -1
+        # Trava do schema: o preview muda as páginas nas requisições enquanto
+        # salva e prepara a repaginação em outras threads
+        self.trava = threading.RLock()
     
     def carregar(self) -> bool:
         """Carrega o schema do arquivo JSON."""
@@ -137,41 +151,109 @@ class SchemaManager:
                 )
                 self.paginas.append(pag)
             
+            self._indexar_capitulos()
             return True
         except Exception as e:
             print(f"Erro ao carregar schema: {e}")
             return False
     
     def salvar(self):
-        """Salva o schema no arquivo JSON."""
-        data = {
-            'versao': '1.0',
-            'total_paginas': len(self.paginas),
-            'paginas': []
-        }
+        """
+        Salva o schema no arquivo JSON.
         
-        for pag in self.paginas:
-            pag_data = {
-                'tipo': pag.tipo,
-                'layout': pag.layout,
-                'fotos': [asdict(f) for f in pag.fotos],
-                'titulo': pag.titulo,
-                'subtitulo': pag.subtitulo,
-                'ano': pag.ano,
-                'imagem': pag.imagem
+        Grava num arquivo temporário e renomeia, com a trava do schema: um
+        salvamento em outra thread (salvamento adiado do preview) nunca vê
+        páginas pela metade nem deixa o arquivo pela metade, e dois
+        salvamentos não se atropelam.
+        """
+        with self.trava:
+            data = {
+                'versao': '1.0',
+                'total_paginas': len(self.paginas),
+                'paginas': [self.pagina_para_dict(pag) for pag in self.paginas]
             }
-            data['paginas'].append(pag_data)
-        
-        with open(self.schema_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            
+            temporario = self.schema_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(temporario, self.schema_path)
     
-    def gerar_schema_inicial(self):
-        """Gera o schema inicial baseado nas fotos existentes."""
+    def gerar_schema_inicial(self, varredura=None, ordem: str = 'nome',
+                             remover_duplicatas: bool = False,
+                             orcamento_paginas: Optional[int] = None, eventos: bool = True,
+                             jobs: int = 1):
+        """
+        Gera o schema inicial baseado nas fotos existentes.
+        
+        Args:
+            varredura: VarreduraFotos já feita (ex.: compartilhada com o
+                gerador); se None, a pasta raiz é varrida aqui.
+            ordem: 'nome' (nome do arquivo) ou 'captura' (data EXIF) para
+                ordenar as fotos dentro de cada ano.
+            remover_duplicatas: Se True, fotos quase duplicadas (mesmo em
+                anos diferentes) ficam de fora; só a melhor de cada grupo entra.
+            orcamento_paginas: Máximo de páginas do livro, capas incluídas
+                (None = sem limite); a paginação junta mais fotos por página
+                até caber.
+            eventos: Com ordem='captura', separa cada ano em eventos
+                (eventos.py) e nenhuma página mistura dois; False desliga.
+            jobs: Processos da detecção de pessoas (como o --jobs do
+                fotolivro.py); o pool só existe se houver fotos sem detecção.
+        """
+        separar_eventos = eventos and ordem == 'captura'
         self.paginas = []
         
         # Carregar ajustes antigos para considerar slot_tipos no agrupamento
         ajustes_antigos = self._carregar_ajustes_antigos()
         
+        # Catálogo de metadados: evita reabrir fotos que não mudaram
+        from catalogo_fotos import CatalogoFotos
+        catalogo = CatalogoFotos(self.pasta_raiz)
+        
+        # Varredura única das pastas dos anos
+        if varredura is None:
+            from varredura_fotos import escanear_pastas
+            varredura = escanear_pastas(self.pasta_raiz, PASTAS_ANOS, EXTENSOES_IMAGEM)
+        
+        # Sondar pelo cabeçalho, em paralelo, só as fotos novas ou alteradas
+        catalogo.preparar(varredura.todas_imagens())
+        
+        # Duplicatas saem antes do agrupamento (economiza páginas inteiras)
+        descartadas = set()
+        if remover_duplicatas:
+            from duplicatas import encontrar_duplicatas, fotos_descartadas
+            descartadas = fotos_descartadas(
+                encontrar_duplicatas(varredura.todas_imagens(), catalogo)
+            )
+            if descartadas:
+                print(f"Removendo {len(descartadas)} fotos duplicadas")
+        
+        # Nitidez e exposição de todas as fotos, em lote (só as ainda não avaliadas)
+        from qualidade_fotos import avaliar_fotos, qualidade_registro
+        avaliar_fotos([c for c in varredura.todas_imagens() if c not in descartadas], catalogo)
+        
+        # Regiões de pessoas de todas as fotos, em `jobs` processos (só as
+        # novas ou alteradas; o resto vem do catálogo). O enquadramento
+        # inicial sai delas aqui, então o PDFRenderer e o preview só leem
+        # pan/zoom e nunca precisam do OpenCV.
+        from fotolivro import detectar_em_paralelo
+        from layouts import boxes_layout
+        from previas import ArmazemPrevias
+        from recortes import enquadramentos_iniciais
+        previas = ArmazemPrevias(self.pasta_raiz, catalogo)
+        detectar_em_paralelo(
+            [c for c in varredura.todas_imagens() if c not in descartadas],
+            catalogo, jobs, previas=previas
+        )
+        
+        # Histograma de cor das prévias (só os que faltam no catálogo): com
+        # as datas de captura, separa os eventos de cada capítulo
+        from eventos import calcular_histogramas, eventos_fotos
+        if separar_eventos:
+            calcular_histogramas([c for c in varredura.todas_imagens() if c not in descartadas],
+                                 catalogo, previas)
+        a_enquadrar = []  # (FotoSchema, largura do slot, altura do slot) sem ajuste salvo
+        
         # Capa principal
         capa_img = self.pasta_raiz / "_capas" / "capa.jpg"
         self.paginas.append(PaginaSchema(
@@ -184,35 +266,27 @@ class SchemaManager:
             imagem='_capas/capa.jpg' if capa_img.exists() else ''
         ))
         
-        # Processar cada ano
-        for nome_pasta in PASTAS_ANOS:
-            pasta = encontrar_pasta_ano(self.pasta_raiz, nome_pasta)
-            if pasta is None:
+        # Informações das fotos de cada ano
+        capitulos_info = []  # (pasta do ano, fotos)
+        for capitulo in varredura.capitulos:
+            nome_pasta = capitulo.nome_pasta
+            if capitulo.pasta is None:
                 continue
             
-            caminhos = listar_imagens(pasta)
+            caminhos = [c for c in capitulo.imagens if c not in descartadas]
+            if ordem == 'captura':
+                caminhos = catalogo.ordenar_por_captura(caminhos)
             if not caminhos:
                 continue
             
-            # Subcapa do ano
-            titulo_ano, ano = TITULOS_ANOS.get(nome_pasta, (nome_pasta, ""))
-            subcapa_img = self.pasta_raiz / "_capas" / f"subcapa_{nome_pasta.lower()}.jpg"
-            self.paginas.append(PaginaSchema(
-                tipo='subcapa',
-                layout='L1',
-                fotos=[],
-                titulo=titulo_ano,
-                ano=ano,
-                imagem=f'_capas/subcapa_{nome_pasta.lower()}.jpg' if subcapa_img.exists() else ''
-            ))
-            
             # Carregar informações das fotos
+            eventos_capitulo = (eventos_fotos(caminhos, catalogo).tolist() if separar_eventos
+                                else [0] * len(caminhos))
             fotos_info = []
-            for caminho in caminhos:
-                try:
-                    with Image.open(caminho) as img:
-                        largura, altura = img.size
-                except:
+            for caminho, evento in zip(caminhos, eventos_capitulo):
+                registro = catalogo.registro(caminho)
+                largura, altura = registro['largura'], registro['altura']
+                if largura <= 0 or altura <= 0:
                     largura, altura = 1920, 1080
                 
                 foto_path = str(caminho.relative_to(self.pasta_raiz))
@@ -222,31 +296,61 @@ class SchemaManager:
                     'caminho': foto_path,
                     'largura': largura,
                     'altura': altura,
-                    'orientacao': orientacao
+                    'orientacao': orientacao,
+                    'qualidade': qualidade_registro(registro),
+                    'regioes': [list(r) for r in registro['rostos'] or []],
+                    'evento': evento
                 })
             
-            # Agrupar fotos em páginas (considerando slot_tipos existentes)
-            grupos = self._agrupar_fotos_inicial(fotos_info, ajustes_antigos)
+            capitulos_info.append((nome_pasta, fotos_info))
+        
+        # Agrupar fotos em páginas (considerando slot_tipos existentes), o
+        # livro inteiro de uma vez: o orçamento de páginas é do livro todo
+        grupos_por_capitulo = self._agrupar_capitulos(
+            [fotos_info for _, fotos_info in capitulos_info], ajustes_antigos, orcamento_paginas
+        )
+        
+        for (nome_pasta, _), grupos in zip(capitulos_info, grupos_por_capitulo):
+            # Subcapa do ano
+            titulo_ano, ano = TITULOS_ANOS.get(nome_pasta, (nome_pasta, ""))
+            subcapa_img = self.pasta_raiz / "_capas" / f"subcapa_{nome_pasta.lower()}.jpg"
+            self.paginas.append(PaginaSchema(
+                tipo='subcapa',
+                layout='L1',
+                fotos=[],
+                titulo=titulo_ano,
+                ano=ano,
+                imagem=f'_capas/subcapa_{nome_pasta.lower()}.jpg' if subcapa_img.exists() else ''
+            ))
             
-            for grupo in grupos:
-                layout = self._escolher_layout_inicial(grupo, ajustes_antigos)
+            for layout, grupo, slots in grupos:
+                # Slots iguais nas duas paridades
+                por_slot = sorted(range(len(grupo)), key=lambda i: slots[i])
+                boxes = boxes_layout(layout, True, [grupo[i]['largura'] / grupo[i]['altura'] for i in por_slot])
                 
                 fotos_schema = []
-                for i, foto in enumerate(grupo):
+                for foto, slot in zip(grupo, slots):
                     # Usar ajustes existentes se houver
                     aj = ajustes_antigos.get(foto['caminho'], {})
                     
-                    fotos_schema.append(FotoSchema(
+                    foto_schema = FotoSchema(
                         caminho=foto['caminho'],
                         largura=foto['largura'],
                         altura=foto['altura'],
                         orientacao=foto['orientacao'],
-                        slot_index=i,
+                        slot_index=slot,
                         pan_x=aj.get('pan_x', 0.5),
                         pan_y=aj.get('pan_y', 0.5),
                         zoom=aj.get('zoom', 1.0),
-                        slot_tipo=aj.get('slot_tipo', 'auto')
-                    ))
+                        slot_tipo=aj.get('slot_tipo', 'auto'),
+                        qualidade=foto['qualidade'],
+                        regioes=foto['regioes'],
+                        evento=foto['evento']
+                    )
+                    fotos_schema.append(foto_schema)
+                    if not {'pan_x', 'pan_y', 'zoom'} & aj.keys():
+                        _, _, w_box, h_box = boxes[slot] if slot < len(boxes) else boxes[-1]
+                        a_enquadrar.append((foto_schema, w_box, h_box))
                 
                 self.paginas.append(PaginaSchema(
                     tipo='conteudo',
@@ -254,157 +358,106 @@ class SchemaManager:
                     fotos=fotos_schema
                 ))
         
+        # Sem ajuste salvo: enquadrar as pessoas detectadas no aspect ratio
+        # do slot (o livro inteiro numa chamada ao motor de recortes)
+        if a_enquadrar:
+            enquadramentos = enquadramentos_iniciais(
+                [f.largura for f, _, _ in a_enquadrar], [f.altura for f, _, _ in a_enquadrar],
+                [w for _, w, _ in a_enquadrar], [h for _, _, h in a_enquadrar],
+                [f.regioes for f, _, _ in a_enquadrar]
+            )
+            for (foto_schema, _, _), (pan_x, pan_y, zoom) in zip(a_enquadrar, enquadramentos.tolist()):
+                foto_schema.pan_x, foto_schema.pan_y, foto_schema.zoom = pan_x, pan_y, zoom
+        
+        catalogo.salvar()
+        
         # Contra capa
         contra_capa_img = self.pasta_raiz / "_capas" / "contra_capa.jpg"
         self.paginas.append(PaginaSchema(
             tipo='contra_capa',
             layout='L1',
             fotos=[],
-            titulo='Bruno Sereia Broering',
-            subtitulo='Infantil 2021 ~ 2025',
+            titulo=TITULO_CAPA,
+            subtitulo=SUBTITULO_CONTRA_CAPA,
             imagem='_capas/contra_capa.jpg' if contra_capa_img.exists() else ''
         ))
         
+        self._indexar_capitulos()
         self.salvar()
     
-    def _agrupar_fotos_inicial(self, fotos: List[Dict], ajustes: Dict = None) -> List[List[Dict]]:
+    def encontrar_duplicatas(self, varredura=None) -> List[Dict]:
         """
-        Agrupa fotos em páginas considerando slot_tipos definidos.
+        Lista os grupos de fotos quase duplicadas entre todos os anos.
         
-        Args:
-            fotos: Lista de dicts com info das fotos
-            ajustes: Dict de ajustes existentes (caminho -> {slot_tipo, ...})
+        Retorna lista de {'manter': caminho, 'duplicatas': [caminhos]}, com
+        caminhos relativos à pasta raiz; 'manter' é a foto de maior resolução.
         """
-        if ajustes is None:
-            ajustes = {}
-        
-        def get_slot_tipo(foto):
-            """Obtém slot_tipo de uma foto."""
-            return ajustes.get(foto['caminho'], {}).get('slot_tipo', 'auto')
+        from catalogo_fotos import CatalogoFotos
+        from duplicatas import encontrar_duplicatas
+        
+        if varredura is None:
+            from varredura_fotos import escanear_pastas
+            varredura = escanear_pastas(self.pasta_raiz, PASTAS_ANOS, EXTENSOES_IMAGEM)
+        
+        catalogo = CatalogoFotos(self.pasta_raiz)
+        catalogo.preparar(varredura.todas_imagens())
+        grupos = encontrar_duplicatas(varredura.todas_imagens(), catalogo)
+        catalogo.salvar()
+        
+        return [
+            {
+                'manter': catalogo.chave(grupo[0]),
+                'duplicatas': [catalogo.chave(c) for c in grupo[1:]]
+            }
+            for grupo in grupos
+        ]
+    
+    def _agrupar_capitulos(self, capitulos: List[List[Dict]], ajustes: Dict = None,
+                           orcamento_paginas: Optional[int] = None) -> List[List[Tuple[str, List[Dict], List[int]]]]:
+        """
+        Divide as fotos de cada capítulo em páginas com a paginação ótima
+        (paginacao.py), considerando os slot_tipos definidos e sem misturar
+        eventos numa página, e escolhe o layout de cada página com a
+        avaliação de layouts (avaliacao_layouts.py).
         
-        grupos = []
-        i = 0
+        As fotos mais nítidas do capítulo (destaques) sem slot_tipo definido
+        ganham página inteira, como se fossem 'full'.
         
-        while i < len(fotos):
-            foto_atual = fotos[i]
-            restantes = len(fotos) - i
-            slot_tipo = get_slot_tipo(foto_atual)
-            
-            # Foto com tipo 'full' vai sozinha
-            if slot_tipo == 'full':
-                grupos.append([foto_atual])
-                i += 1
-                continue
-            
-            # Fotos verticais (fv-l ou fv-r) formam par com próxima
-            if slot_tipo in ['fv-l', 'fv-r']:
-                if restantes >= 2:
-                    proxima = fotos[i + 1]
-                    tipo_proxima = get_slot_tipo(proxima)
-                    if tipo_proxima in ['fv-l', 'fv-r', 'square', 'auto']:
-                        grupos.append([foto_atual, proxima])
-                        i += 2
-                        continue
-                # Sozinha
-                grupos.append([foto_atual])
-                i += 1
-                continue
-            
-            # Fotos horizontais (fh-t ou fh-b) formam par
-            if slot_tipo in ['fh-t', 'fh-b']:
-                if restantes >= 2:
-                    proxima = fotos[i + 1]
-                    tipo_proxima = get_slot_tipo(proxima)
-                    if tipo_proxima in ['fh-t', 'fh-b', 'square', 'auto']:
-                        grupos.append([foto_atual, proxima])
-                        i += 2
-                        continue
-                grupos.append([foto_atual])
-                i += 1
-                continue
-            
-            # Lógica padrão: verificar limite antes de fotos especiais
-            def encontrar_limite(inicio, max_fotos):
-                limite = 0
-                for j in range(inicio, min(inicio + max_fotos, len(fotos))):
-                    tipo_j = get_slot_tipo(fotos[j])
-                    if tipo_j in ['full', 'fv-l', 'fv-r', 'fh-t', 'fh-b']:
-                        break
-                    limite += 1
-                return limite
-            
-            max_grupo = encontrar_limite(i, 4)
-            
-            # Tentar grupo de 4
-            if max_grupo >= 4 and restantes >= 4:
-                grupos.append(fotos[i:i+4])
-                i += 4
-                continue
-            
-            # Tentar grupo de 3
-            if max_grupo >= 3 and restantes >= 3:
-                proximas_3 = fotos[i:i+3]
-                orientacoes = [f['orientacao'] for f in proximas_3]
-                paisagem_count = sum(1 for o in orientacoes if o in ['paisagem', 'quadrada'])
-                if paisagem_count >= 2:
-                    grupos.append(proximas_3)
-                    i += 3
-                    continue
-            
-            # Tentar grupo de 2
-            if max_grupo >= 2 and restantes >= 2:
-                grupos.append(fotos[i:i+2])
-                i += 2
-                continue
-            
-            # Foto sozinha
-            grupos.append([fotos[i]])
-            i += 1
+        Args:
+            capitulos: Fotos de cada capítulo (dicts com info das fotos)
+            ajustes: Dict de ajustes existentes (caminho -> {slot_tipo, ...})
+            orcamento_paginas: Máximo de páginas do livro (capas incluídas)
         
-        return grupos
-    
-    def _escolher_layout_inicial(self, fotos: List[Dict], ajustes: Dict = None) -> str:
-        """Escolhe o layout inicial para um grupo de fotos."""
+        Retorna, por capítulo, [(layout, fotos da página na ordem do
+        capítulo, slot de cada foto)].
+        """
         if ajustes is None:
             ajustes = {}
         
-        num_fotos = len(fotos)
-        
-        if num_fotos == 1:
-            return 'L1'
-        
-        elif num_fotos == 2:
-            # Verificar tipos de slot
-            tipo1 = ajustes.get(fotos[0]['caminho'], {}).get('slot_tipo', 'auto')
-            tipo2 = ajustes.get(fotos[1]['caminho'], {}).get('slot_tipo', 'auto')
-            
-            # Se qualquer uma é vertical, usar L2H
-            if tipo1 in ['fv-l', 'fv-r'] or tipo2 in ['fv-l', 'fv-r']:
-                return 'L2H'
-            
-            # Se qualquer uma é horizontal, usar L2V
-            if tipo1 in ['fh-t', 'fh-b'] or tipo2 in ['fh-t', 'fh-b']:
-                return 'L2V'
-            
-            # Padrão: lado a lado
-            return 'L2H'
-        
-        elif num_fotos == 3:
-            orientacoes = [f['orientacao'] for f in fotos]
-            verticais = sum(1 for o in orientacoes if o == 'retrato')
-            horizontais = sum(1 for o in orientacoes if o in ['paisagem', 'quadrada'])
-            
-            if verticais == 1 and horizontais == 2:
-                return 'L3C'
-            elif horizontais == 3:
-                return 'L3D'
-            else:
-                return 'L3A'
-        
-        elif num_fotos == 4:
-            return 'L4'
-        
-        return 'L1'
+        from paginacao import FotoPaginacao, paginar_capitulos, layouts_grupos
+        
+        fotos_paginacao = []
+        for fotos in capitulos:
+            tipos = _tipos_paginacao([ajustes.get(f['caminho'], {}).get('slot_tipo', 'auto') for f in fotos],
+                                     [(f.get('qualidade') or {}).get('nitidez') for f in fotos],
+                                     [(f['largura'], f['altura']) for f in fotos])
+            fotos_paginacao.append([
+                FotoPaginacao(foto['largura'], foto['altura'], tipo,
+                              tuple(tuple(r) for r in foto.get('regioes') or []), foto.get('evento', 0))
+                for foto, tipo in zip(fotos, tipos)
+            ])
+        
+        orcamento = None
+        if orcamento_paginas is not None:
+            # Capa, subcapas e contra capa não entram na paginação
+            orcamento = orcamento_paginas - len(capitulos) - 2
+        
+        divisao = paginar_capitulos(fotos_paginacao, orcamento)
+        return [
+            [(layout, fotos[inicio:fim], [ordem.index(i) for i in range(inicio, fim)])
+             for (inicio, fim), (layout, ordem) in zip(grupos, layouts_grupos(capitulo, grupos))]
+            for fotos, capitulo, grupos in zip(capitulos, fotos_paginacao, divisao)
+        ]
     
     def atualizar_foto(self, caminho: str, pan_x: float = None, pan_y: float = None, 
                        zoom: float = None, slot_tipo: str = None):
@@ -448,8 +501,15 @@ class SchemaManager:
                     pan_x=foto_data.get('pan_x', 0.5),
                     pan_y=foto_data.get('pan_y', 0.5),
                     zoom=foto_data.get('zoom', 1.0),
-                    slot_tipo=foto_data.get('slot_tipo', 'auto')
+                    slot_tipo=foto_data.get('slot_tipo', 'auto'),
+                    qualidade=foto_data.get('qualidade'),
+                    regioes=foto_data.get('regioes'),
+                    evento=foto_data.get('evento', 0)
                 ))
+            if pagina.tipo == 'conteudo':
+                capitulo = self._capitulo_da_pagina(indice_pagina)
+                if capitulo is not None:
+                    self._indexar_fotos(capitulo)
             return True
         return False
     
@@ -463,6 +523,43 @@ class SchemaManager:
         """Retorna o total de páginas."""
         return len(self.paginas)
     
+    def _indexar_fotos(self, capitulo: IndiceCapitulo):
+        """Refaz a ordem das fotos do capítulo a partir das suas páginas."""
+        capitulo.fotos = []
+        capitulo.primeira_foto = []
+        for pagina in self.paginas[capitulo.inicio:capitulo.fim]:
+            capitulo.primeira_foto.append(len(capitulo.fotos))
+            capitulo.fotos.extend(pagina.fotos)
+        capitulo.primeira_foto.append(len(capitulo.fotos))
+        capitulo.tabela = capitulo.tipos_tabela = None
+    
+    def _indexar_capitulos(self):
+        """
+        Refaz o índice dos capítulos: cada trecho de páginas de conteúdo
+        (delimitado por subcapas ou capa/contra_capa) com as suas fotos.
+        """
+        self._capitulos = []
+        inicio = None
+        for i, pagina in enumerate(self.paginas + [None]):
+            if pagina is not None and pagina.tipo == 'conteudo':
+                if inicio is None:
+                    inicio = i
+            elif inicio is not None:
+                capitulo = IndiceCapitulo(inicio, i, [], [])
+                self._indexar_fotos(capitulo)
+                self._capitulos.append(capitulo)
+                inicio = None
+        self._paginas_indexadas = len(self.paginas)
+    
+    def _capitulo_da_pagina(self, indice_pagina: int) -> Optional[IndiceCapitulo]:
+        """Capítulo que contém a página de conteúdo (busca binária no índice)."""
+        if self._paginas_indexadas != len(self.paginas):
+            self._indexar_capitulos()
+        posicao = bisect_right(self._capitulos, indice_pagina, key=lambda c: c.inicio) - 1
+        if posicao < 0 or indice_pagina >= self._capitulos[posicao].fim:
+            return None
+        return self._capitulos[posicao]
+    
     def encontrar_limites_capitulo(self, indice_pagina: int) -> tuple:
         """
         Encontra os limites do capítulo que contém a página especificada.
@@ -474,143 +571,155 @@ class SchemaManager:
         if indice_pagina < 0 or indice_pagina >= len(self.paginas):
             return (None, None)
         
-        pagina = self.paginas[indice_pagina]
-        if pagina.tipo != 'conteudo':
+        capitulo = self._capitulo_da_pagina(indice_pagina)
+        if capitulo is None:
             return (None, None)
-        
-        # Buscar início do capítulo (primeira página após subcapa/capa)
-        inicio = indice_pagina
-        while inicio > 0:
-            pag_anterior = self.paginas[inicio - 1]
-            if pag_anterior.tipo in ('subcapa', 'capa'):
-                break
-            if pag_anterior.tipo == 'conteudo':
-                inicio -= 1
-            else:
-                break
-        
-        # Buscar fim do capítulo (próxima subcapa/contra_capa ou fim)
-        fim = indice_pagina + 1
-        while fim < len(self.paginas):
-            pag = self.paginas[fim]
-            if pag.tipo in ('subcapa', 'contra_capa', 'capa'):
-                break
-            fim += 1
-        
-        return (inicio, fim)
+        return (capitulo.inicio, capitulo.fim)
+    
+    def _tabela_capitulo(self, capitulo: IndiceCapitulo):
+        """
+        Tabela de paginação (paginacao.py) das fotos do capítulo, guardada
+        no índice até um slot_tipo efetivo (com os destaques) mudar.
+        """
+        from paginacao import tabela_paginacao
+        
+        fotos = _fotos_paginacao(capitulo.fotos)
+        tipos = tuple(f.tipo for f in fotos)
+        if capitulo.tabela is None or tipos != capitulo.tipos_tabela:
+            capitulo.tabela = tabela_paginacao(fotos)
+            capitulo.tipos_tabela = tipos
+        return capitulo.tabela
+    
+    def preparar_repaginacao(self):
+        """
+        Calcula a tabela de paginação de todos os capítulos (a primeira troca
+        de layout num capítulo não precisa calcular a sua). O preview chama
+        numa thread ao carregar o schema; a trava do schema é tomada um
+        capítulo por vez, então uma troca de layout espera no máximo a
+        tabela de um capítulo.
+        """
+        with self.trava:
+            if self._paginas_indexadas != len(self.paginas):
+                self._indexar_capitulos()
+            capitulos = list(self._capitulos)
+        for capitulo in capitulos:
+            with self.trava:
+                self._tabela_capitulo(capitulo)
     
     def redistribuir_fotos_capitulo(self, indice_pagina: int, novo_layout: str,
                                     num_fotos_necessarias: int,
-                                    inicio_capitulo: int, fim_capitulo: int) -> bool:
+                                    inicio_capitulo: int, fim_capitulo: int) -> Optional[Repaginacao]:
         """
         Redistribui as fotos no capítulo após mudança de layout.
         - Não altera páginas anteriores à página modificada
-        - Fotos excedentes vão para o final do capítulo
-        """
-        if indice_pagina < inicio_capitulo or indice_pagina >= fim_capitulo:
-            return False
-        
-        pagina_atual = self.paginas[indice_pagina]
-        if pagina_atual.tipo != 'conteudo':
-            return False
+        - A página recebe as próximas fotos do capítulo no novo layout, e as
+          seguintes do capítulo são repaginadas com a paginação ótima
         
-        # Coletar todas as fotos do capítulo a partir da página atual
-        fotos_disponiveis = []
-        for i in range(indice_pagina, fim_capitulo):
-            if self.paginas[i].tipo == 'conteudo':
-                fotos_disponiveis.extend(self.paginas[i].fotos)
+        A ordem das fotos e a tabela de paginação do capítulo ficam no índice
+        dos capítulos, então só a programação dinâmica do resto do capítulo
+        roda; páginas que saem iguais são mantidas, e os capítulos seguintes
+        só andam no índice.
         
-        if not fotos_disponiveis:
-            return False
-        
-        # Atualizar a página atual com o novo layout
-        pagina_atual.layout = novo_layout
-        
-        # Pegar as fotos necessárias para a página atual
-        fotos_para_pagina = fotos_disponiveis[:num_fotos_necessarias]
-        fotos_restantes = fotos_disponiveis[num_fotos_necessarias:]
-        
-        # Atualizar fotos da página atual
-        pagina_atual.fotos = []
-        for i, foto in enumerate(fotos_para_pagina):
-            foto.slot_index = i
-            pagina_atual.fotos.append(foto)
-        
-        # Remover páginas de conteúdo subsequentes no capítulo (serão recriadas)
-        paginas_a_remover = []
-        for i in range(indice_pagina + 1, fim_capitulo):
-            if self.paginas[i].tipo == 'conteudo':
-                paginas_a_remover.append(i)
-        
-        # Remover de trás para frente para não bagunçar índices
-        for i in reversed(paginas_a_remover):
-            del self.paginas[i]
-        
-        # Recalcular fim do capítulo após remoção
-        novo_fim = indice_pagina + 1
-        while novo_fim < len(self.paginas):
-            if self.paginas[novo_fim].tipo in ('subcapa', 'contra_capa', 'capa'):
-                break
-            novo_fim += 1
-        
-        # Criar novas páginas para as fotos restantes
-        posicao_insercao = indice_pagina + 1
-        while fotos_restantes:
-            # Determinar quantas fotos por página (default: L4 = 4 fotos)
-            num_fotos_pagina = min(4, len(fotos_restantes))
+        Retorna as páginas trocadas (None se nada pôde ser feito).
+        """
+        if indice_pagina < inicio_capitulo or indice_pagina >= fim_capitulo:
+            return None
+        
+        capitulo = self._capitulo_da_pagina(indice_pagina)
+        if capitulo is None or (capitulo.inicio, capitulo.fim) != (inicio_capitulo, fim_capitulo):
+            return None
+        
+        posicao = indice_pagina - capitulo.inicio
+        primeira = capitulo.primeira_foto[posicao]
+        total = len(capitulo.fotos)
+        if primeira >= total:
+            return None
+        
+        from paginacao import layouts_grupos, paginar_a_partir
+        
+        # Página atual: as próximas fotos, na melhor ordem dos slots do layout escolhido
+        fim_atual = min(primeira + num_fotos_necessarias, total)
+        ordem = list(range(primeira, fim_atual))
+        if fim_atual - primeira == num_fotos_necessarias:
+            (_, relativa), = layouts_grupos(_fotos_paginacao(capitulo.fotos)[primeira:fim_atual],
+                                            [(0, fim_atual - primeira)], permitidos=[novo_layout])
+            ordem = [primeira + i for i in relativa]
+        grupos = [(primeira, fim_atual, novo_layout, ordem)]
+        
+        # Resto do capítulo: só a programação dinâmica, com a tabela do índice
+        if fim_atual < total:
+            tabela = self._tabela_capitulo(capitulo)
+            grupos += [(inicio, fim) + tabela.layouts[(inicio, fim)]
+                       for inicio, fim in paginar_a_partir(tabela, fim_atual)]
+        
+        # Páginas antigas do trecho, comparadas pelo layout e pela foto de cada slot
+        antigas = self.paginas[indice_pagina:capitulo.fim]
+        assinaturas = [(p.layout, sorted((f.slot_index, f.caminho) for f in p.fotos)) for p in antigas]
+        
+        novas = []
+        alteradas = []
+        for j, (inicio, fim, layout, ordem) in enumerate(grupos):
+            slots = [ordem.index(i) for i in range(inicio, fim)]
+            fotos = capitulo.fotos[inicio:fim]
+            if j < len(antigas) and assinaturas[j] == (layout, sorted((s, f.caminho) for s, f in zip(slots, fotos))):
+                novas.append(antigas[j])
+                continue
             
-            # Escolher layout baseado no número de fotos
-            if num_fotos_pagina == 1:
-                layout = 'L1'
-            elif num_fotos_pagina == 2:
-                layout = 'L2H'
-            elif num_fotos_pagina == 3:
-                layout = 'L3D'
+            for foto, slot in zip(fotos, slots):
+                foto.slot_index = slot
+            if j < len(antigas):
+                pagina = antigas[j]
+                pagina.layout = layout
+                pagina.fotos = fotos
             else:
-                layout = 'L4'
-            
-            fotos_nova_pagina = fotos_restantes[:num_fotos_pagina]
-            fotos_restantes = fotos_restantes[num_fotos_pagina:]
-            
-            nova_pagina = PaginaSchema(
-                tipo='conteudo',
-                layout=layout,
-                fotos=[],
-                titulo='',
-                subtitulo='',
-                ano='',
-                imagem=''
-            )
-            
-            for i, foto in enumerate(fotos_nova_pagina):
-                foto.slot_index = i
-                nova_pagina.fotos.append(foto)
-            
-            self.paginas.insert(posicao_insercao, nova_pagina)
-            posicao_insercao += 1
-        
-        return True
+                pagina = PaginaSchema(tipo='conteudo', layout=layout, fotos=fotos)
+            novas.append(pagina)
+            alteradas.append(indice_pagina + j)
+        
+        # Trocar o trecho numa operação só e andar o índice dos capítulos seguintes
+        self.paginas[indice_pagina:capitulo.fim] = novas
+        deslocamento = len(novas) - len(antigas)
+        capitulo.fim += deslocamento
+        capitulo.primeira_foto[posicao:] = [inicio for inicio, _, _, _ in grupos] + [total]
+        if deslocamento:
+            for seguinte in self._capitulos[self._capitulos.index(capitulo) + 1:]:
+                seguinte.inicio += deslocamento
+                seguinte.fim += deslocamento
+        self._paginas_indexadas = len(self.paginas)
+        
+        return Repaginacao(indice_pagina, len(antigas), len(novas), alteradas)
     
     def to_dict(self) -> Dict:
         """Converte o schema para dicionário (para API)."""
         # Contar total de fotos
         total_fotos = sum(len(pag.fotos) for pag in self.paginas)
+        total_borradas = sum(
+            1 for pag in self.paginas for f in pag.fotos
+            if f.qualidade and f.qualidade.get('borrada')
+        )
         
         return {
             'total_fotos': total_fotos,
+            'total_borradas': total_borradas,
             'total_paginas': len(self.paginas),
-            'paginas': [
-                {
-                    'tipo': pag.tipo,
-                    'layout': pag.layout,
-                    'fotos': [asdict(f) for f in pag.fotos],
-                    'titulo': pag.titulo,
-                    'subtitulo': pag.subtitulo,
-                    'ano': pag.ano,
-                    'imagem': pag.imagem
-                }
-                for pag in self.paginas
-            ]
+            'paginas': [self.pagina_para_dict(pag) for pag in self.paginas]
+        }
+    
+    @staticmethod
+    def pagina_para_dict(pag: PaginaSchema) -> Dict:
+        """
+        Uma página do schema como dicionário (para API e arquivo). As fotos
+        só têm campos simples: cópia rasa dos campos, bem mais rápida que
+        asdict, que copia tudo recursivamente.
+        """
+        return {
+            'tipo': pag.tipo,
+            'layout': pag.layout,
+            'fotos': [dict(vars(f)) for f in pag.fotos],
+            'titulo': pag.titulo,
+            'subtitulo': pag.subtitulo,
+            'ano': pag.ano,
+            'imagem': pag.imagem
         }
     
     def migrar_ajustes_antigos(self):
@@ -660,17 +769,27 @@ if __name__ == '__main__':
     import sys
     
     if len(sys.argv) < 2:
-        print("Uso: python schema_manager.py <pasta_raiz> [--regenerar]")
+        print("Uso: python schema_manager.py <pasta_raiz> [--regenerar] [--ordem-captura] [--sem-duplicatas] [--paginas=N] [--jobs=N]")
         sys.exit(1)
     
     pasta = Path(sys.argv[1])
     regenerar = '--regenerar' in sys.argv
+    ordem = 'captura' if '--ordem-captura' in sys.argv else 'nome'
+    remover_duplicatas = '--sem-duplicatas' in sys.argv
+    orcamento_paginas = None
+    jobs = 1
+    for opcao in sys.argv[2:]:
+        if opcao.startswith('--paginas='):
+            orcamento_paginas = int(opcao.split('=', 1)[1])
+        elif opcao.startswith('--jobs='):
+            jobs = max(1, int(opcao.split('=', 1)[1]))
     
     manager = SchemaManager(pasta)
     
     if regenerar or not manager.carregar():
         print("Gerando schema inicial...")
-        manager.gerar_schema_inicial()
+        manager.gerar_schema_inicial(ordem=ordem, remover_duplicatas=remover_duplicatas,
+                                     orcamento_paginas=orcamento_paginas, jobs=jobs)
         manager.migrar_ajustes_antigos()
         print(f"Schema gerado com {manager.total_paginas()} páginas")
     else:
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sondagem de Dimensões pelo Cabeçalho
+
+Este módulo lê largura, altura e metadados EXIF (orientação, data de
+captura, câmera e presença de GPS) das fotos lendo apenas os primeiros KB
+de cada arquivo, sem passar pelo decodificador do PIL:
+
+- JPEG: marcadores SOFn + segmento APP1 (Exif)
+- PNG: chunk IHDR
+- WebP: chunks VP8 / VP8L / VP8X (+ EXIF)
+- TIFF: IFD0 (ImageWidth, ImageLength + tags EXIF)
+
+As dimensões retornadas já consideram a orientação EXIF: fotos de celular
+gravadas "deitadas" com Orientation 5-8 têm largura e altura trocadas,
+igual ao que o navegador e o OpenCV exibem.
+
+A sondagem em lote (sondar_imagens) roda em um pool de threads.
+
+EXECUÇÃO (teste rápido):
+    python sondagem_imagens.py <imagem_ou_pasta> [...]
+"""
+
+import os
+import struct
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+
+# Tags EXIF usadas
+TAG_ORIENTACAO = 0x0112
+TAG_MARCA = 0x010F  # Make
+TAG_MODELO = 0x0110  # Model
+TAG_DATA = 0x0132  # DateTime (última modificação)
+TAG_EXIF_IFD = 0x8769  # Ponteiro para o sub-IFD Exif
+TAG_GPS_IFD = 0x8825  # Ponteiro para o sub-IFD GPS
+TAG_DATA_ORIGINAL = 0x9003  # DateTimeOriginal (momento da captura)
+
+# Orientações EXIF que giram a imagem em 90° (largura e altura trocadas)
+ORIENTACOES_GIRADAS = {5, 6, 7, 8}
+
+# Bytes lidos do início de arquivos PNG/WebP/TIFF
+BYTES_CABECALHO = 64 * 1024
+
+# Marcadores SOF do JPEG que carregam as dimensões (exclui DHT, JPG e DAC)
+MARCADORES_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                  0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+# ============================================================================
+# TIFF / EXIF
+# ============================================================================
+
+def _ler_ifd(dados: bytes, ordem: str, inicio_tiff: int, offset_ifd: int) -> Dict[int, tuple]:
+    """
+    Lê um IFD de um bloco TIFF (arquivo TIFF ou payload Exif do JPEG).
+
+    Retorna {tag: (tipo, quantidade, valor_ou_offset, bytes_brutos)}.
+    """
+    pos = inicio_tiff + offset_ifd
+    if offset_ifd <= 0 or pos + 2 > len(dados):
+        return {}
+
+    num_entradas = struct.unpack(ordem + 'H', dados[pos:pos + 2])[0]
+    entradas = {}
+    for i in range(num_entradas):
+        p = pos + 2 + i * 12
+        if p + 12 > len(dados):
+            break
+        tag, tipo, quantidade = struct.unpack(ordem + 'HHI', dados[p:p + 8])
+        bruto = dados[p + 8:p + 12]
+        if tipo == 3:  # SHORT
+            valor = struct.unpack(ordem + 'H', bruto[:2])[0]
+        else:  # LONG ou offset
+            valor = struct.unpack(ordem + 'I', bruto)[0]
+        entradas[tag] = (tipo, quantidade, valor, bruto)
+
+    return entradas
+
+
+def _ler_ifd0(dados: bytes, inicio_tiff: int = 0) -> Tuple[Optional[str], Dict[int, tuple]]:
+    """Valida o cabeçalho TIFF e lê o IFD0. Retorna (ordem de bytes, entradas)."""
+    cabecalho = dados[inicio_tiff:inicio_tiff + 8]
+    if cabecalho[:2] == b'II':
+        ordem = '<'
+    elif cabecalho[:2] == b'MM':
+        ordem = '>'
+    else:
+        return None, {}
+
+    if len(cabecalho) < 8 or struct.unpack(ordem + 'H', cabecalho[2:4])[0] != 42:
+        return None, {}
+
+    offset_ifd = struct.unpack(ordem + 'I', cabecalho[4:8])[0]
+    return ordem, _ler_ifd(dados, ordem, inicio_tiff, offset_ifd)
+
+
+def _texto_ifd(dados: bytes, inicio_tiff: int, entrada: Optional[tuple]) -> Optional[str]:
+    """Lê o valor ASCII de uma entrada de IFD (inline ou por offset)."""
+    if entrada is None or entrada[0] != 2:
+        return None
+    _, quantidade, offset, bruto = entrada
+    if quantidade <= 4:
+        texto = bruto[:quantidade]
+    else:
+        texto = dados[inicio_tiff + offset:inicio_tiff + offset + quantidade]
+    texto = texto.split(b'\x00', 1)[0].decode('ascii', errors='ignore').strip()
+    return texto or None
+
+
+def _data_iso(texto: Optional[str]) -> Optional[str]:
+    """Converte 'AAAA:MM:DD HH:MM:SS' (EXIF) para 'AAAA-MM-DDTHH:MM:SS'."""
+    if not texto or len(texto) < 19 or texto.startswith('0000'):
+        return None
+    data, _, hora = texto[:19].partition(' ')
+    return f"{data.replace(':', '-')}T{hora}"
+
+
+def _extrair_exif(dados: bytes, inicio_tiff: int = 0) -> dict:
+    """
+    Extrai orientação, data de captura, câmera e presença de GPS
+    de um bloco TIFF/Exif.
+    """
+    metadados = {'orientacao_exif': 1, 'data_captura': None, 'camera': None, 'tem_gps': False}
+
+    ordem, ifd0 = _ler_ifd0(dados, inicio_tiff)
+    if ordem is None:
+        return metadados
+
+    orientacao = ifd0.get(TAG_ORIENTACAO, (0, 0, 1))[2]
+    metadados['orientacao_exif'] = orientacao if 1 <= orientacao <= 8 else 1
+
+    marca = _texto_ifd(dados, inicio_tiff, ifd0.get(TAG_MARCA))
+    modelo = _texto_ifd(dados, inicio_tiff, ifd0.get(TAG_MODELO))
+    if modelo and marca and not modelo.lower().startswith(marca.lower()):
+        modelo = f"{marca} {modelo}"
+    metadados['camera'] = modelo or marca
+
+    metadados['tem_gps'] = TAG_GPS_IFD in ifd0
+
+    # DateTimeOriginal fica no sub-IFD Exif; DateTime do IFD0 é o fallback
+    data = None
+    if TAG_EXIF_IFD in ifd0:
+        sub_ifd = _ler_ifd(dados, ordem, inicio_tiff, ifd0[TAG_EXIF_IFD][2])
+        data = _texto_ifd(dados, inicio_tiff, sub_ifd.get(TAG_DATA_ORIGINAL))
+    if not data:
+        data = _texto_ifd(dados, inicio_tiff, ifd0.get(TAG_DATA))
+    metadados['data_captura'] = _data_iso(data)
+
+    return metadados
+
+
+# ============================================================================
+# PARSERS POR FORMATO
+# ============================================================================
+#
+# Cada parser retorna (largura, altura, metadados_exif) com as dimensões
+# armazenadas no arquivo (antes de aplicar a orientação), ou None.
+
+def _sondar_jpeg(arquivo: BinaryIO) -> Optional[Tuple[int, int, dict]]:
+    """Percorre os segmentos do JPEG até o SOF, lendo só cabeçalhos e o APP1."""
+    arquivo.seek(2)  # depois do SOI
+    exif = _extrair_exif(b'')
+
+    while True:
+        byte = arquivo.read(1)
+        if not byte:
+            return None
+        if byte != b'\xFF':
+            continue
+
+        # Pular bytes de preenchimento 0xFF
+        marcador = arquivo.read(1)
+        while marcador == b'\xFF':
+            marcador = arquivo.read(1)
+        if not marcador:
+            return None
+        codigo = marcador[0]
+
+        # Marcadores sem payload
+        if codigo in (0x01, 0xD8) or 0xD0 <= codigo <= 0xD7:
+            continue
+        if codigo in (0xD9, 0xDA):  # EOI / início dos dados sem SOF
+            return None
+
+        tamanho_bytes = arquivo.read(2)
+        if len(tamanho_bytes) < 2:
+            return None
+        tamanho = struct.unpack('>H', tamanho_bytes)[0] - 2
+
+        if codigo in MARCADORES_SOF:
+            sof = arquivo.read(5)
+            if len(sof) < 5:
+                return None
+            altura, largura = struct.unpack('>HH', sof[1:5])
+            return largura, altura, exif
+
+        if codigo == 0xE1:
+            payload = arquivo.read(tamanho)
+            if payload[:6] == b'Exif\x00\x00':
+                exif = _extrair_exif(payload, 6)
+            continue
+
+        arquivo.seek(tamanho, os.SEEK_CUR)
+
+
+def _sondar_png(dados: bytes) -> Optional[Tuple[int, int, dict]]:
+    """Lê largura/altura do chunk IHDR."""
+    if len(dados) < 24 or dados[12:16] != b'IHDR':
+        return None
+    largura, altura = struct.unpack('>II', dados[16:24])
+    return largura, altura, _extrair_exif(b'')
+
+
+def _sondar_webp(dados: bytes) -> Optional[Tuple[int, int, dict]]:
+    """Percorre os chunks RIFF do WebP (VP8, VP8L, VP8X e EXIF)."""
+    largura = altura = None
+    exif = _extrair_exif(b'')
+    pos = 12
+
+    while pos + 8 <= len(dados):
+        tipo = dados[pos:pos + 4]
+        tamanho = struct.unpack('<I', dados[pos + 4:pos + 8])[0]
+        corpo = dados[pos + 8:pos + 8 + tamanho]
+
+        if tipo == b'VP8X' and len(corpo) >= 10:
+            largura = int.from_bytes(corpo[4:7], 'little') + 1
+            altura = int.from_bytes(corpo[7:10], 'little') + 1
+        elif tipo == b'VP8 ' and largura is None and len(corpo) >= 10:
+            # Frame tag (3 bytes) + start code (3 bytes) + dimensões de 14 bits
+            largura = struct.unpack('<H', corpo[6:8])[0] & 0x3FFF
+            altura = struct.unpack('<H', corpo[8:10])[0] & 0x3FFF
+        elif tipo == b'VP8L' and largura is None and len(corpo) >= 5:
+            bits = int.from_bytes(corpo[1:5], 'little')
+            largura = (bits & 0x3FFF) + 1
+            altura = ((bits >> 14) & 0x3FFF) + 1
+        elif tipo == b'EXIF':
+            inicio = 6 if corpo[:6] == b'Exif\x00\x00' else 0
+            exif = _extrair_exif(corpo, inicio)
+
+        pos += 8 + tamanho + (tamanho & 1)
+
+    if largura is None:
+        return None
+    return largura, altura, exif
+
+
+def _sondar_tiff(dados: bytes) -> Optional[Tuple[int, int, dict]]:
+    """Lê ImageWidth, ImageLength e os metadados EXIF do IFD0."""
+    _, entradas = _ler_ifd0(dados)
+    if 256 not in entradas or 257 not in entradas:
+        return None
+    return entradas[256][2], entradas[257][2], _extrair_exif(dados)
+
+
+def _sondar_pil(caminho: Path) -> Optional[Tuple[int, int, dict]]:
+    """Fallback: abre o arquivo com o PIL (só cabeçalho, sem decodificar)."""
+    from PIL import Image
+
+    try:
+        with Image.open(caminho) as img:
+            largura, altura = img.size
+            exif = img.getexif()
+            exif_ifd = exif.get_ifd(TAG_EXIF_IFD)
+    except Exception:
+        return None
+
+    orientacao = exif.get(TAG_ORIENTACAO, 1)
+    marca = (exif.get(TAG_MARCA) or '').strip() or None
+    modelo = (exif.get(TAG_MODELO) or '').strip() or None
+    if modelo and marca and not modelo.lower().startswith(marca.lower()):
+        modelo = f"{marca} {modelo}"
+
+    metadados = {
+        'orientacao_exif': orientacao if 1 <= orientacao <= 8 else 1,
+        'data_captura': _data_iso(exif_ifd.get(TAG_DATA_ORIGINAL) or exif.get(TAG_DATA)),
+        'camera': modelo or marca,
+        'tem_gps': TAG_GPS_IFD in exif,
+    }
+    return largura, altura, metadados
+
+
+# ============================================================================
+# API PÚBLICA
+# ============================================================================
+
+def ler_metadados(caminho: Path) -> Optional[dict]:
+    """
+    Lê dimensões e metadados EXIF de uma imagem pelo cabeçalho.
+
+    Retorna dict com largura, altura (já na orientação de exibição),
+    orientacao_exif, data_captura ('AAAA-MM-DDTHH:MM:SS' ou None),
+    camera e tem_gps; ou None se o arquivo não puder ser lido.
+    """
+    try:
+        with open(caminho, 'rb') as arquivo:
+            inicio = arquivo.read(16)
+            if inicio[:3] == b'\xFF\xD8\xFF':
+                resultado = _sondar_jpeg(arquivo)
+            else:
+                dados = inicio + arquivo.read(BYTES_CABECALHO - len(inicio))
+                if dados[:8] == b'\x89PNG\r\n\x1a\n':
+                    resultado = _sondar_png(dados)
+                elif dados[:4] == b'RIFF' and dados[8:12] == b'WEBP':
+                    resultado = _sondar_webp(dados)
+                elif dados[:4] in (b'II*\x00', b'MM\x00*'):
+                    resultado = _sondar_tiff(dados)
+                else:
+                    resultado = None
+    except OSError:
+        return None
+
+    if resultado is None or resultado[0] <= 0 or resultado[1] <= 0:
+        resultado = _sondar_pil(caminho)
+        if resultado is None:
+            return None
+
+    largura, altura, metadados = resultado
+    if metadados['orientacao_exif'] in ORIENTACOES_GIRADAS:
+        largura, altura = altura, largura
+
+    metadados = dict(metadados)
+    metadados['largura'] = largura
+    metadados['altura'] = altura
+    return metadados
+
+
+def ler_cabecalho(caminho: Path) -> Optional[Tuple[int, int, int]]:
+    """
+    Lê as dimensões de uma imagem pelo cabeçalho.
+
+    Retorna (largura, altura, orientacao_exif) com largura/altura já na
+    orientação de exibição, ou None se o arquivo não puder ser lido.
+    """
+    metadados = ler_metadados(caminho)
+    if metadados is None:
+        return None
+    return metadados['largura'], metadados['altura'], metadados['orientacao_exif']
+
+
+def sondar_imagens(
+    caminhos: Iterable[Path],
+    max_workers: int = 8
+) -> Dict[Path, Optional[dict]]:
+    """
+    Sonda várias imagens em paralelo (pool de threads).
+
+    Retorna {caminho: metadados de ler_metadados() ou None}.
+    """
+    caminhos = list(caminhos)
+    if not caminhos:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(caminhos, executor.map(ler_metadados, caminhos)))
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    if len(sys.argv) < 2:
+        print("Uso: python sondagem_imagens.py <imagem_ou_pasta> [...]")
+        sys.exit(1)
+
+    arquivos = []
+    for arg in sys.argv[1:]:
+        p = Path(arg)
+        arquivos.extend(sorted(f for f in p.iterdir() if f.is_file()) if p.is_dir() else [p])
+
+    inicio = time.perf_counter()
+    resultados = sondar_imagens(arquivos)
+    decorrido = time.perf_counter() - inicio
+
+    for caminho, info in resultados.items():
+        print(f"{caminho}: {info}")
+    if arquivos:
+        print(f"\n{len(arquivos)} arquivos em {decorrido * 1000:.1f} ms "
+              f"({decorrido * 1000 / len(arquivos):.2f} ms/arquivo)")
@@ -0,0 +1,645 @@
+# -*- coding: utf-8 -*-
+"""
+Funções da versão de base (commit 7ae236d), copiadas sem alteração
+
+Referência dos testes de paridade: o motor de recortes (recortes.py) e o
+registro de layouts (layouts.py) substituíram estas funções e têm que
+reproduzir os mesmos resultados. Os corpos são os originais de
+fotolivro.py e pdf_renderer.py; só o que não é geometria ficou de fora
+(canvas, detecção, arquivos). O trecho de PDFRenderer._renderizar_foto que
+posiciona a foto no slot virou a função geometria_renderizar_foto, com as
+mesmas linhas.
+"""
+
+from typing import List, Optional, Tuple
+
+
+# Dimensões A4 em paisagem (297mm x 210mm)
+A4_LARGURA_MM = 297
+A4_ALTURA_MM = 210
+
+# Margens (em milímetros)
+MARGEM_EXTERNA_MM = 10  # 1 cm
+MARGEM_LOMBADA_MM = 15  # 1.5 cm
+ESPACO_ENTRE_FOTOS_MM = 5  # 0.5 cm
+
+
+def mm_to_points(mm_value: float) -> float:
+    """Converte milímetros para points."""
+    return mm_value * 72.0 / 25.4
+
+
+# ============================================================================
+# fotolivro.py
+# ============================================================================
+
+def calcular_regiao_rostos(rostos: List[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Calcula a união (bounding box) de todos os rostos detectados.
+
+    Args:
+        rostos: Lista de bounding boxes dos rostos
+
+    Retorna:
+        Bounding box (x, y, largura, altura) que engloba todos os rostos,
+        ou None se a lista estiver vazia.
+    """
+    if not rostos:
+        return None
+
+    # Encontrar os limites extremos
+    x_min = min(r[0] for r in rostos)
+    y_min = min(r[1] for r in rostos)
+    x_max = max(r[0] + r[2] for r in rostos)
+    y_max = max(r[1] + r[3] for r in rostos)
+
+    return (x_min, y_min, x_max - x_min, y_max - y_min)
+
+
+def calcular_crop_inteligente(
+    img_largura: int,
+    img_altura: int,
+    slot_largura: float,
+    slot_altura: float,
+    rostos: List[Tuple[int, int, int, int]]
+) -> Tuple[int, int, int, int]:
+    """
+    Calcula o melhor crop da imagem que PRESERVA os rostos (não corta-os).
+
+    Estratégia:
+    1. Começar com o MAIOR crop possível que caiba no aspect ratio do slot
+    2. Se há rostos, ajustar a posição do crop para evitar cortá-los
+    3. Preferir cortar fundo (bordas sem rostos) em vez de rostos
+
+    Args:
+        img_largura: Largura da imagem em pixels
+        img_altura: Altura da imagem em pixels
+        slot_largura: Largura do slot em points
+        slot_altura: Altura do slot em points
+        rostos: Lista de bounding boxes dos rostos
+
+    Retorna:
+        (x, y, largura, altura) do crop na imagem original em pixels.
+    """
+    ratio_slot = slot_largura / slot_altura
+    ratio_img = img_largura / img_altura if img_altura > 0 else 1.0
+
+    # Calcular o maior crop possível com o aspect ratio do slot
+    if ratio_img >= ratio_slot:
+        # Imagem mais larga que o slot: usar altura total, cortar largura
+        crop_h = img_altura
+        crop_w = int(img_altura * ratio_slot)
+    else:
+        # Imagem mais alta que o slot: usar largura total, cortar altura
+        crop_w = img_largura
+        crop_h = int(img_largura / ratio_slot)
+
+    # Se não há rostos, usar crop centralizado
+    if not rostos:
+        crop_x = (img_largura - crop_w) // 2
+        crop_y = (img_altura - crop_h) // 2
+        return (crop_x, crop_y, crop_w, crop_h)
+
+    # Calcular o centro dos rostos (ponderado)
+    total_area = 0
+    centro_x = 0
+    centro_y = 0
+
+    for (rx, ry, rw, rh) in rostos:
+        area = rw * rh
+        total_area += area
+        centro_x += (rx + rw / 2) * area
+        centro_y += (ry + rh / 2) * area
+
+    if total_area > 0:
+        centro_x = centro_x / total_area
+        centro_y = centro_y / total_area
+    else:
+        centro_x = img_largura / 2
+        centro_y = img_altura / 2
+
+    # Calcular a região que contém todos os rostos (com margem)
+    regiao_rostos = calcular_regiao_rostos(rostos)
+    if regiao_rostos:
+        face_x, face_y, face_w, face_h = regiao_rostos
+        # Adicionar margem de 10% ao redor dos rostos
+        margem = 0.1
+        face_x = max(0, face_x - int(face_w * margem))
+        face_y = max(0, face_y - int(face_h * margem))
+        face_w = min(img_largura - face_x, int(face_w * (1 + 2 * margem)))
+        face_h = min(img_altura - face_y, int(face_h * (1 + 2 * margem)))
+    else:
+        face_x, face_y, face_w, face_h = 0, 0, img_largura, img_altura
+
+    # Posicionar o crop tentando manter os rostos dentro
+    # Começar centralizando no centro dos rostos
+    crop_x = int(centro_x - crop_w / 2)
+    crop_y = int(centro_y - crop_h / 2)
+
+    # Ajustar para garantir que os rostos fiquem dentro do crop
+    # Se os rostos estão mais à esquerda que o crop, mover crop para esquerda
+    if face_x < crop_x:
+        crop_x = max(0, face_x)
+    # Se os rostos estão mais à direita que o crop
+    if face_x + face_w > crop_x + crop_w:
+        crop_x = min(img_largura - crop_w, face_x + face_w - crop_w)
+
+    # Se os rostos estão mais acima que o crop
+    if face_y < crop_y:
+        crop_y = max(0, face_y)
+    # Se os rostos estão mais abaixo que o crop
+    if face_y + face_h > crop_y + crop_h:
+        crop_y = min(img_altura - crop_h, face_y + face_h - crop_h)
+
+    # Clamping final para garantir que está dentro da imagem
+    crop_x = max(0, min(crop_x, img_largura - crop_w))
+    crop_y = max(0, min(crop_y, img_altura - crop_h))
+
+    # Garantir dimensões válidas
+    crop_w = max(1, min(crop_w, img_largura - crop_x))
+    crop_h = max(1, min(crop_h, img_altura - crop_y))
+
+    return (crop_x, crop_y, crop_w, crop_h)
+
+
+class GeradorFotolivro:
+    """Métodos de geometria do GeradorFotolivro da versão de base."""
+
+    def __init__(self):
+        # Dimensões da página em points
+        self.largura_pagina = mm_to_points(A4_LARGURA_MM)
+        self.altura_pagina = mm_to_points(A4_ALTURA_MM)
+
+        # Margens em points
+        self.margem_externa = mm_to_points(MARGEM_EXTERNA_MM)  # 1 cm
+        self.margem_lombada = mm_to_points(MARGEM_LOMBADA_MM)  # 2 cm
+        self.espaco_entre_fotos = mm_to_points(ESPACO_ENTRE_FOTOS_MM)  # 1 cm
+
+    def calcular_crop_com_ajuste(
+        self,
+        img_largura: int,
+        img_altura: int,
+        slot_largura: float,
+        slot_altura: float,
+        ajuste: dict
+    ) -> Tuple[int, int, int, int]:
+        """
+        Calcula o crop baseado nos ajustes do usuário (pan_x, pan_y, zoom).
+
+        Args:
+            img_largura: Largura da imagem em pixels
+            img_altura: Altura da imagem em pixels
+            slot_largura: Largura do slot em points
+            slot_altura: Altura do slot em points
+            ajuste: Dicionário com pan_x, pan_y (0-1) e zoom (1+)
+
+        Retorna:
+            Tupla (x, y, largura, altura) do crop em pixels
+        """
+        pan_x = ajuste.get('pan_x', 0.5)
+        pan_y = ajuste.get('pan_y', 0.5)
+        zoom = ajuste.get('zoom', 1.0)
+
+        # Calcular aspect ratio do slot
+        ratio_slot = slot_largura / slot_altura
+        ratio_img = img_largura / img_altura
+
+        # Calcular dimensões do crop base (modo cover)
+        if ratio_img > ratio_slot:
+            # Imagem mais larga que o slot: limitar pela altura
+            crop_h = img_altura
+            crop_w = int(crop_h * ratio_slot)
+        else:
+            # Imagem mais alta que o slot: limitar pela largura
+            crop_w = img_largura
+            crop_h = int(crop_w / ratio_slot)
+
+        # Aplicar zoom (reduz o tamanho do crop)
+        crop_w = int(crop_w / zoom)
+        crop_h = int(crop_h / zoom)
+
+        # Garantir que o crop não seja maior que a imagem
+        crop_w = min(crop_w, img_largura)
+        crop_h = min(crop_h, img_altura)
+
+        # Calcular posição baseada no pan (0=esquerda/topo, 1=direita/baixo)
+        max_x = img_largura - crop_w
+        max_y = img_altura - crop_h
+
+        crop_x = int(pan_x * max_x)
+        crop_y = int(pan_y * max_y)
+
+        # Garantir bounds
+        crop_x = max(0, min(crop_x, max_x))
+        crop_y = max(0, min(crop_y, max_y))
+
+        return (crop_x, crop_y, crop_w, crop_h)
+
+    def calcular_area_util(self, pagina_impar: bool) -> Tuple[float, float, float, float]:
+        """
+        Calcula a área útil da página (sem margens).
+
+        Grade de margens:
+        - 1 cm em todos os lados externos
+        - 2 cm no lado da lombada (esquerda em ímpares, direita em pares)
+
+        Args:
+            pagina_impar: True se página ímpar (lombada à esquerda), False se par (lombada à direita)
+
+        Retorna:
+            (x, y, largura, altura) da área útil em points
+        """
+        # Página ímpar: lombada à ESQUERDA (margem esquerda = 2cm, direita = 1cm)
+        # Página par: lombada à DIREITA (margem esquerda = 1cm, direita = 2cm)
+        if pagina_impar:
+            margem_esquerda = self.margem_lombada  # 2 cm (lombada)
+            margem_direita = self.margem_externa   # 1 cm
+        else:
+            margem_esquerda = self.margem_externa  # 1 cm
+            margem_direita = self.margem_lombada   # 2 cm (lombada)
+
+        # Margens superior e inferior: 1 cm
+        margem_superior = self.margem_externa
+        margem_inferior = self.margem_externa
+
+        # Área útil
+        x = margem_esquerda
+        y = margem_inferior
+        largura = self.largura_pagina - margem_esquerda - margem_direita
+        altura = self.altura_pagina - margem_superior - margem_inferior
+
+        return (x, y, largura, altura)
+
+    def calcular_layout_l1(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """
+        Calcula coordenadas para layout L1 (1 foto).
+
+        Retorna lista com uma tupla (x, y, largura, altura) da área da foto.
+        """
+        x, y, largura, altura = area_util
+        return [(x, y, largura, altura)]
+
+    def calcular_layout_l2h(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """
+        Calcula coordenadas para layout L2H (2 fotos lado a lado).
+
+        Retorna lista com duas tuplas (x, y, largura, altura) das áreas das fotos.
+        """
+        x, y, largura, altura = area_util
+
+        # Dividir largura em 2, com espaço entre
+        largura_foto = (largura - self.espaco_entre_fotos) / 2
+
+        foto1 = (x, y, largura_foto, altura)
+        foto2 = (x + largura_foto + self.espaco_entre_fotos, y, largura_foto, altura)
+
+        return [foto1, foto2]
+
+    def calcular_layout_l2v(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """
+        Calcula coordenadas para layout L2V (2 fotos empilhadas).
+
+        Retorna lista com duas tuplas (x, y, largura, altura) das áreas das fotos.
+        """
+        x, y, largura, altura = area_util
+
+        # Dividir altura em 2, com espaço entre
+        altura_foto = (altura - self.espaco_entre_fotos) / 2
+
+        foto1 = (x, y + altura_foto + self.espaco_entre_fotos, largura, altura_foto)
+        foto2 = (x, y, largura, altura_foto)
+
+        return [foto1, foto2]
+
+    def calcular_layout_l3a(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """
+        Calcula coordenadas para layout L3A (2 em cima, 1 embaixo).
+
+        Grade: toda área útil é ocupada por 3 slots com 1 cm entre eles.
+        - Linha superior: 2 fotos lado a lado (50% altura cada, dividem largura)
+        - Linha inferior: 1 foto ocupando toda largura (50% altura)
+
+        Retorna lista com três tuplas (x, y, largura, altura) das áreas das fotos.
+        """
+        x, y, largura, altura = area_util
+
+        # Dividir altura em 2 linhas com espaço entre
+        altura_linha = (altura - self.espaco_entre_fotos) / 2
+
+        # Fotos superiores: dividem a largura com espaço entre
+        largura_foto_superior = (largura - self.espaco_entre_fotos) / 2
+
+        foto1 = (x, y + altura_linha + self.espaco_entre_fotos, largura_foto_superior, altura_linha)
+        foto2 = (x + largura_foto_superior + self.espaco_entre_fotos, y + altura_linha + self.espaco_entre_fotos,
+                 largura_foto_superior, altura_linha)
+
+        # Foto inferior: ocupa toda a largura
+        foto3 = (x, y, largura, altura_linha)
+
+        return [foto1, foto2, foto3]
+
+    def calcular_layout_l3b(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """
+        Calcula coordenadas para layout L3B (1 em cima, 2 embaixo).
+
+        Grade: toda área útil é ocupada por 3 slots com 1 cm entre eles.
+        - Linha superior: 1 foto ocupando toda largura (50% altura)
+        - Linha inferior: 2 fotos lado a lado (50% altura cada, dividem largura)
+
+        Retorna lista com três tuplas (x, y, largura, altura) das áreas das fotos.
+        """
+        x, y, largura, altura = area_util
+
+        # Dividir altura em 2 linhas com espaço entre
+        altura_linha = (altura - self.espaco_entre_fotos) / 2
+
+        # Foto superior: ocupa toda a largura
+        foto1 = (x, y + altura_linha + self.espaco_entre_fotos, largura, altura_linha)
+
+        # Fotos inferiores: dividem a largura com espaço entre
+        largura_foto_inferior = (largura - self.espaco_entre_fotos) / 2
+        foto2 = (x, y, largura_foto_inferior, altura_linha)
+        foto3 = (x + largura_foto_inferior + self.espaco_entre_fotos, y, largura_foto_inferior, altura_linha)
+
+        return [foto1, foto2, foto3]
+
+    def calcular_layout_l3c(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """
+        Calcula coordenadas para layout L3C (1 vertical à direita, 2 horizontais à esquerda).
+
+        Grade: toda área útil é ocupada por 3 slots com 1 cm entre eles.
+        - Coluna esquerda (60%): 2 fotos horizontais empilhadas (dividem altura)
+        - Coluna direita (40%): 1 foto vertical ocupando toda altura
+
+        Retorna lista com três tuplas (x, y, largura, altura) das áreas das fotos.
+        Ordem: [vertical, horizontal_superior, horizontal_inferior]
+        """
+        x, y, largura, altura = area_util
+
+        # Dividir largura em 2 colunas (60% esquerda, 40% direita) com espaço entre
+        largura_esquerda = (largura - self.espaco_entre_fotos) * 0.60
+        largura_direita = (largura - self.espaco_entre_fotos) * 0.40
+
+        # Área esquerda: 2 fotos horizontais dividindo verticalmente
+        altura_horizontal = (altura - self.espaco_entre_fotos) / 2
+
+        # Foto horizontal superior (esquerda)
+        foto_h1 = (x, y + altura_horizontal + self.espaco_entre_fotos, largura_esquerda, altura_horizontal)
+
+        # Foto horizontal inferior (esquerda)
+        foto_h2 = (x, y, largura_esquerda, altura_horizontal)
+
+        # Foto vertical (direita) - ocupa toda altura
+        x_vertical = x + largura_esquerda + self.espaco_entre_fotos
+        foto_v = (x_vertical, y, largura_direita, altura)
+
+        # Retornar na ordem: [vertical, horizontal_superior, horizontal_inferior]
+        return [foto_v, foto_h1, foto_h2]
+
+    def calcular_layout_l3d(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """
+        Calcula coordenadas para layout L3D (1 horizontal em cima, 2 horizontais embaixo).
+
+        Grade: toda área útil é ocupada por 3 slots com 1 cm entre eles.
+        - Linha superior: 1 foto ocupando toda largura (50% altura)
+        - Linha inferior: 2 fotos lado a lado (50% altura cada, dividem largura)
+
+        Este layout é idêntico ao L3B, usado para 3 fotos horizontais.
+
+        Retorna lista com três tuplas (x, y, largura, altura) das áreas das fotos.
+        Ordem: [foto_cima, foto_esquerda, foto_direita]
+        """
+        x, y, largura, altura = area_util
+
+        # Dividir altura em 2 linhas com espaço entre
+        altura_linha = (altura - self.espaco_entre_fotos) / 2
+
+        # Foto superior: ocupa toda a largura
+        foto_cima = (x, y + altura_linha + self.espaco_entre_fotos, largura, altura_linha)
+
+        # Fotos inferiores: dividem a largura com espaço entre
+        largura_foto_inferior = (largura - self.espaco_entre_fotos) / 2
+        foto_esquerda = (x, y, largura_foto_inferior, altura_linha)
+        foto_direita = (x + largura_foto_inferior + self.espaco_entre_fotos, y, largura_foto_inferior, altura_linha)
+
+        # Retornar na ordem: [foto_cima, foto_esquerda, foto_direita]
+        return [foto_cima, foto_esquerda, foto_direita]
+
+    def calcular_layout_l4(self, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """
+        Calcula coordenadas para layout L4 (grid 2x2 de fotos).
+
+        Grade: 4 fotos em grid 2x2 com espaço entre elas.
+        Ideal para fotos com poucos elementos/pessoas.
+
+        Retorna lista com quatro tuplas (x, y, largura, altura) das áreas das fotos.
+        Ordem: [topo_esquerda, topo_direita, baixo_esquerda, baixo_direita]
+        """
+        x, y, largura, altura = area_util
+
+        # Dividir em grid 2x2
+        largura_foto = (largura - self.espaco_entre_fotos) / 2
+        altura_foto = (altura - self.espaco_entre_fotos) / 2
+
+        # Linha superior
+        foto_topo_esq = (x, y + altura_foto + self.espaco_entre_fotos, largura_foto, altura_foto)
+        foto_topo_dir = (x + largura_foto + self.espaco_entre_fotos, y + altura_foto + self.espaco_entre_fotos,
+                         largura_foto, altura_foto)
+
+        # Linha inferior
+        foto_baixo_esq = (x, y, largura_foto, altura_foto)
+        foto_baixo_dir = (x + largura_foto + self.espaco_entre_fotos, y, largura_foto, altura_foto)
+
+        return [foto_topo_esq, foto_topo_dir, foto_baixo_esq, foto_baixo_dir]
+
+
+# ============================================================================
+# pdf_renderer.py
+# ============================================================================
+
+class PDFRenderer:
+    """Métodos de geometria do PDFRenderer da versão de base."""
+
+    def __init__(self):
+        # Dimensões da página em points
+        self.largura_pagina = mm_to_points(A4_LARGURA_MM)
+        self.altura_pagina = mm_to_points(A4_ALTURA_MM)
+
+        # Margens em points
+        self.margem_externa = mm_to_points(MARGEM_EXTERNA_MM)
+        self.margem_lombada = mm_to_points(MARGEM_LOMBADA_MM)
+        self.espaco_entre_fotos = mm_to_points(ESPACO_ENTRE_FOTOS_MM)
+
+    def _calcular_area_util(self, pagina_impar: bool) -> Tuple[float, float, float, float]:
+        """Calcula a área útil da página (sem margens)."""
+        if pagina_impar:
+            margem_esquerda = self.margem_lombada
+            margem_direita = self.margem_externa
+        else:
+            margem_esquerda = self.margem_externa
+            margem_direita = self.margem_lombada
+
+        x = margem_esquerda
+        y = self.margem_externa
+        largura = self.largura_pagina - margem_esquerda - margem_direita
+        altura = self.altura_pagina - self.margem_externa * 2
+
+        return (x, y, largura, altura)
+
+    def _calcular_boxes_layout(self, layout: str, area_util: Tuple[float, float, float, float]) -> List[Tuple[float, float, float, float]]:
+        """Calcula as boxes (slots) para cada layout."""
+        x, y, largura, altura = area_util
+        esp = self.espaco_entre_fotos
+
+        if layout == 'L1':
+            return [(x, y, largura, altura)]
+
+        elif layout == 'L2H':
+            # 2 fotos lado a lado
+            w = (largura - esp) / 2
+            return [
+                (x, y, w, altura),
+                (x + w + esp, y, w, altura)
+            ]
+
+        elif layout == 'L2V':
+            # 2 fotos empilhadas
+            h = (altura - esp) / 2
+            return [
+                (x, y + h + esp, largura, h),
+                (x, y, largura, h)
+            ]
+
+        elif layout == 'L3A':
+            # 2 em cima, 1 embaixo
+            h = (altura - esp) / 2
+            w = (largura - esp) / 2
+            return [
+                (x, y + h + esp, w, h),
+                (x + w + esp, y + h + esp, w, h),
+                (x, y, largura, h)
+            ]
+
+        elif layout == 'L3B':
+            # 1 em cima, 2 embaixo
+            h = (altura - esp) / 2
+            w = (largura - esp) / 2
+            return [
+                (x, y + h + esp, largura, h),
+                (x, y, w, h),
+                (x + w + esp, y, w, h)
+            ]
+
+        elif layout == 'L3C':
+            # 1 vertical à direita, 2 horizontais à esquerda
+            w_esq = (largura - esp) * 0.60
+            w_dir = (largura - esp) * 0.40
+            h = (altura - esp) / 2
+            return [
+                (x + w_esq + esp, y, w_dir, altura),  # Vertical à direita
+                (x, y + h + esp, w_esq, h),  # Horizontal superior
+                (x, y, w_esq, h)  # Horizontal inferior
+            ]
+
+        elif layout == 'L3D':
+            # 1 horizontal em cima, 2 horizontais embaixo
+            h = (altura - esp) / 2
+            w = (largura - esp) / 2
+            return [
+                (x, y + h + esp, largura, h),
+                (x, y, w, h),
+                (x + w + esp, y, w, h)
+            ]
+
+        elif layout == 'L4':
+            # Grid 2x2
+            w = (largura - esp) / 2
+            h = (altura - esp) / 2
+            return [
+                (x, y + h + esp, w, h),
+                (x + w + esp, y + h + esp, w, h),
+                (x, y, w, h),
+                (x + w + esp, y, w, h)
+            ]
+
+        return [(x, y, largura, altura)]
+
+    def _calcular_crop(self, img_largura: int, img_altura: int,
+                       slot_largura: float, slot_altura: float,
+                       pan_x: float, pan_y: float, zoom: float) -> Tuple[int, int, int, int]:
+        """Calcula o crop baseado nos ajustes de pan/zoom."""
+        ratio_slot = slot_largura / slot_altura
+        ratio_img = img_largura / img_altura
+
+        # Calcular dimensões do crop base (modo cover)
+        if ratio_img > ratio_slot:
+            crop_h = img_altura
+            crop_w = int(crop_h * ratio_slot)
+        else:
+            crop_w = img_largura
+            crop_h = int(crop_w / ratio_slot)
+
+        # Aplicar zoom (reduz o tamanho do crop)
+        crop_w = int(crop_w / zoom)
+        crop_h = int(crop_h / zoom)
+
+        # Garantir que o crop não seja maior que a imagem
+        crop_w = min(crop_w, img_largura)
+        crop_h = min(crop_h, img_altura)
+
+        # Calcular posição baseada no pan
+        max_x = img_largura - crop_w
+        max_y = img_altura - crop_h
+
+        crop_x = int(pan_x * max_x)
+        crop_y = int(pan_y * max_y)
+
+        # Garantir bounds
+        crop_x = max(0, min(crop_x, max_x))
+        crop_y = max(0, min(crop_y, max_y))
+
+        return (crop_x, crop_y, crop_w, crop_h)
+
+
+def geometria_renderizar_foto(img_w: int, img_h: int, box: Tuple[float, float, float, float],
+                              pan_x: float, pan_y: float, zoom: float) -> Tuple[float, float, float, float]:
+    """
+    Trecho de PDFRenderer._renderizar_foto (versão de base) que posiciona a
+    foto inteira no slot. Retorna (img_x, img_y, display_w, display_h).
+    """
+    x_box, y_box, w_box, h_box = box
+
+    # Calcular escala base para "cover" (preencher slot)
+    scale_x = w_box / img_w
+    scale_y = h_box / img_h
+    base_cover_scale = max(scale_x, scale_y)
+
+    # Escala mínima para "contain" (mostrar toda imagem)
+    base_contain_scale = min(scale_x, scale_y)
+
+    # Aplicar zoom do usuário
+    # zoom 1.0 = cover, zoom < 1 = mostra mais (até contain)
+    min_zoom = base_contain_scale / base_cover_scale if base_cover_scale > 0 else 0.3
+    effective_zoom = max(min_zoom, zoom)
+    final_scale = base_cover_scale * effective_zoom
+
+    # Tamanho final da imagem
+    display_w = img_w * final_scale
+    display_h = img_h * final_scale
+
+    # Quanto a imagem excede/falta no slot
+    excess_w = display_w - w_box
+    excess_h = display_h - h_box
+
+    # Posição baseada no pan (0.5 = centralizado)
+    # Nota: eixo Y do PDF é invertido em relação ao HTML
+    # No HTML: pan_y=0 mostra topo, pan_y=1 mostra base
+    # No PDF: Y cresce para cima, então invertemos
+    offset_x = -excess_w * pan_x
+    offset_y = -excess_h * (1 - pan_y)
+
+    # Posição final da imagem
+    img_x = x_box + offset_x
+    img_y = y_box + offset_y
+
+    return (img_x, img_y, display_w, display_h)
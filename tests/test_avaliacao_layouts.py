@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Avaliação vetorizada de layouts (avaliacao_layouts.py) contra o laço
+escalar: custo de cada foto em cada slot, foto a foto, e o melhor layout
+por todos os layouts registrados e permutações.
+"""
+
+import math
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+import avaliacao_layouts as av
+import base_7ae236d as base
+from constantes import RATIO_QUADRADO_MAX, RATIO_QUADRADO_MIN
+from layouts import (AREAS_UTEIS, ESPACO_FOTOS, LAYOUTS, boxes_justificado, boxes_layout,
+                     empacotar_linhas, id_justificado)
+from planejamento import DPI_MINIMO
+
+
+TIPOS = ['auto'] * 6 + ['full', 'fv-l', 'fv-r', 'fh-t', 'fh-b', 'square']
+TAMANHOS = [(4032, 3024), (3024, 4032), (1920, 1080), (1080, 1920), (3000, 3000),
+            (6000, 1000), (640, 480), (1, 1)]
+
+
+def _fotos(rng, n, tipos=TIPOS):
+    """(largura, altura, regiões, tipo) sorteados, com regiões vazias e nas bordas."""
+    fotos = []
+    for _ in range(n):
+        w, h = TAMANHOS[rng.integers(len(TAMANHOS))]
+        regioes = []
+        for _ in range(int(rng.integers(0, 6))):
+            rw, rh = int(rng.integers(0, w // 3 + 1)), int(rng.integers(0, h // 3 + 1))
+            regioes.append((int(rng.integers(0, w - rw + 1)), int(rng.integers(0, h - rh + 1)), rw, rh))
+        fotos.append((w, h, regioes, tipos[rng.integers(len(tipos))]))
+    return fotos
+
+
+def _custo_slot(foto, slot_w, slot_h, orientacao_slot, fracao):
+    """Custo de uma foto num slot, sem os tipos de slot (uma foto por vez)."""
+    w, h, regioes, _ = foto
+    cx, cy, cw, ch = base.calcular_crop_inteligente(w, h, slot_w, slot_h, list(regioes))
+
+    area_total = sum(rw * rh for _, _, rw, rh in regioes)
+    area_dentro = sum(max(0, min(rx + rw, cx + cw) - max(rx, cx)) * max(0, min(ry + rh, cy + ch) - max(ry, cy))
+                      for rx, ry, rw, rh in regioes)
+    retencao = area_dentro / area_total if area_total > 0 else 1.0
+    dpi = cw * 72.0 / slot_w
+
+    proporcao = w / h
+    orientacao = 'paisagem' if proporcao > RATIO_QUADRADO_MAX else 'retrato' if proporcao < RATIO_QUADRADO_MIN else None
+    contraria = orientacao_slot is not None and orientacao is not None and orientacao != orientacao_slot
+    cheia = len(regioes) > av.LIMITE_PESSOAS_SIMPLES
+
+    return (av.PESO_PERDA_RECORTE * (1.0 - (cw * ch) / (w * h))
+            + av.PESO_ROSTOS * (1.0 - retencao)
+            + av.PESO_DPI * max(0.0, 1.0 - dpi / DPI_MINIMO)
+            + av.PESO_ORIENTACAO * contraria
+            + av.PESO_PESSOAS * cheia * (1.0 - fracao))
+
+
+def _custo_slot_registrado(foto, id_layout, j):
+    """Custo da foto no slot j de um layout registrado, com os tipos de slot."""
+    slots = LAYOUTS[id_layout]['slots']
+    (x, y, w, h), orientacao_slot = slots[j]
+    slot_w, slot_h = boxes_layout(id_layout, True)[j][2:]
+    util_w, util_h = boxes_layout('L1', True)[0][2:]
+    custo = _custo_slot(foto, slot_w, slot_h, orientacao_slot, slot_w * slot_h / (util_w * util_h))
+
+    tipo = foto[3]
+    if tipo in av.TIPOS_RESTRITOS:
+        exigida, maximo = av.TIPOS_RESTRITOS[tipo]
+        dividida = len(slots) > 1
+        if len(slots) > maximo or (dividida and exigida and orientacao_slot and orientacao_slot != exigida):
+            return math.inf
+        if tipo in av.LADOS_TIPOS:
+            eixo, sinal = av.LADOS_TIPOS[tipo]
+            centro = x + w / 2 if eixo == 0 else y + h / 2
+            custo += av.PESO_LADO * (dividida and sinal * (centro - 0.5) <= 0)
+    return custo
+
+
+def _melhor_layout(fotos, grupo, permitidos=None):
+    """Menor custo do grupo entre todos os layouts e permutações."""
+    melhor = math.inf
+    for id_layout, layout in LAYOUTS.items():
+        if len(layout['slots']) != len(grupo) or (permitidos is not None and id_layout not in permitidos):
+            continue
+        for ordem in permutations(grupo):
+            melhor = min(melhor, sum(_custo_slot_registrado(fotos[i], id_layout, j)
+                                     for j, i in enumerate(ordem)))
+    return melhor
+
+
+def _avaliar(fotos):
+    largura, altura, regioes, tipos = zip(*fotos)
+    return av.avaliar_fotos(largura, altura, regioes, tipos)
+
+
+def _colunas():
+    """(id do layout, slot) de cada coluna da avaliação, na ordem do registro."""
+    return [(id_layout, j) for id_layout, layout in LAYOUTS.items() for j in range(len(layout['slots']))]
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_custo_de_cada_foto_em_cada_slot(semente):
+    fotos = _fotos(np.random.default_rng(semente), 30)
+    custos = _avaliar(fotos).custos
+    esperado = np.array([[_custo_slot_registrado(f, id_layout, j) for id_layout, j in _colunas()]
+                         for f in fotos])
+    assert np.array_equal(np.isinf(custos), np.isinf(esperado))
+    np.testing.assert_allclose(custos, esperado, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_melhor_layout_de_cada_grupo(semente):
+    fotos = _fotos(np.random.default_rng(10 + semente), 24)
+    avaliacao = _avaliar(fotos)
+    colunas = {coluna: i for i, coluna in enumerate(_colunas())}
+
+    for k in range(1, max(len(l['slots']) for l in LAYOUTS.values()) + 1):
+        grupos = np.lib.stride_tricks.sliding_window_view(np.arange(len(fotos)), k)
+        custos, ids, ordens = av.melhores_layouts(avaliacao, grupos)
+        for grupo, custo, id_layout, ordem in zip(grupos.tolist(), custos, ids, ordens.tolist()):
+            esperado = _melhor_layout(fotos, grupo)
+            assert custo == pytest.approx(esperado, abs=1e-9) or (math.isinf(custo) and math.isinf(esperado))
+            assert sorted(ordem) == grupo
+            assert len(LAYOUTS[id_layout]['slots']) == k
+            if math.isfinite(esperado):
+                # O layout e a ordem devolvidos custam o que foi informado
+                atribuido = sum(avaliacao.custos[i, colunas[(id_layout, j)]] for j, i in enumerate(ordem))
+                assert atribuido == pytest.approx(custo, abs=1e-9)
+
+
+def test_melhor_layout_so_entre_os_permitidos():
+    fotos = _fotos(np.random.default_rng(20), 12)
+    avaliacao = _avaliar(fotos)
+    grupos = np.lib.stride_tricks.sliding_window_view(np.arange(len(fotos)), 3)
+    for permitidos in (['L3A'], ['L3C', 'L3D'], ['L2H']):
+        custos, ids, _ = av.melhores_layouts(avaliacao, grupos, permitidos)
+        for grupo, custo, id_layout in zip(grupos.tolist(), custos, ids):
+            esperado = _melhor_layout(fotos, grupo, permitidos)
+            if math.isinf(esperado):
+                assert math.isinf(custo)
+            else:
+                assert custo == pytest.approx(esperado, abs=1e-9)
+                assert id_layout in permitidos
+
+
+def test_foto_full_so_em_layout_de_um_slot():
+    fotos = [(4032, 3024, [], 'full'), (4032, 3024, [], 'auto')]
+    custos, _, _ = av.melhores_layouts(_avaliar(fotos), np.array([[0, 1]]))
+    assert math.isinf(custos[0])
+    custos, ids, _ = av.melhores_layouts(_avaliar(fotos), np.array([[0]]))
+    assert math.isfinite(custos[0]) and ids == ['L1']
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_colagens_justificadas(semente):
+    # Poucas fotos com tipo restrito: a maioria das colagens é viável
+    fotos = _fotos(np.random.default_rng(30 + semente), 30, ['auto'] * 30 + ['square', 'full'])
+    largura, altura, regioes, tipos = zip(*fotos)
+    grupos = [(i, i + k) for k in (5, 7, 9) for i in range(0, len(fotos) - k + 1, 3)]
+    custos, ids = av.avaliar_justificados(largura, altura, regioes, tipos, grupos)
+
+    util_w, util_h = boxes_layout('L1', True)[0][2:]
+    for (inicio, fim), custo, id_layout in zip(grupos, custos, ids):
+        da_pagina = [w / h for w, h, _, _ in fotos[inicio:fim]]
+        linhas = empacotar_linhas(da_pagina)
+        assert id_layout == id_justificado(linhas)
+        esperado = 0.0
+        for foto, box in zip(fotos[inicio:fim], boxes_justificado(linhas, da_pagina, AREAS_UTEIS[True], ESPACO_FOTOS)):
+            if foto[3] in av.TIPOS_RESTRITOS:
+                esperado = math.inf
+                break
+            esperado += _custo_slot(foto, box[2], box[3], None, box[2] * box[3] / (util_w * util_h)) + av.PESO_COLAGEM
+        if math.isinf(esperado):
+            assert math.isinf(custo)
+        else:
+            assert custo == pytest.approx(esperado, abs=1e-9)
+
+
+def test_sem_fotos():
+    avaliacao = av.avaliar_fotos([], [], [], [])
+    assert avaliacao.custos.shape[0] == 0
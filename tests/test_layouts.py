@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Paridade das tabelas compiladas do registro de layouts (layouts.py) com o
+cálculo das boxes da versão de base (tests/base_7ae236d.py): PDFRenderer
+e GeradorFotolivro, nas duas paridades de página.
+"""
+
+import pytest
+
+import base_7ae236d as base
+import layouts
+
+
+GERADOR = base.GeradorFotolivro()
+RENDERER = base.PDFRenderer()
+
+# Layouts da versão de base e o método do gerador que calcula cada um
+LAYOUTS_BASE = {
+    'L1': GERADOR.calcular_layout_l1,
+    'L2H': GERADOR.calcular_layout_l2h,
+    'L2V': GERADOR.calcular_layout_l2v,
+    'L3A': GERADOR.calcular_layout_l3a,
+    'L3B': GERADOR.calcular_layout_l3b,
+    'L3C': GERADOR.calcular_layout_l3c,
+    'L3D': GERADOR.calcular_layout_l3d,
+    'L4': GERADOR.calcular_layout_l4,
+}
+
+
+def test_registro_tem_os_layouts_da_base():
+    assert set(LAYOUTS_BASE) <= set(layouts.LAYOUTS)
+
+
+@pytest.mark.parametrize('pagina_impar', [True, False])
+def test_area_util(pagina_impar):
+    assert layouts.area_util(pagina_impar) == RENDERER._calcular_area_util(pagina_impar)
+    # O gerador da base subtrai as margens uma a uma: a altura difere no
+    # último bit da do PDFRenderer
+    assert layouts.area_util(pagina_impar) == pytest.approx(GERADOR.calcular_area_util(pagina_impar),
+                                                            rel=1e-15)
+
+
+@pytest.mark.parametrize('pagina_impar', [True, False])
+@pytest.mark.parametrize('id_layout', sorted(LAYOUTS_BASE))
+def test_boxes_iguais_a_base(id_layout, pagina_impar):
+    area = RENDERER._calcular_area_util(pagina_impar)
+    obtidas = layouts.boxes_layout(id_layout, pagina_impar)
+    assert obtidas == layouts.TABELAS_BOXES[pagina_impar][id_layout]
+    assert obtidas == RENDERER._calcular_boxes_layout(id_layout, area)
+    assert obtidas == LAYOUTS_BASE[id_layout](area)
+    for box, box_gerador in zip(obtidas, LAYOUTS_BASE[id_layout](GERADOR.calcular_area_util(pagina_impar))):
+        assert box == pytest.approx(box_gerador, rel=1e-15)
+
+
+@pytest.mark.parametrize('pagina_impar', [True, False])
+@pytest.mark.parametrize('id_layout', ['desconhecido', '', None])
+def test_layout_desconhecido_usa_a_area_inteira(id_layout, pagina_impar):
+    area = RENDERER._calcular_area_util(pagina_impar)
+    assert layouts.boxes_layout(id_layout, pagina_impar) == RENDERER._calcular_boxes_layout(id_layout, area)
+    assert layouts.fotos_por_layout(id_layout) == 1
+
+
+@pytest.mark.parametrize('id_layout', sorted(LAYOUTS_BASE))
+def test_fotos_por_layout(id_layout):
+    assert layouts.fotos_por_layout(id_layout) == len(LAYOUTS_BASE[id_layout](layouts.area_util(True)))
+
+
+def test_compilar_layout_rejeita_slots_fora_da_grade(monkeypatch):
+    monkeypatch.setitem(layouts.LAYOUTS, 'X', {'nome': 'x', 'descricao': 'x', 'slots': [
+        ((0.0, 0.0, 0.6, 0.6), None),
+        ((0.4, 0.4, 0.6, 0.6), None),
+    ]})
+    with pytest.raises(ValueError):
+        layouts.compilar_layout('X', layouts.area_util(True), layouts.ESPACO_FOTOS)
+
+
+@pytest.mark.parametrize('pagina_impar', [True, False])
+@pytest.mark.parametrize('proporcoes', [
+    [1.5, 0.667, 1.5, 1.5, 0.667],
+    [1.333] * 9,
+    [0.5, 3.0, 1.0, 1.0, 2.0, 0.75],
+])
+def test_colagem_justificada_preenche_a_area(proporcoes, pagina_impar):
+    x, y, largura, altura = layouts.area_util(pagina_impar)
+    id_layout = layouts.id_justificado(layouts.empacotar_linhas(proporcoes, pagina_impar))
+    boxes = layouts.boxes_layout(id_layout, pagina_impar, proporcoes)
+    assert len(boxes) == len(proporcoes) == layouts.fotos_por_layout(id_layout)
+
+    inicio = 0
+    for n in layouts.linhas_justificado(id_layout):
+        linha = boxes[inicio:inicio + n]
+        da_linha = proporcoes[inicio:inicio + n]
+        inicio += n
+        # Cada linha ocupa a largura útil, com o espaço entre fotos e as
+        # larguras na razão das proporções das fotos
+        assert linha[0][0] == pytest.approx(x)
+        assert linha[-1][0] + linha[-1][2] == pytest.approx(x + largura)
+        for (a, pa), (b, pb) in zip(zip(linha, da_linha), zip(linha[1:], da_linha[1:])):
+            assert b[0] - (a[0] + a[2]) == pytest.approx(layouts.ESPACO_FOTOS)
+            assert (a[1], a[3]) == pytest.approx((b[1], b[3]))
+            assert a[2] / b[2] == pytest.approx(pa / pb)
+    assert boxes[0][1] + boxes[0][3] == pytest.approx(y + altura)
+    assert boxes[-1][1] == pytest.approx(y)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Paginação por programação dinâmica (paginacao.py) conferida por força
+bruta: todas as divisões de capítulos pequenos em páginas, com e sem
+orçamento de páginas e com eventos.
+"""
+
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+import paginacao
+from paginacao import CUSTO_PAGINA, FotoPaginacao
+
+
+TIPOS = ['auto'] * 8 + ['full', 'fv-l', 'fv-r', 'fh-t', 'fh-b', 'square']
+TAMANHOS = [(4032, 3024), (3024, 4032), (1920, 1080), (1080, 1920), (3000, 3000), (6000, 2000)]
+
+
+def _capitulo(rng, n, eventos=False):
+    """Fotos sintéticas: tamanhos reais, tipos de slot, pessoas e eventos sorteados."""
+    fotos = []
+    evento = 0
+    for _ in range(n):
+        w, h = TAMANHOS[rng.integers(len(TAMANHOS))]
+        regioes = []
+        for _ in range(int(rng.integers(0, 5))):
+            rw, rh = int(rng.integers(w // 20, w // 4)), int(rng.integers(h // 20, h // 4))
+            regioes.append((int(rng.integers(0, w - rw)), int(rng.integers(0, h - rh)), rw, rh))
+        if eventos and fotos and rng.random() < 0.25:
+            evento += 1
+        fotos.append(FotoPaginacao(w, h, TIPOS[rng.integers(len(TIPOS))], tuple(regioes), evento))
+    return fotos
+
+
+def _divisoes(n):
+    """Todas as divisões de n fotos em grupos consecutivos de até MAX_FOTOS_PAGINA."""
+    for cortes in itertools.product((False, True), repeat=max(0, n - 1)):
+        grupos, inicio = [], 0
+        for i, corta in enumerate(cortes, start=1):
+            if corta:
+                grupos.append((inicio, i))
+                inicio = i
+        grupos.append((inicio, n))
+        if all(fim - ini <= paginacao.MAX_FOTOS_PAGINA for ini, fim in grupos):
+            yield grupos
+
+
+def _custo(custos, grupos, preco_pagina=CUSTO_PAGINA):
+    return sum(custos[ini][fim - ini - 1] + preco_pagina for ini, fim in grupos)
+
+
+def _melhor_por_paginas(custos, n):
+    """Menor custo (sem o preço das páginas) de cada número de páginas, por força bruta."""
+    melhor = {}
+    for grupos in _divisoes(n):
+        custo = _custo(custos, grupos, 0.0)
+        melhor[len(grupos)] = min(melhor.get(len(grupos), math.inf), custo)
+    return melhor
+
+
+@pytest.mark.parametrize('semente', range(40))
+def test_paginar_e_otima(semente):
+    rng = np.random.default_rng(semente)
+    fotos = _capitulo(rng, int(rng.integers(1, 12)))
+    custos = paginacao.tabela_custos(fotos).tolist()
+
+    grupos = paginacao.paginar(fotos)
+    otimo = min(_custo(custos, g) for g in _divisoes(len(fotos)))
+    assert grupos[0][0] == 0 and grupos[-1][1] == len(fotos)
+    assert all(a[1] == b[0] for a, b in zip(grupos, grupos[1:]))
+    assert _custo(custos, grupos) == pytest.approx(otimo, abs=1e-9)
+
+
+@pytest.mark.parametrize('semente', range(20))
+def test_paginar_nunca_mistura_eventos(semente):
+    rng = np.random.default_rng(100 + semente)
+    fotos = _capitulo(rng, int(rng.integers(2, 12)), eventos=True)
+    custos = paginacao.tabela_custos(fotos).tolist()
+
+    grupos = paginacao.paginar(fotos)
+    for ini, fim in grupos:
+        assert len({f.evento for f in fotos[ini:fim]}) == 1
+    viaveis = [g for g in _divisoes(len(fotos))
+               if all(len({f.evento for f in fotos[ini:fim]}) == 1 for ini, fim in g)]
+    assert _custo(custos, grupos) == pytest.approx(min(_custo(custos, g) for g in viaveis), abs=1e-9)
+
+
+def test_capitulo_vazio():
+    assert paginacao.paginar([]) == []
+    assert paginacao.paginar_capitulos([[], []]) == [[], []]
+
+
+@pytest.mark.parametrize('semente', range(10))
+def test_paginar_a_partir_igual_a_paginar_o_resto(semente):
+    rng = np.random.default_rng(200 + semente)
+    fotos = _capitulo(rng, int(rng.integers(2, 20)), eventos=True)
+    tabela = paginacao.tabela_paginacao(fotos)
+    for inicio in range(len(fotos)):
+        esperado = [(inicio + a, inicio + b) for a, b in paginacao.paginar(fotos[inicio:])]
+        assert paginacao.paginar_a_partir(tabela, inicio) == esperado
+
+
+def test_sem_orcamento_igual_a_paginar():
+    rng = np.random.default_rng(300)
+    capitulos = [_capitulo(rng, int(rng.integers(1, 15))) for _ in range(4)]
+    assert paginacao.paginar_capitulos(capitulos) == [paginacao.paginar(c) for c in capitulos]
+
+
+@pytest.mark.parametrize('semente', range(15))
+def test_orcamento_de_paginas(semente):
+    rng = np.random.default_rng(400 + semente)
+    capitulos = [_capitulo(rng, int(rng.integers(1, 9)), eventos=semente % 2 == 1) for _ in range(3)]
+    tabelas = [paginacao.tabela_custos(c).tolist() for c in capitulos]
+    melhores = [_melhor_por_paginas(t, len(c)) for t, c in zip(tabelas, capitulos)]
+
+    # Menor custo do livro para cada total de páginas, por força bruta
+    livro = {0: 0.0}
+    for melhor in melhores:
+        combinado = {}
+        for p, q in itertools.product(livro, melhor):
+            combinado[p + q] = min(combinado.get(p + q, math.inf), livro[p] + melhor[q])
+        livro = combinado
+    finitos = [p for p, custo in livro.items() if math.isfinite(custo)]
+    livre = sum(len(g) for g in paginacao.paginar_capitulos(capitulos))
+
+    for orcamento in range(min(finitos), livre + 1):
+        divisao = paginacao.paginar_capitulos(capitulos, orcamento)
+        paginas = sum(len(g) for g in divisao)
+        custo = sum(_custo(t, g, 0.0) for t, g in zip(tabelas, divisao))
+        assert paginas <= orcamento
+        # O preço de Lagrange dá a divisão ótima para o número de páginas
+        # que ela usa
+        assert custo == pytest.approx(livro[paginas], abs=1e-9)
+
+
+def test_orcamento_inalcancavel_usa_a_divisao_mais_compacta(capsys):
+    rng = np.random.default_rng(500)
+    capitulos = [_capitulo(rng, 8) for _ in range(2)]
+    compacta = paginacao.paginar_capitulos(capitulos, 1)
+    assert compacta == [paginacao._programacao_dinamica(paginacao.tabela_custos(c),
+                                                        CUSTO_PAGINA + paginacao.PRECO_PAGINA_MAXIMO)
+                        for c in capitulos]
+    assert 'AVISO' in capsys.readouterr().out
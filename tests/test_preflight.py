@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Preflight de DPI (PDFRenderer.preflight) contra o cálculo slot a slot com
+a geometria da versão de base (tests/base_7ae236d.py): boxes do
+PDFRenderer antigo, foto inteira posicionada como em _renderizar_foto e
+recortada pelo slot.
+"""
+
+import numpy as np
+import pytest
+
+import base_7ae236d as base
+from layouts import LAYOUTS, boxes_layout, fotos_por_layout
+from pdf_renderer import PDFRenderer
+from planejamento import DPI_MINIMO
+from schema_manager import FotoSchema, PaginaSchema, SchemaManager
+
+
+RENDERER_BASE = base.PDFRenderer()
+TAMANHOS = [(4032, 3024), (3024, 4032), (1920, 1080), (800, 600), (640, 480), (3000, 3000), (6000, 1000)]
+AJUSTES = [(0.5, 0.5, 1.0), (0.0, 0.0, 1.0), (1.0, 1.0, 2.5), (0.5, 0.5, 0.3),
+           (0.2, 0.8, 0.01), (-0.5, 1.5, 1.0), (0.5, 0.5, 8.0), (-3.0, 4.0, 1.0)]
+
+
+def _schema(pasta, rng, paginas=60):
+    """Capa, subcapa e páginas de conteúdo nos layouts registrados e em colagens."""
+    schema = SchemaManager(pasta)
+    schema.paginas = [PaginaSchema(tipo='capa', layout='L1', fotos=[]),
+                      PaginaSchema(tipo='subcapa', layout='L1', fotos=[], titulo='Capítulo')]
+    ids = list(LAYOUTS) + ['J:3-2', 'J:2-2-2']
+    for p in range(paginas):
+        layout = ids[rng.integers(len(ids))]
+        fotos = []
+        for j in range(fotos_por_layout(layout)):
+            w, h = TAMANHOS[rng.integers(len(TAMANHOS))]
+            pan_x, pan_y, zoom = AJUSTES[rng.integers(len(AJUSTES))]
+            fotos.append(FotoSchema(f'c/{p:03d}_{j}.jpg', w, h, 'paisagem', j, pan_x, pan_y, zoom))
+        schema.paginas.append(PaginaSchema(tipo='conteudo', layout=layout, fotos=fotos))
+    schema.paginas.append(PaginaSchema(tipo='contra_capa', layout='L1', fotos=[]))
+    return schema
+
+
+def _referencia(schema):
+    """(indice_pagina, slot_index, caminho, dpi, pixels, polegadas) de cada slot, um por vez."""
+    slots = []
+    for i, pagina in enumerate(schema.paginas):
+        if pagina.tipo != 'conteudo':
+            continue
+        pagina_impar = (i + 1) % 2 == 1
+        if pagina.layout in LAYOUTS:
+            boxes = RENDERER_BASE._calcular_boxes_layout(pagina.layout, RENDERER_BASE._calcular_area_util(pagina_impar))
+        else:
+            boxes = boxes_layout(pagina.layout, pagina_impar, pagina.proporcoes())
+        for foto in pagina.fotos:
+            if foto.slot_index >= len(boxes):
+                continue
+            x_box, y_box, w_box, h_box = box = boxes[foto.slot_index]
+            img_x, img_y, display_w, display_h = base.geometria_renderizar_foto(
+                foto.largura, foto.altura, box, foto.pan_x, foto.pan_y, foto.zoom)
+            # Parte da foto dentro do slot (nada, se o pan a tirou do slot)
+            visivel_w = max(0.0, min(x_box + w_box, img_x + display_w) - max(x_box, img_x))
+            visivel_h = max(0.0, min(y_box + h_box, img_y + display_h) - max(y_box, img_y))
+            escala = display_w / foto.largura
+            pixels = (visivel_w / escala, visivel_h / escala)
+            polegadas = (visivel_w / 72.0, visivel_h / 72.0)
+            dpi = pixels[0] / polegadas[0] if polegadas[0] > 0 else 0.0
+            slots.append((i, foto.slot_index, foto.caminho, dpi, pixels, polegadas))
+    return slots
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_preflight_igual_ao_calculo_slot_a_slot(tmp_path, semente):
+    schema = _schema(tmp_path, np.random.default_rng(semente))
+    obtidos = PDFRenderer(tmp_path, tmp_path / 'livro.pdf').preflight(schema)
+    esperados = _referencia(schema)
+
+    assert len(obtidos) == len(esperados) == sum(len(p.fotos) for p in schema.paginas)
+    for slot, (indice, slot_index, caminho, dpi, pixels, polegadas) in zip(obtidos, esperados):
+        assert (slot['indice_pagina'], slot['slot_index'], slot['caminho']) == (indice, slot_index, caminho)
+        # Os valores do preflight são arredondados (dpi a 0.1, pixels a 1, polegadas a 0.01)
+        assert slot['dpi'] == pytest.approx(dpi, abs=0.05 + 1e-9)
+        assert slot['pixels'] == pytest.approx(pixels, abs=0.5 + 1e-6)
+        assert slot['polegadas'] == pytest.approx(polegadas, abs=0.005 + 1e-9)
+        assert slot['abaixo'] == (dpi < DPI_MINIMO)
+
+
+def test_preflight_dpi_minimo(tmp_path):
+    schema = _schema(tmp_path, np.random.default_rng(10))
+    renderer = PDFRenderer(tmp_path, tmp_path / 'livro.pdf')
+    esperados = _referencia(schema)
+    for minimo in (72, 300, 1000):
+        abaixo = [s['abaixo'] for s in renderer.preflight(schema, minimo)]
+        assert abaixo == [dpi < minimo for _, _, _, dpi, _, _ in esperados]
+
+
+def test_preflight_ignora_slots_inexistentes_e_paginas_sem_fotos(tmp_path):
+    schema = SchemaManager(tmp_path)
+    schema.paginas = [
+        PaginaSchema(tipo='capa', layout='L1', fotos=[]),
+        PaginaSchema(tipo='conteudo', layout='L2H', fotos=[
+            FotoSchema('a.jpg', 4032, 3024, 'paisagem', 1),
+            FotoSchema('b.jpg', 4032, 3024, 'paisagem', 5),
+        ]),
+        PaginaSchema(tipo='conteudo', layout='L4', fotos=[]),
+        PaginaSchema(tipo='conteudo', layout='desconhecido', fotos=[
+            FotoSchema('c.jpg', 3024, 4032, 'retrato', 0),
+        ]),
+    ]
+    slots = PDFRenderer(tmp_path, tmp_path / 'livro.pdf').preflight(schema)
+    assert [(s['indice_pagina'], s['slot_index'], s['caminho']) for s in slots] == [(1, 1, 'a.jpg'), (3, 0, 'c.jpg')]
+    assert [s['dpi'] for s in slots] == [round(d, 1) for _, _, _, d, _, _ in _referencia(schema)]
+
+    schema.paginas = schema.paginas[:1]
+    assert PDFRenderer(tmp_path, tmp_path / 'livro.pdf').preflight(schema) == []
+
+
+def test_preflight_foto_fora_do_slot(tmp_path):
+    # Pan muito fora de 0..1 tira a foto do slot: nada visível, DPI 0
+    schema = SchemaManager(tmp_path)
+    schema.paginas = [PaginaSchema(tipo='conteudo', layout='L1', fotos=[
+        FotoSchema('a.jpg', 6000, 1000, 'paisagem', 0, pan_x=-3.0),
+    ])]
+    slot, = PDFRenderer(tmp_path, tmp_path / 'livro.pdf').preflight(schema)
+    assert slot['dpi'] == 0.0 and slot['abaixo']
+    assert slot['pixels'][0] == 0 and slot['polegadas'][0] == 0.0
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Paridade do motor de recortes (recortes.py) com as funções escalares da
+versão de base (tests/base_7ae236d.py), em casos aleatórios e de borda.
+"""
+
+import numpy as np
+import pytest
+
+import base_7ae236d as base
+from recortes import geometrias_exibicao, recortes_com_ajuste, recortes_inteligentes
+
+
+GERADOR = base.GeradorFotolivro()
+RENDERER = base.PDFRenderer()
+
+
+def _ancoras_aleatorias(rng, img_w, img_h):
+    """0 a 4 regiões dentro da foto (às vezes encostadas na borda)."""
+    ancoras = []
+    for _ in range(rng.integers(0, 5)):
+        w = int(rng.integers(1, max(2, img_w // 2)))
+        h = int(rng.integers(1, max(2, img_h // 2)))
+        x = int(rng.integers(0, max(1, img_w - w)))
+        y = int(rng.integers(0, max(1, img_h - h)))
+        ancoras.append((x, y, w, h))
+    return ancoras
+
+
+def _casos_aleatorios(n, semente=0):
+    """Fotos de celular e câmera em slots de layouts reais e arbitrários."""
+    rng = np.random.default_rng(semente)
+    casos = []
+    for _ in range(n):
+        img_w, img_h = (int(v) for v in rng.integers(200, 6000, size=2))
+        slot_w, slot_h = (float(v) for v in rng.uniform(50, 800, size=2))
+        pan_x, pan_y = (float(v) for v in rng.uniform(0, 1, size=2))
+        zoom = float(rng.choice([1.0, rng.uniform(0.3, 1.0), rng.uniform(1.0, 4.0)]))
+        casos.append((img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom,
+                      _ancoras_aleatorias(rng, img_w, img_h)))
+    return casos
+
+
+# Tamanhos de borda: proporção igual à do slot, 1x1, faixas finas, slots
+# minúsculos ou extremamente alongados
+TAMANHOS_BORDA = [
+    (4000, 3000, 400.0, 300.0),
+    (3000, 4000, 300.0, 400.0),
+    (1, 1, 771.02, 538.58),
+    (1, 1, 1.0, 1.0),
+    (1, 5000, 771.02, 538.58),
+    (5000, 1, 771.02, 538.58),
+    (2, 3, 0.001, 1000.0),
+    (3000, 2000, 1000.0, 0.001),
+    (6000, 4000, 1e-9, 1e-9),
+    (7, 13, 383.0, 538.58),
+]
+
+AJUSTES_BORDA = [
+    (0.5, 0.5, 1.0),
+    (0.0, 0.0, 1.0),
+    (1.0, 1.0, 1.0),
+    (-0.5, 1.5, 1.0),
+    (2.0, -3.0, 2.5),
+    (0.5, 0.5, 0.01),
+    (0.0, 1.0, 0.3),
+    (0.5, 0.5, 100.0),
+    (1.0, 0.0, 1e6),
+]
+
+
+def _ancoras_borda(img_w, img_h):
+    return [
+        [],
+        [(0, 0, 0, 0)],
+        [(img_w // 2, img_h // 2, 0, 0)],
+        [(0, 0, img_w, img_h)],
+        [(0, 0, 1, 1), (max(0, img_w - 1), max(0, img_h - 1), 1, 1)],
+        [(max(0, img_w - 2), 0, 2, img_h)],
+        [(0, 0, img_w // 3, img_h // 3), (0, 0, 0, img_h)],
+        [(img_w + 10, img_h + 10, 50, 50)],
+        [(-20, -20, 10, 10)],
+    ]
+
+
+def _comparar_inteligentes(casos):
+    img_w, img_h, slot_w, slot_h, ancoras = zip(*casos)
+    obtido = recortes_inteligentes(img_w, img_h, slot_w, slot_h, ancoras)
+    esperado = [base.calcular_crop_inteligente(*caso) for caso in casos]
+    assert obtido.tolist() == [list(r) for r in esperado]
+
+
+def _comparar_com_ajuste(casos):
+    img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom = zip(*casos)
+    obtido = recortes_com_ajuste(img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom)
+    for (iw, ih, sw, sh, px, py, z), recorte in zip(casos, obtido.tolist()):
+        ajuste = {'pan_x': px, 'pan_y': py, 'zoom': z}
+        assert recorte == list(GERADOR.calcular_crop_com_ajuste(iw, ih, sw, sh, ajuste))
+        assert recorte == list(RENDERER._calcular_crop(iw, ih, sw, sh, px, py, z))
+
+
+def _comparar_exibicao(casos):
+    img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom = zip(*casos)
+    obtido = geometrias_exibicao(img_w, img_h, slot_w, slot_h, pan_x, pan_y, zoom)
+    for (iw, ih, sw, sh, px, py, z), geometria in zip(casos, obtido):
+        # Slot na origem: a posição devolvida é relativa ao canto do slot
+        esperado = base.geometria_renderizar_foto(iw, ih, (0.0, 0.0, sw, sh), px, py, z)
+        np.testing.assert_allclose(geometria[:4], esperado, rtol=1e-12, atol=1e-9)
+        np.testing.assert_allclose(geometria[4], esperado[2] / iw, rtol=1e-12)
+
+
+def test_recortes_inteligentes_aleatorios():
+    casos = [(iw, ih, sw, sh, anc) for iw, ih, sw, sh, _, _, _, anc in _casos_aleatorios(2000)]
+    _comparar_inteligentes(casos)
+
+
+def test_recortes_inteligentes_bordas():
+    casos = [(iw, ih, sw, sh, anc)
+             for iw, ih, sw, sh in TAMANHOS_BORDA
+             for anc in _ancoras_borda(iw, ih)]
+    _comparar_inteligentes(casos)
+
+
+def test_recortes_inteligentes_foto_sem_pixels():
+    # A base trata altura 0 como proporção 1; o recorte fica vazio e
+    # centralizado, com ou sem âncoras
+    casos = [(iw, ih, 400.0, 300.0, anc)
+             for iw, ih in [(0, 0), (100, 0), (0, 100)]
+             for anc in ([], [(0, 0, 0, 0)], [(0, 0, 10, 10)])]
+    _comparar_inteligentes(casos)
+
+
+def test_recortes_com_ajuste_aleatorios():
+    _comparar_com_ajuste([caso[:7] for caso in _casos_aleatorios(2000, semente=1)])
+
+
+def test_recortes_com_ajuste_bordas():
+    _comparar_com_ajuste([(iw, ih, sw, sh, px, py, z)
+                          for iw, ih, sw, sh in TAMANHOS_BORDA
+                          for px, py, z in AJUSTES_BORDA])
+
+
+# Slot com exatamente a proporção da foto, em que int(altura * proporção)
+# não volta à largura por arredondamento: o desempate da base decide o recorte
+EMPATES = [(1, 49), (1, 93), (1007, 1440), (1014, 3024), (1042, 4032),
+           (4000, 3000), (1920, 1080), (1, 1)]
+
+
+def test_recortes_inteligentes_empate_de_proporcao():
+    # A base usa '>=' no recorte inteligente: empate corta a largura
+    _comparar_inteligentes([(iw, ih, float(iw), float(ih), anc)
+                            for iw, ih in EMPATES
+                            for anc in ([], [(0, 0, 1, 1)])])
+
+
+def test_recortes_com_ajuste_empate_de_proporcao():
+    # ... e '>' no recorte com ajuste: empate corta a altura
+    _comparar_com_ajuste([(iw, ih, float(iw), float(ih), px, py, z)
+                          for iw, ih in EMPATES
+                          for px, py, z in AJUSTES_BORDA])
+
+
+def test_geometrias_exibicao_aleatorias():
+    _comparar_exibicao([caso[:7] for caso in _casos_aleatorios(2000, semente=2)])
+
+
+def test_geometrias_exibicao_bordas():
+    _comparar_exibicao([(iw, ih, sw, sh, px, py, z)
+                        for iw, ih, sw, sh in TAMANHOS_BORDA
+                        for px, py, z in AJUSTES_BORDA])
+
+
+@pytest.mark.parametrize('zoom', [0.0, 0.01, 0.3])
+def test_geometrias_exibicao_zoom_abaixo_do_contain(zoom):
+    # Zoom abaixo do contain é limitado: a foto inteira cabe no slot
+    x, y, w, h, _ = geometrias_exibicao([4000], [3000], [300.0], [400.0],
+                                        [0.5], [0.5], [zoom])[0]
+    assert w == pytest.approx(300.0)
+    assert h <= 400.0
+    assert x == pytest.approx(0.0)
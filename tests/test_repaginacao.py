@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Troca de layout incremental (SchemaManager.redistribuir_fotos_capitulo)
+contra a paginação do schema gerado (--regenerar), com destaques: as fotos
+mais nítidas ganham página inteira nos dois caminhos.
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+import paginacao
+from layouts import LAYOUTS, fotos_por_layout
+from qualidade_fotos import escolher_destaques
+from schema_manager import FotoSchema, PaginaSchema, SchemaManager
+
+
+TAMANHOS = [(4032, 3024), (3024, 4032), (4032, 1960), (1920, 1440), (1440, 1920), (800, 600)]
+
+
+def _capitulos(rng, num_capitulos=3, por_capitulo=40):
+    """Fotos (dicts como os de gerar_schema_inicial) com nitidez, pessoas e eventos."""
+    capitulos = []
+    for c in range(num_capitulos):
+        fotos, evento = [], 0
+        for i in range(por_capitulo):
+            w, h = TAMANHOS[rng.integers(len(TAMANHOS))]
+            regioes = [[int(rng.integers(0, w // 2)), int(rng.integers(0, h // 2)), w // 5, h // 5]
+                       for _ in range(int(rng.integers(0, 4)))]
+            if i and rng.random() < 0.05:
+                evento += 1
+            fotos.append({'caminho': f'c{c}/{i:03d}.jpg', 'largura': w, 'altura': h,
+                          'orientacao': 'paisagem' if w > h else 'retrato',
+                          'qualidade': {'nitidez': float(rng.uniform(0, 400))},
+                          'regioes': regioes, 'evento': evento})
+        capitulos.append(fotos)
+    return capitulos
+
+
+def _schema(pasta, capitulos):
+    """Páginas como as de gerar_schema_inicial (capa, subcapas, conteúdo, contra capa)."""
+    schema = SchemaManager(pasta)
+    schema.paginas = [PaginaSchema(tipo='capa', layout='L1', fotos=[])]
+    for c, grupos in enumerate(schema._agrupar_capitulos(capitulos)):
+        schema.paginas.append(PaginaSchema(tipo='subcapa', layout='L1', fotos=[], titulo=f'Capítulo {c}'))
+        for layout, grupo, slots in grupos:
+            schema.paginas.append(PaginaSchema(tipo='conteudo', layout=layout, fotos=[
+                FotoSchema(f['caminho'], f['largura'], f['altura'], f['orientacao'], slot,
+                           qualidade=f['qualidade'], regioes=f['regioes'], evento=f['evento'])
+                for f, slot in zip(grupo, slots)
+            ]))
+    schema.paginas.append(PaginaSchema(tipo='contra_capa', layout='L1', fotos=[]))
+    return schema
+
+
+def _assinaturas(paginas):
+    return [(p.layout, sorted((f.slot_index, f.caminho) for f in p.fotos)) for p in paginas]
+
+
+def _esperadas(schema, indice, novo_layout):
+    """
+    Páginas do resto do capítulo pelo caminho do --regenerar: destaques
+    escolhidos no capítulo inteiro, página atual no novo layout e o resto
+    paginado do zero.
+    """
+    inicio, fim = schema.encontrar_limites_capitulo(indice)
+    capitulo = [f for p in schema.paginas[inicio:fim] for f in p.fotos]
+    destaques = escolher_destaques([(f.qualidade or {}).get('nitidez') for f in capitulo],
+                                   [(f.largura, f.altura) for f in capitulo])
+    sinteticas = [paginacao.FotoPaginacao(f.largura, f.altura,
+                                          'full' if f.slot_tipo == 'auto' and i in destaques else f.slot_tipo,
+                                          tuple(tuple(r) for r in f.regioes or []), f.evento)
+                  for i, f in enumerate(capitulo)]
+
+    primeira = sum(len(p.fotos) for p in schema.paginas[inicio:indice])
+    fim_atual = min(primeira + fotos_por_layout(novo_layout), len(capitulo))
+    ordem = list(range(fim_atual - primeira))
+    if fim_atual - primeira == fotos_por_layout(novo_layout):
+        (_, ordem), = paginacao.layouts_grupos(sinteticas[primeira:fim_atual],
+                                               [(0, fim_atual - primeira)], [novo_layout])
+    esperadas = [(novo_layout, sorted((s, capitulo[primeira + i].caminho) for s, i in enumerate(ordem)))]
+    resto = sinteticas[fim_atual:]
+    grupos = paginacao.paginar(resto)
+    for (a, _), (layout, ordem) in zip(grupos, paginacao.layouts_grupos(resto, grupos)):
+        esperadas.append((layout, sorted((s, capitulo[fim_atual + i].caminho) for s, i in enumerate(ordem))))
+    return esperadas
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_trocar_pelo_mesmo_layout_nao_muda_o_capitulo(tmp_path, semente):
+    # O schema acabou de ser gerado: repaginar a partir de qualquer página
+    # mantendo o layout dela não pode juntar um destaque com outras fotos
+    schema = _schema(tmp_path, _capitulos(np.random.default_rng(semente)))
+    destaques = [p for p in schema.paginas if p.tipo == 'conteudo' and p.layout == 'L1']
+    assert destaques
+    antes = _assinaturas(schema.paginas)
+    for indice, pagina in enumerate(list(schema.paginas)):
+        if pagina.tipo != 'conteudo':
+            continue
+        inicio, fim = schema.encontrar_limites_capitulo(indice)
+        repaginacao = schema.redistribuir_fotos_capitulo(indice, pagina.layout, len(pagina.fotos), inicio, fim)
+        assert repaginacao.alteradas == []
+    assert _assinaturas(schema.paginas) == antes
+
+
+@pytest.mark.parametrize('semente', range(3))
+def test_troca_de_layout_igual_ao_regenerar(tmp_path, semente):
+    rng = np.random.default_rng(10 + semente)
+    schema = _schema(tmp_path, _capitulos(rng))
+    for _ in range(30):
+        conteudo = [i for i, p in enumerate(schema.paginas) if p.tipo == 'conteudo']
+        indice = int(conteudo[rng.integers(len(conteudo))])
+        novo_layout = list(LAYOUTS)[rng.integers(len(LAYOUTS))]
+        esperadas = _esperadas(schema, indice, novo_layout)
+
+        inicio, fim = schema.encontrar_limites_capitulo(indice)
+        schema.redistribuir_fotos_capitulo(indice, novo_layout, fotos_por_layout(novo_layout), inicio, fim)
+        _, fim = schema.encontrar_limites_capitulo(indice)
+        assert _assinaturas(schema.paginas[indice:fim]) == esperadas
+
+
+def test_salvar_e_preparar_repaginacao_esperam_a_trava(tmp_path):
+    # O preview salva e prepara as tabelas em threads enquanto as
+    # requisições mudam as páginas com a trava do schema
+    schema = _schema(tmp_path, _capitulos(np.random.default_rng(20), num_capitulos=2, por_capitulo=15))
+    schema._indexar_capitulos()
+    salvar = threading.Thread(target=schema.salvar)
+    preparar = threading.Thread(target=schema.preparar_repaginacao)
+    with schema.trava:
+        salvar.start()
+        preparar.start()
+        salvar.join(0.2)
+        preparar.join(0.2)
+        assert salvar.is_alive() and preparar.is_alive()
+        assert not schema.schema_path.exists()
+        assert all(c.tabela is None for c in schema._capitulos)
+    salvar.join()
+    preparar.join()
+    assert schema.schema_path.exists()
+    assert all(c.tabela is not None for c in schema._capitulos)
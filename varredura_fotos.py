@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Varredura das Pastas de Fotos
+
+Este módulo percorre a pasta raiz uma única vez (os.scandir), resolve as
+pastas dos capítulos sem diferenciar maiúsculas/minúsculas e lista as
+imagens de todos os capítulos em paralelo.
+
+O resultado é um retrato imutável (VarreduraFotos) que pode ser
+compartilhado pelo GeradorFotolivro, pelo SchemaManager e pelo gerar_capas,
+evitando varrer a mesma pasta várias vezes (custo alto em pastas de rede).
+"""
+
+import os
+from pathlib import Path
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from constantes import PASTAS_ANOS, EXTENSOES_IMAGEM
+
+
+@dataclass(frozen=True)
+class CapituloVarrido:
+    """Uma pasta de capítulo (ano) encontrada na varredura."""
+    nome_pasta: str  # Nome esperado (ex.: 'Infantil1')
+    pasta: Optional[Path]  # Pasta real encontrada (None se não existe)
+    imagens: Tuple[Path, ...]  # Imagens válidas, ordenadas por nome
+
+
+@dataclass(frozen=True)
+class VarreduraFotos:
+    """Retrato imutável das pastas de capítulos e suas imagens."""
+    pasta_raiz: Path
+    capitulos: Tuple[CapituloVarrido, ...]
+
+    def capitulo(self, nome_pasta: str) -> Optional[CapituloVarrido]:
+        """Retorna o capítulo pelo nome esperado da pasta."""
+        for cap in self.capitulos:
+            if cap.nome_pasta == nome_pasta:
+                return cap
+        return None
+
+    def pastas_faltando(self) -> List[str]:
+        """Nomes das pastas de capítulo que não existem na raiz."""
+        return [cap.nome_pasta for cap in self.capitulos if cap.pasta is None]
+
+    def todas_imagens(self) -> List[Path]:
+        """Todas as imagens, na ordem dos capítulos."""
+        return [img for cap in self.capitulos for img in cap.imagens]
+
+
+def _listar_imagens_scandir(pasta: Path, extensoes: Iterable[str]) -> Tuple[Path, ...]:
+    """Lista as imagens de uma pasta com os.scandir, ordenadas por nome."""
+    extensoes = {e.lower() for e in extensoes}
+    nomes = []
+    try:
+        with os.scandir(pasta) as entradas:
+            for entrada in entradas:
+                if os.path.splitext(entrada.name)[1].lower() not in extensoes:
+                    continue
+                try:
+                    if entrada.is_file():
+                        nomes.append(entrada.name)
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"AVISO: Não foi possível listar {pasta}: {e}")
+        return ()
+
+    return tuple(pasta / nome for nome in sorted(nomes))
+
+
+def escanear_pastas(
+    pasta_raiz: Path,
+    pastas: Iterable[str] = PASTAS_ANOS,
+    extensoes: Iterable[str] = EXTENSOES_IMAGEM,
+    max_workers: Optional[int] = None
+) -> VarreduraFotos:
+    """
+    Varre a pasta raiz uma vez e lista as imagens de cada capítulo.
+
+    Args:
+        pasta_raiz: Pasta que contém as pastas dos anos
+        pastas: Nomes esperados das pastas, na ordem do livro
+        extensoes: Extensões de imagem aceitas
+        max_workers: Threads para listar os capítulos (padrão: um por capítulo)
+
+    Retorna:
+        VarreduraFotos com um CapituloVarrido para cada nome em `pastas`.
+    """
+    pasta_raiz = Path(pasta_raiz)
+    pastas = list(pastas)
+
+    # Uma única passada na raiz: nome em minúsculas -> pasta real
+    subpastas: Dict[str, Path] = {}
+    try:
+        with os.scandir(pasta_raiz) as entradas:
+            for entrada in entradas:
+                try:
+                    if entrada.is_dir():
+                        subpastas.setdefault(entrada.name.lower(), pasta_raiz / entrada.name)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+
+    encontradas = [subpastas.get(nome.lower()) for nome in pastas]
+
+    # Listar os capítulos em paralelo (I/O bound, ideal para threads)
+    a_listar = [p for p in encontradas if p is not None]
+    listagens: Dict[Path, Tuple[Path, ...]] = {}
+    if a_listar:
+        workers = max_workers or len(a_listar)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            resultados = executor.map(lambda p: _listar_imagens_scandir(p, extensoes), a_listar)
+            listagens = dict(zip(a_listar, resultados))
+
+    capitulos = tuple(
+        CapituloVarrido(
+            nome_pasta=nome,
+            pasta=pasta,
+            imagens=listagens.get(pasta, ()) if pasta is not None else ()
+        )
+        for nome, pasta in zip(pastas, encontradas)
+    )
+
+    return VarreduraFotos(pasta_raiz=pasta_raiz, capitulos=capitulos)